@@ -0,0 +1,5 @@
+import logging
+
+# the package logs through the 'al_contacts' logger and stays silent until the application
+# configures logging, see al_contacts.log.configure_logging()
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -0,0 +1,204 @@
+#! /usr/bin/env python
+
+import os
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from al_contacts.contacts import load_csv_file
+
+
+class BatchException(Exception):
+    """
+    Exception raised by the batch job functions.
+    """
+    pass
+
+
+def collect_inputs(patterns=None, manifest=None):
+    """
+    Collect the input csv files of a batch run from glob patterns and/or a manifest file.
+
+    :Params:
+        patterns: `list`
+            glob patterns of input csv files.
+        manifest: `str`
+            path of a text file with one input csv file per line. Blank lines and lines starting
+            with '#' are skipped, relative paths are relative to the manifest's directory.
+
+    :Returns:
+        `list` of absolute paths, without duplicates, in the order they were found.
+    """
+    inputs = []
+    for pattern in patterns or []:
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise BatchException('No input files match the pattern "{0}"'.format(pattern))
+        inputs.extend(matches)
+
+    if manifest:
+        if not os.path.exists(manifest):
+            raise BatchException('Manifest file does not exist: "{0}"'.format(manifest))
+        baseDir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, 'r') as fp:
+            for line in fp:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    inputs.append(os.path.join(baseDir, line))
+
+    paths = []
+    for path in inputs:
+        path = os.path.abspath(path)
+        if path not in paths:
+            paths.append(path)
+    return paths
+
+
+def plan_jobs(inputs, formats, outputDir):
+    """
+    Make one job per input file. Each job serialises its input to every format in 'formats',
+    as '<outputDir>/<input file name>.<format>'.
+
+    :Params:
+        inputs: `list`
+            paths of the input csv files.
+        formats: `list`
+            names of the registered formats to serialise to.
+        outputDir: `str`
+            directory to write the serialised files to.
+
+    :Returns:
+        `list` of (input path, [(format, output path), ...]) tuples.
+    """
+    if not inputs:
+        raise BatchException('No input files to process')
+    if not formats:
+        raise BatchException('No formats to serialise to')
+
+    jobs = []
+    outputs = set()
+    for path in inputs:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        targets = []
+        for aFormat in formats:
+            output = os.path.join(outputDir, '{0}.{1}'.format(stem, aFormat))
+            if output in outputs:
+                raise BatchException('More than one input file would be written to "{0}"'.format(output))
+            outputs.add(output)
+            targets.append((aFormat, output))
+        jobs.append((path, targets))
+    return jobs
+
+
+def run_job(job):
+    """
+    Run a single batch job: load the input csv file once and serialise it to each target format.
+    This runs in the worker processes, where the format registry is built once per process on
+    the first job and then reused.
+
+    :Params:
+        job: `tuple`
+            (input path, [(format, output path), ...]) as made by plan_jobs().
+
+    :Returns:
+        `list` of result dictionaries, one per target format, with keys = ['input', 'format',
+        'output', 'rows', 'bytes', 'seconds', 'error']
+    """
+    from al_contacts.common import FORMATS_MAP
+
+    path, targets = job
+    results = []
+    try:
+        start = time.perf_counter()
+        data = load_csv_file(path)
+        loadTime = time.perf_counter() - start
+    except Exception as e:
+        return [_result(path, aFormat, output, error=e) for aFormat, output in targets]
+
+    for aFormat, output in targets:
+        start = time.perf_counter()
+        try:
+            FORMATS_MAP[aFormat].notify_rw('serialise', data, output)
+        except Exception as e:
+            results.append(_result(path, aFormat, output, error=e))
+            continue
+        seconds = loadTime + time.perf_counter() - start
+        results.append(_result(path, aFormat, output, len(data), os.path.getsize(output), seconds))
+        # the csv load is shared by all the formats of the job, count it once.
+        loadTime = 0.0
+
+    return results
+
+
+def _result(path, aFormat, output, rows=0, size=0, seconds=0.0, error=None):
+    """
+    Make a result dictionary for run_job()
+    """
+    return {
+        'input': path,
+        'format': aFormat,
+        'output': output,
+        'rows': rows,
+        'bytes': size,
+        'seconds': seconds,
+        'error': '{0}: {1}'.format(type(error).__name__, error) if error else '',
+    }
+
+
+def run_batch(inputs, formats, outputDir, workers=None):
+    """
+    Serialise every input csv file to every format, fanning the jobs out over a process pool.
+
+    :Params:
+        inputs: `list`
+            paths of the input csv files.
+        formats: `list`
+            names of the registered formats to serialise to.
+        outputDir: `str`
+            directory to write the serialised files to. Created if it does not exist.
+        workers: `int`
+            number of worker processes. Defaults to the number of CPUs. With 1 worker the jobs
+            run in the current process.
+
+    :Returns:
+        `list` of result dictionaries, see run_job(), in input order.
+    """
+    jobs = plan_jobs(inputs, formats, outputDir)
+    if not os.path.isdir(outputDir):
+        os.makedirs(outputDir)
+
+    if workers == 1:
+        return [result for job in jobs for result in run_job(job)]
+
+    # a few jobs per task keeps the pool's IPC overhead low for thousands of small files.
+    chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [result for results in executor.map(run_job, jobs, chunksize=chunksize) for result in results]
+
+
+def format_summary(results):
+    """
+    Make a text table of the rows, bytes and time of each batch job.
+
+    :Params:
+        results: `list`
+            result dictionaries as returned by run_batch().
+    """
+    line = '-'*112
+    rowFormat = '| {0:<50} | {1:<8} | {2:>10} | {3:>12} | {4:>14} |'
+    lines = [line, rowFormat.format('Input', 'Format', 'Rows', 'Bytes', 'Time (s)'), line]
+    for result in results:
+        if result['error']:
+            lines.append('| {0:<50} | {1:<8} | {2:<42} |'.format(
+                result['input'][-50:], result['format'], 'FAILED: ' + result['error'][:34]))
+        else:
+            lines.append(rowFormat.format(
+                result['input'][-50:], result['format'], result['rows'], result['bytes'],
+                '{0:.4f}'.format(result['seconds'])))
+    lines.append(line)
+
+    failed = len([result for result in results if result['error']])
+    lines.append('{0} jobs, {1} failed, {2} rows, {3} bytes, {4:.4f} s'.format(
+        len(results), failed, sum(result['rows'] for result in results),
+        sum(result['bytes'] for result in results), sum(result['seconds'] for result in results)))
+    return '\n'.join(lines)
@@ -0,0 +1,473 @@
+#! /usr/bin/env python
+
+import gc
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import datetime
+import subprocess
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# version of the layout of the json report
+REPORT_SCHEMA = 1
+
+DEFAULT_SEED = 0
+DEFAULT_ROWS = [1000, 100000]
+DEFAULT_REPEAT = 3
+
+# the views render at most this many rows, a table of 10M rows is not a useful measurement
+DEFAULT_VIEW_ROWS = 100000
+
+# number of contacts the generator draws at a time. The contacts of a seed do not depend on
+# the batch size they are read in, since the random draws are always made per chunk.
+GENERATOR_CHUNK = 10000
+
+FIRST_NAMES = [
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+    'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+    'Rahul', 'Priya', 'Amir', 'Fatima', 'Wei', 'Mei', 'Olu', 'Ada', 'Sean', 'Niamh', 'Lars',
+    'Ingrid', 'Mateo', 'Lucia',
+]
+LAST_NAMES = [
+    'Smith', 'Jones', 'Taylor', 'Brown', 'Williams', 'Wilson', 'Johnson', 'Davies', 'Robinson',
+    'Wright', 'Thompson', 'Evans', 'Walker', 'White', 'Roberts', 'Green', 'Hall', 'Wood',
+    'Singh', 'Patel', 'Khan', 'Chen', 'Okafor', 'Murphy', 'Larsen', 'Garcia', 'Bird', 'Brainerd',
+    'Kumar', 'Ali', 'Novak', 'Rossi',
+]
+STREETS = [
+    'Maidstone Road', 'Queens Road', 'Great Portland Street', 'High Street', 'Station Road',
+    'Church Lane', 'Park Avenue', 'Mill Lane', 'Victoria Road', 'Green Lane', 'Manor Road',
+    'Kings Road', 'London Road', 'Springfield Road', 'The Crescent', 'Grange Road',
+]
+POSTCODE_AREAS = ['N', 'E', 'SE', 'SW', 'W', 'NW', 'EC', 'WC', 'CA', 'BT', 'EH', 'M', 'B', 'LS']
+
+
+class BenchmarkException(Exception):
+    """
+    Exception raised by the benchmark functions.
+    """
+    pass
+
+
+def _pools(rng):
+    """
+    Draw the pools the contacts are picked from: full names, addresses, and the two halves of
+    the phone numbers. Picking from pools keeps the generator at about a million contacts per
+    second, where formatting every field of every contact would be several times slower.
+    """
+    letters = 'ABDEFGHJLNPQRSTUWXYZ'
+    names = [first + ' ' + last for first in FIRST_NAMES for last in LAST_NAMES]
+    addresses = ['{0} {1} {2}{3}{4}{5}{6}'.format(
+        rng.randrange(1, 300), rng.choice(STREETS), rng.choice(POSTCODE_AREAS), rng.randrange(1, 30),
+        rng.randrange(10), rng.choice(letters), rng.choice(letters)) for _ in range(4096)]
+    prefixes = ['07%04d' % number for number in range(10000)]
+    suffixes = ['%05d' % number for number in range(100000)]
+    return names, addresses, prefixes, suffixes
+
+
+def _generate_chunk(rng, pools, count):
+    """
+    Draw 'count' contacts, one column at a time.
+    """
+    choices = rng.choices
+    names, addresses, prefixes, suffixes = pools
+    columns = zip(choices(names, k=count), choices(addresses, k=count), choices(prefixes, k=count),
+                  choices(suffixes, k=count))
+    return [
+        {'name': name, 'address': address, 'phone': prefix + suffix}
+        for name, address, prefix, suffix in columns
+    ]
+
+
+def iter_contacts(count, seed=DEFAULT_SEED, batchSize=GENERATOR_CHUNK):
+    """
+    Yield 'count' synthetic contacts in lists of at most 'batchSize' dictionaries. The same seed
+    always yields the same contacts.
+
+    :Params:
+        count: `int`
+            number of contacts to generate.
+        seed: `int`
+            seed of the random generator.
+        batchSize: `int`
+            maximum number of contacts per batch.
+    """
+    if batchSize < 1:
+        raise BenchmarkException('Batch size must be a positive number, not "{0}"'.format(batchSize))
+
+    rng = random.Random(seed)
+    pools = _pools(rng)
+    produced = 0
+    while produced < count:
+        chunk = _generate_chunk(rng, pools, min(GENERATOR_CHUNK, count - produced))
+        for start in range(0, len(chunk), batchSize):
+            yield chunk[start:start + batchSize]
+        produced += len(chunk)
+
+
+def generate_contacts(count, seed=DEFAULT_SEED):
+    """
+    Return a list of 'count' synthetic contacts with keys = ['name', 'address', 'phone'].
+
+    :Params:
+        count: `int`
+            number of contacts to generate.
+        seed: `int`
+            seed of the random generator.
+    """
+    # the cyclic garbage collector would scan the growing list over and over, and the contacts
+    # can not form cycles anyway
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return [item for batch in iter_contacts(count, seed) for item in batch]
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def parse_rows(text):
+    """
+    Parse a number of rows, with an optional K or M suffix, e.g. '10M'.
+    """
+    multipliers = {'K': 1000, 'M': 1000000}
+    text = text.strip().upper()
+    try:
+        if text[-1:] in multipliers:
+            rows = int(float(text[:-1]) * multipliers[text[-1]])
+        else:
+            rows = int(text)
+    except ValueError:
+        raise BenchmarkException('Invalid number of rows "{0}"'.format(text))
+    if rows < 1:
+        raise BenchmarkException('Number of rows must be positive, not "{0}"'.format(text))
+    return rows
+
+
+def peak_rss():
+    """
+    Return the peak resident set size of the current process in bytes, or None where the
+    platform does not report it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def _timed(function, repeat):
+    """
+    Call 'function' 'repeat' times and return (seconds of each call, result of the last call).
+    """
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+def _traced(function, name, action, rows):
+    """
+    Run 'function' once more, with tracemalloc tracing its memory, and return the memory report
+    of its stages, see al_contacts.instrumentation.MemoryHook.report(). The whole call is the
+    'benchmark.<action>' stage, the stages of the formats and views run inside it follow.
+    """
+    from al_contacts.instrumentation import MemoryHook, add_hook, remove_hook, stage
+
+    hook = MemoryHook()
+    hook.start()
+    add_hook(hook)
+    try:
+        with stage('benchmark.' + action, name) as aStage:
+            # the result is still referenced when the stage ends, so it counts as retained
+            result = function()
+            aStage.records = rows
+    finally:
+        remove_hook(hook)
+        hook.stop()
+    del result
+    return hook.report()
+
+
+def run_action(kind, name, action, rows, seed, path, repeat, memprofile=False):
+    """
+    Measure one action of a format or a view in the current process, see run_worker().
+
+    :Params:
+        memprofile: `bool`
+            after the timed runs, run the action once more with tracemalloc to measure the peak
+            and retained memory of its stages. tracemalloc slows the run down, so this run is
+            not timed.
+
+    :Returns:
+        result dictionary with keys = ['kind', 'name', 'action', 'rows', 'seconds', 'samples',
+        'records_per_s', 'bytes', 'bytes_per_s', 'base_rss_bytes', 'peak_rss_bytes'], and 'memory'
+        with 'memprofile', the list of stage dictionaries of MemoryHook.report()
+    """
+    from al_contacts.common import FORMATS_MAP, VIEWS_MAP
+
+    if kind == 'format' and action == 'serialise':
+        formatObj = FORMATS_MAP[name]
+        data = generate_contacts(rows, seed)
+        baseRss = peak_rss()
+        function = lambda: formatObj.notify_rw('serialise', data, path)
+        samples, result = _timed(function, repeat)
+        size = os.path.getsize(path)
+    elif kind == 'format' and action == 'deserialise':
+        formatObj = FORMATS_MAP[name]
+        baseRss = peak_rss()
+        function = lambda: formatObj.notify_rw('deserialise', path)
+        samples, result = _timed(function, repeat)
+        size = os.path.getsize(path)
+        if len(result) != rows:
+            raise BenchmarkException('Deserialised {0} records instead of {1}'.format(len(result), rows))
+        del result
+    elif kind == 'view' and action == 'render':
+        view = VIEWS_MAP[name]
+        data = generate_contacts(rows, seed)
+        baseRss = peak_rss()
+        function = lambda: view.render(data)
+        samples, result = _timed(function, repeat)
+        size = len(result.encode('utf-8'))
+        del result
+    else:
+        raise BenchmarkException('Invalid benchmark "{0} {1} {2}"'.format(kind, name, action))
+
+    seconds = min(samples)
+    result = {
+        'kind': kind,
+        'name': name,
+        'action': action,
+        'rows': rows,
+        'seconds': seconds,
+        'samples': samples,
+        'records_per_s': rows / seconds if seconds else None,
+        'bytes': size,
+        'bytes_per_s': size / seconds if seconds else None,
+        'base_rss_bytes': baseRss,
+        'peak_rss_bytes': peak_rss(),
+    }
+    if memprofile:
+        result['memory'] = _traced(function, name, action, rows)
+    return result
+
+
+def run_worker(kind, name, action, rows, seed, path, repeat, memprofile=False):
+    """
+    Measure one action in a fresh interpreter, so that its peak RSS is not mixed up with the
+    memory of the other benchmarks, and return its result dictionary.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([PACKAGE_ROOT, env.get('PYTHONPATH', '')])
+    command = [sys.executable, '-m', 'al_contacts.benchmark', 'worker', kind, name, action,
+               '--rows', str(rows), '--seed', str(seed), '--path', path, '--repeat', str(repeat)]
+    if memprofile:
+        command.append('--memprofile')
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+                             universal_newlines=True)
+    if process.returncode:
+        raise BenchmarkException('Benchmark "{0} {1} {2}" of {3} rows failed:\n{4}'.format(
+            kind, name, action, rows, process.stderr))
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+def run_benchmarks(rows=DEFAULT_ROWS, formats=None, views=None, seed=DEFAULT_SEED, repeat=DEFAULT_REPEAT,
+                   viewRows=DEFAULT_VIEW_ROWS, workDir=None, progress=None, memprofile=False):
+    """
+    Run the serialise/deserialise benchmarks of each format and the render benchmark of each
+    view, for each number of rows, each in its own interpreter.
+
+    :Params:
+        rows: `list`
+            numbers of contacts to benchmark with.
+        formats: `list`
+            names of the formats to benchmark. Defaults to all the registered formats.
+        views: `list`
+            names of the views to benchmark. Defaults to all the registered views.
+        seed: `int`
+            seed of the contact generator.
+        repeat: `int`
+            number of times each action is timed, the fastest time is reported.
+        viewRows: `int`
+            maximum number of contacts rendered by the views.
+        workDir: `str`
+            directory for the serialised files. Defaults to a temporary directory.
+        progress: `callable`
+            called with each result dictionary as it is measured.
+        memprofile: `bool`
+            also measure the tracemalloc peak and retained memory of each action.
+
+    :Returns:
+        the report dictionary, see write_report().
+    """
+    from al_contacts.common import FORMATS_MAP, VIEWS_MAP
+
+    formats = list(FORMATS_MAP.keys()) if formats is None else formats
+    views = list(VIEWS_MAP.keys()) if views is None else views
+    for aFormat in formats:
+        if aFormat not in FORMATS_MAP:
+            raise BenchmarkException('Invalid format specified: "{0}"'.format(aFormat))
+    for aView in views:
+        if aView not in VIEWS_MAP:
+            raise BenchmarkException('Invalid view specified: "{0}"'.format(aView))
+
+    tmpDir = workDir or tempfile.mkdtemp(prefix='al_contacts_benchmark')
+    results = []
+
+    def measure(*args):
+        result = run_worker(*args, memprofile=memprofile)
+        results.append(result)
+        if progress:
+            progress(result)
+
+    try:
+        for count in rows:
+            for aFormat in formats:
+                path = os.path.join(tmpDir, 'contacts_{0}.{1}'.format(count, aFormat))
+                measure('format', aFormat, 'serialise', count, seed, path, repeat)
+                measure('format', aFormat, 'deserialise', count, seed, path, repeat)
+                os.remove(path)
+            for aView in views:
+                measure('view', aView, 'render', min(count, viewRows), seed, '', repeat)
+    finally:
+        if workDir is None:
+            shutil.rmtree(tmpDir, ignore_errors=True)
+
+    return {
+        'schema': REPORT_SCHEMA,
+        'meta': {
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': seed,
+            'repeat': repeat,
+            'memprofile': memprofile,
+        },
+        'results': results,
+    }
+
+
+def write_report(report, path):
+    """
+    Write a benchmark report as json to 'path'.
+
+    The report is a dictionary with keys = ['schema', 'meta', 'results'], where each result has
+    keys = ['kind', 'name', 'action', 'rows', 'seconds', 'samples', 'records_per_s', 'bytes',
+    'bytes_per_s', 'base_rss_bytes', 'peak_rss_bytes'], plus 'memory' when the memory was
+    traced, and is identified by its kind, name, action and rows.
+    """
+    with open(path, 'w') as fp:
+        json.dump(report, fp, indent=2, sort_keys=True)
+        fp.write('\n')
+
+
+def read_report(path):
+    """
+    Read a benchmark report written by write_report().
+    """
+    try:
+        with open(path, 'r') as fp:
+            report = json.load(fp)
+    except (OSError, ValueError) as e:
+        raise BenchmarkException('Cannot read the benchmark report "{0}": {1}'.format(path, e))
+    if report.get('schema') != REPORT_SCHEMA:
+        raise BenchmarkException('Unsupported benchmark report schema "{0}" in "{1}"'.format(report.get('schema'), path))
+    return report
+
+
+def format_result(result):
+    """
+    Make a one line summary of a result dictionary.
+    """
+    rss = result['peak_rss_bytes']
+    line = '{0:<6} {1:<8} {2:<12} {3:>10} rows {4:>10.4f} s {5:>12,.0f} rec/s {6:>14,} bytes {7:>10} MB rss'.format(
+        result['kind'], result['name'], result['action'], result['rows'], result['seconds'],
+        result['records_per_s'] or 0, result['bytes'], '{0:.1f}'.format(rss / 1048576.0) if rss else '-')
+    if result.get('memory'):
+        total = [stats for stats in result['memory'] if stats['stage'] == 'benchmark.' + result['action']][0]
+        line += ' {0:>10.1f} MB peak {1:>10.1f} MB retained'.format(
+            total['peak_bytes'] / 1048576.0, total['retained_bytes'] / 1048576.0)
+    return line
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m al_contacts.benchmark',
+        description='Measure the serialise/deserialise throughput, file size and peak RSS of each format\
+            and the render throughput of each view on synthetic contacts, and write a json report',
+    )
+    parser.add_argument(
+        '--rows',
+        nargs='+',
+        default=[str(rows) for rows in DEFAULT_ROWS],
+        help='Numbers of contacts to benchmark with, e.g. "1K 100K 10M". Defaults to {0}'.format(DEFAULT_ROWS),
+    )
+    parser.add_argument('--formats', nargs='*', help='Formats to benchmark. Defaults to all the registered formats')
+    parser.add_argument('--views', nargs='*', help='Views to benchmark. Defaults to all the registered views')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Seed of the contact generator')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='Times each action is timed. Defaults to {0}'.format(DEFAULT_REPEAT))
+    parser.add_argument('--view-rows', type=int, default=DEFAULT_VIEW_ROWS,
+                        help='Maximum number of contacts rendered by the views. Defaults to {0}'.format(DEFAULT_VIEW_ROWS))
+    parser.add_argument('--output', help='Path of the json report. Defaults to printing it')
+    parser.add_argument('--memprofile', action='store_true',
+                        help='Also measure the tracemalloc peak and retained memory of each action and of its stages,\
+                            in an extra untimed run')
+    return parser.parse_args(argv)
+
+
+def parse_worker_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m al_contacts.benchmark worker')
+    parser.add_argument('kind', choices=['format', 'view'])
+    parser.add_argument('name')
+    parser.add_argument('action', choices=['serialise', 'deserialise', 'render'])
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--path', default='')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--memprofile', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['worker']:
+        args = parse_worker_args(argv[1:])
+        result = run_action(args.kind, args.name, args.action, args.rows, args.seed, args.path, args.repeat,
+                            args.memprofile)
+        print(json.dumps(result))
+        return
+
+    args = parse_args(argv)
+    try:
+        rows = [parse_rows(text) for text in args.rows]
+        report = run_benchmarks(rows, args.formats, args.views, args.seed, args.repeat, args.view_rows,
+                                progress=lambda result: print(format_result(result), file=sys.stderr),
+                                memprofile=args.memprofile)
+    except BenchmarkException as e:
+        print('Error from package "al_contacts"! {0}'.format(e), file=sys.stderr)
+        sys.exit(1)
+
+    if args.output:
+        write_report(report, args.output)
+        print('Wrote the benchmark report to "{0}"'.format(args.output), file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
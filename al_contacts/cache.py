@@ -0,0 +1,345 @@
+#! /usr/bin/env python
+
+import os
+import sys
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from al_contacts.reader_writer import BinaryRW, ReaderWriterException
+
+logger = logging.getLogger(__name__)
+
+# default limits of the estimated memory held by the cached datasets, and of the size of the
+# snapshot files on disk
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+# suffix of the snapshot files in the snapshot directory
+SNAPSHOT_SUFFIX = '.snapshot'
+
+
+class CacheException(Exception):
+    """
+    Exception raised by the DeserialisationCache class.
+    """
+    pass
+
+
+def estimate_size(data):
+    """
+    Estimate the memory held by a list of contact dictionaries, in bytes.
+    """
+    size = sys.getsizeof(data)
+    for item in data:
+        size += sys.getsizeof(item)
+        for value in item.values():
+            size += sys.getsizeof(value)
+    return size
+
+
+def file_identity(filepath):
+    """
+    Return the (absolute path, inode, size, modification time in ns) identity of a file. A file
+    rewritten, replaced or touched gets a new identity.
+    """
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        raise CacheException('Dataset file does not exist: "{0}"'.format(filepath))
+    return (os.path.abspath(filepath), stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class _SnapshotFormat:
+    """
+    Stand-in for the 'Format' the reader/writer of the snapshots registers with, the snapshots
+    are not a format of the Formats registry.
+    """
+    def register_rw(self, rw):
+        self.rw = rw
+
+
+    def __str__(self):
+        return 'snapshot'
+
+
+    def __repr__(self):
+        return 'snapshot'
+
+
+class DeserialisationCache:
+    """
+    This class caches the deserialised datasets of files in two tiers, both keyed on the format
+    and the identity of the file (path, inode, size and modification time), so that a file that
+    changed on disk is never served from the cache.
+
+    The first tier keeps the datasets in memory and evicts the least recently used ones once
+    their estimated size goes over 'maxBytes'. The second, optional, tier keeps a snapshot of
+    each dataset in 'snapshotDir', in the binary row format, which loads faster than parsing
+    the source again, also in later processes. A new snapshot replaces the snapshots of older
+    versions of the same file, and the least recently used snapshots are deleted once their
+    size goes over 'maxDiskBytes'. Only contact datasets are snapshotted.
+
+    The cached datasets are shared by all the callers, they must not be modified. It is safe
+    to use from several threads, and several processes can share a snapshot directory.
+    """
+    def __init__(self, maxBytes=DEFAULT_MAX_BYTES, snapshotDir=None, maxDiskBytes=DEFAULT_MAX_DISK_BYTES):
+        """
+        :Params:
+            maxBytes: `int`
+                upper limit of the estimated memory held by the cached datasets, 0 to only
+                use the snapshots, e.g. in a process deserialising each file once.
+            snapshotDir: `str`
+                directory of the snapshot files, created if needed. Defaults to no disk tier.
+            maxDiskBytes: `int`
+                upper limit of the size of the snapshot files.
+        """
+        if maxBytes < 0 or maxDiskBytes < 0:
+            raise CacheException('The cache limits must be positive numbers of bytes')
+
+        self.maxBytes = maxBytes
+        self.maxDiskBytes = maxDiskBytes
+        self.snapshotDir = os.path.abspath(snapshotDir) if snapshotDir else None
+        self.currentBytes = 0
+        self.diskBytes = 0
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.diskEvictions = 0
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+        # the snapshots are written one at a time, two threads missing the same dataset would
+        # write the same temporary file
+        self._diskLock = threading.Lock()
+        self._snapshots = BinaryRW(_SnapshotFormat())
+
+        if self.snapshotDir:
+            os.makedirs(self.snapshotDir, exist_ok=True)
+            self.diskBytes = sum(size for path, size, mtime in self._list_snapshots())
+
+
+    def __str__(self):
+        return 'deserialisation cache'
+
+
+    def __repr__(self):
+        return 'deserialisation cache'
+
+
+    def __len__(self):
+        return len(self._datasets)
+
+
+    def get(self, formatName, filepath, loader):
+        """
+        Return the dataset for 'filepath', from memory, else from its snapshot, else calling
+        loader(filepath) to deserialise it.
+
+        :Params:
+            formatName: `str`
+                name of the format the file is serialised in.
+            filepath: `str`
+                path of the serialised file.
+            loader: `callable`
+                called with 'filepath' to deserialise the file, returns a list of dictionaries.
+        """
+        key = (formatName,) + file_identity(filepath)
+
+        with self._lock:
+            if key in self._datasets:
+                self._datasets.move_to_end(key)
+                self.hits += 1
+                return self._datasets[key][0]
+
+        data = self._load_snapshot(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.diskHits += 1
+
+        if data is None:
+            data = loader(filepath)
+            self._store_snapshot(key, data)
+        self._add(key, data)
+        return data
+
+
+    def deserialise(self, rw, formatName, filepath=None):
+        """
+        Deserialise a file with a reader/writer through the cache, see get().
+
+        :Params:
+            rw: `al_contacts.reader_writer.ReaderWriter`
+                reader/writer of the format of the file.
+            formatName: `str`
+                name of the format.
+            filepath: `str`
+                path of the file. Defaults to rw.filepath, in which case the dataset is also
+                stored in rw.data, as rw.deserialise() does.
+        """
+        # raises ReaderWriterException for a missing file, as rw.deserialise() does
+        path = rw._filepath_to_read(filepath)
+        data = self.get(formatName, path, rw.deserialise)
+        if filepath is None:
+            rw.data = data
+        return data
+
+
+    def clear(self):
+        """
+        Drop the datasets held in memory. The snapshots are kept.
+        """
+        with self._lock:
+            self._datasets.clear()
+            self.currentBytes = 0
+
+
+    def stats(self):
+        """
+        Return the cache statistics as a dictionary. 'hits' counts the datasets served from
+        either tier, 'disk_hits' those served from a snapshot, and 'misses' the datasets
+        deserialised from their file.
+        """
+        with self._lock:
+            return {
+                'datasets': len(self._datasets),
+                'bytes': self.currentBytes,
+                'max_bytes': self.maxBytes,
+                'hits': self.hits,
+                'disk_hits': self.diskHits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_bytes': self.diskBytes,
+                'max_disk_bytes': self.maxDiskBytes,
+                'disk_evictions': self.diskEvictions,
+            }
+
+
+    def _add(self, key, data):
+        """
+        Keep a dataset in memory and evict the least recently used ones until the cache fits
+        'maxBytes'. The most recent dataset is always kept, even if it is bigger than 'maxBytes'
+        on its own, unless 'maxBytes' is 0, which turns the memory tier off.
+        """
+        if not self.maxBytes:
+            return
+        size = estimate_size(data)
+        with self._lock:
+            if key not in self._datasets:
+                self._datasets[key] = (data, size)
+                self.currentBytes += size
+            while self.currentBytes > self.maxBytes and len(self._datasets) > 1:
+                _, (_, size) = self._datasets.popitem(last=False)
+                self.currentBytes -= size
+                self.evictions += 1
+
+
+    def _snapshot_path(self, key):
+        """
+        Return the path of the snapshot of a dataset, named '<file hash>-<version hash>' so that
+        the snapshots of older versions of a file can be found.
+        """
+        formatName, path = key[:2]
+        fileHash = hashlib.sha1('{0}\0{1}'.format(formatName, path).encode('utf-8', 'surrogateescape')).hexdigest()
+        versionHash = hashlib.sha1(repr(key[2:]).encode('ascii')).hexdigest()
+        return os.path.join(self.snapshotDir, '{0}-{1}{2}'.format(fileHash[:20], versionHash[:20], SNAPSHOT_SUFFIX))
+
+
+    def _list_snapshots(self, prefix=''):
+        """
+        Return the (path, size, modification time) of the snapshot files starting with 'prefix'.
+        """
+        snapshots = []
+        try:
+            entries = list(os.scandir(self.snapshotDir))
+        except OSError:
+            return snapshots
+        for entry in entries:
+            if entry.name.endswith(SNAPSHOT_SUFFIX) and entry.name.startswith(prefix):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # deleted by another process
+                    continue
+                snapshots.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        return snapshots
+
+
+    def _load_snapshot(self, key):
+        """
+        Return the dataset of the snapshot of 'key', or None without a disk tier or a snapshot.
+        A snapshot that can not be read is deleted.
+        """
+        if not self.snapshotDir:
+            return None
+        path = self._snapshot_path(key)
+        try:
+            data = self._snapshots.deserialise(path)
+        except ReaderWriterException as e:
+            if os.path.exists(path):
+                logger.warning('Deleting the invalid snapshot:%s, %s', path, e)
+                self._remove_snapshot(path)
+            return None
+        except OSError as e:
+            logger.warning('Cannot read the snapshot:%s, %s', path, e)
+            return None
+
+        # the modification time of the snapshots orders their eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+
+    def _store_snapshot(self, key, data):
+        """
+        Write the snapshot of a dataset, delete the snapshots of the older versions of its file
+        and evict the least recently used snapshots until they fit 'maxDiskBytes'.
+        """
+        if not self.snapshotDir:
+            return
+        path = self._snapshot_path(key)
+        with self._diskLock:
+            try:
+                self._snapshots.write_batches([data], path)
+            except (ReaderWriterException, TypeError, AttributeError) as e:
+                logger.debug('Not snapshotting the dataset of the file:%s, %s', key[1], e)
+                return
+            except OSError as e:
+                logger.warning('Cannot write the snapshot:%s, %s', path, e)
+                return
+
+            prefix = os.path.basename(path).split('-')[0] + '-'
+            for stale, size, mtime in self._list_snapshots(prefix):
+                if stale != path:
+                    self._remove_snapshot(stale)
+
+            snapshots = sorted(self._list_snapshots(), key=lambda snapshot: snapshot[2])
+            total = sum(size for _, size, _ in snapshots)
+            for oldest, size, mtime in snapshots:
+                if total <= self.maxDiskBytes:
+                    break
+                if oldest == path:
+                    continue
+                if self._remove_snapshot(oldest):
+                    with self._lock:
+                        self.diskEvictions += 1
+                total -= size
+            with self._lock:
+                self.diskBytes = total
+
+
+    def _remove_snapshot(self, path):
+        """
+        Delete a snapshot file, returning False if another process deleted it first.
+        """
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
@@ -0,0 +1,300 @@
+#! /usr/bin/env python
+
+import os
+import sys
+import mmap
+import pickle
+from array import array
+from itertools import accumulate
+
+from al_contacts.contacts import CONTACT_KEYS
+
+# version of the layout of the columnar pickle files, stored in their header frame
+COLUMNS_VERSION = 1
+
+# pickle protocol of the columnar files, the first one with out-of-band buffers
+PICKLE_PROTOCOL = 5
+
+# suffix of the side file holding the out-of-band buffers of a columnar pickle file
+BUFFERS_SUFFIX = '.buffers'
+
+# buffers start at multiples of this offset in the side file, so that the offsets columns
+# mapped from it are aligned for any CPU
+BUFFER_ALIGNMENT = 64
+
+# size of the random token that starts the side file and is stored in the header of the pickle
+# file, so that a side file left from another write is never paired with the pickle file
+TOKEN_SIZE = 16
+
+# typecode of the offsets columns, 8 bytes signed integers
+OFFSETS_TYPECODE = 'q'
+
+
+class ColumnsException(Exception):
+    """
+    Exception raised by the ContactColumns class and the columnar pickle files functions.
+    """
+    pass
+
+
+class ContactColumns:
+    """
+    This class holds a batch of contacts as columns instead of a list of dictionaries: for each
+    contact key, the utf-8 encoded values are concatenated in one data buffer, and the offsets
+    of the values in it are kept in an array of COUNT + 1 integers. A batch of N contacts is
+    then held by 6 buffers instead of N dictionaries and 3 * N strings.
+
+    Pickled with protocol 5, the buffers are handed to the pickler as `pickle.PickleBuffer`
+    objects, so they can be written out-of-band, see dump_columns(), and loaded back from a
+    memory map without a copy, see load_columns(). With older protocols they are pickled as bytes.
+    """
+    def __init__(self, keys, count, buffers):
+        """
+        :Params:
+            keys: `list`
+                contact keys of the columns.
+            count: `int`
+                number of contacts.
+            buffers: `list`
+                the data buffer and the offsets buffer of each key, in the order of 'keys'.
+                Any object supporting the buffer protocol, e.g. bytes, array or a memoryview
+                of a memory map.
+        """
+        if len(buffers) != 2 * len(keys):
+            raise ColumnsException('Expected {0} buffers for the columns {1}, got {2}'.format(2 * len(keys), keys, len(buffers)))
+
+        self.keys = list(keys)
+        self.count = count
+        self._columns = []
+        for index in range(len(self.keys)):
+            data = memoryview(buffers[2 * index]).cast('B')
+            offsets = memoryview(buffers[2 * index + 1]).cast('B').cast(OFFSETS_TYPECODE)
+            if len(offsets) != count + 1 or offsets[0] != 0 or offsets[-1] != len(data):
+                raise ColumnsException('Column "{0}" does not hold {1} values'.format(self.keys[index], count))
+            self._columns.append((data, offsets))
+
+
+    def __str__(self):
+        return 'contact columns'
+
+
+    def __repr__(self):
+        return 'contact columns'
+
+
+    def __len__(self):
+        return self.count
+
+
+    def __iter__(self):
+        return iter(self.to_records())
+
+
+    def __reduce_ex__(self, protocol):
+        wrap = pickle.PickleBuffer if protocol >= 5 else bytes
+        buffers = [wrap(buf) for column in self._columns for buf in column]
+        return (_rebuild_columns, (self.keys, self.count, buffers))
+
+
+    @classmethod
+    def from_records(cls, records, keys=CONTACT_KEYS):
+        """
+        Make the columns of a list of contact dictionaries.
+
+        :Params:
+            records: `list`
+                list of dictionaries with keys = 'keys' and string values.
+            keys: `list`
+                contact keys to keep as columns.
+        """
+        buffers = []
+        for key in keys:
+            try:
+                encoded = [record[key].encode('utf-8') for record in records]
+            except KeyError:
+                raise ColumnsException('A contact has no "{0}" field'.format(key))
+            except AttributeError:
+                raise ColumnsException('The "{0}" fields of the contacts must be strings'.format(key))
+            buffers.append(b''.join(encoded))
+            buffers.append(array(OFFSETS_TYPECODE, accumulate(map(len, encoded), initial=0)))
+        return cls(keys, len(records), buffers)
+
+
+    @property
+    def nbytes(self):
+        """
+        Number of bytes of the buffers of the columns.
+        """
+        return sum(data.nbytes + offsets.nbytes for data, offsets in self._columns)
+
+
+    def column(self, key, start=0, stop=None):
+        """
+        Decode the values of the column 'key' of the contacts start to stop.
+        """
+        try:
+            data, offsets = self._columns[self.keys.index(key)]
+        except ValueError:
+            raise ColumnsException('There is no "{0}" column, the columns are {1}'.format(key, self.keys))
+
+        start, stop, _ = slice(start, stop).indices(self.count)
+        if stop <= start:
+            return []
+        offsets = offsets[start:stop + 1].tolist()
+        first = offsets[0]
+        text = str(data[first:offsets[-1]], 'utf-8')
+        if len(text) == offsets[-1] - first:
+            # ascii only, the byte offsets are also the character offsets
+            return [text[begin - first:end - first] for begin, end in zip(offsets, offsets[1:])]
+        return [str(data[begin:end], 'utf-8') for begin, end in zip(offsets, offsets[1:])]
+
+
+    def to_records(self, start=0, stop=None):
+        """
+        Decode the contacts start to stop back to a list of dictionaries.
+        """
+        columns = [self.column(key, start, stop) for key in self.keys]
+        if self.keys == CONTACT_KEYS:
+            return [{'name': name, 'address': address, 'phone': phone} for name, address, phone in zip(*columns)]
+        return [dict(zip(self.keys, values)) for values in zip(*columns)]
+
+
+def _rebuild_columns(keys, count, buffers):
+    return ContactColumns(keys, count, buffers)
+
+
+def buffers_path(filepath):
+    """
+    Return the path of the side file holding the out-of-band buffers of a columnar pickle file.
+    """
+    return filepath + BUFFERS_SUFFIX
+
+
+def is_columns_header(frame):
+    """
+    Return True if 'frame', the first pickle frame loaded from a file, is the header of a
+    columnar pickle file written by dump_columns().
+    """
+    return isinstance(frame, dict) and frame.get('columns') == COLUMNS_VERSION
+
+
+def _replace_file(filepath, write):
+    """
+    Call write() with a binary file object of a temporary file next to filepath, and move it
+    to filepath once it is complete, see al_contacts.reader_writer._atomic_open().
+    """
+    # imported here, al_contacts.reader_writer imports this module
+    from al_contacts.reader_writer import _atomic_open
+
+    with _atomic_open(filepath, 'wb') as fp:
+        return write(fp)
+
+
+def dump_columns(batches, filepath):
+    """
+    Write batches of contacts to a columnar pickle file. Each batch is pickled with protocol 5
+    as a ContactColumns frame whose buffers are written out-of-band, one after the other, to
+    the side file buffers_path(filepath). The pickle file itself only holds a header frame,
+    with the place of every buffer in the side file, and the small frames of the batches.
+    Both files are replaced atomically, the side file first.
+
+    :Params:
+        batches: `iterable`
+            batches of contacts, each a list of dictionaries or a ContactColumns object.
+        filepath: `str`
+            path of the pickle file.
+
+    :Returns:
+        the number of contacts written.
+    """
+    token = os.urandom(TOKEN_SIZE)
+    frames = []
+    table = []
+
+    def write_buffers(fp):
+        fp.write(token)
+        position = TOKEN_SIZE
+        count = 0
+        for batch in batches:
+            if not isinstance(batch, ContactColumns):
+                batch = ContactColumns.from_records(batch)
+            count += len(batch)
+            buffers = []
+            frames.append(pickle.dumps(batch, protocol=PICKLE_PROTOCOL, buffer_callback=buffers.append))
+            places = []
+            for buf in buffers:
+                raw = buf.raw()
+                padding = -position % BUFFER_ALIGNMENT
+                fp.write(b'\0' * padding)
+                fp.write(raw)
+                places.append((position + padding, raw.nbytes))
+                position += padding + raw.nbytes
+            table.append(places)
+        return count, position
+
+    count, size = _replace_file(buffers_path(filepath), write_buffers)
+    header = {'columns': COLUMNS_VERSION, 'byteorder': sys.byteorder, 'token': token, 'buffers': table, 'size': size}
+
+    def write_frames(fp):
+        pickle.dump(header, fp, protocol=PICKLE_PROTOCOL)
+        for frame in frames:
+            fp.write(frame)
+
+    _replace_file(filepath, write_frames)
+    return count
+
+
+def _read_header(fp, filepath):
+    try:
+        header = pickle.load(fp)
+    except (EOFError, pickle.UnpicklingError) as e:
+        raise ColumnsException('Invalid columnar pickle file:{0}, {1}'.format(filepath, e))
+    if not is_columns_header(header):
+        raise ColumnsException('The file:{0} is not a columnar pickle file'.format(filepath))
+    if header['byteorder'] != sys.byteorder:
+        raise ColumnsException('The file:{0} was written on a {1} endian machine'.format(filepath, header['byteorder']))
+    return header
+
+
+def iter_columns(filepath):
+    """
+    Load the batches of a columnar pickle file written by dump_columns(), one ContactColumns
+    object per batch. The side file is memory-mapped and the columns of the batches are views
+    of the map: nothing is copied until the values are decoded, and the pages are only read
+    from the disk, or the page cache, when they are used. The map stays open as long as one of
+    the batches is referenced.
+
+    :Params:
+        filepath: `str`
+            path of the pickle file.
+    """
+    with open(filepath, 'rb') as fp:
+        header = _read_header(fp, filepath)
+        try:
+            with open(buffers_path(filepath), 'rb') as side:
+                if os.fstat(side.fileno()).st_size != header['size']:
+                    raise ColumnsException('The side file of the file:{0} does not match it'.format(filepath))
+                buffers = memoryview(mmap.mmap(side.fileno(), 0, access=mmap.ACCESS_READ))
+        except FileNotFoundError:
+            raise ColumnsException('The side file of the file:{0} is missing'.format(filepath))
+        if buffers[:TOKEN_SIZE] != header['token']:
+            raise ColumnsException('The side file of the file:{0} does not match it'.format(filepath))
+
+        for places in header['buffers']:
+            try:
+                batch = pickle.load(fp, buffers=[buffers[offset:offset + size] for offset, size in places])
+            except (EOFError, pickle.UnpicklingError) as e:
+                raise ColumnsException('Invalid columnar pickle file:{0}, {1}'.format(filepath, e))
+            if not isinstance(batch, ContactColumns):
+                raise ColumnsException('Invalid columnar pickle file:{0}, a batch is a "{1}"'.format(filepath, type(batch).__name__))
+            yield batch
+
+
+def load_columns(filepath):
+    """
+    Load all the batches of a columnar pickle file, see iter_columns().
+
+    :Returns:
+        list of ContactColumns objects.
+    """
+    return list(iter_columns(filepath))
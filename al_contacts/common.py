@@ -3,39 +3,130 @@
 import os
 import sys
 
-# Register all available formats
+# Register all available formats and views.
+# The formats, their reader/writers and the views are declared by name only. Each of them is
+# imported, instantiated and registered the first time it is used, so that importing this module
+# (e.g. for 'al_contacts --help') does not import the json/pickle machinery it will not use.
 from al_contacts.formats import Formats
-from al_contacts.format import JsonFormat, PickleFormat
+from al_contacts.views import Views
+from al_contacts.plugins import FORMATS_GROUP, VIEWS_GROUP, discover_plugins
+
+# format name, 'Format' class, 'ReaderWriter' class
+FORMATS_TABLE = [
+    ('json', 'al_contacts.format:JsonFormat', 'al_contacts.reader_writer:JsonRW'),
+    ('pickle', 'al_contacts.format:PickleFormat', 'al_contacts.reader_writer:PickleRW'),
+    ('binary', 'al_contacts.format:BinaryFormat', 'al_contacts.reader_writer:BinaryRW'),
+    ('csv', 'al_contacts.format:CsvFormat', 'al_contacts.reader_writer:CsvRW'),
+]
+
+# view name, 'View' class
+VIEWS_TABLE = [
+    ('table', 'al_contacts.view:TableView'),
+    ('list', 'al_contacts.view:ListView'),
+]
+
+# actions supported by al_contacts.reader_writer.ReaderWriter
+ACTIONS = ['serialise', 'deserialise']
 
 dataFormats = Formats()
-jsonDataFormat = JsonFormat(dataFormats)
-pickleDataFormat = PickleFormat(dataFormats)
+for name, formatClass, rwClass in FORMATS_TABLE:
+    dataFormats.declare_format(name, formatClass, rwClass)
 
-# generate a map of format names versus format objects
-FORMATS_MAP = {}
-for fmt in dataFormats.formats:
-    FORMATS_MAP[str(fmt)] = fmt
+dataViews = Views()
+for name, viewClass in VIEWS_TABLE:
+    dataViews.declare_view(name, viewClass)
 
-# Register reader/writer with specific formats
-from al_contacts.reader_writer import JsonRW, PickleRW
-jsonReaderWriter = JsonRW(jsonDataFormat)
-pickleReaderWriter = PickleRW(pickleDataFormat)
+# formats and views of third-party packages, declared through entry points. Only their names are
+# read here, a plugin is imported the first time it is used. The built-in names take precedence.
+for name, factory in discover_plugins(FORMATS_GROUP):
+    if name not in dataFormats.names():
+        dataFormats.declare_format(name, factory)
 
-# generate a map of action names versus actual action names
-ACTIONS_MAP = {}
-for rw in jsonReaderWriter.actions:
-    ACTIONS_MAP[str(rw)] = rw
+for name, factory in discover_plugins(VIEWS_GROUP):
+    if name not in dataViews.names():
+        dataViews.declare_view(name, factory)
+
+
+class LazyMap:
+    """
+    Read-only map of names versus registry objects, which instantiates an object only when it
+    is looked up. Listing the keys does not instantiate anything.
+    """
+    def __init__(self, names, getter):
+        """
+        :Params:
+            names: `callable`
+                returns the names of the objects.
+            getter: `callable`
+                returns the object for a name.
+        """
+        self._names = names
+        self._getter = getter
+
+
+    def __getitem__(self, name):
+        if name not in self._names():
+            raise KeyError(name)
+        return self._getter(name)
+
+
+    def __contains__(self, name):
+        return name in self._names()
+
+
+    def __iter__(self):
+        return iter(self._names())
+
+
+    def __len__(self):
+        return len(self._names())
 
-# get all supported views
-from al_contacts.views import Views
-from al_contacts.view import TableView, ListView
 
-dataViews = Views([])
-tableDataView = TableView(dataViews)
-listDataView = ListView(dataViews)
+    def __repr__(self):
+        return repr(dict.fromkeys(self._names(), '...'))
+
+
+    def keys(self):
+        return dict.fromkeys(self._names()).keys()
+
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+
+    def values(self):
+        return [self[name] for name in self._names()]
+
+
+    def items(self):
+        return [(name, self[name]) for name in self._names()]
+
+
+# generate a map of format names versus format objects
+FORMATS_MAP = LazyMap(dataFormats.names, dataFormats.get_format)
+
+# generate a map of action names versus actual action names
+ACTIONS_MAP = dict((action, action) for action in ACTIONS)
 
 # generate a map of view names versus view objects
-VIEWS_MAP = {}
-for view in dataViews.views:
-    VIEWS_MAP[str(view)] = view
+VIEWS_MAP = LazyMap(dataViews.names, dataViews.get_view)
+
+
+# the module level names of the objects that used to be created on import
+_LEGACY_NAMES = {
+    'jsonDataFormat': lambda: dataFormats.get_format('json'),
+    'pickleDataFormat': lambda: dataFormats.get_format('pickle'),
+    'jsonReaderWriter': lambda: dataFormats.get_format('json').rw,
+    'pickleReaderWriter': lambda: dataFormats.get_format('pickle').rw,
+    'tableDataView': lambda: dataViews.get_view('table'),
+    'listDataView': lambda: dataViews.get_view('list'),
+}
+
 
+def __getattr__(name):
+    if name in _LEGACY_NAMES:
+        return _LEGACY_NAMES[name]()
+    raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
@@ -0,0 +1,148 @@
+#! /usr/bin/env python
+
+import csv
+
+from al_contacts.instrumentation import stage
+
+# keys of the dictionaries that hold the contact details
+CONTACT_KEYS = ['name', 'address', 'phone']
+
+
+# delimiters tried when sniffing the dialect of a csv file
+CSV_DELIMITERS = ',;\t|'
+
+# number of characters read from the start of a csv file to sniff its dialect
+SNIFF_SIZE = 1 << 14
+
+# number of contacts parsed per batch by load_csv_file(), which keeps them all anyway
+LOAD_BATCH_SIZE = 1 << 14
+
+
+def sniff_dialect(sample):
+    """
+    Return the dialect of the csv text 'sample'. Only the delimiter and the quote character are
+    taken from csv.Sniffer, the rest of the excel dialect is kept: the sniffer's guesses for the
+    other settings, e.g. skipinitialspace, would change the values read. Falls back to the excel
+    dialect if the sample can not be sniffed.
+
+    :Params:
+        sample: `str`
+            the first lines of a csv file.
+    """
+    # a partial last line can mislead the sniffer
+    if '\n' in sample.rstrip('\r\n'):
+        sample = sample[:sample.rstrip('\r\n').rindex('\n')]
+    try:
+        sniffed = csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS)
+    except csv.Error:
+        return csv.excel
+
+    class SniffedDialect(csv.excel):
+        delimiter = sniffed.delimiter
+        quotechar = sniffed.quotechar or '"'
+    return SniffedDialect
+
+
+def header_columns(row):
+    """
+    Return the column index of each of CONTACT_KEYS if 'row' is a header row naming them, in any
+    order and case, None if it is a row of data.
+    """
+    names = [cell.strip().lower() for cell in row]
+    if not all(key in names for key in CONTACT_KEYS):
+        return None
+    return [names.index(key) for key in CONTACT_KEYS]
+
+
+def iter_csv_contacts(fp, batchSize=1000, dialect=None):
+    """
+    read an open csv file incrementally and yield its contacts in lists of at most 'batchSize'
+    dictionaries. A first row naming the columns maps them on to the contact keys, otherwise
+    the columns are name, address and phone in that order. Blank lines are skipped.
+
+    :Params:
+        fp: `file`
+            csv file opened in text mode, preferably with newline=''.
+        batchSize: `int`
+            maximum number of contacts per batch.
+        dialect: `csv.Dialect`
+            dialect of the file. Sniffed from the start of the file by default.
+    """
+    if batchSize < 1:
+        raise ValueError('Batch size must be a positive number, not "{0}"'.format(batchSize))
+
+    if dialect is None:
+        position = fp.tell()
+        dialect = sniff_dialect(fp.read(SNIFF_SIZE))
+        fp.seek(position)
+
+    reader = csv.reader(fp, dialect)
+    first = next(reader, None)
+    while first == []:
+        first = next(reader, None)
+    if first is None:
+        return
+
+    columns = header_columns(first)
+    pending = []
+    if columns is None:
+        columns = list(range(len(CONTACT_KEYS)))
+        pending = [first]
+    nameColumn, addressColumn, phoneColumn = columns
+
+    batch = []
+    try:
+        for rows in (pending, reader):
+            for row in rows:
+                if not row:
+                    continue
+                batch.append({'name': row[nameColumn], 'address': row[addressColumn], 'phone': row[phoneColumn]})
+                if len(batch) >= batchSize:
+                    yield batch
+                    batch = []
+    except IndexError:
+        raise ValueError('Line {0} of the csv file "{1}" has fewer than {2} columns'.format(
+            reader.line_num, getattr(fp, 'name', ''), max(columns) + 1))
+
+    if batch:
+        yield batch
+
+
+def load_csv_file(csvFile=None):
+    """
+    read contents and return data as a list of dictionaries
+
+    :Params:
+        csvFile: `str`
+            path of a csv file with the columns name, address and phone, either in that order
+            or named by a header row. The delimiter is sniffed.
+
+    :Returns:
+        `list` of dictionaries with keys = ['name', 'address', 'phone']
+    """
+    data = []
+    with stage('csv.load') as aStage, open(csvFile, 'r', newline='') as fp:
+        for batch in iter_csv_contacts(fp, batchSize=LOAD_BATCH_SIZE):
+            data.extend(batch)
+        aStage.records = len(data)
+        aStage.bytes = fp.tell()
+
+    return data
+
+
+def iter_csv_batches(csvFile, batchSize=1000):
+    """
+    read a csv file incrementally and yield its contacts in lists of at most 'batchSize' dictionaries
+
+    :Params:
+        csvFile: `str`
+            path of a csv file, see load_csv_file().
+        batchSize: `int`
+            maximum number of contacts per batch.
+    """
+    if batchSize < 1:
+        raise ValueError('Batch size must be a positive number, not "{0}"'.format(batchSize))
+
+    with open(csvFile, 'r', newline='') as fp:
+        for batch in iter_csv_contacts(fp, batchSize):
+            yield batch
@@ -0,0 +1,454 @@
+#! /usr/bin/env python
+
+import os
+import json
+import string
+import pickle
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from al_contacts.instrumentation import stage
+from al_contacts.phone import DEFAULT_COUNTRY_CODE, normalise_phones
+from al_contacts.reader_writer import _atomic_open
+
+logger = logging.getLogger(__name__)
+
+# version of the layout of the manifest
+DATASET_VERSION = 1
+
+# name of the manifest file in the dataset directory
+MANIFEST_NAME = 'manifest.json'
+
+# partition value of the records the partitioner can not place, e.g. invalid phone numbers
+OTHER_PARTITION = '_'
+
+# national digits of a phone number kept in its 'area' partition, after the country code
+AREA_DIGITS = 3
+
+# partition of each name initial
+_INITIALS = dict((letter, letter.upper()) for letter in string.ascii_letters)
+
+# country calling codes of one and two digits. The codes are prefix-free, all the others
+# have three digits.
+_COUNTRY_CODES_1 = {'1', '7'}
+_COUNTRY_CODES_2 = {
+    '20', '27', '30', '31', '32', '33', '34', '36', '39', '40', '41', '43', '44', '45', '46', '47', '48',
+    '49', '51', '52', '53', '54', '55', '56', '57', '58', '60', '61', '62', '63', '64', '65', '66', '81',
+    '82', '84', '86', '90', '91', '92', '93', '94', '95', '98',
+}
+
+
+class DatasetException(Exception):
+    """
+    Exception raised by the Dataset class.
+    """
+    pass
+
+
+def partition_initials(batch):
+    """
+    Return the partition of each record of a batch on the first letter of its name, upper
+    case, OTHER_PARTITION for names that do not start with an ascii letter.
+    """
+    initials = [(record.get('name') or '').lstrip()[:1] for record in batch]
+    return [_INITIALS.get(initial, OTHER_PARTITION) for initial in initials]
+
+
+def country_code(number):
+    """
+    Return the country calling code of a normalised phone number, '+<code><number>'.
+    """
+    digits = number[1:]
+    if digits[:1] in _COUNTRY_CODES_1:
+        return digits[:1]
+    if digits[:2] in _COUNTRY_CODES_2:
+        return digits[:2]
+    return digits[:3]
+
+
+def partition_countries(batch, countryCode=DEFAULT_COUNTRY_CODE):
+    """
+    Return the partition of each record of a batch on the country calling code of its phone
+    number, OTHER_PARTITION for the invalid numbers. Numbers with a national trunk prefix take
+    'countryCode'.
+    """
+    numbers = normalise_phones([record.get('phone') for record in batch], countryCode)
+    return [country_code(number) if number else OTHER_PARTITION for number in numbers]
+
+
+def partition_areas(batch, countryCode=DEFAULT_COUNTRY_CODE):
+    """
+    Return the partition of each record of a batch on the country calling code and the first
+    AREA_DIGITS national digits of its phone number, e.g. '44-207', OTHER_PARTITION for the
+    invalid numbers.
+    """
+    numbers = normalise_phones([record.get('phone') for record in batch], countryCode)
+    values = []
+    for number in numbers:
+        if number:
+            code = country_code(number)
+            values.append('{0}-{1}'.format(code, number[1 + len(code):1 + len(code) + AREA_DIGITS]))
+        else:
+            values.append(OTHER_PARTITION)
+    return values
+
+
+# partitioners by name: the field a partition value is computed from, and the function
+# computing the partition values of a batch
+PARTITIONERS = {
+    'initial': ('name', partition_initials),
+    'country': ('phone', partition_countries),
+    'area': ('phone', partition_areas),
+}
+
+
+def _spill(fp, records):
+    pickle.dump(records, fp, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _iter_spilled(fp):
+    """
+    Yield the batches spilled to a temporary file and close it.
+    """
+    with fp:
+        fp.seek(0)
+        while True:
+            try:
+                yield pickle.load(fp)
+            except EOFError:
+                return
+
+
+def _entry_files(entries):
+    """
+    Return the names of the files of manifest entries, the partition files and their Bloom filters.
+    """
+    return set(entry[key] for entry in entries for key in ('file', 'bloom') if key in entry)
+
+
+class _Partition:
+    """
+    Records of a partition being written: the pending batch, the temporary file the full
+    batches are spilled to, and the statistics of the manifest.
+    """
+    def __init__(self, value):
+        self.value = value
+        self.pending = []
+        self.spilled = None
+        self.records = 0
+        self.min = {}
+        self.max = {}
+
+
+    def add(self, records, batchSize):
+        self.pending.extend(records)
+        if len(self.pending) >= batchSize:
+            self.flush()
+
+
+    def flush(self):
+        """
+        Update the statistics with the pending records and spill them.
+        """
+        if not self.pending:
+            return
+        self.records += len(self.pending)
+        for field in set().union(*self.pending):
+            if field in self.min and self.min[field] is None:
+                continue
+            values = [record[field] for record in self.pending if field in record]
+            try:
+                low, high = min(values), max(values)
+                if field in self.min:
+                    low, high = min(low, self.min[field]), max(high, self.max[field])
+            except TypeError:
+                # values that can not be ordered, the field can not prune the partition
+                low = high = None
+            self.min[field], self.max[field] = low, high
+
+        if self.spilled is None:
+            self.spilled = tempfile.TemporaryFile(prefix='al_contacts_partition')
+        _spill(self.spilled, self.pending)
+        self.pending = []
+
+
+class Dataset:
+    """
+    This class stores the contacts of a dataset as a directory of files, one per partition of
+    the records on a key such as the first letter of their name or the country code of their
+    phone number, in any registered format, and a manifest with the statistics of each
+    partition: its number of records, its size and the smallest and largest value of each field.
+
+    Queries prune the partitions whose statistics rule out a match from the manifest alone,
+    before any file is opened, and the partitions are written concurrently, so a dataset can
+    grow past what one file, or one reader, can handle.
+    """
+    def __init__(self, formats, root):
+        """
+        :Params:
+            formats: `al_contacts.formats.Formats`
+                registry of the formats the partitions can be written in.
+            root: `str`
+                directory of the dataset.
+        """
+        self.formats = formats
+        self.root = os.path.abspath(root)
+        self._manifest = None
+
+
+    def __str__(self):
+        return 'dataset'
+
+
+    def __repr__(self):
+        return 'dataset'
+
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, MANIFEST_NAME)
+
+
+    @property
+    def manifest(self):
+        """
+        The manifest of the dataset, read on first use.
+        """
+        if self._manifest is None:
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as fp:
+                    manifest = json.load(fp)
+            except FileNotFoundError:
+                raise DatasetException('There is no dataset in "{0}"'.format(self.root))
+            except ValueError as e:
+                raise DatasetException('Invalid manifest:{0}, {1}'.format(self.manifest_path, e))
+            if not isinstance(manifest, dict) or manifest.get('dataset') != DATASET_VERSION:
+                raise DatasetException('The file:{0} is not a dataset manifest of version {1}'.format(
+                    self.manifest_path, DATASET_VERSION))
+            self._manifest = manifest
+        return self._manifest
+
+
+    def write(self, batches, formatName, partitionBy='initial', batchSize=1000, workers=None, bloom=None):
+        """
+        Write batches of records as the partitions of the dataset, replacing its previous
+        content. The records are first routed to their partitions, full batches being spilled
+        to temporary files so that memory stays bounded, then the partitions are written by
+        'workers' threads at once.
+
+        :Params:
+            batches: `iterable`
+                lists of dictionaries with keys = ['name', 'address', 'phone'].
+            formatName: `str`
+                name of the registered format to write the partitions in.
+            partitionBy: `str`
+                name of the partitioner, one of PARTITIONERS.
+            batchSize: `int`
+                number of records per batch written to the partition files.
+            workers: `int`
+                number of partitions written at once. When the reader/writer of the format
+                encodes batches independently, the batches are also encoded by as many
+                processes. None or 1 writes the partitions one after the other.
+            bloom: `al_contacts.bloom.BloomIndex`
+                builds the Bloom filters of each partition file when set, which the queries
+                read before opening the partition.
+
+        :Returns:
+            the manifest of the dataset.
+        """
+        if partitionBy not in PARTITIONERS:
+            raise DatasetException('Invalid partitioner "{0}", valid partitioners are {1}'.format(
+                partitionBy, list(PARTITIONERS)))
+        if batchSize < 1:
+            raise DatasetException('Batch size must be a positive number, not "{0}"'.format(batchSize))
+        rw = self._get_rw(formatName)
+        partitioner = PARTITIONERS[partitionBy][1]
+
+        with stage('dataset.write', str(formatName)) as aStage:
+            partitions = {}
+            for batch in batches:
+                groups = {}
+                for value, record in zip(partitioner(batch), batch):
+                    groups.setdefault(value, []).append(record)
+                for value, records in groups.items():
+                    if value not in partitions:
+                        partitions[value] = _Partition(value)
+                    partitions[value].add(records, batchSize)
+            for partition in partitions.values():
+                partition.flush()
+
+            os.makedirs(self.root, exist_ok=True)
+            entries = self._write_partitions(rw, formatName, partitionBy, sorted(partitions.values(),
+                                             key=lambda partition: partition.value), workers, bloom)
+            manifest = {
+                'dataset': DATASET_VERSION,
+                'format': str(formatName),
+                'partition_by': partitionBy,
+                'records': sum(entry['records'] for entry in entries),
+                'bytes': sum(entry['bytes'] for entry in entries),
+                'partitions': entries,
+            }
+            previous = self._previous_files()
+            with _atomic_open(self.manifest_path, 'w', encoding='utf-8') as fp:
+                json.dump(manifest, fp, ensure_ascii=False, indent=1)
+            self._manifest = manifest
+            self._remove_files(previous - _entry_files(entries))
+
+            aStage.records = manifest['records']
+            aStage.bytes = manifest['bytes']
+
+        logger.info('Wrote %d records in %d "%s" partitions to the dataset:%s', manifest['records'], len(entries),
+                    partitionBy, self.root)
+        return manifest
+
+
+    def partitions(self, where=None):
+        """
+        Return the manifest entries of the partitions that can hold records matching 'where',
+        without opening any of their files but their Bloom filters.
+
+        :Params:
+            where: `dict`
+                field values the records must be equal to.
+        """
+        manifest = self.manifest
+        partitions = manifest['partitions']
+        if not where:
+            return list(partitions)
+
+        field, partitioner = PARTITIONERS[manifest['partition_by']]
+        if field in where:
+            value = partitioner([{field: where[field]}])[0]
+            partitions = [entry for entry in partitions if entry['value'] == value]
+        partitions = [entry for entry in partitions if self._may_match(entry, where)]
+        if any('bloom' in entry for entry in partitions):
+            from al_contacts.bloom import may_contain
+
+            partitions = [entry for entry in partitions
+                          if 'bloom' not in entry or may_contain(os.path.join(self.root, entry['file']), where)]
+        return partitions
+
+
+    def iter_batches(self, where=None, batchSize=1000):
+        """
+        Yield, in batches, the records of the dataset matching 'where', reading only the
+        partitions that can hold them.
+
+        :Params:
+            where: `dict`
+                field values the records must be equal to.
+            batchSize: `int`
+                maximum number of records per batch.
+        """
+        rw = self._get_rw(self.manifest['format'])
+        partitions = self.partitions(where)
+        logger.info('Reading %d of the %d partitions of the dataset:%s', len(partitions),
+                    len(self.manifest['partitions']), self.root)
+        items = list((where or {}).items())
+        for entry in partitions:
+            for batch in rw.iter_batches(os.path.join(self.root, entry['file']), batchSize):
+                if items:
+                    batch = [record for record in batch if all(record.get(field) == value for field, value in items)]
+                if batch:
+                    yield batch
+
+
+    def read(self, where=None):
+        """
+        Return the records of the dataset matching 'where', see iter_batches().
+        """
+        with stage('dataset.read', self.manifest['format']) as aStage:
+            data = [record for batch in self.iter_batches(where) for record in batch]
+            aStage.records = len(data)
+        return data
+
+
+    def _may_match(self, entry, where):
+        """
+        Return False if the statistics of a partition rule out a record matching 'where'.
+        """
+        for field, value in where.items():
+            if field not in entry['min']:
+                # no record of the partition has the field
+                return False
+            low, high = entry['min'][field], entry['max'][field]
+            try:
+                if low is not None and not low <= value <= high:
+                    return False
+            except TypeError:
+                continue
+        return True
+
+
+    def _write_partitions(self, rw, formatName, partitionBy, partitions, workers, bloom=None):
+        """
+        Write the spilled partitions to their files, and their Bloom filters if 'bloom' is set,
+        'workers' at once, and return their manifest entries.
+        """
+        def write(partition, executor=None):
+            name = '{0}={1}.{2}'.format(partitionBy, partition.value, formatName)
+            filepath = os.path.join(self.root, name)
+            batches = _iter_spilled(partition.spilled)
+            if bloom is not None:
+                filters = bloom.new_filters(partition.records)
+                batches = bloom.iter_adding(filters, batches)
+            count = rw.write_batches(batches, filepath, executor)
+            if count != partition.records:
+                raise DatasetException('Wrote {0} records of the partition "{1}" instead of {2}'.format(
+                    count, partition.value, partition.records))
+            entry = {
+                'value': partition.value,
+                'file': name,
+                'records': count,
+                'bytes': os.path.getsize(filepath),
+                'min': partition.min,
+                'max': partition.max,
+            }
+            if bloom is not None:
+                entry['bloom'] = os.path.basename(bloom.write(filepath, filters))
+            return entry
+
+        if not workers or workers < 2:
+            return [write(partition) for partition in partitions]
+
+        encoder = None
+        if rw.parallelEncoding:
+            from concurrent.futures import ProcessPoolExecutor
+            encoder = ProcessPoolExecutor(max_workers=workers)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(lambda partition: write(partition, encoder), partitions))
+        finally:
+            if encoder is not None:
+                encoder.shutdown()
+
+
+    def _previous_files(self):
+        """
+        Return the files of the partitions of the manifest on disk, and of their Bloom filters,
+        if any.
+        """
+        try:
+            entries = self.manifest['partitions']
+        except DatasetException:
+            return set()
+        return _entry_files(entries)
+
+
+    def _remove_files(self, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+
+
+    def _get_rw(self, formatName):
+        """
+        Return the reader/writer registered for the format named 'formatName'.
+        """
+        aFormat = self.formats.get_format(formatName)
+        if not aFormat.rw:
+            raise DatasetException('There is no reader/writer registered for "{0}" format currently'.format(aFormat))
+        return aFormat.rw
@@ -0,0 +1,392 @@
+#! /usr/bin/env python
+
+import os
+import re
+import json
+import hashlib
+import logging
+from itertools import repeat
+from operator import add, itemgetter
+
+from al_contacts.jsoncodec import encode_contacts
+from al_contacts.reader_writer import _atomic_open
+
+logger = logging.getLogger(__name__)
+
+# version of the layout of the delta files
+DELTA_VERSION = 1
+
+# a delta file is named '<base file>.<sequence>.delta', the sequence starting at 1
+DELTA_SUFFIX = '.delta'
+
+# fields identifying a contact across serialisations, the same as al_contacts.pipeline.Dedupe
+DEFAULT_KEY_FIELDS = ('name', 'phone')
+
+# number of deltas chained to a base before serialise() writes a new base instead
+DEFAULT_MAX_CHAIN = 32
+
+# bytes of the digests of the datasets and of the files
+HASH_SIZE = 16
+
+# size of the blocks read to hash a base file
+READ_SIZE = 1 << 20
+
+
+class DeltaException(Exception):
+    """
+    Exception raised by the DeltaStore class and the delta functions.
+    """
+    pass
+
+
+def record_keys(records, keyFields=DEFAULT_KEY_FIELDS):
+    """
+    Return the key of each record: the tuple of its 'keyFields' values followed by the number of
+    records before it with the same values, so that duplicates have distinct keys too.
+    """
+    getter = itemgetter(*keyFields)
+    try:
+        values = list(map(getter, records))
+    except KeyError:
+        values = [tuple(map(record.get, keyFields)) for record in records]
+    else:
+        if len(keyFields) == 1:
+            values = [(value,) for value in values]
+
+    if len(set(values)) == len(values):
+        return list(map(add, values, repeat((0,))))
+    seen = {}
+    keys = []
+    for value in values:
+        count = seen.get(value, 0)
+        seen[value] = count + 1
+        keys.append(value + (count,))
+    return keys
+
+
+def state_digest(records):
+    """
+    Return the hex digest of the content of a whole dataset, in order.
+    """
+    text = encode_contacts(records)
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=HASH_SIZE).hexdigest()
+
+
+def diff_records(old, new, keyFields=DEFAULT_KEY_FIELDS):
+    """
+    Compute the record level differences that turn the records 'old' into 'new'. The records
+    are matched on their keys, see record_keys(), and compared on their content.
+
+    :Params:
+        old: `list`
+            list of dictionaries, the previous dataset.
+        new: `list`
+            list of dictionaries, the dataset to serialise.
+        keyFields: `tuple`
+            fields identifying a record.
+
+    :Returns:
+        a delta dictionary with keys = ['key_fields', 'removed', 'upserts', 'order', 'count',
+        'digest']: the keys of the records removed, the [key, record] pairs of the records
+        added or changed, the keys of all the records in their new order, or None when
+        applying the changes to 'old' already yields that order, see apply_delta(), and the
+        digest of 'new'.
+    """
+    oldState = dict(zip(record_keys(old, keyFields), old))
+    newKeys = record_keys(new, keyFields)
+
+    upserts = [[list(key), record] for key, record in zip(newKeys, new) if oldState.get(key) != record]
+    newKeySet = set(newKeys)
+    removed = [key for key in oldState if key not in newKeySet]
+
+    # apply_delta() keeps the records left in place and adds the new ones at the end
+    expected = [key for key in oldState if key in newKeySet]
+    expected.extend(key for key in newKeys if key not in oldState)
+    order = None if expected == newKeys else [list(key) for key in newKeys]
+
+    return {
+        'key_fields': list(keyFields),
+        'removed': [list(key) for key in removed],
+        'upserts': upserts,
+        'order': order,
+        'count': len(new),
+        'digest': state_digest(new),
+    }
+
+
+def apply_delta(records, delta):
+    """
+    Apply a delta computed by diff_records() to the records it was computed against. The
+    records kept stay in place, the changed ones are replaced in place and the added ones go
+    at the end, unless the delta holds the whole order.
+
+    :Returns:
+        the new list of records.
+    """
+    keyFields = delta['key_fields']
+    state = dict(zip(record_keys(records, keyFields), records))
+    try:
+        for key in delta['removed']:
+            del state[tuple(key)]
+    except KeyError:
+        raise DeltaException('The delta removes a record that is not in the dataset: {0}'.format(key))
+    for key, record in delta['upserts']:
+        state[tuple(key)] = record
+
+    if delta['order'] is None:
+        data = list(state.values())
+    else:
+        try:
+            data = [state[tuple(key)] for key in delta['order']]
+        except KeyError as e:
+            raise DeltaException('The order of the delta names a record that is not in the dataset: {0}'.format(e))
+    if len(data) != delta['count']:
+        raise DeltaException('The delta yields {0} records instead of {1}'.format(len(data), delta['count']))
+    return data
+
+
+def is_empty_delta(delta):
+    """
+    Return True if a delta does not change anything.
+    """
+    return not delta['removed'] and not delta['upserts'] and delta['order'] is None
+
+
+def file_digest(filepath):
+    """
+    Return the hex digest of the content of a file.
+    """
+    digest = hashlib.blake2b(digest_size=HASH_SIZE)
+    with open(filepath, 'rb') as fp:
+        for block in iter(lambda: fp.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def delta_path(filepath, sequence):
+    """
+    Return the path of the delta file number 'sequence' of the base file 'filepath'.
+    """
+    return '{0}.{1:06d}{2}'.format(filepath, sequence, DELTA_SUFFIX)
+
+
+def list_deltas(filepath):
+    """
+    Return the (sequence, path) of the delta files of the base file 'filepath', in order.
+    """
+    directory, name = os.path.split(os.path.abspath(filepath))
+    pattern = re.compile(re.escape(name) + r'\.(\d+)' + re.escape(DELTA_SUFFIX) + '$')
+    deltas = []
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return deltas
+    for entry in entries:
+        match = pattern.match(entry.name)
+        if match:
+            deltas.append((int(match.group(1)), entry.path))
+    return sorted(deltas)
+
+
+def read_delta(path):
+    """
+    Read a delta file written by DeltaStore.serialise().
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as fp:
+            delta = json.load(fp)
+    except ValueError as e:
+        raise DeltaException('Invalid delta file:{0}, {1}'.format(path, e))
+    if not isinstance(delta, dict) or delta.get('delta') != DELTA_VERSION:
+        raise DeltaException('The file:{0} is not a delta file of version {1}'.format(path, DELTA_VERSION))
+    return delta
+
+
+class DeltaStore:
+    """
+    This class serialises successive versions of a dataset as a base file, written by the
+    reader/writer of its format, followed by a chain of delta files holding only the records
+    added, changed or removed since the previous version. Deserialising reads the base and
+    applies the deltas in order.
+
+    Each delta file names the digest of the base and of the previous delta, and the digest of
+    the dataset it yields, so a chain that does not belong to its base, e.g. after the base was
+    written without the store, is ignored, and a broken chain is an error. After 'maxChain'
+    deltas, or with consolidate(), the whole dataset is written as a new base and the deltas
+    are deleted.
+    """
+    def __init__(self, keyFields=DEFAULT_KEY_FIELDS, maxChain=DEFAULT_MAX_CHAIN):
+        """
+        :Params:
+            keyFields: `tuple`
+                fields identifying a contact across versions of the dataset.
+            maxChain: `int`
+                number of deltas chained to a base before a new base is written.
+        """
+        if not keyFields:
+            raise DeltaException('The delta records need at least one key field')
+        if maxChain < 1:
+            raise DeltaException('The delta chains must be allowed at least one delta, not "{0}"'.format(maxChain))
+
+        self.keyFields = tuple(keyFields)
+        self.maxChain = maxChain
+
+
+    def __str__(self):
+        return 'delta store'
+
+
+    def __repr__(self):
+        return 'delta store'
+
+
+    def serialise(self, rw, data=None, filepath=None):
+        """
+        Serialise a dataset as a delta against the dataset currently at 'filepath', or as a new
+        base when there is no base yet or the chain is full.
+
+        :Params:
+            rw: `al_contacts.reader_writer.ReaderWriter`
+                reader/writer of the format of the base file.
+            data: `list`
+                list of dictionaries. Defaults to rw.data.
+            filepath: `str`
+                path of the base file. Defaults to rw.filepath.
+
+        :Returns:
+            the serialised data.
+        """
+        data = rw._data_to_write(data)
+        filepath = rw._filepath_to_write(filepath)
+
+        if not os.path.exists(filepath):
+            self._write_base(rw, data, filepath)
+            return data
+
+        chain, tip = self._chain(filepath)
+        if len(chain) >= self.maxChain:
+            logger.info('The delta chain of the file:%s is full, writing a new base', filepath)
+            self._write_base(rw, data, filepath)
+            return data
+
+        previous = self._apply_chain(rw.deserialise(filepath), chain)
+        delta = diff_records(previous, data, self.keyFields)
+        if is_empty_delta(delta):
+            logger.info('No change to the data of the file:%s, no delta written', filepath)
+            return data
+
+        if not chain:
+            # deltas written against another base
+            self._remove_deltas(filepath)
+        sequence = chain[-1][0] + 1 if chain else 1
+        header = {
+            'delta': DELTA_VERSION,
+            'sequence': sequence,
+            'base': chain[0][2]['base'] if chain else tip,
+            'parent': tip,
+        }
+        delta = dict(header, **delta)
+        path = delta_path(filepath, sequence)
+        with _atomic_open(path, 'w', encoding='utf-8') as fp:
+            json.dump(delta, fp, ensure_ascii=False, separators=(',', ':'))
+
+        logger.info('Serialised delta %d of the file:%s, %d records changed and %d removed',
+                    sequence, filepath, len(delta['upserts']), len(delta['removed']))
+        return data
+
+
+    def deserialise(self, rw, filepath=None):
+        """
+        Deserialise the base file at 'filepath' and apply its deltas.
+
+        :Params:
+            rw: `al_contacts.reader_writer.ReaderWriter`
+                reader/writer of the format of the base file.
+            filepath: `str`
+                path of the base file. Defaults to rw.filepath, in which case the dataset is
+                also stored in rw.data, as rw.deserialise() does.
+        """
+        path = rw._filepath_to_read(filepath)
+        data = self._apply_chain(rw.deserialise(path), self._chain(path)[0])
+        if filepath is None:
+            rw.data = data
+        return data
+
+
+    def consolidate(self, rw, filepath=None):
+        """
+        Write the dataset of a base file and its deltas as a new base and delete the deltas.
+
+        :Returns:
+            the number of deltas consolidated.
+        """
+        filepath = rw._filepath_to_read(filepath)
+        chain = self._chain(filepath)[0]
+        if chain:
+            self._write_base(rw, self._apply_chain(rw.deserialise(filepath), chain), filepath)
+        else:
+            self._remove_deltas(filepath)
+        return len(chain)
+
+
+    def _chain(self, filepath):
+        """
+        Read the deltas of a base file, checking that they follow each other.
+
+        :Returns:
+            the (deltas, tip) tuple of the list of the (sequence, path, delta) of the deltas, no
+            deltas if they were written against another base, and of the digest of the last
+            link of the chain, the base file or the last delta file.
+        """
+        tip = file_digest(filepath)
+        deltas = list_deltas(filepath)
+        if not deltas:
+            return [], tip
+
+        chain = []
+        baseDigest = tip
+        for expected, (sequence, path) in enumerate(deltas, 1):
+            delta = read_delta(path)
+            if expected == 1 and delta.get('base') != baseDigest:
+                logger.warning('Ignoring the %d deltas of the file:%s, they were written against another base',
+                               len(deltas), filepath)
+                return [], baseDigest
+            if sequence != expected:
+                raise DeltaException('Delta {0} of the file:{1} is missing'.format(expected, filepath))
+            if delta.get('base') != baseDigest or delta.get('parent') != tip:
+                raise DeltaException('The delta file:{0} does not follow the previous delta'.format(path))
+            chain.append((sequence, path, delta))
+            tip = file_digest(path)
+        return chain, tip
+
+
+    def _apply_chain(self, data, chain):
+        """
+        Apply the deltas of a chain to the dataset of its base.
+        """
+        if not chain:
+            return data
+        if not isinstance(data, list):
+            raise DeltaException('The deltas apply to a list of records, not a "{0}"'.format(type(data).__name__))
+        for sequence, path, delta in chain:
+            data = apply_delta(data, delta)
+        if state_digest(data) != delta['digest']:
+            raise DeltaException('The deltas of the file:{0} do not yield the dataset they were computed for'.format(
+                path))
+        return data
+
+
+    def _write_base(self, rw, data, filepath):
+        """
+        Write a dataset as the new base, atomically, and delete the deltas of the old one.
+        """
+        rw.write_batches([data], filepath)
+        self._remove_deltas(filepath)
+
+
+    def _remove_deltas(self, filepath):
+        for sequence, path in list_deltas(filepath):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
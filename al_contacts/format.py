@@ -1,5 +1,11 @@
 #! /usr/bin/env python
 
+import logging
+
+from al_contacts.instrumentation import stage
+
+logger = logging.getLogger(__name__)
+
 
 class FormatException(Exception):
     """
@@ -19,6 +25,9 @@ class Format:
     A ReaderWriter class can un-register itself using the unregister_rw() method
     This class can send notifications to the registered reader/writer class using notify_rw() method
     """
+    # byte strings a file serialised in this format starts with, used by probe()
+    magic = ()
+
     def __init__(self, formats):
         """
         :Params:
@@ -51,8 +60,8 @@ class Format:
             raise FormatException('"{0}" is already Registered with "{1}" format.'.format(self.rw, self))
         else:
             if self.rw:
-                print('Unregistering "{0}" for format "{1}"'.format(self.rw, self))
-            print('Registering "{0}" for format "{1}"'.format(rw, self))
+                logger.info('Unregistering "%s" for format "%s"', self.rw, self)
+            logger.info('Registering "%s" for format "%s"', rw, self)
             self.rw = rw
 
 
@@ -68,22 +77,60 @@ class Format:
         """
         if self.rw == rw:
             self.rw = None
-            print('Unregistered "{0}"!. There is no reader/writer registered for "{1}" format currently'.format(rw, self))
+            logger.info('Unregistered "%s"!. There is no reader/writer registered for "%s" format currently', rw, self)
         else:
             raise FormatException('"{0}" is not registered as the current reader/writer for "{1}" format'.format(rw, self))
 
     
-    def notify_rw(self, action=''):
+    def notify_rw(self, action='', *args, **kwargs):
         """
         This class can send notifications to the registered reader/writer classes using notify_rw() method
         The reader/writer object  must implement notify() method
+        Any further arguments, e.g. per-call data and filepath, are forwarded to the reader/writer,
+        so that a single registered reader/writer can serve several threads at once.
 
         :Params:
             action: `str`
                 action is one of the actions supported by `al_contacts.reader_writer.ReaderWriter` class.
+
+        :Returns:
+            whatever the reader/writer action returns, i.e. the serialised or deserialised data.
         """
         if self.rw:
-            self.rw.notify(self, action)
+            with stage('format.notify_rw', str(self)):
+                return self.rw.notify(self, action, *args, **kwargs)
+        else:
+            raise FormatException('There is no reader/writer registered for "{0}" format currently'.format(self))
+
+
+    def probe(self, header):
+        """
+        Return True if 'header', the first bytes of a file, looks like data serialised in this
+        format. This implementation checks the header against the 'magic' prefixes of the class,
+        the subclasses can override it with a cheap check of their own. It must not need more
+        than the header, which may end in the middle of a record.
+
+        :Params:
+            header: `bytes`
+                the first few KB of the file, or the whole file if it is shorter.
+        """
+        return bool(self.magic) and header.startswith(tuple(self.magic))
+
+
+    async def anotify_rw(self, action='', *args, executor=None, **kwargs):
+        """
+        Asynchronous counterpart of notify_rw(). The registered reader/writer performs the action
+        in 'executor', so several formats can be awaited concurrently, e.g. with asyncio.gather().
+        The reader/writer object must implement anotify() method
+
+        :Params:
+            action: `str`
+                action is one of the actions supported by `al_contacts.reader_writer.ReaderWriter` class.
+            executor: `concurrent.futures.Executor`
+                executor to run the action in. Defaults to the default executor of the running loop.
+        """
+        if self.rw:
+            return await self.rw.anotify(self, action, *args, executor=executor, **kwargs)
         else:
             raise FormatException('There is no reader/writer registered for "{0}" format currently'.format(self))
 
@@ -100,7 +147,7 @@ class Format:
                 This could be used later to communicate back.
         """
         if self.rw:
-            print('"{0}" is registered with "{1}" format!'.format(self.rw, self))
+            logger.info('"%s" is registered with "%s" format!', self.rw, self)
         else:
             raise FormatException('There is no reader/writer registered for "{0}" format currently'.format(self))
 
@@ -111,6 +158,10 @@ class PickleFormat(Format):
     This class is an observer class, for Pickle format, for the observable 'Formats' class
     This is also an observable class for reader/writer for Pickle data format.
     """
+    # PROTO opcode of the protocols 2 and above, and the list/dict opening opcodes the
+    # protocols 0 and 1 start with
+    magic = tuple(bytes([0x80, protocol]) for protocol in range(2, 6)) + (b'(l', b'(d', b']', b'}')
+
     def __str__(self):
         return 'pickle'
 
@@ -124,8 +175,84 @@ class JsonFormat(Format):
     This class is an observer class, for Json format, for the observable 'Formats' class
     This is also an observable class for reader/writer for Json data format.
     """
+    magic = (b'[', b'{')
+
     def __str__(self):
         return 'json'
 
     def __repr__(self):
-        return 'json'
\ No newline at end of file
+        return 'json'
+
+
+    def probe(self, header):
+        """
+        Implementation of the base class probe() method for the JsonFormat class.
+        Check for an array or an object after an optional byte order mark and whitespace.
+        """
+        if header.startswith(b'\xef\xbb\xbf'):
+            header = header[3:]
+        return Format.probe(self, header.lstrip())
+
+
+
+class BinaryFormat(Format):
+    """
+    This class inherits from 'Format' class that defines common methods for all format classes.
+    This class is an observer class, for the Binary format, for the observable 'Formats' class
+    This is also an observable class for reader/writer for the Binary data format.
+    """
+    magic = (b'ALCB',)
+
+    def __str__(self):
+        return 'binary'
+
+    def __repr__(self):
+        return 'binary'
+
+
+
+class CsvFormat(Format):
+    """
+    This class inherits from 'Format' class that defines common methods for all format classes.
+    This class is an observer class, for Csv format, for the observable 'Formats' class
+    This is also an observable class for reader/writer for Csv data format.
+    """
+    def __str__(self):
+        return 'csv'
+
+    def __repr__(self):
+        return 'csv'
+
+
+    def probe(self, header):
+        """
+        Implementation of the base class probe() method for the CsvFormat class.
+        csv has no magic bytes: check for utf-8 text whose complete lines can be sniffed as
+        rows of at least as many columns as the contact fields.
+        """
+        # imported here, csv is only needed once a file is probed
+        import csv
+        from al_contacts.contacts import CONTACT_KEYS, CSV_DELIMITERS
+
+        if not header or b'\x00' in header:
+            return False
+        try:
+            text = header.decode('utf-8')
+        except UnicodeDecodeError as e:
+            # the header may end in the middle of a character
+            if e.start < len(header) - 3:
+                return False
+            text = header[:e.start].decode('utf-8')
+
+        lines = text.lstrip('\ufeff').splitlines()
+        if len(lines) > 1 and not text.endswith(('\n', '\r')):
+            lines = lines[:-1]
+        lines = [line for line in lines if line.strip()]
+        if not lines or lines[0].lstrip()[:1] in ('[', '{'):
+            return False
+        try:
+            dialect = csv.Sniffer().sniff('\n'.join(lines), delimiters=CSV_DELIMITERS)
+            rows = list(csv.reader(lines, dialect))
+        except csv.Error:
+            return False
+        return all(len(row) >= len(CONTACT_KEYS) for row in rows)
@@ -1,5 +1,27 @@
 #! /usr/bin/env python
 
+import os
+import logging
+import threading
+from collections import OrderedDict
+
+from al_contacts.plugins import load_object
+from al_contacts.instrumentation import stage
+
+logger = logging.getLogger(__name__)
+
+# format name that stands for the format detected from the contents of a file, see Formats.detect()
+AUTO_FORMAT = 'auto'
+
+# number of bytes read from the start of a file to detect its format
+PROBE_SIZE = 4096
+
+# order in which Formats.detect() probes the built-in formats: the formats recognised by their
+# magic bytes first, the text formats recognised by heuristics last. The other formats, e.g. the
+# plugins, are probed in between, in name order.
+MAGIC_FORMATS = ['binary', 'pickle', 'delta', 'json']
+HEURISTIC_FORMATS = ['csv']
+
 
 class FormatsException(Exception):
     """
@@ -14,9 +36,13 @@ class Formats:
     Any format class can register itself with this class using the register_format() method
     Formats can un-register themselves using the unregister_format() method
     This class can send notifications to the format classes using notify_formats() method
+    Formats can also be declared by name using the declare_format() method, in which case they
+    are imported, instantiated and registered only on first use through get_format().
     """
     def __init__(self):
         self.formats = []
+        self._declared = OrderedDict()
+        self._lock = threading.RLock()
 
 
     def __str__(self):
@@ -39,7 +65,7 @@ class Formats:
         if format in self.formats:
             raise FormatsException('"{0}" format already registered with "{1}"'.format(format, self))
         else:
-            print('Registering "{0}" format with "{1}"'.format(format, self))
+            logger.info('Registering "%s" format with "%s"', format, self)
             self.formats.append(format)
 
 
@@ -53,7 +79,7 @@ class Formats:
                 object of one of the 'Format' classes which registers with this class.
         """
         if format in self.formats:
-            print('Unregistering "{0}" format from "{1}"'.format(format, self))
+            logger.info('Unregistering "%s" format from "%s"', format, self)
             self.formats.pop(self.formats.index(format))
         else:
             raise FormatsException('"{0}" format is not registered with "{1}"'.format(format, self))
@@ -63,9 +89,314 @@ class Formats:
         """
         This class can send notifications to the 'Format' class objects using notify_formats() method
         The 'Format' class objects must implement notify() method
+        Declared formats are instantiated first, so that they get notified too.
         """
+        for name in list(self._declared):
+            self.get_format(name)
+
         if not self.formats:
             raise FormatsException('There are no formats registered with "{0}" currently'.format(self))
         else:
+            with stage('formats.notify'):
+                for aFormat in self.formats:
+                    aFormat.notify(self)
+
+
+    def declare_format(self, name, formatClass, rwClass=None):
+        """
+        Declare a format by name without importing or instantiating it. The format is created and
+        registered with this class by get_format() the first time it is asked for.
+
+        :Params:
+            name: `str`
+                name of the format, which must match the string representation of its instances.
+            formatClass: `str` or `callable`
+                'package.module:attribute' path of, or the, 'Format' subclass or factory. It is
+                called with this object and must register the format with it.
+            rwClass: `str` or `callable`
+                'package.module:attribute' path of, or the, 'ReaderWriter' subclass to register
+                with the format. Optional for factories that register their own reader/writer.
+        """
+        with self._lock:
+            if name in self.names():
+                raise FormatsException('"{0}" format already registered with "{1}"'.format(name, self))
+            self._declared[name] = (formatClass, rwClass)
+
+
+    def names(self):
+        """
+        Return the names of all the registered and declared formats, without instantiating any of them.
+        """
+        names = [str(aFormat) for aFormat in self.formats]
+        return names + [name for name in self._declared if name not in names]
+
+
+    def get_format(self, format):
+        """
+        Return the registered format named 'format'. A declared format is instantiated and
+        registered on first use. A registered format object is returned as is.
+
+        :Params:
+            format: `str` or `al_contacts.format.Format`
+                name of one of the registered formats, or a registered format object.
+        """
+        for aFormat in self.formats:
+            if aFormat is format or str(aFormat) == format:
+                return aFormat
+
+        with self._lock:
             for aFormat in self.formats:
-                aFormat.notify(self)
\ No newline at end of file
+                if str(aFormat) == format:
+                    return aFormat
+            if isinstance(format, str) and format in self._declared:
+                return self._instantiate(format)
+
+        raise FormatsException('There is no format named "{0}" registered with "{1}" currently'.format(format, self))
+
+
+    def _instantiate(self, name):
+        """
+        Import, instantiate and register the declared format 'name' and its reader/writer.
+        """
+        formatClass, rwClass = self._declared[name]
+        aFormat = load_object(formatClass)(self)
+        if str(aFormat) != name:
+            self.unregister_format(aFormat)
+            raise FormatsException('Format declared as "{0}" registered as "{1}"'.format(name, aFormat))
+        if rwClass:
+            try:
+                load_object(rwClass)(aFormat)
+            except Exception:
+                self.unregister_format(aFormat)
+                raise
+        del self._declared[name]
+        return aFormat
+
+
+    def detect_order(self):
+        """
+        Return the names of the formats in the order detect() probes them, without instantiating
+        any of them: the MAGIC_FORMATS, then the other formats in name order, then the
+        HEURISTIC_FORMATS. The order does not depend on which formats were already used.
+        """
+        names = self.names()
+        first = [name for name in MAGIC_FORMATS if name in names]
+        last = [name for name in HEURISTIC_FORMATS if name in names]
+        return first + sorted(name for name in names if name not in first and name not in last) + last
+
+
+    def detect(self, path, probeSize=PROBE_SIZE):
+        """
+        Return the format of the serialised file at 'path', from its first 'probeSize' bytes.
+        The formats are probed in the order of detect_order(), so a heuristic probe never wins
+        over a magic one, and the declared formats are only instantiated until one of them matches.
+
+        :Params:
+            path: `str`
+                path of the serialised file.
+            probeSize: `int`
+                number of bytes to read from the start of the file.
+        """
+        try:
+            with open(path, 'rb') as fp:
+                header = fp.read(probeSize)
+        except OSError as e:
+            raise FormatsException('Cannot read "{0}" to detect its format: {1}'.format(path, e))
+
+        names = self.detect_order()
+        for name in names:
+            aFormat = self.get_format(name)
+            probe = getattr(aFormat, 'probe', None)
+            if probe and probe(header):
+                logger.debug('Detected "%s" format for the file:%s', aFormat, path)
+                return aFormat
+
+        raise FormatsException('Could not detect the format of "{0}", none of {1} matched'.format(path, names))
+
+
+    def transcode(self, srcFormat, srcPath, dstFormat, dstPath, batchSize=1000, workers=None):
+        """
+        Convert a serialised file from one registered format to another, streaming the records
+        from the source reader/writer to the destination reader/writer in batches instead of
+        deserialising the whole file first. When the destination reader/writer encodes batches
+        independently, 'workers' processes encode the batches in parallel.
+
+        :Params:
+            srcFormat: `str` or `al_contacts.format.Format`
+                format of the file to convert, or AUTO_FORMAT to detect it.
+            srcPath: `str`
+                path of the file to convert.
+            dstFormat: `str` or `al_contacts.format.Format`
+                format to convert to.
+            dstPath: `str`
+                path of the converted file.
+            batchSize: `int`
+                number of records per batch.
+            workers: `int`
+                number of encoding worker processes. None or 1 encodes in the current process.
+
+        :Returns:
+            the number of records converted.
+        """
+        if srcFormat == AUTO_FORMAT:
+            srcFormat = self.detect(srcPath)
+        srcRW = self._get_rw(srcFormat)
+        dstRW = self._get_rw(dstFormat)
+
+        if os.path.abspath(srcPath) == os.path.abspath(dstPath):
+            raise FormatsException('Cannot transcode "{0}" onto itself'.format(srcPath))
+
+        with stage('formats.transcode', '{0}->{1}'.format(srcFormat, dstFormat)) as aStage:
+            batches = srcRW.iter_batches(srcPath, batchSize)
+            if workers and workers > 1 and dstRW.parallelEncoding:
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    count = dstRW.write_batches(batches, dstPath, executor)
+            else:
+                count = dstRW.write_batches(batches, dstPath)
+            aStage.records = count
+            if aStage.active:
+                aStage.bytes = os.path.getsize(dstPath)
+        return count
+
+
+    def merge(self, inputs, dstFormat, dstPath, keyFields=('name',), dedupe=False, batchSize=1000, presorted=False,
+              runRecords=None, maxFanIn=None):
+        """
+        Merge serialised files of any registered formats into one file sorted on 'keyFields',
+        with a k-way merge of the streamed inputs through a heap. Sorted inputs are merged as they
+        are read, holding one batch of each input in memory. Other inputs are first sorted in
+        runs of 'runRecords' records spilled to temporary files, and the runs are merged. At most
+        'maxFanIn' inputs or runs are merged at once, the others are merged in earlier passes
+        through temporary files.
+
+        :Params:
+            inputs: `list`
+                paths of the files to merge, whose format is detected, or (format, path) tuples.
+            dstFormat: `str` or `al_contacts.format.Format`
+                format to write the merged records in.
+            dstPath: `str`
+                path of the merged file.
+            keyFields: `tuple`
+                fields of the records to merge on.
+            dedupe: `bool`
+                keep only the first record of each key, the inputs taking precedence in order.
+            batchSize: `int`
+                number of records per batch read from the inputs and written to the output.
+            presorted: `bool`
+                True if every input is sorted on 'keyFields' already, which is checked as
+                they are read.
+            runRecords: `int`
+                number of records sorted at once when the inputs are not sorted. Defaults to
+                al_contacts.merge.DEFAULT_RUN_RECORDS.
+            maxFanIn: `int`
+                largest number of inputs or runs merged at once. Defaults to
+                al_contacts.merge.MAX_FAN_IN.
+
+        :Returns:
+            the number of records written.
+        """
+        from al_contacts.merge import DEFAULT_RUN_RECORDS, MAX_FAN_IN
+        from al_contacts.merge import iter_checked, iter_record_batches, merge_records, reduce_runs, spill_runs
+
+        if not inputs:
+            raise FormatsException('There are no files to merge')
+        dstRW = self._get_rw(dstFormat)
+        sources = self._sources(inputs)
+        for srcRW, srcPath in sources:
+            if os.path.abspath(srcPath) == os.path.abspath(dstPath):
+                raise FormatsException('Cannot merge "{0}" onto itself'.format(srcPath))
+
+        with stage('formats.merge', str(dstFormat)) as aStage:
+            maxFanIn = maxFanIn or MAX_FAN_IN
+            iterables = []
+            for srcRW, srcPath in sources:
+                batches = srcRW.iter_batches(srcPath, batchSize)
+                if presorted:
+                    iterables.append(iter_checked(batches, keyFields, srcPath))
+                else:
+                    spill_runs(batches, keyFields, runRecords or DEFAULT_RUN_RECORDS, srcPath, iterables, maxFanIn)
+            iterables = reduce_runs(iterables, keyFields, maxFanIn)
+            logger.info('Merging %d files in %d sorted streams into the file:%s', len(sources), len(iterables), dstPath)
+
+            records = merge_records(iterables, keyFields, dedupe)
+            count = dstRW.write_batches(iter_record_batches(records, batchSize), dstPath)
+            aStage.records = count
+            if aStage.active:
+                aStage.bytes = os.path.getsize(dstPath)
+        return count
+
+
+    def lookup(self, inputs, where, batchSize=1000, countryCode=None):
+        """
+        Return the records of serialised files of any registered formats matching 'where', e.g.
+        the contacts with a phone number, to tell whether it is a contact already. The Bloom
+        filters of the files, see al_contacts.bloom, are read first and the files they rule out
+        are not opened, so that a lookup of a missing record mostly costs a block read per file.
+        Phone numbers and names match once normalised as in the filters.
+
+        :Params:
+            inputs: `list`
+                paths of the files to search, whose format is detected, or (format, path) tuples.
+            where: `dict`
+                field values of the records looked up.
+            batchSize: `int`
+                number of records per batch read from the files opened.
+            countryCode: `str`
+                country code the phone numbers with a national trunk prefix are normalised with.
+                Defaults to al_contacts.phone.DEFAULT_COUNTRY_CODE.
+
+        :Returns:
+            the list of the matching records.
+        """
+        from al_contacts.bloom import may_contain, select_records
+        from al_contacts.delta import DeltaStore, list_deltas
+        from al_contacts.phone import DEFAULT_COUNTRY_CODE
+
+        if not inputs:
+            raise FormatsException('There are no files to look up')
+        if not where:
+            raise FormatsException('There are no field values to look up')
+        countryCode = countryCode or DEFAULT_COUNTRY_CODE
+        sources = self._sources(inputs)
+
+        with stage('formats.lookup') as aStage:
+            candidates = [(srcRW, srcPath) for srcRW, srcPath in sources if may_contain(srcPath, where, countryCode)]
+            logger.info('Reading %d of the %d files, the others ruled out by their Bloom filters', len(candidates),
+                        len(sources))
+            records = []
+            for srcRW, srcPath in candidates:
+                # the records of a file with deltas are those of its whole chain, whichever
+                # reader/writer wrote them
+                if srcRW.delta is not None or list_deltas(srcPath):
+                    batches = [(srcRW.delta or DeltaStore()).deserialise(srcRW, srcPath)]
+                else:
+                    batches = srcRW.iter_batches(srcPath, batchSize)
+                for batch in batches:
+                    records.extend(select_records(batch, where, countryCode))
+            aStage.records = len(records)
+        return records
+
+
+    def _sources(self, inputs):
+        """
+        Return the (reader/writer, path) tuple of each input, a path whose format is detected
+        or a (format, path) tuple.
+        """
+        sources = []
+        for anInput in inputs:
+            srcFormat, srcPath = anInput if isinstance(anInput, tuple) else (AUTO_FORMAT, anInput)
+            if srcFormat == AUTO_FORMAT:
+                srcFormat = self.detect(srcPath)
+            sources.append((self._get_rw(srcFormat), srcPath))
+        return sources
+
+
+    def _get_rw(self, format):
+        """
+        Return the reader/writer registered for the format named 'format'.
+        """
+        aFormat = self.get_format(format)
+        if not aFormat.rw:
+            raise FormatsException('There is no reader/writer registered for "{0}" format currently'.format(aFormat))
+        return aFormat.rw
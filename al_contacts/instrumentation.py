@@ -0,0 +1,446 @@
+#! /usr/bin/env python
+
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+# hooks notified around every instrumented stage, see add_hook()
+_hooks = []
+_hooksLock = threading.Lock()
+
+
+class InstrumentationException(Exception):
+    """
+    Exception raised by the instrumentation hooks.
+    """
+    pass
+
+
+class Stage:
+    """
+    One run of an instrumented stage, e.g. a reader/writer action. The code being measured sets
+    'records' and 'bytes' once it knows them, the hooks get the stage before and after it runs.
+    """
+    active = True
+
+    def __init__(self, name, label, hooks):
+        """
+        :Params:
+            name: `str`
+                name of the notification point, e.g. 'rw.serialise'.
+            label: `str`
+                what the stage ran for, e.g. the name of the format or view.
+            hooks: `list`
+                hooks to notify.
+        """
+        self.name = name
+        self.label = label
+        self.records = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self._hooks = hooks
+        self._tokens = []
+        self._start = 0.0
+
+
+    def __str__(self):
+        return '{0}[{1}]'.format(self.name, self.label) if self.label else self.name
+
+
+    def __repr__(self):
+        return str(self)
+
+
+    def __enter__(self):
+        self._tokens = [hook.before(self) for hook in self._hooks]
+        self._start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, excType, excValue, traceback):
+        self.seconds = time.perf_counter() - self._start
+        for hook, token in reversed(list(zip(self._hooks, self._tokens))):
+            hook.after(self, token, excValue)
+        return False
+
+
+class _NullStage:
+    """
+    Stage used while no hooks are installed. It does nothing, so that the instrumented code
+    costs one check of the hooks list when nobody is measuring it.
+    """
+    active = False
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, label=''):
+    """
+    Return a context manager measuring the stage 'name' for the installed hooks. The code in the
+    'with' block can set the 'records' and 'bytes' attributes of the returned stage, after
+    checking its 'active' attribute if they are costly to work out.
+
+    :Params:
+        name: `str`
+            name of the notification point, e.g. 'rw.serialise'.
+        label: `str`
+            what the stage runs for, e.g. the name of the format or view.
+    """
+    if not _hooks:
+        return _NULL_STAGE
+    return Stage(name, label, list(_hooks))
+
+
+def add_hook(hook):
+    """
+    Install a hook, notified around every instrumented stage from now on.
+
+    :Params:
+        hook: `al_contacts.instrumentation.Hook`
+            object implementing before() and after().
+    """
+    with _hooksLock:
+        if hook in _hooks:
+            raise InstrumentationException('"{0}" hook is already installed'.format(hook))
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """
+    Uninstall a hook installed with add_hook().
+    """
+    with _hooksLock:
+        if hook not in _hooks:
+            raise InstrumentationException('"{0}" hook is not installed'.format(hook))
+        _hooks.remove(hook)
+
+
+@contextmanager
+def hooked(*hooks):
+    """
+    Install 'hooks' for the duration of a 'with' block.
+    """
+    for hook in hooks:
+        add_hook(hook)
+    try:
+        yield hooks
+    finally:
+        for hook in hooks:
+            remove_hook(hook)
+
+
+class Hook:
+    """
+    Base class of the instrumentation hooks. The subclasses override before() and/or after().
+    """
+    def __str__(self):
+        return 'hook'
+
+
+    def __repr__(self):
+        return 'hook'
+
+
+    def before(self, stage):
+        """
+        Called before 'stage' runs. Whatever it returns is passed back to after().
+        """
+        return None
+
+
+    def after(self, stage, token, error):
+        """
+        Called after 'stage' ran, with the value before() returned and the exception the stage
+        raised, if any. stage.seconds holds the wall time of the stage.
+        """
+        pass
+
+
+class StageTimer(Hook):
+    """
+    Hook accumulating, per stage name and label, the number of calls, the wall time, the time
+    spent in the stage itself rather than in the stages nested in it, the records and the bytes.
+    It is safe to use from several threads, nesting is tracked per thread.
+    """
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+
+    def __str__(self):
+        return 'stage timer'
+
+
+    def __repr__(self):
+        return 'stage timer'
+
+
+    def before(self, stage):
+        stack = self._local.__dict__.setdefault('stack', [])
+        # wall time of the stages nested in this one
+        stack.append(0.0)
+        return None
+
+
+    def after(self, stage, token, error):
+        stack = self._local.stack
+        nested = stack.pop()
+        if stack:
+            stack[-1] += stage.seconds
+
+        with self._lock:
+            stats = self._stats.get((stage.name, stage.label))
+            if stats is None:
+                stats = self._stats[(stage.name, stage.label)] = {
+                    'stage': stage.name, 'label': stage.label, 'calls': 0, 'seconds': 0.0,
+                    'self_seconds': 0.0, 'records': 0, 'bytes': 0, 'errors': 0,
+                }
+            stats['calls'] += 1
+            stats['seconds'] += stage.seconds
+            stats['self_seconds'] += max(stage.seconds - nested, 0.0)
+            stats['records'] += stage.records
+            stats['bytes'] += stage.bytes
+            if error is not None:
+                stats['errors'] += 1
+
+
+    def report(self):
+        """
+        Return the accumulated statistics as a list of dictionaries with keys = ['stage', 'label',
+        'calls', 'seconds', 'self_seconds', 'records', 'bytes', 'errors'], in the order the stages
+        first finished.
+        """
+        with self._lock:
+            return [dict(stats) for stats in self._stats.values()]
+
+
+    def format_breakdown(self):
+        """
+        Make a text table of the accumulated statistics.
+        """
+        line = '-'*110
+        rowFormat = '| {0:<32} | {1:>6} | {2:>10} | {3:>10} | {4:>10} | {5:>14} | {6:>10} |'
+        lines = [line, rowFormat.format('Stage', 'Calls', 'Total (s)', 'Self (s)', 'Records', 'Bytes', 'Records/s'), line]
+        for stats in self.report():
+            name = '{0}[{1}]'.format(stats['stage'], stats['label']) if stats['label'] else stats['stage']
+            rate = stats['records'] / stats['self_seconds'] if stats['records'] and stats['self_seconds'] else 0
+            lines.append(rowFormat.format(
+                name[:32], stats['calls'], '{0:.4f}'.format(stats['seconds']), '{0:.4f}'.format(stats['self_seconds']),
+                stats['records'], stats['bytes'], '{0:,.0f}'.format(rate)))
+        lines.append(line)
+        return '\n'.join(lines)
+
+
+class MemoryHook(Hook):
+    """
+    Hook measuring, with tracemalloc, the peak and the retained memory of each stage: the peak
+    is the highest traced memory during the stage above what was traced when it started, the
+    retained memory is what the stage left allocated when it ended, e.g. the loaded data.
+    Nested stages are accounted for: the peak of a stage includes the peaks of the stages run
+    inside it. tracemalloc traces every thread, so the figures are meant for runs doing one
+    thing at a time, like the CLI.
+    """
+    def __init__(self, topLines=0):
+        """
+        :Params:
+            topLines: `int`
+                number of source lines that retained the most memory to keep per stage. Comparing
+                the tracemalloc snapshots this needs is slow, 0 turns it off.
+        """
+        self.topLines = topLines
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started = False
+
+
+    def __str__(self):
+        return 'memory hook'
+
+
+    def __repr__(self):
+        return 'memory hook'
+
+
+    def start(self):
+        """
+        Start tracing the memory allocations, unless they are traced already.
+        """
+        # imported here, only the memory profiling runs need it
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+
+
+    def stop(self):
+        """
+        Stop tracing the memory allocations, if start() started it.
+        """
+        import tracemalloc
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+
+    def before(self, stage):
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return None
+
+        current, peak = tracemalloc.get_traced_memory()
+        stack = self._local.__dict__.setdefault('stack', [])
+        if stack:
+            # the peak is reset for this stage, keep the enclosing stage's peak so far
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        frame = {'start': current, 'peak': current, 'snapshot': None}
+        if self.topLines:
+            frame['snapshot'] = tracemalloc.take_snapshot()
+        stack.append(frame)
+        tracemalloc.reset_peak()
+        return frame
+
+
+    def after(self, stage, token, error):
+        import tracemalloc
+        if token is None or not tracemalloc.is_tracing():
+            return
+
+        current, peak = tracemalloc.get_traced_memory()
+        stack = self._local.stack
+        frame = stack.pop()
+        peak = max(frame['peak'], peak)
+        if stack:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+
+        top = []
+        if frame['snapshot'] is not None:
+            # leave out the allocations of tracemalloc and of this hook
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            differences = tracemalloc.take_snapshot().filter_traces(filters).compare_to(
+                frame['snapshot'].filter_traces(filters), 'lineno')
+            top = [str(difference) for difference in differences[:self.topLines] if difference.size_diff > 0]
+
+        with self._lock:
+            stats = self._stats.get((stage.name, stage.label))
+            if stats is None:
+                stats = self._stats[(stage.name, stage.label)] = {
+                    'stage': stage.name, 'label': stage.label, 'calls': 0, 'records': 0,
+                    'peak_bytes': 0, 'retained_bytes': 0, 'top': [],
+                }
+            stats['calls'] += 1
+            stats['records'] += stage.records
+            stats['peak_bytes'] = max(stats['peak_bytes'], peak - frame['start'])
+            stats['retained_bytes'] += current - frame['start']
+            if top:
+                stats['top'] = top
+
+
+    def report(self):
+        """
+        Return the memory statistics as a list of dictionaries with keys = ['stage', 'label',
+        'calls', 'records', 'peak_bytes', 'retained_bytes', 'peak_per_record',
+        'retained_per_record', 'top'], in the order the stages first finished. 'peak_bytes' is the
+        highest peak of all the calls of a stage, 'retained_bytes' the sum of what they retained.
+        """
+        with self._lock:
+            report = [dict(stats) for stats in self._stats.values()]
+        for stats in report:
+            records = stats['records'] / float(stats['calls']) if stats['calls'] else 0
+            stats['peak_per_record'] = stats['peak_bytes'] / records if records else None
+            stats['retained_per_record'] = stats['retained_bytes'] / float(stats['records']) if stats['records'] else None
+        return report
+
+
+    def format_breakdown(self):
+        """
+        Make a text table of the memory statistics.
+        """
+        line = '-'*118
+        rowFormat = '| {0:<32} | {1:>6} | {2:>10} | {3:>14} | {4:>14} | {5:>12} | {6:>12} |'
+        lines = [line, rowFormat.format('Stage', 'Calls', 'Records', 'Peak (B)', 'Retained (B)', 'Peak/rec', 'Retained/rec'), line]
+        for stats in self.report():
+            name = '{0}[{1}]'.format(stats['stage'], stats['label']) if stats['label'] else stats['stage']
+            lines.append(rowFormat.format(
+                name[:32], stats['calls'], stats['records'], stats['peak_bytes'], stats['retained_bytes'],
+                '{0:.1f}'.format(stats['peak_per_record']) if stats['peak_per_record'] is not None else '-',
+                '{0:.1f}'.format(stats['retained_per_record']) if stats['retained_per_record'] is not None else '-'))
+        lines.append(line)
+        for stats in self.report():
+            if stats['top']:
+                lines.append('Top allocations of {0}[{1}]:'.format(stats['stage'], stats['label']))
+                lines.extend('  ' + entry for entry in stats['top'])
+        return '\n'.join(lines)
+
+
+@contextmanager
+def memory_profiling(stream=None, topLines=0):
+    """
+    Trace the memory of the instrumented stages run in a 'with' block and print their peak and
+    retained bytes to 'stream' when it ends.
+
+    :Params:
+        stream: `file`
+            stream to print the breakdown to. Defaults to sys.stderr.
+        topLines: `int`
+            number of source lines that retained the most memory to list per stage.
+    """
+    hook = MemoryHook(topLines)
+    hook.start()
+    add_hook(hook)
+    try:
+        yield hook
+    finally:
+        remove_hook(hook)
+        hook.stop()
+        (stream or sys.stderr).write(hook.format_breakdown() + '\n')
+
+
+@contextmanager
+def profiling(pstatsPath=None, stream=None):
+    """
+    Time the instrumented stages run in a 'with' block and print their breakdown to 'stream'
+    when it ends. With 'pstatsPath', the block also runs under cProfile and the profile is
+    written there, for 'python -m pstats' or snakeviz.
+
+    :Params:
+        pstatsPath: `str`
+            path to write the cProfile statistics to. Optional.
+        stream: `file`
+            stream to print the breakdown to. Defaults to sys.stderr.
+    """
+    timer = StageTimer()
+    profiler = None
+    if pstatsPath:
+        # imported here, only the runs writing a profile need it
+        import cProfile
+        profiler = cProfile.Profile()
+
+    add_hook(timer)
+    if profiler:
+        profiler.enable()
+    try:
+        yield timer
+    finally:
+        if profiler:
+            profiler.disable()
+        remove_hook(timer)
+        stream = stream or sys.stderr
+        stream.write(timer.format_breakdown() + '\n')
+        if profiler:
+            profiler.dump_stats(pstatsPath)
+            stream.write('Wrote the cProfile statistics to "{0}"\n'.format(pstatsPath))
@@ -0,0 +1,109 @@
+#! /usr/bin/env python
+
+import json
+from operator import itemgetter
+from json.encoder import encode_basestring_ascii
+
+from al_contacts.contacts import CONTACT_KEYS
+
+_KEYS = tuple(CONTACT_KEYS)
+_GETTERS = [itemgetter(key) for key in CONTACT_KEYS]
+
+# text json.dumps() writes before each value of a contact, the first one for the first contact
+# of an array and the second one for the next ones
+_FIRST_PREFIX = '{"' + CONTACT_KEYS[0] + '": '
+_NEXT_PREFIX = '}, ' + _FIRST_PREFIX
+_PREFIXES = [', "{0}": '.format(key) for key in CONTACT_KEYS[1:]]
+
+# text json.dumps() writes between two contacts of an array
+RECORD_BOUNDARY = _NEXT_PREFIX
+
+# number of records encoded at once by iter_encode_contacts(). Big enough for the joins to
+# dominate, small enough for the lists of the escaped values to stay in the CPU caches.
+ENCODE_BLOCK = 4096
+
+
+def encode_contact_items(records):
+    """
+    Encode a list of records as the comma separated items of a json array, the same text as
+    json.dumps(records)[1:-1].
+
+    When all the records are dictionaries with the keys of CONTACT_KEYS, in that order, and
+    string values, the values are escaped column by column by encode_basestring_ascii(), the C
+    function json.dumps() uses for them, and laid out between the precompiled text json.dumps()
+    writes around them, in one join. The other lists go through json.dumps().
+    """
+    if not records:
+        return ''
+    if type(records) is not list or set(map(type, records)) != {dict} or set(map(tuple, records)) != {_KEYS}:
+        return json.dumps(records)[1:-1]
+
+    count = len(records)
+    parts = [None] * (2 * len(_KEYS) * count)
+    try:
+        for index, getter in enumerate(_GETTERS):
+            parts[2 * index + 1::2 * len(_KEYS)] = map(encode_basestring_ascii, map(getter, records))
+    except TypeError:
+        # a value is not a string
+        return json.dumps(records)[1:-1]
+
+    parts[0::2 * len(_KEYS)] = [_NEXT_PREFIX] * count
+    parts[0] = _FIRST_PREFIX
+    for index, prefix in enumerate(_PREFIXES, 1):
+        parts[2 * index::2 * len(_KEYS)] = [prefix] * count
+    parts.append('}')
+    return ''.join(parts)
+
+
+def iter_encode_contacts(records, blockSize=ENCODE_BLOCK):
+    """
+    Encode a list of records as a json array, yielding the text in blocks of 'blockSize'
+    records, see encode_contact_items(). The blocks joined are the same text as
+    json.dumps(records).
+
+    :Params:
+        records: `list`
+            list of dictionaries with keys = ['name', 'address', 'phone'].
+        blockSize: `int`
+            number of records encoded at once.
+    """
+    if type(records) is not list:
+        yield json.dumps(records)
+        return
+
+    yield '['
+    for start in range(0, len(records), blockSize):
+        text = encode_contact_items(records[start:start + blockSize])
+        yield ', ' + text if start else text
+    yield ']'
+
+
+def encode_contacts(records, blockSize=ENCODE_BLOCK):
+    """
+    Encode a list of records as a json array, the same text as json.dumps(records), see
+    iter_encode_contacts().
+    """
+    return ''.join(iter_encode_contacts(records, blockSize))
+
+
+def decode_contact_items(text, pos=0):
+    """
+    Decode at once the items of a json array from 'pos', the start of an item, up to the last
+    boundary between two contacts in 'text', e.g. a chunk of a file being read. A quote inside
+    a json string is always escaped, so the boundary text '}, {"name": ' can only be found
+    between two items, and the complete items before it are decoded by one json.loads() call
+    instead of one call per item.
+
+    :Returns:
+        the (items, end) tuple of the decoded items and the position after the last one, with
+        no items when 'text' has no boundary after 'pos', or None when the items before the
+        boundary are not valid json, e.g. because the contacts are nested in other objects.
+        These have to be decoded item by item.
+    """
+    cut = text.rfind(RECORD_BOUNDARY, pos)
+    if cut < 0:
+        return [], pos
+    try:
+        return json.loads('[' + text[pos:cut + 1] + ']'), cut + 1
+    except ValueError:
+        return None
@@ -0,0 +1,82 @@
+#! /usr/bin/env python
+
+import sys
+import logging
+
+# name of the logger all the al_contacts modules log under
+LOGGER_NAME = 'al_contacts'
+
+# levels that can be chosen with '--log-level', from the most to the least verbose
+LOG_LEVELS = ['debug', 'info', 'warning', 'error', 'critical']
+DEFAULT_LOG_LEVEL = 'info'
+
+# level used by '--quiet'
+QUIET_LOG_LEVEL = 'error'
+
+LOG_FORMAT = '%(levelname)s %(name)s: %(message)s'
+
+
+class LogException(Exception):
+    """
+    Exception raised while configuring the logging of the al_contacts package.
+    """
+    pass
+
+
+def add_logging_arguments(parser):
+    """
+    Add the '--log-level' and '--quiet' options to an argparse parser.
+
+    :Params:
+        parser: `argparse.ArgumentParser`
+            parser of one of the al_contacts commands.
+    """
+    parser.add_argument(
+        '--log-level',
+        choices=LOG_LEVELS,
+        default=DEFAULT_LOG_LEVEL,
+        help='Level of the messages logged to stderr. Defaults to "{0}"'.format(DEFAULT_LOG_LEVEL),
+    )
+    parser.add_argument(
+        '-q',
+        '--quiet',
+        action='store_true',
+        help='Only log errors, same as "--log-level {0}"'.format(QUIET_LOG_LEVEL),
+    )
+
+
+def configure_logging(level=DEFAULT_LOG_LEVEL, quiet=False, stream=None):
+    """
+    Send the messages of the al_contacts package at 'level' and above to 'stream'. Messages
+    below 'level' are dropped by the logger's level check before they are formatted, so
+    disabled messages cost a method call and nothing more. Calling it again replaces the
+    previous configuration.
+
+    :Params:
+        level: `str`
+            one of LOG_LEVELS.
+        quiet: `bool`
+            only log errors, overrides 'level'.
+        stream: `file`
+            stream to write the messages to. Defaults to sys.stderr, stdout is left to the views.
+
+    :Returns:
+        the configured `logging.Logger`.
+    """
+    if quiet:
+        level = QUIET_LOG_LEVEL
+    if level not in LOG_LEVELS:
+        raise LogException('Invalid log level "{0}", expected one of {1}'.format(level, LOG_LEVELS))
+
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        if getattr(handler, '_al_contacts', False):
+            logger.removeHandler(handler)
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler._al_contacts = True
+    logger.addHandler(handler)
+    logger.setLevel(getattr(logging, level.upper()))
+    logger.propagate = False
+    return logger
@@ -0,0 +1,265 @@
+#! /usr/bin/env python
+
+import heapq
+import pickle
+import logging
+import tempfile
+from operator import itemgetter
+
+logger = logging.getLogger(__name__)
+
+# fields the records are merged on by default
+DEFAULT_KEY_FIELDS = ('name',)
+
+# number of records sorted in memory at once before they are spilled to a run file, when the
+# inputs are not sorted already
+DEFAULT_RUN_RECORDS = 100000
+
+# number of records per pickle frame of a run file
+RUN_FRAME_RECORDS = 1000
+
+# largest number of sorted streams merged at once: beyond it, runs are merged in several passes
+# so that the open files and the frames of records held in memory stay bounded
+MAX_FAN_IN = 64
+
+
+class MergeException(Exception):
+    """
+    Exception raised by the merge functions.
+    """
+    pass
+
+
+def _key_getter(keyFields):
+    """
+    Return a function returning the merge key of a record, a tuple of its 'keyFields' values.
+    """
+    if not keyFields:
+        raise MergeException('The records need at least one key field to be merged on')
+    getter = itemgetter(*keyFields)
+    if len(keyFields) == 1:
+        return lambda record: (getter(record),)
+    return getter
+
+
+def iter_checked(batches, keyFields=DEFAULT_KEY_FIELDS, name=''):
+    """
+    Yield the records of batches sorted on 'keyFields', checking that they are.
+
+    :Params:
+        batches: `iterable`
+            lists of dictionaries, sorted on their 'keyFields' values.
+        keyFields: `tuple`
+            fields the records are sorted on.
+        name: `str`
+            name of the input, for the error messages.
+    """
+    getKey = _key_getter(keyFields)
+    previous = None
+    for batch in batches:
+        try:
+            keys = list(map(getKey, batch))
+        except KeyError as e:
+            raise MergeException('A record of "{0}" has no {1} field'.format(name, e))
+        if not keys:
+            continue
+        try:
+            unsorted = previous is not None and keys[0] < previous or any(map(tuple.__gt__, keys, keys[1:]))
+        except TypeError as e:
+            raise MergeException('The {0} values of "{1}" cannot be compared: {2}'.format(list(keyFields), name, e))
+        if unsorted:
+            raise MergeException('The records of "{0}" are not sorted on {1}'.format(name, list(keyFields)))
+        previous = keys[-1]
+        yield from batch
+
+
+def _iter_run(fp):
+    """
+    Yield the records of a run file and close it.
+    """
+    with fp:
+        while True:
+            try:
+                frame = pickle.load(fp)
+            except EOFError:
+                return
+            yield from frame
+
+
+class _Run:
+    """
+    A sorted run of records written to an anonymous temporary file, deleted once closed, in
+    pickle frames of RUN_FRAME_RECORDS records. Its records can be iterated once.
+
+    :Params:
+        records: `iterable`
+            dictionaries sorted on the merge key.
+        level: `int`
+            number of merge passes the records went through.
+    """
+    def __init__(self, records, level=0):
+        self.level = level
+        self.records = 0
+        self.fp = tempfile.TemporaryFile(prefix='al_contacts_run')
+        try:
+            for frame in iter_record_batches(records, RUN_FRAME_RECORDS):
+                pickle.dump(frame, self.fp, protocol=pickle.HIGHEST_PROTOCOL)
+                self.records += len(frame)
+            self.fp.seek(0)
+        except BaseException:
+            self.fp.close()
+            raise
+
+
+    def __str__(self):
+        return 'run of {0} records'.format(self.records)
+
+
+    def __repr__(self):
+        return '_Run(records={0}, level={1})'.format(self.records, self.level)
+
+
+    def __iter__(self):
+        return _iter_run(self.fp)
+
+
+def _add_run(runs, run, keyFields, maxFanIn):
+    """
+    Append 'run' to 'runs', then merge the last 'maxFanIn' runs into one run of the next level
+    while they are all of the same level, so that each level holds fewer than 'maxFanIn' runs.
+    The runs merged are the last ones, their records keep their order among the runs.
+    """
+    runs.append(run)
+    while len(runs) >= maxFanIn and all(aRun.level == run.level for aRun in runs[-maxFanIn:]):
+        tail = runs[-maxFanIn:]
+        del runs[-maxFanIn:]
+        run = _Run(merge_records(tail, keyFields), run.level + 1)
+        runs.append(run)
+        logger.debug('Merged %d runs into a %s', maxFanIn, run)
+
+
+def spill_runs(batches, keyFields=DEFAULT_KEY_FIELDS, runRecords=DEFAULT_RUN_RECORDS, name='', runs=None,
+               maxFanIn=MAX_FAN_IN):
+    """
+    Sort the records of batches in runs of at most 'runRecords' records, each written to a
+    temporary file. Once 'maxFanIn' runs of the same level are spilled, they are merged into one
+    run of the next level, so that the number of open runs grows with the logarithm of the
+    number of records.
+
+    :Params:
+        runs: `list`
+            runs to add the runs of 'batches' to, e.g. those of the previous inputs. Defaults
+            to a new list.
+        maxFanIn: `int`
+            largest number of runs merged at once.
+
+    :Returns:
+        list of the iterables over the records of each run, in order.
+    """
+    if runRecords < 1:
+        raise MergeException('Runs must hold at least one record, not "{0}"'.format(runRecords))
+    if maxFanIn < 2:
+        raise MergeException('At least 2 runs must be merged at once, not "{0}"'.format(maxFanIn))
+
+    getKey = _key_getter(keyFields)
+    runs = [] if runs is None else runs
+    pending = []
+
+    def spill():
+        try:
+            pending.sort(key=getKey)
+        except KeyError as e:
+            raise MergeException('A record of "{0}" has no {1} field'.format(name, e))
+        except TypeError as e:
+            raise MergeException('The {0} values of "{1}" cannot be compared: {2}'.format(list(keyFields), name, e))
+        _add_run(runs, _Run(pending), keyFields, maxFanIn)
+        logger.debug('Spilled a run of %d records of "%s"', len(pending), name)
+        del pending[:]
+
+    for batch in batches:
+        pending.extend(batch)
+        while len(pending) >= runRecords:
+            rest = pending[runRecords:]
+            del pending[runRecords:]
+            spill()
+            pending.extend(rest)
+    if pending:
+        spill()
+    return runs
+
+
+def reduce_runs(iterables, keyFields=DEFAULT_KEY_FIELDS, maxFanIn=MAX_FAN_IN):
+    """
+    Merge the last of the sorted iterables into runs until at most 'maxFanIn' of them are left,
+    to bound the fan-in of the final merge. The records keep their order among the iterables.
+
+    :Params:
+        iterables: `list`
+            iterables of dictionaries sorted on their 'keyFields' values.
+        keyFields: `tuple`
+            fields the records are sorted on.
+        maxFanIn: `int`
+            largest number of iterables merged at once.
+
+    :Returns:
+        list of at most 'maxFanIn' iterables.
+    """
+    if maxFanIn < 2:
+        raise MergeException('At least 2 runs must be merged at once, not "{0}"'.format(maxFanIn))
+
+    iterables = list(iterables)
+    while len(iterables) > maxFanIn:
+        # merge just enough of them for the next pass to be the last one, if it can be
+        count = min(maxFanIn, len(iterables) - maxFanIn + 1)
+        tail = iterables[-count:]
+        del iterables[-count:]
+        iterables.append(_Run(merge_records(tail, keyFields), 1))
+    return iterables
+
+
+def merge_records(iterables, keyFields=DEFAULT_KEY_FIELDS, dedupe=False):
+    """
+    Merge iterables of records sorted on 'keyFields' into one sorted iterator, with a heap
+    holding one record of each iterable. Records with the same key come in the order of the
+    iterables.
+
+    :Params:
+        iterables: `list`
+            iterables of dictionaries sorted on their 'keyFields' values.
+        keyFields: `tuple`
+            fields the records are sorted on.
+        dedupe: `bool`
+            keep only the first record of each key.
+    """
+    getKey = _key_getter(keyFields)
+    merged = heapq.merge(*iterables, key=getKey)
+    try:
+        if not dedupe:
+            yield from merged
+            return
+
+        previous = None
+        for record in merged:
+            key = getKey(record)
+            if key != previous:
+                previous = key
+                yield record
+    except TypeError as e:
+        raise MergeException('The {0} values of the records cannot be compared: {1}'.format(list(keyFields), e))
+
+
+def iter_record_batches(records, batchSize=1000):
+    """
+    Group an iterable of records in lists of at most 'batchSize' records.
+    """
+    if batchSize < 1:
+        raise MergeException('Batch size must be a positive number, not "{0}"'.format(batchSize))
+
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batchSize:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
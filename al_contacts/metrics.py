@@ -0,0 +1,402 @@
+#! /usr/bin/env python
+
+import bisect
+import threading
+from contextlib import contextmanager
+
+from al_contacts.instrumentation import Hook, add_hook, remove_hook
+
+# prefix of the names of the metrics of the package
+METRICS_PREFIX = 'al_contacts'
+
+# upper bounds, in seconds, of the buckets of the latency histograms
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# content type of the Prometheus text format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsException(Exception):
+    """
+    Exception raised by the metrics registry.
+    """
+    pass
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join('{0}="{1}"'.format(name, _escape(value)) for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    """
+    Base class of the metrics: a named family of values, one per combination of label values.
+    It is safe to update from several threads.
+    """
+    kind = 'untyped'
+
+    def __init__(self, name, help, labelNames=()):
+        """
+        :Params:
+            name: `str`
+                name of the metric, e.g. 'al_contacts_records_total'.
+            help: `str`
+                description of the metric.
+            labelNames: `tuple`
+                names of the labels of the metric.
+        """
+        self.name = name
+        self.help = help
+        self.labelNames = tuple(labelNames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+
+    def __str__(self):
+        return self.name
+
+
+    def __repr__(self):
+        return self.name
+
+
+    def _key(self, labels):
+        labels = tuple(str(label) for label in labels)
+        if len(labels) != len(self.labelNames):
+            raise MetricsException('Metric "{0}" takes the labels {1}, got {2}'.format(self.name, self.labelNames, labels))
+        return labels
+
+
+    def samples(self):
+        """
+        Return the samples of the metric as a list of (name, labels, value) tuples, where labels
+        is a list of (label name, label value) pairs.
+        """
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(self.name, list(zip(self.labelNames, labels)), value) for labels, value in values]
+
+
+class Counter(Metric):
+    """
+    Metric that only goes up, e.g. the number of records processed.
+    """
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        """
+        Add 'amount' to the counter of the label values 'labels'.
+        """
+        if amount < 0:
+            raise MetricsException('Counter "{0}" cannot decrease'.format(self.name))
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+    def set_total(self, value, labels=()):
+        """
+        Set the counter of the label values 'labels' to a total counted elsewhere, e.g. by a
+        cache, from a collector.
+        """
+        key = self._key(labels)
+        with self._lock:
+            if value < self._values.get(key, 0):
+                raise MetricsException('Counter "{0}" cannot decrease'.format(self.name))
+            self._values[key] = value
+
+
+    def value(self, labels=()):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """
+    Metric that goes up and down, e.g. the bytes held by a cache.
+    """
+    kind = 'gauge'
+
+    def set(self, value, labels=()):
+        """
+        Set the gauge of the label values 'labels' to 'value'.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+    def value(self, labels=()):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    """
+    Metric counting observations, e.g. latencies, in cumulative buckets, with their count and
+    their sum.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelNames=(), buckets=DEFAULT_BUCKETS):
+        """
+        :Params:
+            buckets: `tuple`
+                upper bounds of the buckets, in increasing order. The '+Inf' bucket is added.
+        """
+        Metric.__init__(self, name, help, labelNames)
+        if list(buckets) != sorted(buckets) or not buckets:
+            raise MetricsException('The buckets of histogram "{0}" must be in increasing order'.format(name))
+        self.buckets = tuple(buckets)
+
+
+    def observe(self, value, labels=()):
+        """
+        Count 'value' in the histogram of the label values 'labels'.
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per bucket counts, the last one is '+Inf', then the sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+
+    def count(self, labels=()):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[0]) if state else 0
+
+
+    def samples(self):
+        with self._lock:
+            values = sorted((labels, (list(state[0]), state[1])) for labels, state in self._values.items())
+
+        samples = []
+        for labels, (counts, total) in values:
+            pairs = list(zip(self.labelNames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append((self.name + '_bucket', pairs + [('le', _format_value(float(bound)))], cumulative))
+            samples.append((self.name + '_sum', pairs, total))
+            samples.append((self.name + '_count', pairs, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    This class holds the metrics of a process and exports them in the Prometheus text format.
+    Collectors registered with add_collector() are called on every export, to read values that
+    are kept elsewhere, e.g. the statistics of a cache.
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+
+    def __str__(self):
+        return 'metrics registry'
+
+
+    def __repr__(self):
+        return 'metrics registry'
+
+
+    def _register(self, metricClass, name, help, labelNames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metricClass(name, help, labelNames, **kwargs)
+            elif type(metric) is not metricClass or metric.labelNames != tuple(labelNames):
+                raise MetricsException('Metric "{0}" is already registered as a {1} with the labels {2}'.format(
+                    name, metric.kind, metric.labelNames))
+            return metric
+
+
+    def counter(self, name, help, labelNames=()):
+        """
+        Return the counter 'name', registering it on first use.
+        """
+        return self._register(Counter, name, help, labelNames)
+
+
+    def gauge(self, name, help, labelNames=()):
+        """
+        Return the gauge 'name', registering it on first use.
+        """
+        return self._register(Gauge, name, help, labelNames)
+
+
+    def histogram(self, name, help, labelNames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Return the histogram 'name', registering it on first use.
+        """
+        return self._register(Histogram, name, help, labelNames, buckets=buckets)
+
+
+    def get(self, name):
+        with self._lock:
+            return self._metrics.get(name)
+
+
+    def add_collector(self, collector):
+        """
+        Register a callable called with the registry before every export, to update gauges and
+        counters from values kept outside of the registry.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+
+    def collect(self):
+        """
+        Run the collectors and return the metrics sorted by name.
+        """
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            collector(self)
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+
+    def to_prometheus(self):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self.collect():
+            lines.append('# HELP {0} {1}'.format(metric.name, metric.help.replace('\\', '\\\\').replace('\n', '\\n')))
+            lines.append('# TYPE {0} {1}'.format(metric.name, metric.kind))
+            for name, labels, value in metric.samples():
+                lines.append('{0}{1} {2}'.format(name, _format_labels(labels), _format_value(value)))
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+    def write_textfile(self, path):
+        """
+        Write the metrics to 'path' in the Prometheus text format, for the textfile collector of
+        the node exporter. The file is replaced atomically, a scrape never reads half a file, and it
+        gets the permissions of a file created by open(), so that the exporter can read it.
+        """
+        # imported here, the reader/writers are only needed once the metrics are written
+        from al_contacts.reader_writer import _atomic_open
+
+        with _atomic_open(path, 'w') as fp:
+            fp.write(self.to_prometheus())
+
+
+class MetricsHook(Hook):
+    """
+    Hook updating a metrics registry from the instrumented stages: the csv loading, the
+    reader/writer actions and the notifications of the formats and views. It counts the calls,
+    errors, records and bytes of each stage and observes its latency, labelled with the stage
+    name and what it ran for, e.g. stage="rw.deserialise", label="json".
+    """
+    def __init__(self, registry, buckets=DEFAULT_BUCKETS):
+        """
+        :Params:
+            registry: `al_contacts.metrics.MetricsRegistry`
+                registry to update.
+            buckets: `tuple`
+                upper bounds, in seconds, of the buckets of the latency histogram.
+        """
+        labels = ('stage', 'label')
+        self.registry = registry
+        self.calls = registry.counter(METRICS_PREFIX + '_stage_calls_total', 'Runs of each stage', labels)
+        self.errors = registry.counter(METRICS_PREFIX + '_stage_errors_total', 'Runs of each stage that raised', labels)
+        self.records = registry.counter(METRICS_PREFIX + '_records_total', 'Records processed by each stage', labels)
+        self.bytes = registry.counter(METRICS_PREFIX + '_bytes_total', 'Bytes read or written by each stage', labels)
+        self.latency = registry.histogram(METRICS_PREFIX + '_stage_seconds', 'Wall time of each stage run', labels, buckets)
+
+
+    def __str__(self):
+        return 'metrics hook'
+
+
+    def __repr__(self):
+        return 'metrics hook'
+
+
+    def after(self, stage, token, error):
+        labels = (stage.name, stage.label)
+        self.calls.inc(labels)
+        if error is not None:
+            self.errors.inc(labels)
+        if stage.records:
+            self.records.inc(labels, stage.records)
+        if stage.bytes:
+            self.bytes.inc(labels, stage.bytes)
+        self.latency.observe(stage.seconds, labels)
+
+
+def cache_collector(cache, name='datasets'):
+    """
+    Return a collector exporting the statistics of a cache: its hits, misses, evictions, hit
+    ratio, entries and bytes, and those of its disk tier if it has one, labelled with
+    cache="<name>".
+
+    :Params:
+        cache: `object`
+            cache whose stats() method returns a dictionary with keys = ['hits', 'misses',
+            'evictions', 'datasets', 'bytes'], and optionally ['disk_hits', 'disk_evictions',
+            'disk_bytes'], e.g. `al_contacts.cache.DeserialisationCache`.
+        name: `str`
+            value of the 'cache' label.
+    """
+    def collect(registry):
+        stats = cache.stats()
+        labels = ('cache',)
+        lookups = stats['hits'] + stats['misses']
+        for key in ('hits', 'misses', 'evictions', 'disk_hits', 'disk_evictions'):
+            if key in stats:
+                registry.counter('{0}_cache_{1}_total'.format(METRICS_PREFIX, key), 'Cache {0}'.format(key.replace('_', ' ')),
+                                 labels).set_total(stats[key], (name,))
+        registry.gauge(METRICS_PREFIX + '_cache_hit_ratio', 'Cache hits over lookups', labels).set(
+            stats['hits'] / float(lookups) if lookups else 0.0, (name,))
+        registry.gauge(METRICS_PREFIX + '_cache_entries', 'Entries held by the cache', labels).set(stats['datasets'], (name,))
+        registry.gauge(METRICS_PREFIX + '_cache_bytes', 'Estimated bytes held by the cache', labels).set(stats['bytes'], (name,))
+        if 'disk_bytes' in stats:
+            registry.gauge(METRICS_PREFIX + '_cache_disk_bytes', 'Bytes of the snapshots of the cache', labels).set(
+                stats['disk_bytes'], (name,))
+    return collect
+
+
+@contextmanager
+def metrics_textfile(path, registry=None):
+    """
+    Update a metrics registry from the stages run in a 'with' block and write it to 'path' in
+    the Prometheus text format when the block ends, even if it raised.
+
+    :Params:
+        path: `str`
+            path of the file, e.g. in the directory of the node exporter textfile collector.
+        registry: `al_contacts.metrics.MetricsRegistry`
+            registry to update. Defaults to a new registry.
+    """
+    registry = registry if registry is not None else MetricsRegistry()
+    hook = MetricsHook(registry)
+    add_hook(hook)
+    try:
+        yield registry
+    finally:
+        remove_hook(hook)
+        registry.write_textfile(path)
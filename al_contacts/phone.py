@@ -0,0 +1,191 @@
+#! /usr/bin/env python
+
+import re
+
+
+class PhoneException(Exception):
+    """
+    Exception raised by the phone number normalisation functions and the PhoneNormaliser class.
+    """
+    pass
+
+
+# Country calling code used for numbers written with a national trunk prefix ('0...').
+DEFAULT_COUNTRY_CODE = '44'
+
+# Separators people put into phone numbers. These are deleted in a single str.translate() pass.
+_SEPARATORS_TABLE = str.maketrans('', '', ' \t\u00a0-.()/[]\u2010\u2011\u2012\u2013\u2014\u2212')
+
+# A batch is normalised as one '\n+' separated block, so that all the rewriting below is done by a
+# handful of C-level str.replace()/str.translate()/regex passes instead of per-row Python code.
+_VALID_BATCH = re.compile(r'(?:\n\+[1-9]\d{6,14})*')
+_VALID_LINES = re.compile(r'^(\+[1-9]\d{6,14}$)?.*$', re.MULTILINE)
+_VALID_NUMBER = re.compile(r'\+[1-9]\d{6,14}')
+_COUNTRY_CODE = re.compile(r'[1-9]\d{0,2}')
+# The '(0)' of a number after an international prefix, e.g. '+44 (0)20', is a trunk prefix not
+# dialled from abroad. Without an international prefix it is the trunk prefix itself.
+_INTERNATIONAL_TRUNK = re.compile(r'^(\+[ \t\u00a0]*(?:\+|00)[^\n]*?)\(0\)', re.MULTILINE)
+
+
+def normalise_phones(numbers, country_code=DEFAULT_COUNTRY_CODE):
+    """
+    Normalise a batch of phone numbers to a canonical E.164-like form ('+<country code><number>').
+    Separators are stripped, an international '00' prefix becomes '+' and a national trunk
+    prefix '0' is replaced with '+<country_code>'. A '(0)' is dropped after an international
+    prefix, and taken as the trunk prefix otherwise. Numbers that do not end up as '+' followed
+    by 7 to 15 digits are invalid and come back as None.
+
+    :Params:
+        numbers: `list`
+            list of phone number strings. Non-string items are treated as invalid numbers.
+        country_code: `str`
+            country calling code used for numbers with a national trunk prefix.
+
+    :Returns:
+        `list` of normalised numbers (or None) in the same order as 'numbers'.
+    """
+    if not _COUNTRY_CODE.fullmatch(country_code or ''):
+        raise PhoneException('Invalid country calling code: "{0}"'.format(country_code))
+
+    numbers = list(numbers)
+    if not numbers:
+        return []
+
+    try:
+        block = '\n+' + '\n+'.join(numbers)
+    except TypeError:
+        block = '\n+' + '\n+'.join([number if isinstance(number, str) else '' for number in numbers])
+
+    # every number now starts with '+': the international '00' prefix is marked as '++', then the
+    # remaining '0' trunk prefixes take the country code and the doubled '+' signs collapse.
+    if '(0)' in block:
+        block = _INTERNATIONAL_TRUNK.sub(r'\1', block)
+    block = block.translate(_SEPARATORS_TABLE)
+    block = block.replace('\n+00', '\n++').replace('\n+0', '\n+' + country_code).replace('\n++', '\n+')
+
+    if _VALID_BATCH.fullmatch(block):
+        normalised = block[1:].split('\n')
+    else:
+        normalised = _VALID_LINES.findall(block, 1)
+
+    if len(normalised) != len(numbers):
+        # an embedded newline split a number in two, redo this batch one number at a time.
+        normalised = [_normalise_one(number, country_code) or '' for number in numbers]
+
+    return [number or None for number in normalised]
+
+
+def _normalise_one(number, country_code):
+    """
+    Normalise a single number that could not go through the batch path.
+    """
+    if not isinstance(number, str) or '\n' in number or '\r' in number:
+        return None
+    return normalise_phones([number], country_code)[0]
+
+
+def normalise_phone(number, country_code=DEFAULT_COUNTRY_CODE):
+    """
+    Normalise a single phone number. See normalise_phones() for the rules.
+
+    :Params:
+        number: `str`
+            phone number to be normalised.
+        country_code: `str`
+            country calling code used for numbers with a national trunk prefix.
+
+    :Returns:
+        normalised number as `str`, or None if the number is not valid.
+    """
+    return _normalise_one(number, country_code) if isinstance(number, str) else None
+
+
+def is_valid_phone(number):
+    """
+    Check whether 'number' is already in the canonical form produced by normalise_phones().
+    """
+    return isinstance(number, str) and _VALID_NUMBER.fullmatch(number) is not None
+
+
+class PhoneNormaliser:
+    """
+    This class normalises the phone numbers of contact data, a whole batch at a time.
+    An instance is callable with a list of dictionaries, with keys = ['name', 'address', 'phone'],
+    so that it can be used as a processing stage before serialise(). Its key() method can be used
+    as the key function for indexes and de-duplication.
+    """
+    def __init__(self, country_code=DEFAULT_COUNTRY_CODE, field='phone', drop_invalid=False):
+        """
+        :Params:
+            country_code: `str`
+                country calling code used for numbers with a national trunk prefix.
+            field: `str`
+                key of the contact dictionaries that holds the phone number.
+            drop_invalid: `bool`
+                drop the contacts with invalid numbers instead of keeping their original value.
+        """
+        if not _COUNTRY_CODE.fullmatch(country_code or ''):
+            raise PhoneException('Invalid country calling code: "{0}"'.format(country_code))
+
+        self.country_code = country_code
+        self.field = field
+        self.drop_invalid = drop_invalid
+
+
+    def __str__(self):
+        return 'phone normaliser'
+
+
+    def __repr__(self):
+        return 'phone normaliser'
+
+
+    def __call__(self, data):
+        """
+        Normalise the phone numbers of a list of contacts. The contacts are copied, the input
+        data is not modified.
+
+        :Params:
+            data: `list`
+                list of dictionaries with keys = ['name', 'address', 'phone']
+
+        :Returns:
+            `list` of dictionaries with normalised phone numbers.
+        """
+        field = self.field
+        numbers = self.normalise_batch([item.get(field) for item in data])
+
+        if self.drop_invalid:
+            return [dict(item, **{field: number}) for item, number in zip(data, numbers) if number]
+        return [dict(item, **{field: number}) if number else dict(item) for item, number in zip(data, numbers)]
+
+
+    def normalise(self, number):
+        """
+        Normalise a single phone number. Returns None for invalid numbers.
+        """
+        return normalise_phone(number, self.country_code)
+
+
+    def normalise_batch(self, numbers):
+        """
+        Normalise a list of phone numbers. Returns None for each invalid number.
+        """
+        return normalise_phones(numbers, self.country_code)
+
+
+    def key(self, item):
+        """
+        Key function for indexing and de-duplicating contacts on their phone number. Invalid
+        numbers fall back to the raw value stripped of separators, so that they still compare
+        equal to themselves.
+
+        :Params:
+            item: `dict`
+                a contact dictionary with keys = ['name', 'address', 'phone']
+        """
+        number = item.get(self.field)
+        normalised = self.normalise(number)
+        if normalised:
+            return normalised
+        return number.translate(_SEPARATORS_TABLE) if isinstance(number, str) else ''
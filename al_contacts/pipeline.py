@@ -0,0 +1,571 @@
+#! /usr/bin/env python
+
+import re
+import time
+import queue
+import logging
+import threading
+
+from al_contacts.contacts import iter_csv_batches
+
+logger = logging.getLogger(__name__)
+
+# seconds a blocked stage waits on a queue before checking whether the pipeline was stopped
+POLL_INTERVAL = 0.05
+
+# marks the end of the batches on a queue
+_END = None
+
+
+class PipelineException(Exception):
+    """
+    Exception raised by the Pipeline class and its stages.
+    """
+    pass
+
+
+class _Stopped(Exception):
+    """
+    Raised inside a stage when another stage failed and the pipeline is shutting down.
+    """
+    pass
+
+
+class Dedupe:
+    """
+    Transform that drops the contacts already seen in an earlier batch or earlier in the same
+    batch, comparing the values of 'fields'.
+    """
+    def __init__(self, fields=('name', 'phone')):
+        """
+        :Params:
+            fields: `list`
+                keys of the contact dictionaries that identify a contact.
+        """
+        self.fields = tuple(fields)
+        self._seen = set()
+
+
+    def __str__(self):
+        return 'dedupe'
+
+
+    def __repr__(self):
+        return 'dedupe'
+
+
+    def __call__(self, batch):
+        seen = self._seen
+        fields = self.fields
+        result = []
+        for item in batch:
+            key = tuple(item.get(field) for field in fields)
+            if key not in seen:
+                seen.add(key)
+                result.append(item)
+        return result
+
+
+class FieldFilter:
+    """
+    Transform that keeps the contacts whose 'field' matches the regular expression 'pattern'.
+    """
+    def __init__(self, field, pattern):
+        """
+        :Params:
+            field: `str`
+                key of the contact dictionaries to match.
+            pattern: `str`
+                regular expression searched for in the value of 'field'.
+        """
+        self.field = field
+        self.pattern = pattern
+        self._regex = re.compile(pattern)
+
+
+    def __str__(self):
+        return 'filter'
+
+
+    def __repr__(self):
+        return 'filter'
+
+
+    def __getstate__(self):
+        return {'field': self.field, 'pattern': self.pattern}
+
+
+    def __setstate__(self, state):
+        self.__init__(state['field'], state['pattern'])
+
+
+    def __call__(self, batch):
+        search = self._regex.search
+        field = self.field
+        return [item for item in batch if search(item.get(field) or '')]
+
+
+def _get(inQueue, stop):
+    """
+    Get the next item from 'inQueue', raising _Stopped if the pipeline stops while waiting.
+    """
+    while True:
+        try:
+            return inQueue.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            if stop.is_set():
+                raise _Stopped()
+
+
+def _put(outQueue, item, stop):
+    """
+    Put 'item' on 'outQueue', blocking while it is full, raising _Stopped if the pipeline stops
+    while waiting. The blocking put is what holds a fast stage back to the pace of the next one.
+    """
+    while True:
+        try:
+            outQueue.put(item, timeout=POLL_INTERVAL)
+            return
+        except queue.Full:
+            if stop.is_set():
+                raise _Stopped()
+
+
+def _stage_stats(name, kind):
+    """
+    Make the statistics dictionary of a stage.
+    """
+    return {
+        'name': name,
+        'kind': kind,
+        'batches': 0,
+        'records': 0,
+        'busy': 0.0,
+        'wait_in': 0.0,
+        'wait_out': 0.0,
+        'error': '',
+    }
+
+
+def _run_source(name, batches, outQueues, stop, statsQueue):
+    """
+    Source stage: put the batches of the source iterable on the output queues.
+    """
+    clock = time.perf_counter
+    stats = _stage_stats(name, 'source')
+    try:
+        iterator = iter(batches)
+        while True:
+            start = clock()
+            batch = next(iterator, _END)
+            stats['busy'] += clock() - start
+            if batch is _END:
+                break
+            if not batch:
+                continue
+            stats['batches'] += 1
+            stats['records'] += len(batch)
+
+            start = clock()
+            for outQueue in outQueues:
+                _put(outQueue, batch, stop)
+            stats['wait_out'] += clock() - start
+
+        for outQueue in outQueues:
+            _put(outQueue, _END, stop)
+    except _Stopped:
+        pass
+    except Exception as e:
+        stats['error'] = '{0}: {1}'.format(type(e).__name__, e)
+        stop.set()
+    statsQueue.put(stats)
+
+
+def _run_transform(name, transform, inQueue, outQueues, stop, statsQueue):
+    """
+    Transform stage: apply 'transform' to each batch of the input queue and put the non-empty
+    results on the output queues. Runs in a thread or in a process.
+    """
+    clock = time.perf_counter
+    stats = _stage_stats(name, 'transform')
+    try:
+        while True:
+            start = clock()
+            batch = _get(inQueue, stop)
+            stats['wait_in'] += clock() - start
+            if batch is _END:
+                break
+
+            start = clock()
+            batch = transform(batch)
+            stats['busy'] += clock() - start
+            if not batch:
+                continue
+            stats['batches'] += 1
+            stats['records'] += len(batch)
+
+            start = clock()
+            for outQueue in outQueues:
+                _put(outQueue, batch, stop)
+            stats['wait_out'] += clock() - start
+
+        for outQueue in outQueues:
+            _put(outQueue, _END, stop)
+    except _Stopped:
+        # the next stages may be gone, do not wait for them to read what is left on the queues
+        for outQueue in outQueues:
+            if hasattr(outQueue, 'cancel_join_thread'):
+                outQueue.cancel_join_thread()
+    except Exception as e:
+        stats['error'] = '{0}: {1}'.format(type(e).__name__, e)
+        stop.set()
+    statsQueue.put(stats)
+
+
+def _drain(inQueue, stop, stats):
+    """
+    Yield the batches of a sink's input queue until the end marker, counting them in 'stats'.
+    The time spent waiting is subtracted from the busy time by the caller.
+    """
+    clock = time.perf_counter
+    while True:
+        start = clock()
+        batch = _get(inQueue, stop)
+        stats['wait_in'] += clock() - start
+        if batch is _END:
+            return
+        stats['batches'] += 1
+        stats['records'] += len(batch)
+        yield batch
+
+
+def _run_rw_sink(name, rw, filepath, inQueue, stop, statsQueue):
+    """
+    Reader/writer sink stage: stream the batches of the input queue to rw.write_batches(). The
+    reader/writer encodes and writes each batch as it arrives, and leaves no file behind if the
+    pipeline stops half way.
+    """
+    stats = _stage_stats(name, 'sink')
+    start = time.perf_counter()
+    try:
+        rw.write_batches(_drain(inQueue, stop, stats), filepath)
+    except _Stopped:
+        pass
+    except Exception as e:
+        stats['error'] = '{0}: {1}'.format(type(e).__name__, e)
+        stop.set()
+    stats['busy'] = time.perf_counter() - start - stats['wait_in']
+    statsQueue.put(stats)
+
+
+def _run_view_sink(name, view, inQueue, stop, statsQueue, rendered):
+    """
+    View sink stage: collect the batches of the input queue and render them in 'view'. The text
+    is stored in 'rendered' and printed by Pipeline.run() once all the stages are done, so that
+    the views do not interleave with each other.
+    """
+    stats = _stage_stats(name, 'sink')
+    start = time.perf_counter()
+    try:
+        data = [item for batch in _drain(inQueue, stop, stats) for item in batch]
+        rendered[name] = view.render(data)
+    except _Stopped:
+        pass
+    except Exception as e:
+        stats['error'] = '{0}: {1}'.format(type(e).__name__, e)
+        stop.set()
+    stats['busy'] = time.perf_counter() - start - stats['wait_in']
+    statsQueue.put(stats)
+
+
+class Pipeline:
+    """
+    This class connects a source of contact batches, e.g. a csv file, to a chain of transform
+    stages and to one or more reader/writer and view sinks, with a bounded queue between each
+    stage. Every stage runs in its own thread, or its own process for the transforms added with
+    process=True, so that reading, transforming, encoding and writing overlap. A full queue
+    blocks the stage feeding it, which keeps the memory held by the pipeline bounded by the
+    queue depth and batch size.
+    """
+    def __init__(self, batchSize=1000, queueDepth=8, sampleInterval=0.01):
+        """
+        :Params:
+            batchSize: `int`
+                number of contacts per batch read from a csv source.
+            queueDepth: `int`
+                maximum number of batches waiting between two stages.
+            sampleInterval: `float`
+                seconds between two samples of the queue depths.
+        """
+        if batchSize < 1:
+            raise PipelineException('Batch size must be a positive number, not "{0}"'.format(batchSize))
+        if queueDepth < 1:
+            raise PipelineException('Queue depth must be a positive number, not "{0}"'.format(queueDepth))
+        self.batchSize = batchSize
+        self.queueDepth = queueDepth
+        self.sampleInterval = sampleInterval
+        self.transforms = []
+        self.sinks = []
+
+
+    def __str__(self):
+        return 'pipeline'
+
+
+    def __repr__(self):
+        return 'pipeline'
+
+
+    def add_transform(self, transform, name=None, process=False):
+        """
+        Add a transform stage after the existing ones.
+
+        :Params:
+            transform: `callable`
+                called with a list of contact dictionaries, returns the transformed list, e.g.
+                an `al_contacts.phone.PhoneNormaliser`, Dedupe or FieldFilter object.
+            name: `str`
+                name of the stage in the metrics. Defaults to str(transform).
+            process: `bool`
+                run the stage in its own process. The transform must be picklable.
+        """
+        self.transforms.append((self._stage_name(name or str(transform)), transform, process))
+        return self
+
+
+    def add_rw_sink(self, format, filepath, name=None):
+        """
+        Add a sink serialising all the transformed contacts with the reader/writer of a format.
+
+        :Params:
+            format: `al_contacts.format.Format`
+                registered format to serialise to, with its reader/writer.
+            filepath: `str`
+                file path to write the data to.
+            name: `str`
+                name of the stage in the metrics. Defaults to str(format).
+        """
+        if not format.rw:
+            raise PipelineException('There is no reader/writer registered for "{0}" format currently'.format(format))
+        self.sinks.append((self._stage_name(name or str(format)), 'rw', (format.rw, filepath)))
+        return self
+
+
+    def add_view_sink(self, view, name=None):
+        """
+        Add a sink rendering all the transformed contacts in a view.
+
+        :Params:
+            view: `al_contacts.view.View`
+                view to render the data in.
+            name: `str`
+                name of the stage in the metrics. Defaults to str(view).
+        """
+        self.sinks.append((self._stage_name(name or str(view)), 'view', (view,)))
+        return self
+
+
+    def _stage_name(self, name):
+        """
+        Return 'name', raising PipelineException if another stage already has it.
+        """
+        names = ['source'] + [stage[0] for stage in self.transforms + self.sinks]
+        if name in names:
+            raise PipelineException('There is already a stage named "{0}" in "{1}"'.format(name, self))
+        return name
+
+
+    def run(self, source, display=True):
+        """
+        Run the pipeline until the source is exhausted and every sink is done.
+
+        :Params:
+            source: `str` or `iterable`
+                path of a contacts csv file, or an iterable of lists of contact dictionaries.
+            display: `bool`
+                print the text of the view sinks, in the order they were added.
+
+        :Returns:
+            a report dictionary with keys = ['seconds', 'records', 'stages', 'queues',
+            'bottleneck', 'views'], see format_report().
+        """
+        if not self.sinks:
+            raise PipelineException('There are no sinks added to "{0}"'.format(self))
+        if isinstance(source, str):
+            source = iter_csv_batches(source, self.batchSize)
+
+        useProcesses = any(process for name, transform, process in self.transforms)
+        if useProcesses:
+            # imported here, only the pipelines with process stages need it
+            import multiprocessing
+            stop = multiprocessing.Event()
+            statsQueue = multiprocessing.Queue()
+        else:
+            stop = threading.Event()
+            statsQueue = queue.Queue()
+
+        def make_queue(process):
+            return multiprocessing.Queue(self.queueDepth) if process else queue.Queue(self.queueDepth)
+
+        # one queue in front of each transform and each sink, the queues of the sinks are fed
+        # by the last transform, or the source if there are none
+        queues = []
+        workers = []
+        rendered = {}
+        upstream = ('source', False)
+        transformQueues = []
+        for name, transform, process in self.transforms:
+            aQueue = make_queue(process or upstream[1])
+            queues.append(('{0} -> {1}'.format(upstream[0], name), aQueue))
+            transformQueues.append(aQueue)
+            upstream = (name, process)
+
+        sinkQueues = []
+        for name, kind, args in self.sinks:
+            aQueue = make_queue(upstream[1])
+            queues.append(('{0} -> {1}'.format(upstream[0], name), aQueue))
+            sinkQueues.append(aQueue)
+
+        outputs = transformQueues[:1] or sinkQueues
+        workers.append(threading.Thread(target=_run_source, args=('source', source, outputs, stop, statsQueue)))
+        for index, (name, transform, process) in enumerate(self.transforms):
+            outputs = transformQueues[index + 1:index + 2] or sinkQueues
+            args = (name, transform, transformQueues[index], outputs, stop, statsQueue)
+            if process:
+                workers.append(multiprocessing.Process(target=_run_transform, args=args))
+            else:
+                workers.append(threading.Thread(target=_run_transform, args=args))
+        for (name, kind, args), aQueue in zip(self.sinks, sinkQueues):
+            if kind == 'rw':
+                target, args = _run_rw_sink, (name,) + args + (aQueue, stop, statsQueue)
+            else:
+                target, args = _run_view_sink, (name,) + args + (aQueue, stop, statsQueue, rendered)
+            workers.append(threading.Thread(target=target, args=args))
+
+        samples = dict((name, []) for name, aQueue in queues)
+        sampling = threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(queues, samples, sampling))
+
+        # the process stages are forked before any thread of the run is started: a child forked
+        # while another thread holds a lock, e.g. of a queue or of logging, inherits it locked
+        start = time.perf_counter()
+        for worker in sorted(workers, key=lambda worker: isinstance(worker, threading.Thread)):
+            worker.daemon = True
+            worker.start()
+        sampler.start()
+
+        stats = self._collect(statsQueue, workers)
+        for worker in workers:
+            worker.join()
+        seconds = time.perf_counter() - start
+        sampling.set()
+        sampler.join()
+
+        report = self._report(seconds, stats, queues, samples, rendered)
+        errors = [stage for stage in report['stages'] if stage['error']]
+        if errors:
+            raise PipelineException('Stage "{0}" of "{1}" failed: {2}'.format(errors[0]['name'], self, errors[0]['error']))
+
+        if display:
+            for name, kind, args in self.sinks:
+                if name in rendered:
+                    print(rendered[name])
+        return report
+
+
+    def _sample(self, queues, samples, sampling):
+        """
+        Sample the depth of every queue until 'sampling' is set.
+        """
+        while not sampling.wait(self.sampleInterval):
+            for name, aQueue in queues:
+                try:
+                    samples[name].append(aQueue.qsize())
+                except NotImplementedError:
+                    # multiprocessing queues can not tell their size on some platforms
+                    pass
+
+
+    def _collect(self, statsQueue, workers):
+        """
+        Collect the statistics every stage puts on 'statsQueue' when it is done. The process
+        stages are read before they are joined, so that they can flush their queues and exit.
+        """
+        stats = []
+        while len(stats) < len(workers):
+            try:
+                stats.append(statsQueue.get(timeout=POLL_INTERVAL))
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    break
+        return stats
+
+
+    def _report(self, seconds, stats, queues, samples, rendered):
+        """
+        Make the report of a run from the stage statistics and the queue depth samples.
+        """
+        kinds = [('source', 'source')] + [(stage[0], 'transform') for stage in self.transforms] + \
+            [(stage[0], 'sink') for stage in self.sinks]
+        collected = dict((stage['name'], stage) for stage in stats)
+        stats = []
+        for name, kind in kinds:
+            if name not in collected:
+                collected[name] = _stage_stats(name, kind)
+                collected[name]['error'] = 'Stage exited without reporting, it may have been killed'
+            stats.append(collected[name])
+
+        queueStats = []
+        for name, aQueue in queues:
+            depths = samples[name]
+            queueStats.append({
+                'name': name,
+                'capacity': self.queueDepth,
+                'samples': len(depths),
+                'mean_depth': float(sum(depths)) / len(depths) if depths else 0.0,
+                'max_depth': max(depths) if depths else 0,
+                'full': float(len([depth for depth in depths if depth >= self.queueDepth])) / len(depths) if depths else 0.0,
+            })
+
+        # the bottleneck is the stage that spent the most time doing its own work, the queue in
+        # front of it fills up while the queues after it run empty
+        bottleneck = max(stats, key=lambda stage: stage['busy'])['name'] if stats else ''
+        return {
+            'seconds': seconds,
+            'records': stats[0]['records'] if stats and stats[0]['name'] == 'source' else 0,
+            'stages': stats,
+            'queues': queueStats,
+            'bottleneck': bottleneck,
+            'views': rendered,
+        }
+
+
+def format_report(report):
+    """
+    Make a text table of the work and waiting time of each stage and the depth of each queue.
+
+    :Params:
+        report: `dict`
+            report returned by Pipeline.run().
+    """
+    line = '-'*96
+    rowFormat = '| {0:<20} | {1:<9} | {2:>10} | {3:>12} | {4:>9} | {5:>9} | {6:>8} |'
+    lines = [line, rowFormat.format('Stage', 'Kind', 'Batches', 'Records', 'Busy (s)', 'Idle (s)', 'Blocked'), line]
+    for stage in report['stages']:
+        lines.append(rowFormat.format(
+            stage['name'][:20], stage['kind'], stage['batches'], stage['records'],
+            '{0:.4f}'.format(stage['busy']), '{0:.4f}'.format(stage['wait_in']),
+            '{0:.4f}'.format(stage['wait_out'])))
+    lines.append(line)
+
+    queueFormat = '| {0:<45} | {1:>8} | {2:>10} | {3:>9} | {4:>8} |'
+    lines.append(queueFormat.format('Queue', 'Capacity', 'Mean depth', 'Max depth', 'Full'))
+    lines.append(line)
+    for aQueue in report['queues']:
+        lines.append(queueFormat.format(
+            aQueue['name'][:45], aQueue['capacity'], '{0:.2f}'.format(aQueue['mean_depth']),
+            aQueue['max_depth'], '{0:.0%}'.format(aQueue['full'])))
+    lines.append(line)
+    lines.append('{0} records in {1:.4f} s, bottleneck: {2}'.format(
+        report['records'], report['seconds'], report['bottleneck']))
+    return '\n'.join(lines)
@@ -0,0 +1,198 @@
+#! /usr/bin/env python
+
+import os
+import sys
+import importlib
+
+
+class PluginsException(Exception):
+    """
+    Exception raised while loading formats, reader/writers and views by name.
+    """
+    pass
+
+
+def load_object(path):
+    """
+    Import and return the object named by 'path', in the 'package.module:attribute' form.
+    Objects that are not strings are returned as they are, so that classes can be declared
+    directly as well as by name.
+
+    :Params:
+        path: `str`
+            'package.module:attribute' path of the object to load.
+    """
+    if not isinstance(path, str):
+        return path
+
+    moduleName, _, attributes = path.partition(':')
+    if not moduleName or not attributes:
+        raise PluginsException('Invalid object path "{0}", expected "package.module:attribute"'.format(path))
+
+    try:
+        obj = importlib.import_module(moduleName)
+        for attribute in attributes.split('.'):
+            obj = getattr(obj, attribute)
+    except (ImportError, AttributeError) as e:
+        raise PluginsException('Could not load "{0}": {1}'.format(path, e))
+    return obj
+
+
+# entry point groups third-party packages can declare formats and views in, e.g. in setup.py:
+#   entry_points={'al_contacts.formats': ['yaml = mypackage.formats:make_yaml_format']}
+# A format entry point names a factory or 'Format' subclass that is called with the
+# 'al_contacts.formats.Formats' object and registers the format and its reader/writer with it.
+# A view entry point names a factory or 'View' subclass that is called with the
+# 'al_contacts.views.Views' object and registers the view with it.
+FORMATS_GROUP = 'al_contacts.formats'
+VIEWS_GROUP = 'al_contacts.views'
+ENTRY_POINT_GROUPS = [FORMATS_GROUP, VIEWS_GROUP]
+
+# file the discovered entry points are cached in, between runs
+PLUGINS_CACHE_ENV = 'AL_CONTACTS_PLUGINS_CACHE'
+# set to '0' to turn entry point discovery off
+PLUGINS_ENV = 'AL_CONTACTS_PLUGINS'
+
+_CACHE_VERSION = 'al_contacts-plugins-1'
+
+# entry points discovered by this process, {group: [(name, value), ...]}
+_discovered = {}
+
+# entry points scanned by this process and not cached yet, (cache file, fingerprint, entry points)
+_unsaved = None
+
+
+def default_cache_file():
+    """
+    Return the path of the plugins cache file, from $AL_CONTACTS_PLUGINS_CACHE or else under
+    $XDG_CACHE_HOME (~/.cache).
+    """
+    if os.environ.get(PLUGINS_CACHE_ENV):
+        return os.environ[PLUGINS_CACHE_ENV]
+    cacheHome = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cacheHome, 'al_contacts', 'plugins.cache')
+
+
+def _fingerprint(paths=None):
+    """
+    Return a string that changes whenever a distribution is installed in or removed from one of
+    the import 'paths' (sys.path by default), from the modification times of the directories.
+    The current directory is left out, or the cache would go stale whenever it changes.
+    """
+    cwd = os.getcwd()
+    parts = []
+    for path in sys.path if paths is None else paths:
+        if not path or os.path.abspath(path) == cwd:
+            continue
+        try:
+            parts.append('{0}={1}'.format(path, os.stat(path).st_mtime_ns))
+        except OSError:
+            parts.append('{0}=-'.format(path))
+    return '|'.join(parts)
+
+
+def _scan_entry_points():
+    """
+    Read the entry points of ENTRY_POINT_GROUPS from the metadata of the installed distributions.
+    """
+    # imported here, importlib.metadata is slow to import and only needed on a cache miss
+    from importlib.metadata import entry_points
+
+    discovered = dict((group, []) for group in ENTRY_POINT_GROUPS)
+    for group in ENTRY_POINT_GROUPS:
+        for entryPoint in entry_points(group=group):
+            if entryPoint.name not in [name for name, value in discovered[group]]:
+                discovered[group].append((entryPoint.name, entryPoint.value))
+    return discovered
+
+
+def _read_cache(cacheFile, fingerprint):
+    """
+    Return the entry points cached in 'cacheFile', or None if the cache is missing or stale.
+    """
+    try:
+        with open(cacheFile, 'r', encoding='utf-8') as fp:
+            lines = fp.read().splitlines()
+    except (OSError, ValueError):
+        return None
+
+    if len(lines) < 2 or lines[0] != _CACHE_VERSION or lines[1] != fingerprint:
+        return None
+
+    discovered = dict((group, []) for group in ENTRY_POINT_GROUPS)
+    for line in lines[2:]:
+        fields = line.split('\t')
+        if len(fields) != 3 or fields[0] not in discovered:
+            return None
+        discovered[fields[0]].append((fields[1], fields[2]))
+    return discovered
+
+
+def _write_cache(cacheFile, fingerprint, discovered):
+    """
+    Write the discovered entry points to 'cacheFile'. Failing to write the cache is not an error.
+    """
+    lines = [_CACHE_VERSION, fingerprint]
+    for group in ENTRY_POINT_GROUPS:
+        for name, value in discovered[group]:
+            lines.append('\t'.join([group, name, value]))
+
+    tmpFile = '{0}.{1}.tmp'.format(cacheFile, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cacheFile)), exist_ok=True)
+        with open(tmpFile, 'w', encoding='utf-8') as fp:
+            fp.write('\n'.join(lines) + '\n')
+        os.replace(tmpFile, cacheFile)
+    except OSError:
+        try:
+            os.remove(tmpFile)
+        except OSError:
+            pass
+
+
+def discover_plugins(group, cacheFile=None, refresh=False):
+    """
+    Return the (name, 'package.module:attribute') pairs of the entry points declared in 'group'
+    by the installed distributions, without importing any of them. The entry points are read
+    from the distributions' metadata once and cached in 'cacheFile' until a distribution is
+    installed or removed, so that a warm run does not scan the metadata at all. The cache is
+    only written by save_plugins_cache(), so that importing the package writes nothing.
+
+    :Params:
+        group: `str`
+            one of ENTRY_POINT_GROUPS.
+        cacheFile: `str`
+            path of the cache file. Defaults to default_cache_file().
+        refresh: `bool`
+            ignore the cached entry points and read the metadata again.
+    """
+    if group not in ENTRY_POINT_GROUPS:
+        raise PluginsException('Invalid entry point group "{0}", expected one of {1}'.format(group, ENTRY_POINT_GROUPS))
+    if os.environ.get(PLUGINS_ENV) == '0':
+        return []
+
+    global _unsaved
+
+    if refresh or group not in _discovered:
+        cacheFile = cacheFile or default_cache_file()
+        fingerprint = _fingerprint()
+        discovered = None if refresh else _read_cache(cacheFile, fingerprint)
+        if discovered is None:
+            discovered = _scan_entry_points()
+            _unsaved = (cacheFile, fingerprint, discovered)
+        _discovered.update(discovered)
+
+    return list(_discovered[group])
+
+
+def save_plugins_cache():
+    """
+    Write the entry points this process read from the distributions' metadata to their cache
+    file, if any, e.g. once the command line app started. Failing to write the cache is not an
+    error.
+    """
+    global _unsaved
+
+    if _unsaved is not None:
+        _write_cache(*_unsaved)
+        _unsaved = None
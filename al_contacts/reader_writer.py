@@ -1,10 +1,28 @@
 #! /usr/bin/env python
 
+import gc
+import io
 import os
+import re
+import csv
+import struct
+import shutil
+import operator
+import logging
+import functools
+from collections import deque
 from contextlib import contextmanager
 import json
 import pickle
 
+from al_contacts.instrumentation import stage
+from al_contacts.contacts import CONTACT_KEYS, iter_csv_contacts
+from al_contacts.columns import ColumnsException, ContactColumns
+from al_contacts.columns import dump_columns, iter_columns, is_columns_header
+from al_contacts.jsoncodec import decode_contact_items, encode_contact_items, iter_encode_contacts
+
+logger = logging.getLogger(__name__)
+
 
 class ReaderWriterException(Exception):
     """
@@ -13,14 +31,356 @@ class ReaderWriterException(Exception):
     pass
 
 
+# number of batches that may be encoding in an executor at once while streaming
+ENCODING_WINDOW = 16
+
+_WHITESPACE = re.compile(r'\s*')
+
+# Layout of the files of the binary format, all integers little endian:
+#   header   magic, schema version, flags, record count (patched once all the blocks are
+#            written) and the 16 bytes sync marker of the file, then the number of fields
+#            and the varint-prefixed utf-8 name of each field
+#   blocks   sync marker, then the varints record count, framing and payload length, then the
+#            payload holding the fields of the records of the block, row after row
+# A reader can start anywhere in a file, find the next sync marker and read whole blocks
+# from there, see BinaryRW.iter_range().
+BINARY_MAGIC = b'ALCB'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sBBQ16s')
+SYNC_SIZE = 16
+
+# maximum number of records per block, i.e. between two sync markers
+BLOCK_RECORDS = 4096
+
+# framings of the payload of a block. With FRAMING_SEPARATED the fields are joined by
+# FIELD_SEPARATOR, which then takes the place of a one byte length prefix and lets the reader
+# split the whole block at once. The writer falls back to FRAMING_LENGTHS, a varint prefix per
+# field holding its length in characters followed by the text of all the fields, for the
+# blocks where a field contains the separator.
+FRAMING_SEPARATED = 0
+FRAMING_LENGTHS = 1
+FIELD_SEPARATOR = '\x1f'
+
+MAX_VARINT_BYTES = 10
+MAX_FIELDS = 255
+
+
+# flags of the temporary files of _atomic_open(), created if they do not exist only
+TMP_FILE_FLAGS = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, 'O_BINARY', 0)
+
+
+@contextmanager
+def _atomic_open(filepath, mode, **kwargs):
+    """
+    Open a temporary file next to 'filepath' for writing, and move it over 'filepath' only once
+    it has been written completely. The temporary file has a unique name, so that several
+    threads or processes can write the same path at once, the last one replacing the file. It
+    gets the permissions of the file it replaces, or those open() would give a new file.
+    Further keyword arguments are passed to open().
+    """
+    directory, basename = os.path.split(os.path.abspath(filepath))
+    while True:
+        tmpFilepath = os.path.join(directory, '.{0}.{1}.tmp'.format(basename, os.urandom(6).hex()))
+        try:
+            fd = os.open(tmpFilepath, TMP_FILE_FLAGS, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, mode, **kwargs) as fp:
+            yield fp
+        if os.path.exists(filepath):
+            shutil.copymode(filepath, tmpFilepath)
+        os.replace(tmpFilepath, filepath)
+    finally:
+        if os.path.exists(tmpFilepath):
+            os.remove(tmpFilepath)
+
+
+def _encode_batches(batches, encoder, executor=None):
+    """
+    Yield (number of records, encoder(batch)) for each batch, in order. With an executor, up to
+    ENCODING_WINDOW batches are encoded concurrently while the results are consumed.
+    """
+    if executor is None:
+        for batch in batches:
+            yield len(batch), encoder(batch)
+        return
+
+    pending = deque()
+    for batch in batches:
+        pending.append((len(batch), executor.submit(encoder, batch)))
+        if len(pending) >= ENCODING_WINDOW:
+            size, future = pending.popleft()
+            yield size, future.result()
+    while pending:
+        size, future = pending.popleft()
+        yield size, future.result()
+
+
+def _encode_json_batch(batch):
+    """
+    Encode a batch of records as the comma separated items of a json array.
+    """
+    return encode_contact_items(batch)
+
+
+def _encode_pickle_batch(batch):
+    """
+    Encode a batch of records as a single pickle frame.
+    """
+    return pickle.dumps(batch)
+
+
+def _encode_csv_batch(batch, dialect='excel'):
+    """
+    Encode a batch of records as csv rows of their name, address and phone.
+    """
+    buf = io.StringIO()
+    try:
+        csv.writer(buf, dialect).writerows(map(operator.itemgetter(*CONTACT_KEYS), batch))
+    except KeyError as e:
+        raise ReaderWriterException('Record without the {0} field can not be written as csv'.format(e))
+    return buf.getvalue()
+
+
+def _encode_varint(value):
+    """
+    Encode a non-negative integer as a little endian base 128 varint.
+    """
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _decode_varint(buf, pos):
+    """
+    Decode the varint at 'pos' in 'buf' and return it with the position after it.
+    """
+    result = shift = 0
+    for pos in range(pos, min(pos + MAX_VARINT_BYTES, len(buf))):
+        byte = buf[pos]
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos + 1
+        shift += 7
+    raise ReaderWriterException('Invalid varint in binary data')
+
+
+def _read_varint(fp):
+    """
+    Read a varint from a binary file, None at the end of the file.
+    """
+    result = shift = 0
+    for index in range(MAX_VARINT_BYTES):
+        byte = fp.read(1)
+        if not byte:
+            if index:
+                raise ReaderWriterException('Truncated varint in "{0}"'.format(fp.name))
+            return None
+        result |= (byte[0] & 0x7f) << shift
+        if byte[0] < 0x80:
+            return result
+        shift += 7
+    raise ReaderWriterException('Invalid varint in "{0}"'.format(fp.name))
+
+
+def _encode_binary_block(batch, keys=tuple(CONTACT_KEYS)):
+    """
+    Encode a batch of records as the varints record count, framing and payload length followed
+    by the payload of a block of the binary format, without its sync marker.
+    """
+    try:
+        for item in batch:
+            if len(item) != len(keys):
+                raise KeyError(sorted(item))
+        values = [item[key] for item in batch for key in keys]
+        text = FIELD_SEPARATOR.join(values)
+    except KeyError as e:
+        raise ReaderWriterException('Record fields {0} do not match the binary schema {1}'.format(e, list(keys)))
+    except TypeError:
+        raise ReaderWriterException('The binary format only holds text fields')
+
+    if text.count(FIELD_SEPARATOR) == len(values) - 1:
+        framing, payload = FRAMING_SEPARATED, text.encode('utf-8')
+    else:
+        lengths = [len(value) for value in values]
+        if max(lengths) < 0x80:
+            prefixes = bytes(lengths)
+        else:
+            prefixes = b''.join(map(_encode_varint, lengths))
+        framing = FRAMING_LENGTHS
+        payload = _encode_varint(len(prefixes)) + prefixes + ''.join(values).encode('utf-8')
+    return _encode_varint(len(batch)) + _encode_varint(framing) + _encode_varint(len(payload)) + payload
+
+
+def _decode_binary_block(payload, count, framing, keys):
+    """
+    Decode the payload of a block of 'count' records. Every length is checked against the
+    data actually there, a corrupted or hostile file raises ReaderWriterException.
+    """
+    size = count * len(keys)
+    try:
+        if framing == FRAMING_SEPARATED:
+            values = payload.decode('utf-8').split(FIELD_SEPARATOR) if size else []
+            if len(values) != size:
+                raise ReaderWriterException('Binary block holds {0} fields instead of {1}'.format(len(values), size))
+        elif framing == FRAMING_LENGTHS:
+            prefixesSize, pos = _decode_varint(payload, 0)
+            prefixes = payload[pos:pos + prefixesSize]
+            if len(prefixes) != prefixesSize:
+                raise ReaderWriterException('Truncated binary block')
+            if len(prefixes) == size and max(prefixes, default=0) < 0x80:
+                lengths = list(prefixes)
+            else:
+                lengths, index = [], 0
+                while index < len(prefixes):
+                    length, index = _decode_varint(prefixes, index)
+                    lengths.append(length)
+                if len(lengths) != size:
+                    raise ReaderWriterException('Binary block holds {0} fields instead of {1}'.format(len(lengths), size))
+            text = payload[pos + prefixesSize:].decode('utf-8')
+            if sum(lengths) != len(text):
+                raise ReaderWriterException('Binary block fields do not add up to its text')
+            values, start = [], 0
+            for length in lengths:
+                values.append(text[start:start + length])
+                start += length
+        else:
+            raise ReaderWriterException('Unknown binary block framing "{0}"'.format(framing))
+    except UnicodeDecodeError as e:
+        raise ReaderWriterException('Invalid utf-8 text in binary block: {0}'.format(e))
+
+    fields = iter(values)
+    if keys == ('name', 'address', 'phone'):
+        # the contact schema, the constant keys make the dictionary displays cheaper
+        return [{'name': name, 'address': address, 'phone': phone} for name, address, phone in zip(fields, fields, fields)]
+    if len(keys) == 3:
+        key0, key1, key2 = keys
+        return [{key0: value0, key1: value1, key2: value2} for value0, value1, value2 in zip(fields, fields, fields)]
+    return [dict(zip(keys, row)) for row in zip(*[fields] * len(keys))]
+
+
+def _iter_blocks(batches, blockRecords=BLOCK_RECORDS):
+    """
+    Re-cut an iterable of batches into lists of at most 'blockRecords' records, skipping the
+    empty batches.
+    """
+    for batch in batches:
+        for start in range(0, len(batch), blockRecords):
+            yield batch[start:start + blockRecords]
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Disable the cyclic garbage collector while decoding. The decoders allocate many dictionaries
+    that can not form cycles, and would otherwise trigger full collections over them.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _iter_json_array(fp, batchSize, chunkSize=1 << 16, bulk=True):
+    """
+    Incrementally parse the json array in 'fp', yielding its items in lists of at most
+    'batchSize' items, without reading the whole file into memory.
+    The complete contacts of each chunk are decoded at once when they are laid out as
+    json.dumps() writes them, see al_contacts.jsoncodec.decode_contact_items(), and item by item
+    otherwise, or always when 'bulk' is False.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = '', 0, False
+    state = 'start'
+    batch = []
+    # bulk: the items may be decoded at once, scanned: there is nothing to decode at once
+    # before the next chunk is read
+    scanned = False
+
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos == len(buf):
+            if eof:
+                raise ReaderWriterException('Unexpected end of json data in "{0}"'.format(fp.name))
+            chunk = fp.read(chunkSize)
+            eof = not chunk
+            buf, pos, scanned = buf[pos:] + chunk, 0, False
+            continue
+
+        char = buf[pos]
+        if state == 'start':
+            if char != '[':
+                raise ReaderWriterException('json data in "{0}" is not an array'.format(fp.name))
+            pos += 1
+            state = 'first'
+        elif state in ('first', 'sep') and char == ']':
+            break
+        elif state == 'sep':
+            if char != ',':
+                raise ReaderWriterException('Invalid json data in "{0}" at offset {1}'.format(fp.name, pos))
+            pos += 1
+            state = 'value'
+        else:
+            if bulk and not scanned:
+                decoded = decode_contact_items(buf, pos)
+                if decoded is None:
+                    # the items are not laid out as json.dumps() writes contacts
+                    bulk = False
+                elif decoded[0]:
+                    items, pos = decoded
+                    state = 'sep'
+                    batch.extend(items)
+                    start = 0
+                    while len(batch) - start >= batchSize:
+                        yield batch[start:start + batchSize]
+                        start += batchSize
+                    batch = batch[start:]
+                    continue
+                scanned = True
+
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                end = None
+            # a value that runs up to the end of the buffer may continue in the next chunk
+            if end is None or (end == len(buf) and not eof):
+                if eof:
+                    raise ReaderWriterException('Invalid json data in "{0}"'.format(fp.name))
+                chunk = fp.read(chunkSize)
+                eof = not chunk
+                buf, pos, scanned = buf[pos:] + chunk, 0, False
+                continue
+            pos = end
+            state = 'sep'
+            batch.append(item)
+            if len(batch) >= batchSize:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+
 class ReaderWriter:
     """
     This class is an observer class for observable 'Format' class and has to ne instantiated
     with an object of one of the 'Format' classes to support.
     This implements a notify() method that the 'Format' class uses to send notifications.
     It also defines serialise() and deserialise() methods for a specific format.
+
+    serialise(data, filepath) and deserialise(filepath) can be called with per-call arguments,
+    in which case they do not touch the instance state and a single instance can serve several
+    threads at once. Called without arguments they fall back to self.data and self.filepath.
     """
-    def __init__(self, format, data=[], filepath=''):
+    def __init__(self, format, data=None, filepath=''):
         """
         :Params:
             format: `al_contacts.format.Format`
@@ -34,9 +394,24 @@ class ReaderWriter:
                 file path where the data is to be written to or read from.
 
         """
-        self.data = data
+        self.data = data if data is not None else []
         self.filepath = filepath
+        # True when the batches written by write_batches() are encoded independently of each
+        # other, so that their encoding can be spread over the workers of an executor.
+        self.parallelEncoding = False
+        # cache the 'deserialise' notifications go through when set, see
+        # al_contacts.cache.DeserialisationCache
+        self.cache = None
+        # delta store the 'serialise' and 'deserialise' notifications go through when set, see
+        # al_contacts.delta.DeltaStore. It takes precedence over the cache, which only knows the
+        # base file.
+        self.delta = None
+        # Bloom filters the 'serialise' notifications build next to the files written when set,
+        # see al_contacts.bloom.BloomIndex
+        self.bloom = None
         self.actions = ['serialise', 'deserialise']
+        # format the reader/writer registers with, which aserialise()/adeserialise() notify on behalf of
+        self.format = format
         format.register_rw(self)
 
 
@@ -48,10 +423,10 @@ class ReaderWriter:
         return 'base reader/writer observer'
 
 
-    def notify(self, format, action, *args, **kwargs):
+    def notify(self, format, action, *args, cache=None, delta=None, bloom=None, **kwargs):
         """
         This is the method that observable class 'Format' will use to send notifications to
-        this observer class.
+        this observer class. Any further arguments are forwarded to the action.
 
         :Params:
             format: `al_contacts.format.Format`
@@ -59,37 +434,243 @@ class ReaderWriter:
                 This can be used in case the caller 'Format' object needs to be notified back.
             action: `str`
                 action is one of the actions supported by this class.
+            cache: `al_contacts.cache.DeserialisationCache`
+                cache this call goes through. Defaults to the 'cache' of the reader/writer.
+            delta: `al_contacts.delta.DeltaStore`
+                delta store this call goes through. Defaults to the 'delta' of the reader/writer.
+            bloom: `al_contacts.bloom.BloomIndex`
+                Bloom filters this call builds. Defaults to the 'bloom' of the reader/writer.
+
+        :Returns:
+            the data that was serialised or deserialised by the action.
         """
-        if not action:
-            raise ReaderWriterException('Specify an <action> from {0} to perform"'.format(self.actions))
-        if action not in self.actions:
-            raise ReaderWriterException('Operation "{0}" is not defined in "{1}"'.format(action, self))
+        self._check_action(action)
+        cache = cache if cache is not None else self.cache
+        delta = delta if delta is not None else self.delta
+        bloom = bloom if bloom is not None else self.bloom
+
+        data = None
+        with stage('rw.' + action, str(format)) as aStage:
+            if action == 'serialise':
+                if delta is not None:
+                    data = delta.serialise(self, *args, **kwargs)
+                else:
+                    data = self.serialise(*args, **kwargs)
+                if bloom is not None:
+                    bloom.build(data, self._action_filepath(action, args, kwargs))
+            elif action == 'deserialise':
+                if delta is not None:
+                    data = delta.deserialise(self, *args, **kwargs)
+                elif cache is not None:
+                    data = cache.deserialise(self, str(format), *args, **kwargs)
+                else:
+                    data = self.deserialise(*args, **kwargs)
+            if aStage.active:
+                aStage.records = len(data) if isinstance(data, list) else 0
+                aStage.bytes = self._action_size(action, args, kwargs)
+        return data
 
-        if action == 'serialise':
-            self.serialise()
-        elif action == 'deserialise':
-            self.deserialise()
 
+    async def anotify(self, format, action, *args, executor=None, **kwargs):
+        """
+        Asynchronous counterpart of notify(). The action is validated straight away and then
+        notify() runs in 'executor', so that the file I/O and encoding do not block the event loop
+        and the action goes through the same instrumentation, cache, delta store and Bloom
+        filters as a synchronous one.
 
-    def serialise(self):
+        :Params:
+            format: `al_contacts.format.Format`
+                object of one of the 'Format' classes to which the readre/writer object registers.
+            action: `str`
+                action is one of the actions supported by this class.
+            executor: `concurrent.futures.Executor`
+                executor to run the action in. Defaults to the default executor of the running loop.
         """
-        Serialise data(self.data) to a file
+        # imported here, asyncio is slow to import and the CLI never needs it
+        import asyncio
+
+        self._check_action(action)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(self.notify, format, action, *args, **kwargs))
+
+
+    async def aserialise(self, data=None, filepath=None, executor=None):
+        """
+        Serialise in 'executor', through notify() like anotify(), and wait for it without blocking
+        the event loop.
+
+        :Params:
+            data: `list`
+                see serialise().
+            filepath: `string`
+                see serialise().
+            executor: `concurrent.futures.Executor`
+                executor to run the serialisation in. Defaults to the default executor of the running loop.
+        """
+        return await self.anotify(self.format, 'serialise', data, filepath, executor=executor)
+
+
+    async def adeserialise(self, filepath=None, executor=None):
+        """
+        Deserialise in 'executor', through notify() like anotify(), and wait for it without
+        blocking the event loop.
+
+        :Params:
+            filepath: `string`
+                see deserialise().
+            executor: `concurrent.futures.Executor`
+                executor to run the deserialisation in. Defaults to the default executor of the running loop.
+        """
+        return await self.anotify(self.format, 'deserialise', filepath, executor=executor)
+
+
+    def serialise(self, data=None, filepath=None):
+        """
+        Serialise data to a file
         This method needs to be implemented by the subclasses.
 
+        :Params:
+            data: `list`
+                list of dictionaries with keys = ['name', 'address', 'phone']. Defaults to self.data
+            filepath: `string`
+                file path to write the data to. Defaults to self.filepath
+
+        :Returns:
+            the serialised data.
         """
-        print('ReaderWriter.serialise() needs to be implemented by the subclasses')
+        logger.warning('ReaderWriter.serialise() needs to be implemented by the subclasses')
         pass
 
 
-    def deserialise(self):
+    def deserialise(self, filepath=None):
         """
-        Recover the original objects / object-types from the serialised data in self.filepath
+        Recover the original objects / object-types from the serialised data in a file
         This method needs to be implemented by the subclasses.
+
+        :Params:
+            filepath: `string`
+                file path to read the data from. Defaults to self.filepath, in which case the
+                deserialised data is also stored in self.data
+
+        :Returns:
+            the deserialised data.
         """
-        print('ReaderWriter.deserialise() needs to be implemented by the subclasses')
+        logger.warning('ReaderWriter.deserialise() needs to be implemented by the subclasses')
         pass
 
 
+    def iter_batches(self, filepath=None, batchSize=1000):
+        """
+        Yield the records of a serialised file in lists of at most 'batchSize' records.
+        This implementation deserialises the whole file first. The subclasses override it to
+        stream the file instead.
+
+        :Params:
+            filepath: `string`
+                file path to read the data from. Defaults to self.filepath
+            batchSize: `int`
+                maximum number of records per batch.
+        """
+        if batchSize < 1:
+            raise ReaderWriterException('Batch size must be a positive number, not "{0}"'.format(batchSize))
+
+        data = self.deserialise(self._filepath_to_read(filepath)) or []
+        for start in range(0, len(data), batchSize):
+            yield data[start:start + batchSize]
+
+
+    def write_batches(self, batches, filepath=None, executor=None):
+        """
+        Serialise an iterable of record batches to a file, e.g. the output of iter_batches().
+        This implementation collects all the batches and calls serialise(). The subclasses
+        override it to write the batches as they come.
+
+        :Params:
+            batches: `iterable`
+                lists of dictionaries with keys = ['name', 'address', 'phone']
+            filepath: `string`
+                file path to write the data to. Defaults to self.filepath
+            executor: `concurrent.futures.Executor`
+                executor to encode the batches in, used when self.parallelEncoding is True.
+
+        :Returns:
+            the number of records written.
+        """
+        data = [item for batch in batches for item in batch]
+        self.serialise(data, self._filepath_to_write(filepath))
+        return len(data)
+
+
+    def _action_size(self, action, args, kwargs):
+        """
+        Return the size of the file an action called with 'args' and 'kwargs' wrote or read, for
+        the instrumentation hooks.
+        """
+        try:
+            return os.path.getsize(self._action_filepath(action, args, kwargs))
+        except (OSError, TypeError):
+            return 0
+
+
+    def _action_filepath(self, action, args, kwargs):
+        """
+        Return the path of the file an action called with 'args' and 'kwargs' wrote or read.
+        """
+        position = 1 if action == 'serialise' else 0
+        filepath = kwargs.get('filepath', args[position] if len(args) > position else None)
+        if filepath is None:
+            filepath = self.filepath
+        return filepath
+
+
+    def _check_action(self, action):
+        """
+        Raise ReaderWriterException if 'action' is not one of the supported actions.
+        """
+        if not action:
+            raise ReaderWriterException('Specify an <action> from {0} to perform"'.format(self.actions))
+        if action not in self.actions:
+            raise ReaderWriterException('Operation "{0}" is not defined in "{1}"'.format(action, self))
+
+
+    def _data_to_write(self, data):
+        """
+        Return the per-call 'data', or self.data when it is not passed. Raise ReaderWriterException
+        if there is nothing to write.
+        """
+        if data is None:
+            data = self.data
+        if not data:
+            raise ReaderWriterException('data to write empty for "{0}" instance'.format(self))
+        return data
+
+
+    def _filepath_to_write(self, filepath):
+        """
+        Return the per-call 'filepath', or self.filepath when it is not passed.
+        """
+        if filepath is None:
+            filepath = self.filepath
+        if not filepath:
+            raise ReaderWriterException('filepath, to write data to, empty for "{0}" instance'.format(self))
+        return filepath
+
+
+    def _filepath_to_read(self, filepath):
+        """
+        Return the per-call 'filepath', or self.filepath when it is not passed. Raise
+        ReaderWriterException if the file does not exist.
+        """
+        if filepath is None:
+            filepath = self.filepath
+        if not filepath:
+            raise ReaderWriterException('filepath, to read data from, empty for "{0}" instance'.format(self))
+        if not os.path.exists(filepath):
+            raise ReaderWriterException('Specified path for deserialisation of data does not exist: "{0}"'.format(filepath))
+        return filepath
+
+
 class JsonRW(ReaderWriter):
     """
     This class inherits from 'ReaderWriter' class that defines common methods for all
@@ -97,6 +678,11 @@ class JsonRW(ReaderWriter):
     This class is an observer class for observable 'Format' class for Json Format.
     It implements serialise() and deserialise() methods for Json Format.
     """
+    def __init__(self, format, data=None, filepath=''):
+        ReaderWriter.__init__(self, format, data, filepath)
+        self.parallelEncoding = True
+
+
     def __str__(self):
         return 'json reader/writer'
 
@@ -105,39 +691,78 @@ class JsonRW(ReaderWriter):
         return 'json reader/writer'
 
 
-    def serialise(self):
+    def serialise(self, data=None, filepath=None):
         """
         Implementation of the base class serialise() method for the JsonRW class.
         Serialise passed data to json format and save at filepath.
         """
-        if not self.data:
-            raise ReaderWriterException('self.data empty for "{0}" instance'.format(self))
+        data = self._data_to_write(data)
+        filepath = self._filepath_to_write(filepath)
 
-        if not self.filepath:
-            raise ReaderWriterException('self.filepath, to write json data to, empty for "{0}" instance'.format(self))
+        with open(filepath, 'w') as fp:
+            fp.writelines(iter_encode_contacts(data))
 
-        with open(self.filepath, 'w') as fp:
-            json.dump(self.data, fp, encoding='utf-8')
+        logger.info('Serialised Json data into the file:%s', filepath)
+        return data
 
-        print('Serialised Json data into the file:{0}'.format(self.filepath))
 
-
-    def deserialise(self):
+    def deserialise(self, filepath=None):
         """
         Implementation of the base class deserialise() method for the JsonRW class.
-        Recover the original python objects from the json data at self.filepath
+        Recover the original python objects from the json data at filepath
         """
+        perCall = filepath is not None
+        filepath = self._filepath_to_read(filepath)
+
+        with open(filepath, 'r') as fp:
+            data = json.load(fp)
 
-        if not self.filepath:
-            raise ReaderWriterException('self.filepath, to read json data from, empty for "{0}" instance'.format(self))
+        if not perCall:
+            self.data = data
 
-        if not os.path.exists(self.filepath):
-            raise ReaderWriterException('Specified path for deserialisation of data does not exist: "{0}"'.format(self.filepath))
+        logger.info('De-serialised Json data from the file:%s', filepath)
+        return data
+
+
+    def iter_batches(self, filepath=None, batchSize=1000):
+        """
+        Implementation of the base class iter_batches() method for the JsonRW class.
+        Parse the json array at filepath incrementally and yield its records in batches.
+        """
+        if batchSize < 1:
+            raise ReaderWriterException('Batch size must be a positive number, not "{0}"'.format(batchSize))
+
+        filepath = self._filepath_to_read(filepath)
+        with open(filepath, 'r') as fp:
+            for batch in _iter_json_array(fp, batchSize):
+                yield batch
+
+
+    def write_batches(self, batches, filepath=None, executor=None):
+        """
+        Implementation of the base class write_batches() method for the JsonRW class.
+        Write the batches as one json array, encoding each batch separately, so the file is
+        the same as the one serialise() writes for all the records.
+        """
+        filepath = self._filepath_to_write(filepath)
 
-        with open(self.filepath, 'r') as fp:
-            self.data = json.load(fp, encoding='utf-8')
+        count = 0
+        debug = logger.isEnabledFor(logging.DEBUG)
+        with _atomic_open(filepath, 'w') as fp:
+            fp.write('[')
+            for size, text in _encode_batches(batches, _encode_json_batch, executor):
+                if not size:
+                    continue
+                if count:
+                    fp.write(', ')
+                fp.write(text)
+                count += size
+                if debug:
+                    logger.debug('Wrote a batch of %d records to the file:%s', size, filepath)
+            fp.write(']')
 
-        print('De-serialised Json data from the file:{0}'.format(self.filepath))
+        logger.info('Serialised %d records of Json data into the file:%s', count, filepath)
+        return count
 
 
 class PickleRW(ReaderWriter):
@@ -146,7 +771,23 @@ class PickleRW(ReaderWriter):
     reader/writer classes.
     This class is an observer class for observable 'Format' class for Pickle Format.
     It implements serialise() and deserialise() methods for Pickle Format.
+
+    In columnar mode the records are written as `al_contacts.columns.ContactColumns` batches
+    with pickle protocol 5, their buffers out-of-band in a side file that is memory-mapped when
+    the file is read, see al_contacts.columns.dump_columns(). Both kinds of files are read back
+    by deserialise() and iter_batches() whatever the mode.
     """
+    def __init__(self, format, data=None, filepath='', columnar=False):
+        """
+        :Params:
+            columnar: `bool`
+                write columnar pickle files. ContactColumns data is always written columnar.
+        """
+        ReaderWriter.__init__(self, format, data, filepath)
+        self.columnar = columnar
+        self.parallelEncoding = not columnar
+
+
     def __str__(self):
         return 'Pickle reader/writer'
 
@@ -155,35 +796,472 @@ class PickleRW(ReaderWriter):
         return 'Pickle reader/writer'
 
 
-    def serialise(self):
+    def serialise(self, data=None, filepath=None):
         """
         Implementation of the base class serialise() method for the PickleRW class.
         Serialise passed data to Pickle format and save at filepath.
         """
-        if not self.data:
-            raise ReaderWriterException('self.data empty for "{0}" instance'.format(self))
+        data = self._data_to_write(data)
+        filepath = self._filepath_to_write(filepath)
 
-        if not self.filepath:
-            raise ReaderWriterException('self.filepath, to write json data to, empty for "{0}" instance'.format(self))
+        if self.columnar or isinstance(data, ContactColumns):
+            try:
+                dump_columns([data], filepath)
+            except ColumnsException as e:
+                raise ReaderWriterException('Cannot serialise the data to columnar Pickle: {0}'.format(e))
+            logger.info('Serialised columnar Pickle data into the file:%s', filepath)
+            return data
 
-        with open(self.filepath, 'w') as fp:
-            pickle.dump(self.data, fp)
+        with open(filepath, 'wb') as fp:
+            pickle.dump(data, fp)
 
-        print('Serialised Json data into the file:{0}'.format(self.filepath))
+        logger.info('Serialised Pickle data into the file:%s', filepath)
+        return data
 
 
-    def deserialise(self):
+    def deserialise(self, filepath=None):
         """
         Implementation of the base class deserialise() method for the PickleRW class.
-        Recover the original python objects from the Pickle data at self.filepath
+        Recover the original python objects from the Pickle data at filepath
+        Files written by write_batches() hold one pickle frame per batch, the frames are
+        concatenated back into a single list.
+        """
+        perCall = filepath is not None
+        filepath = self._filepath_to_read(filepath)
+
+        with open(filepath, 'rb') as fp:
+            data = pickle.load(fp)
+            if is_columns_header(data):
+                data = [item for batch in self._iter_columns(filepath) for item in batch.to_records()]
+            else:
+                while True:
+                    try:
+                        data.extend(pickle.load(fp))
+                    except EOFError:
+                        break
+
+        if not perCall:
+            self.data = data
+
+        logger.info('De-serialised Pickle data from the file:%s', filepath)
+        return data
+
+
+    def iter_batches(self, filepath=None, batchSize=1000):
+        """
+        Implementation of the base class iter_batches() method for the PickleRW class.
+        Load the pickle frames at filepath one at a time and yield their records in batches.
+        """
+        if batchSize < 1:
+            raise ReaderWriterException('Batch size must be a positive number, not "{0}"'.format(batchSize))
+
+        filepath = self._filepath_to_read(filepath)
+        with open(filepath, 'rb') as fp:
+            try:
+                frame = pickle.load(fp)
+            except EOFError:
+                return
+            if is_columns_header(frame):
+                for batch in self._iter_columns(filepath):
+                    for start in range(0, len(batch), batchSize):
+                        yield batch.to_records(start, start + batchSize)
+                return
+
+            while True:
+                for start in range(0, len(frame), batchSize):
+                    yield frame[start:start + batchSize]
+                try:
+                    frame = pickle.load(fp)
+                except EOFError:
+                    break
+
+
+    def write_batches(self, batches, filepath=None, executor=None):
+        """
+        Implementation of the base class write_batches() method for the PickleRW class.
+        Write each batch as its own pickle frame, deserialise() joins them back together.
+        In columnar mode each batch is a ContactColumns frame, and its buffers are streamed to
+        the side file as they come.
+        """
+        filepath = self._filepath_to_write(filepath)
+
+        if self.columnar:
+            try:
+                count = dump_columns((batch for batch in batches if len(batch)), filepath)
+            except ColumnsException as e:
+                raise ReaderWriterException('Cannot serialise the data to columnar Pickle: {0}'.format(e))
+            logger.info('Serialised %d records of columnar Pickle data into the file:%s', count, filepath)
+            return count
+
+        count = 0
+        debug = logger.isEnabledFor(logging.DEBUG)
+        with _atomic_open(filepath, 'wb') as fp:
+            for size, frame in _encode_batches(batches, _encode_pickle_batch, executor):
+                if size:
+                    fp.write(frame)
+                    count += size
+                    if debug:
+                        logger.debug('Wrote a batch of %d records to the file:%s', size, filepath)
+            if not count:
+                fp.write(_encode_pickle_batch([]))
+
+        logger.info('Serialised %d records of Pickle data into the file:%s', count, filepath)
+        return count
+
+
+    def _iter_columns(self, filepath):
+        """
+        Yield the ContactColumns batches of a columnar pickle file, raising ReaderWriterException
+        if it or its side file is invalid.
+        """
+        try:
+            yield from iter_columns(filepath)
+        except ColumnsException as e:
+            raise ReaderWriterException(str(e))
+
+
+class BinaryRW(ReaderWriter):
+    """
+    This class inherits from 'ReaderWriter' class that defines common methods for all
+    reader/writer classes.
+    This class is an observer class for observable 'Format' class for the Binary Format.
+    It implements serialise() and deserialise() methods for the Binary Format, a compact row
+    format of the contact fields split in blocks by sync markers, see BINARY_HEADER. Reading it
+    only ever decodes utf-8 text, so unlike pickle it is safe to read from untrusted sources.
+    """
+    def __init__(self, format, data=None, filepath='', blockRecords=BLOCK_RECORDS):
+        ReaderWriter.__init__(self, format, data, filepath)
+        self.parallelEncoding = True
+        self.blockRecords = blockRecords
+
+
+    def __str__(self):
+        return 'binary reader/writer'
+
+
+    def __repr__(self):
+        return 'binary reader/writer'
+
+
+    def serialise(self, data=None, filepath=None):
+        """
+        Implementation of the base class serialise() method for the BinaryRW class.
+        Serialise passed data to the binary format and save at filepath.
+        """
+        data = self._data_to_write(data)
+        filepath = self._filepath_to_write(filepath)
+
+        with open(filepath, 'wb') as fp:
+            self._write_blocks(fp, [data])
+
+        logger.info('Serialised Binary data into the file:%s', filepath)
+        return data
+
+
+    def deserialise(self, filepath=None):
+        """
+        Implementation of the base class deserialise() method for the BinaryRW class.
+        Recover the original python objects from the binary data at filepath
+        """
+        perCall = filepath is not None
+        filepath = self._filepath_to_read(filepath)
+
+        data = []
+        with open(filepath, 'rb') as fp:
+            count, marker, keys = self._read_header(fp)
+            for block in self._iter_file_blocks(fp, marker, keys):
+                data.extend(block)
+        if len(data) != count:
+            raise ReaderWriterException('Binary file "{0}" holds {1} records instead of {2}'.format(filepath, len(data), count))
+
+        if not perCall:
+            self.data = data
+
+        logger.info('De-serialised Binary data from the file:%s', filepath)
+        return data
+
+
+    def iter_batches(self, filepath=None, batchSize=1000):
+        """
+        Implementation of the base class iter_batches() method for the BinaryRW class.
+        Decode the blocks at filepath one at a time and yield their records in batches.
         """
-        if not self.filepath:
-            raise ReaderWriterException('self.filepath, to read json data from, empty for "{0}" instance'.format(self))
+        if batchSize < 1:
+            raise ReaderWriterException('Batch size must be a positive number, not "{0}"'.format(batchSize))
 
-        if not os.path.exists(self.filepath):
-            raise ReaderWriterException('Specified path for deserialisation of data does not exist: "{0}"'.format(self.filepath))
+        filepath = self._filepath_to_read(filepath)
+        with open(filepath, 'rb') as fp:
+            count, marker, keys = self._read_header(fp)
+            total = 0
+            for block in self._iter_file_blocks(fp, marker, keys):
+                total += len(block)
+                for start in range(0, len(block), batchSize):
+                    yield block[start:start + batchSize]
+        if total != count:
+            raise ReaderWriterException('Binary file "{0}" holds {1} records instead of {2}'.format(filepath, total, count))
+
+
+    def write_batches(self, batches, filepath=None, executor=None):
+        """
+        Implementation of the base class write_batches() method for the BinaryRW class.
+        Write the batches as blocks of at most self.blockRecords records as they come.
+        """
+        filepath = self._filepath_to_write(filepath)
+
+        with _atomic_open(filepath, 'wb') as fp:
+            count = self._write_blocks(fp, batches, executor, filepath)
+
+        logger.info('Serialised %d records of Binary data into the file:%s', count, filepath)
+        return count
+
+
+    def split_ranges(self, filepath=None, parts=2):
+        """
+        Cut a binary file into 'parts' byte ranges of about the same size, to be read
+        independently, e.g. by several processes, with iter_range().
+
+        :Returns:
+            list of (start, end) byte offsets covering the whole file.
+        """
+        if parts < 1:
+            raise ReaderWriterException('Number of parts must be a positive number, not "{0}"'.format(parts))
+        size = os.path.getsize(self._filepath_to_read(filepath))
+        bounds = [size * part // parts for part in range(parts + 1)]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+
+    def iter_range(self, start, end, filepath=None, batchSize=1000):
+        """
+        Yield, in batches, the records of the blocks of a binary file whose sync marker starts
+        in the byte range [start, end). The ranges of split_ranges() together yield every record
+        of the file exactly once.
+        """
+        if batchSize < 1:
+            raise ReaderWriterException('Batch size must be a positive number, not "{0}"'.format(batchSize))
+
+        filepath = self._filepath_to_read(filepath)
+        with open(filepath, 'rb') as fp:
+            _, marker, keys = self._read_header(fp)
+            offset = self._find_marker(fp, marker, max(start, fp.tell()), end)
+            if offset is None:
+                return
+            fp.seek(offset)
+            for block in self._iter_file_blocks(fp, marker, keys, end):
+                for first in range(0, len(block), batchSize):
+                    yield block[first:first + batchSize]
+
+
+    def _write_blocks(self, fp, batches, executor=None, filepath=''):
+        """
+        Write the header and the blocks of 'batches' to 'fp', and patch the record count of the
+        header once they are all written.
+        """
+        marker = os.urandom(SYNC_SIZE)
+        fp.write(self._encode_header(0, marker))
+
+        count = 0
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for size, block in _encode_batches(_iter_blocks(batches, self.blockRecords), _encode_binary_block, executor):
+            fp.write(marker)
+            fp.write(block)
+            count += size
+            if debug:
+                logger.debug('Wrote a block of %d records to the file:%s', size, filepath)
+
+        fp.seek(0)
+        fp.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, count, marker))
+        fp.seek(0, os.SEEK_END)
+        return count
+
+
+    def _encode_header(self, count, marker, keys=tuple(CONTACT_KEYS)):
+        fields = b''.join(_encode_varint(len(key.encode('utf-8'))) + key.encode('utf-8') for key in keys)
+        return BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, count, marker) + _encode_varint(len(keys)) + fields
+
+
+    def _read_header(self, fp):
+        """
+        Read and check the header of a binary file, and return its record count, sync marker
+        and field names.
+        """
+        header = fp.read(BINARY_HEADER.size)
+        if len(header) != BINARY_HEADER.size:
+            raise ReaderWriterException('"{0}" is too short to be a binary file'.format(fp.name))
+        magic, version, flags, count, marker = BINARY_HEADER.unpack(header)
+        if magic != BINARY_MAGIC:
+            raise ReaderWriterException('"{0}" is not a binary contacts file'.format(fp.name))
+        if version != BINARY_VERSION:
+            raise ReaderWriterException('Unsupported binary schema version {0} in "{1}"'.format(version, fp.name))
+
+        fieldCount = _read_varint(fp)
+        if not fieldCount or fieldCount > MAX_FIELDS:
+            raise ReaderWriterException('Invalid number of fields in "{0}"'.format(fp.name))
+        keys = []
+        for _ in range(fieldCount):
+            length = _read_varint(fp)
+            name = fp.read(length or 0)
+            if length is None or length > MAX_FIELDS or len(name) != length:
+                raise ReaderWriterException('Invalid field name in "{0}"'.format(fp.name))
+            try:
+                keys.append(name.decode('utf-8'))
+            except UnicodeDecodeError:
+                raise ReaderWriterException('Invalid field name in "{0}"'.format(fp.name))
+        return count, marker, tuple(keys)
+
+
+    def _iter_file_blocks(self, fp, marker, keys, end=None):
+        """
+        Decode the blocks of 'fp' from its current position, up to the end of the file or the
+        first block starting at or after 'end'.
+        """
+        while end is None or fp.tell() < end:
+            offset = fp.tell()
+            sync = fp.read(SYNC_SIZE)
+            if not sync:
+                return
+            if sync != marker:
+                raise ReaderWriterException('Missing sync marker in "{0}" at offset {1}'.format(fp.name, offset))
+            count, framing, length = _read_varint(fp), _read_varint(fp), _read_varint(fp)
+            remaining = os.fstat(fp.fileno()).st_size - fp.tell()
+            # the lengths are checked before anything is allocated for them
+            if None in (count, framing, length) or length > remaining or count * len(keys) > length + 1:
+                raise ReaderWriterException('Invalid block in "{0}" at offset {1}'.format(fp.name, offset))
+            payload = fp.read(length)
+            with _gc_paused():
+                block = _decode_binary_block(payload, count, framing, keys)
+            yield block
+
+
+    def _find_marker(self, fp, marker, start, end, chunkSize=1 << 16):
+        """
+        Return the offset of the first sync marker starting in [start, end), None if there is
+        none.
+        """
+        fp.seek(start)
+        buf, bufStart = b'', start
+        while bufStart < end:
+            chunk = fp.read(chunkSize)
+            if not chunk:
+                return None
+            buf += chunk
+            index = buf.find(marker)
+            if index >= 0:
+                return bufStart + index if bufStart + index < end else None
+            # keep the tail, a marker may straddle two chunks
+            keep = min(len(buf), SYNC_SIZE - 1)
+            bufStart += len(buf) - keep
+            buf = buf[len(buf) - keep:]
+        return None
+
+
+class CsvRW(ReaderWriter):
+    """
+    This class inherits from 'ReaderWriter' class that defines common methods for all
+    reader/writer classes.
+    This class is an observer class for observable 'Format' class for Csv Format.
+    It implements serialise() and deserialise() methods for Csv Format. The files are written
+    with a header row naming the columns. Reading maps the columns named by a header row on to
+    the contact fields, or takes them as name, address and phone without one, and sniffs the
+    delimiter, see al_contacts.contacts.iter_csv_contacts().
+    """
+    def __init__(self, format, data=None, filepath='', header=True, dialect='excel'):
+        """
+        :Params:
+            header: `bool`
+                write a header row naming the columns.
+            dialect: `str`
+                name of the csv dialect to write with, e.g. 'excel' or 'excel-tab'.
+        """
+        ReaderWriter.__init__(self, format, data, filepath)
+        self.parallelEncoding = True
+        self.header = header
+        self.dialect = dialect
+
+
+    def __str__(self):
+        return 'csv reader/writer'
+
+
+    def __repr__(self):
+        return 'csv reader/writer'
+
+
+    def serialise(self, data=None, filepath=None):
+        """
+        Implementation of the base class serialise() method for the CsvRW class.
+        Serialise passed data to csv format and save at filepath, in one writerows() call.
+        """
+        data = self._data_to_write(data)
+        filepath = self._filepath_to_write(filepath)
+
+        with open(filepath, 'w', newline='') as fp:
+            writer = csv.writer(fp, self.dialect)
+            if self.header:
+                writer.writerow(CONTACT_KEYS)
+            try:
+                writer.writerows(map(operator.itemgetter(*CONTACT_KEYS), data))
+            except KeyError as e:
+                raise ReaderWriterException('Record without the {0} field can not be written as csv'.format(e))
+
+        logger.info('Serialised Csv data into the file:%s', filepath)
+        return data
+
+
+    def deserialise(self, filepath=None):
+        """
+        Implementation of the base class deserialise() method for the CsvRW class.
+        Recover the contact records from the csv data at filepath
+        """
+        perCall = filepath is not None
+        filepath = self._filepath_to_read(filepath)
+
+        data = []
+        for batch in self.iter_batches(filepath, batchSize=BLOCK_RECORDS):
+            data.extend(batch)
+
+        if not perCall:
+            self.data = data
+
+        logger.info('De-serialised Csv data from the file:%s', filepath)
+        return data
+
+
+    def iter_batches(self, filepath=None, batchSize=1000):
+        """
+        Implementation of the base class iter_batches() method for the CsvRW class.
+        Read the csv rows at filepath incrementally and yield their records in batches.
+        """
+        if batchSize < 1:
+            raise ReaderWriterException('Batch size must be a positive number, not "{0}"'.format(batchSize))
+
+        filepath = self._filepath_to_read(filepath)
+        with open(filepath, 'r', newline='') as fp:
+            try:
+                for batch in iter_csv_contacts(fp, batchSize):
+                    yield batch
+            except (ValueError, csv.Error) as e:
+                raise ReaderWriterException('Invalid csv data in "{0}": {1}'.format(filepath, e))
+
+
+    def write_batches(self, batches, filepath=None, executor=None):
+        """
+        Implementation of the base class write_batches() method for the CsvRW class.
+        Write the header and then the rows of each batch as they come, the same file as the
+        one serialise() writes for all the records.
+        """
+        filepath = self._filepath_to_write(filepath)
 
-        with open(self.filepath, 'r') as fp:
-            self.data = pickle.load(fp)
+        count = 0
+        debug = logger.isEnabledFor(logging.DEBUG)
+        encoder = functools.partial(_encode_csv_batch, dialect=self.dialect)
+        with _atomic_open(filepath, 'w', newline='') as fp:
+            if self.header:
+                fp.write(_encode_csv_batch([dict(zip(CONTACT_KEYS, CONTACT_KEYS))], self.dialect))
+            for size, text in _encode_batches(batches, encoder, executor):
+                fp.write(text)
+                count += size
+                if debug:
+                    logger.debug('Wrote a batch of %d records to the file:%s', size, filepath)
 
-        print('De-serialised Json data from the file:{0}'.format(self.filepath))
\ No newline at end of file
+        logger.info('Serialised %d records of Csv data into the file:%s', count, filepath)
+        return count
@@ -0,0 +1,309 @@
+#! /usr/bin/env python
+
+import os
+import sys
+import argparse
+import statistics
+
+from al_contacts.benchmark import BenchmarkException
+from al_contacts.benchmark import run_benchmarks, read_report, write_report
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# baseline committed with the package, see 'python -m al_contacts.regression --update'
+DEFAULT_BASELINE = os.path.join(PACKAGE_ROOT, 'benchmarks', 'baseline.json')
+
+# slowdown of the median time, or growth of the memory, beyond which a result is a regression
+DEFAULT_THRESHOLD = 10.0
+DEFAULT_MEMORY_THRESHOLD = 10.0
+
+# number of timed runs of each action in each benchmark process, and number of times the
+# benchmarks are run in fresh processes. The median of all the timed runs is compared, so that
+# the noise between processes is accounted for too, not only the noise within a process.
+DEFAULT_REPEAT = 5
+DEFAULT_RUNS = 3
+
+# a change of the median time smaller than NOISE_FACTOR times the spread of the runs is noise.
+# The spread is the median absolute deviation scaled by MAD_SCALE, which makes it comparable to
+# a standard deviation for normally distributed timings.
+NOISE_FACTOR = 3.0
+MAD_SCALE = 1.4826
+
+# exit codes of main()
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+EXIT_ERROR = 2
+
+OK = 'ok'
+REGRESSION = 'regression'
+IMPROVEMENT = 'improvement'
+MISSING = 'missing'
+NEW = 'new'
+
+
+class RegressionException(Exception):
+    """
+    Exception raised while comparing benchmark reports.
+    """
+    pass
+
+
+def median_mad(samples):
+    """
+    Return the median of the samples and their median absolute deviation.
+    """
+    if not samples:
+        raise RegressionException('Cannot compute the median of no samples')
+    median = statistics.median(samples)
+    return median, statistics.median([abs(sample - median) for sample in samples])
+
+
+def result_key(result):
+    """
+    Return the (kind, name, action, rows) tuple identifying a result of a benchmark report.
+    """
+    return (result['kind'], result['name'], result['action'], result['rows'])
+
+
+def _memory_peak(result):
+    """
+    Return the traced peak bytes of the whole action of a result, or None when the memory was
+    not traced.
+    """
+    for stats in result.get('memory') or []:
+        if stats['stage'] == 'benchmark.' + result['action']:
+            return stats['peak_bytes']
+    return None
+
+
+def _compare_time(baseline, current, threshold):
+    baseMedian, baseMad = median_mad(baseline['samples'])
+    median, mad = median_mad(current['samples'])
+    noise = NOISE_FACTOR * MAD_SCALE * max(baseMad, mad)
+    change = (median - baseMedian) / baseMedian * 100.0 if baseMedian else 0.0
+    status = OK
+    if abs(median - baseMedian) > noise and abs(change) > threshold:
+        status = REGRESSION if median > baseMedian else IMPROVEMENT
+    return {
+        'metric': 'seconds', 'baseline': baseMedian, 'current': median, 'change_pct': change,
+        'noise': noise, 'status': status,
+    }
+
+
+def _compare_memory(metric, baseValue, value, threshold):
+    change = (value - baseValue) / float(baseValue) * 100.0 if baseValue else 0.0
+    status = OK
+    if abs(change) > threshold:
+        status = REGRESSION if value > baseValue else IMPROVEMENT
+    return {
+        'metric': metric, 'baseline': baseValue, 'current': value, 'change_pct': change,
+        'noise': 0, 'status': status,
+    }
+
+
+def compare_reports(baseline, current, threshold=DEFAULT_THRESHOLD, memoryThreshold=DEFAULT_MEMORY_THRESHOLD):
+    """
+    Compare the results of a benchmark report against a baseline report.
+
+    The time of a result is the median of its timed runs. It is a regression when it is slower
+    than the baseline by more than 'threshold' percent and by more than the noise of the runs,
+    NOISE_FACTOR times the larger scaled median absolute deviation of the two. The peak RSS, and
+    the traced peak memory when both reports have it, are regressions when they grow by more
+    than 'memoryThreshold' percent.
+
+    :Params:
+        baseline: `dict`
+            baseline report, see al_contacts.benchmark.write_report().
+        current: `dict`
+            report to check.
+        threshold: `float`
+            allowed slowdown, in percent.
+        memoryThreshold: `float`
+            allowed memory growth, in percent.
+
+    :Returns:
+        list of comparison dictionaries with keys = ['kind', 'name', 'action', 'rows', 'metric',
+        'baseline', 'current', 'change_pct', 'noise', 'status'], where status is one of OK,
+        REGRESSION, IMPROVEMENT, MISSING (in the baseline only) and NEW (in the current report
+        only), in the order of the baseline results.
+    """
+    if threshold < 0 or memoryThreshold < 0:
+        raise RegressionException('The thresholds must be positive percentages')
+
+    currentResults = dict((result_key(result), result) for result in current['results'])
+    baseKeys = set()
+    comparisons = []
+
+    def add(key, comparison):
+        comparison.update(zip(('kind', 'name', 'action', 'rows'), key))
+        comparisons.append(comparison)
+
+    for baseResult in baseline['results']:
+        key = result_key(baseResult)
+        baseKeys.add(key)
+        result = currentResults.get(key)
+        if result is None:
+            add(key, {'metric': 'seconds', 'baseline': baseResult['seconds'], 'current': None,
+                      'change_pct': None, 'noise': None, 'status': MISSING})
+            continue
+
+        add(key, _compare_time(baseResult, result, threshold))
+        if baseResult.get('peak_rss_bytes') and result.get('peak_rss_bytes'):
+            add(key, _compare_memory('peak_rss_bytes', baseResult['peak_rss_bytes'], result['peak_rss_bytes'],
+                                     memoryThreshold))
+        basePeak, peak = _memory_peak(baseResult), _memory_peak(result)
+        if basePeak and peak:
+            add(key, _compare_memory('traced_peak_bytes', basePeak, peak, memoryThreshold))
+
+    for result in current['results']:
+        key = result_key(result)
+        if key not in baseKeys:
+            add(key, {'metric': 'seconds', 'baseline': None, 'current': result['seconds'],
+                      'change_pct': None, 'noise': None, 'status': NEW})
+    return comparisons
+
+
+def failed(comparisons):
+    """
+    Return the comparisons failing the gate: the regressions and the results missing from the
+    current report.
+    """
+    return [comparison for comparison in comparisons if comparison['status'] in (REGRESSION, MISSING)]
+
+
+def merge_reports(reports):
+    """
+    Merge the reports of several runs of the same benchmarks into one report: the samples of a
+    result are those of all the runs, its time the fastest of them, and its base and peak RSS the
+    medians of the runs.
+    """
+    if not reports:
+        raise RegressionException('No benchmark report to merge')
+
+    merged = dict(reports[0], results=[])
+    merged['meta'] = dict(reports[0]['meta'], runs=len(reports))
+    runs = {}
+    for report in reports:
+        for result in report['results']:
+            runs.setdefault(result_key(result), []).append(result)
+
+    for key, results in runs.items():
+        result = dict(results[0])
+        result['samples'] = [sample for aResult in results for sample in aResult['samples']]
+        result['seconds'] = min(result['samples'])
+        result['records_per_s'] = result['rows'] / result['seconds'] if result['seconds'] else None
+        result['bytes_per_s'] = result['bytes'] / result['seconds'] if result['seconds'] else None
+        for field in ('base_rss_bytes', 'peak_rss_bytes'):
+            rss = [aResult[field] for aResult in results if aResult.get(field)]
+            result[field] = int(statistics.median(rss)) if rss else None
+        merged['results'].append(result)
+    return merged
+
+
+def rerun_baseline(baseline, repeat=DEFAULT_REPEAT, runs=DEFAULT_RUNS, workDir=None, progress=None):
+    """
+    Run again the benchmarks of a baseline report 'runs' times: same numbers of rows, formats,
+    views and seed, and the memory is traced if it was in the baseline.
+
+    :Returns:
+        the merged report of the runs, see merge_reports().
+    """
+    if runs < 1 or repeat < 1:
+        raise RegressionException('The benchmarks must run at least once')
+
+    results = baseline['results']
+    if not results:
+        raise RegressionException('The baseline report has no results')
+
+    formats = sorted(set(result['name'] for result in results if result['kind'] == 'format'))
+    views = sorted(set(result['name'] for result in results if result['kind'] == 'view'))
+    rows = sorted(set(result['rows'] for result in results if result['kind'] == 'format'))
+    viewRows = max([result['rows'] for result in results if result['kind'] == 'view'] or [0])
+    if not rows:
+        # a baseline of the views only, render their own numbers of rows
+        rows = sorted(set(result['rows'] for result in results))
+    meta = baseline.get('meta', {})
+    return merge_reports([
+        run_benchmarks(rows, formats, views, meta.get('seed', 0), repeat, viewRows or max(rows), workDir,
+                       progress, memprofile=meta.get('memprofile', False))
+        for _ in range(runs)
+    ])
+
+
+def format_comparison(comparison):
+    """
+    Make a one line summary of a comparison dictionary.
+    """
+    def value(number):
+        if number is None:
+            return '-'
+        if comparison['metric'] == 'seconds':
+            return '{0:.4f} s'.format(number)
+        return '{0:.1f} MB'.format(number / 1048576.0)
+
+    return '{0:<11} {1:<6} {2:<8} {3:<12} {4:>10} rows {5:<17} {6:>12} -> {7:>12} {8:>9}'.format(
+        comparison['status'].upper(), comparison['kind'], comparison['name'], comparison['action'],
+        comparison['rows'], comparison['metric'], value(comparison['baseline']), value(comparison['current']),
+        '{0:+.1f}%'.format(comparison['change_pct']) if comparison['change_pct'] is not None else '')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m al_contacts.regression',
+        description='Run again the benchmarks of a baseline report and fail on the throughput or memory\
+            regressions. The time of each action is the median of several runs, and a slowdown within\
+            the noise of the runs is not a regression',
+    )
+    parser.add_argument(
+        'baseline',
+        nargs='?',
+        default=DEFAULT_BASELINE,
+        help='Path of the baseline json report. Defaults to "{0}"'.format(os.path.relpath(DEFAULT_BASELINE)),
+    )
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Allowed slowdown in percent. Defaults to {0}'.format(DEFAULT_THRESHOLD))
+    parser.add_argument('--memory-threshold', type=float, default=DEFAULT_MEMORY_THRESHOLD,
+                        help='Allowed memory growth in percent. Defaults to {0}'.format(DEFAULT_MEMORY_THRESHOLD))
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='Timed runs of each action in each process. Defaults to {0}'.format(DEFAULT_REPEAT))
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS,
+                        help='Times the benchmarks are run, in fresh processes. Defaults to {0}'.format(DEFAULT_RUNS))
+    parser.add_argument('--current', help='Compare this report instead of running the benchmarks')
+    parser.add_argument('--output', help='Also write the new report to this path')
+    parser.add_argument('--update', action='store_true',
+                        help='Replace the baseline with the new report instead of comparing them')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    progress = lambda result: print('measured {0} {1} {2} {3} rows'.format(*result_key(result)), file=sys.stderr)
+    try:
+        baseline = read_report(args.baseline)
+        if args.current:
+            current = read_report(args.current)
+        else:
+            current = rerun_baseline(baseline, args.repeat, args.runs, progress=progress)
+        if args.output:
+            write_report(current, args.output)
+        if args.update:
+            write_report(current, args.baseline)
+            print('Updated the baseline "{0}"'.format(args.baseline), file=sys.stderr)
+            return EXIT_OK
+        comparisons = compare_reports(baseline, current, args.threshold, args.memory_threshold)
+    except (BenchmarkException, RegressionException) as e:
+        print('Error from package "al_contacts"! {0}'.format(e), file=sys.stderr)
+        return EXIT_ERROR
+
+    for comparison in comparisons:
+        print(format_comparison(comparison))
+    failures = failed(comparisons)
+    if failures:
+        print('{0} regression(s) against "{1}"'.format(len(failures), args.baseline), file=sys.stderr)
+        return EXIT_REGRESSION
+    print('No regression against "{0}"'.format(args.baseline), file=sys.stderr)
+    return EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+#! /usr/bin/env python
+
+import os
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from al_contacts.cache import CacheException, DeserialisationCache
+from al_contacts.formats import FormatsException
+from al_contacts.reader_writer import ReaderWriterException
+from al_contacts.instrumentation import stage
+from al_contacts.metrics import CONTENT_TYPE, MetricsRegistry, cache_collector
+
+
+class ServerException(Exception):
+    """
+    Exception raised by the classes of the al_contacts.server module.
+    """
+    pass
+
+
+class DatasetCache(DeserialisationCache):
+    """
+    This class is the DeserialisationCache of the server, it raises ServerException for the
+    dataset files that do not exist or cannot be read in the format requested.
+    """
+    def get(self, formatName, filepath, loader):
+        try:
+            return DeserialisationCache.get(self, formatName, filepath, loader)
+        except (CacheException, ReaderWriterException, FormatsException) as e:
+            raise ServerException(str(e))
+
+
+class ContactsService:
+    """
+    This class answers the requests of the server from warm registries and cached datasets.
+    Only files under 'root' can be served.
+    """
+    def __init__(self, formatsMap, viewsMap, root, cache=None, metrics=None):
+        """
+        :Params:
+            formatsMap: `dict`
+                map of format names versus registered `al_contacts.format.Format` objects.
+            viewsMap: `dict`
+                map of view names versus registered `al_contacts.view.View` objects.
+            root: `str`
+                directory the served dataset files must be in.
+            cache: `al_contacts.server.DatasetCache`
+                cache of the deserialised datasets. Defaults to a new DatasetCache.
+            metrics: `al_contacts.metrics.MetricsRegistry`
+                registry served on '/metrics', the statistics of the cache are added to it.
+                Defaults to a new MetricsRegistry.
+        """
+        self.formatsMap = formatsMap
+        self.viewsMap = viewsMap
+        self.root = os.path.realpath(root)
+        self.cache = cache if cache is not None else DatasetCache()
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.metrics.add_collector(cache_collector(self.cache))
+
+
+    def __str__(self):
+        return 'contacts service'
+
+
+    def __repr__(self):
+        return 'contacts service'
+
+
+    def dataset(self, formatName, path):
+        """
+        Return the deserialised dataset for 'path', relative to the root directory.
+        """
+        if formatName not in self.formatsMap.keys():
+            raise ServerException('Invalid format specified: "{0}"'.format(formatName))
+
+        filepath = os.path.realpath(os.path.join(self.root, path or ''))
+        if os.path.commonpath([self.root, filepath]) != self.root or not os.path.isfile(filepath):
+            raise ServerException('Invalid dataset path specified: "{0}"'.format(path))
+
+        formatObj = self.formatsMap[formatName]
+        return self.cache.get(formatName, filepath, lambda filepath: formatObj.notify_rw('deserialise', filepath))
+
+
+    def page(self, formatName, path, page=1, size=50):
+        """
+        Return a page of a dataset, together with the total number of records.
+        """
+        if page < 1 or size < 1:
+            raise ServerException('Page and page size must be positive numbers')
+
+        data = self.dataset(formatName, path)
+        start = (page - 1) * size
+        return {'page': page, 'size': size, 'total': len(data), 'records': data[start:start + size]}
+
+
+    def lookup(self, formatName, path, field, value):
+        """
+        Return the records of a dataset whose 'field' equals 'value'.
+        """
+        data = self.dataset(formatName, path)
+        return [item for item in data if item.get(field) == value]
+
+
+    def render(self, formatName, path, viewName, page=1, size=50):
+        """
+        Render a page of a dataset in one of the registered views.
+        """
+        if viewName not in self.viewsMap.keys():
+            raise ServerException('Invalid view specified: "{0}"'.format(viewName))
+        records = self.page(formatName, path, page, size)['records']
+        with stage('view.render', viewName) as aStage:
+            aStage.records = len(records)
+            return self.viewsMap[viewName].render(records)
+
+
+class ContactsRequestHandler(BaseHTTPRequestHandler):
+    """
+    This class maps the http requests on to the ContactsService of the server.
+
+    GET /formats                                            list of format names
+    GET /views                                              list of view names
+    GET /cache                                              dataset cache statistics
+    GET /metrics                                            metrics in the Prometheus text format
+    GET /page?format=&path=&page=&size=                     a page of the records of a dataset
+    GET /lookup?format=&path=&field=&value=                 records whose field equals value
+    GET /render?format=&path=&view=&page=&size=             a page rendered in a view, as text
+    """
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = dict((key, values[-1]) for key, values in parse_qs(url.query).items())
+        service = self.server.service
+
+        try:
+            if url.path == '/formats':
+                self._send_json(sorted(service.formatsMap.keys()))
+            elif url.path == '/views':
+                self._send_json(sorted(service.viewsMap.keys()))
+            elif url.path == '/cache':
+                self._send_json(service.cache.stats())
+            elif url.path == '/metrics':
+                self._send(200, CONTENT_TYPE, service.metrics.to_prometheus())
+            elif url.path == '/page':
+                self._send_json(service.page(
+                    query.get('format'), query.get('path'),
+                    int(query.get('page', 1)), int(query.get('size', 50))))
+            elif url.path == '/lookup':
+                self._send_json(service.lookup(
+                    query.get('format'), query.get('path'), query.get('field', 'name'), query.get('value')))
+            elif url.path == '/render':
+                self._send(200, 'text/plain; charset=utf-8', service.render(
+                    query.get('format'), query.get('path'), query.get('view'),
+                    int(query.get('page', 1)), int(query.get('size', 50))))
+            else:
+                self._send_json({'error': 'Not found: "{0}"'.format(url.path)}, 404)
+        except (ServerException, ValueError) as e:
+            self._send_json({'error': str(e)}, 400)
+        except Exception as e:
+            self._send_json({'error': '{0}: {1}'.format(type(e).__name__, e)}, 500)
+
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+    def _send_json(self, body, status=200):
+        self._send(status, 'application/json', json.dumps(body))
+
+
+    def _send(self, status, contentType, body):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(service, host='127.0.0.1', port=8080, quiet=False):
+    """
+    Make a threading http server for 'service'. Call serve_forever() on it to start serving.
+
+    :Params:
+        service: `al_contacts.server.ContactsService`
+            the service answering the requests.
+        host: `str`
+            address to listen on.
+        port: `int`
+            port to listen on, 0 picks a free port.
+        quiet: `bool`
+            do not log the requests to stderr.
+    """
+    server = ThreadingHTTPServer((host, port), ContactsRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    return server
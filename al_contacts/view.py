@@ -1,5 +1,11 @@
 #! /usr/bin/env python
 
+import logging
+
+from al_contacts.instrumentation import stage
+
+logger = logging.getLogger(__name__)
+
 
 class ViewException(Exception):
     """
@@ -42,7 +48,9 @@ class View:
         if not isinstance(data, list):
             raise ViewException('Data supplied must be a list of dictionaries')
 
-        self._display(data)
+        with stage('view.display', str(self)) as aStage:
+            aStage.records = len(data)
+            self._display(data)
 
 
     def _display(self, data):
@@ -54,10 +62,22 @@ class View:
             data: `list`
                 data is a list of dictionaries with with keys = ['name', 'address', 'phone']
         """
-        print('View._display() needs to be implemented by the subclasses')
+        logger.warning('View._display() needs to be implemented by the subclasses')
         pass
 
 
+    def render(self, data):
+        """
+        This method returns the display of 'data' as a string instead of printing it, e.g. for
+        serving it over http. This method needs to be implemented by the subclasses.
+
+        :Params:
+            data: `list`
+                data is a list of dictionaries with with keys = ['name', 'address', 'phone']
+        """
+        raise ViewException('"{0}" view does not support rendering'.format(self))
+
+
 class TableView(View):
     """
     This class inherits from 'View' class, that defines common methods for all
@@ -82,13 +102,26 @@ class TableView(View):
             data: `list`
                 data is a list of dictionaries with with keys = ['name', 'address', 'phone']
         """
-        print('\n\nContact Details in Table View:')
-        print('-'*98)
-        print('| {0:<5} | {1:<15} | {2:<50} | {3:<15} |'.format('Index', 'Name', 'Address', 'Phone'))
-        print('-'*98)
+        print(self.render(data))
+
+
+    def render(self, data):
+        """
+        Implementation of base class render() method.
+        This method returns the Table Format display of the input data as a string.
+
+        :Params:
+            data: `list`
+                data is a list of dictionaries with with keys = ['name', 'address', 'phone']
+        """
+        lines = ['\n\nContact Details in Table View:']
+        lines.append('-'*98)
+        lines.append('| {0:<5} | {1:<15} | {2:<50} | {3:<15} |'.format('Index', 'Name', 'Address', 'Phone'))
+        lines.append('-'*98)
         for index, item in enumerate(data):
-            print('| {0:<5} | {1:<15} | {2:<50} | {3:<15} |'.format(index+1, item['name'], item['address'], item['phone']))
-        print('-'*98)
+            lines.append('| {0:<5} | {1:<15} | {2:<50} | {3:<15} |'.format(index+1, item['name'], item['address'], item['phone']))
+        lines.append('-'*98)
+        return '\n'.join(lines)
 
 
 class ListView(View):
@@ -115,11 +148,24 @@ class ListView(View):
             data: `list`
                 data is a list of dictionaries with with keys = ['name', 'address', 'phone']
         """
-        print('\n\nContact Details in List View:')
-        print('-'*28)
+        print(self.render(data))
+
+
+    def render(self, data):
+        """
+        Implementation of base class render() method.
+        This method returns the List Format display of the input data as a string.
+
+        :Params:
+            data: `list`
+                data is a list of dictionaries with with keys = ['name', 'address', 'phone']
+        """
+        lines = ['\n\nContact Details in List View:']
+        lines.append('-'*28)
         for index, item in enumerate(data):
-            print('Index: {0}'.format(index+1))
-            print('Name: {0}'.format(item['name']))
-            print('Address: {0}'.format(item['address']))
-            print('Phone: {0}'.format(item['phone']))
-            print('\n')
+            lines.append('Index: {0}'.format(index+1))
+            lines.append('Name: {0}'.format(item['name']))
+            lines.append('Address: {0}'.format(item['address']))
+            lines.append('Phone: {0}'.format(item['phone']))
+            lines.append('\n')
+        return '\n'.join(lines)
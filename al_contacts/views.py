@@ -1,5 +1,14 @@
 #! /usr/bin/env python
 
+import logging
+import threading
+from collections import OrderedDict
+
+from al_contacts.plugins import load_object
+from al_contacts.instrumentation import stage
+
+logger = logging.getLogger(__name__)
+
 
 class ViewsException(Exception):
     """
@@ -15,14 +24,20 @@ class Views:
     Any View class can register itself with this class using the register_view() method
     a View can un-register itself using the unregister_view() method
     This class can send notifications to the view classes using notify_views() method
+    Views can also be declared by name using the declare_view() method, in which case they are
+    imported, instantiated and registered only on first use.
     """
-    def __init__(self, data=[]):
+    def __init__(self, data=None):
         """
         :Params:
             data: `list`
                 data is a list of dictionaries with with keys = ['name', 'address', 'phone']
         """
         self.views = []
+        self._declared = OrderedDict()
+        self._lock = threading.RLock()
+        if data is None:
+            data = []
         if not isinstance(data, list):
             raise ViewsException('Views object instantiation Failed. Data supplied must be a list of dictionaries')
         self.data = data
@@ -48,7 +63,7 @@ class Views:
         if view in self.views:
             raise ViewsException('"{0}" view already registered with "{1}".'.format(view, self))
 
-        print('Registering "{0}" view with "{1}"'.format(view, self))
+        logger.info('Registering "%s" view with "%s"', view, self)
         self.views.append(view)
 
 
@@ -65,11 +80,62 @@ class Views:
         if view not in self.views:
             raise ViewsException('"{0}" view is not registered with "{1}".'.format(view, self))
 
-        print('Unregistering "{0}" view from "{1}"'.format(view, self))
+        logger.info('Unregistering "%s" view from "%s"', view, self)
         self.views.pop(self.views.index(view))
             
     
-    def notify_views(self, view=''):
+    def declare_view(self, name, viewClass):
+        """
+        Declare a view by name without importing or instantiating it. The view is created and
+        registered with this class the first time it is asked for.
+
+        :Params:
+            name: `str`
+                name of the view, which must match the string representation of its instances.
+            viewClass: `str` or `callable`
+                'package.module:attribute' path of, or the, 'View' subclass or factory. It is
+                called with this object and must register the view with it.
+        """
+        with self._lock:
+            if name in self.names():
+                raise ViewsException('"{0}" view already registered with "{1}".'.format(name, self))
+            self._declared[name] = viewClass
+
+
+    def names(self):
+        """
+        Return the names of all the registered and declared views, without instantiating any of them.
+        """
+        names = [str(aView) for aView in self.views]
+        return names + [name for name in self._declared if name not in names]
+
+
+    def get_view(self, view):
+        """
+        Return the registered view named 'view'. A declared view is instantiated and registered
+        on first use.
+
+        :Params:
+            view: `str`
+                string representation for a registered or declared `al_contacts.view.View` instance.
+        """
+        with self._lock:
+            for aView in self.views:
+                if str(aView) == view:
+                    return aView
+
+            if isinstance(view, str) and view in self._declared:
+                aView = load_object(self._declared[view])(self)
+                if str(aView) != view:
+                    self.unregister_view(aView)
+                    raise ViewsException('View declared as "{0}" registered as "{1}"'.format(view, aView))
+                del self._declared[view]
+                return aView
+
+        raise ViewsException('There is no view named "{0}" registered with "{1}" currently'.format(view, self))
+
+
+    def notify_views(self, view='', data=None):
         """
         This method sends notifications to the all instances of `al_contacts.view.View` that are
         registered with this class.
@@ -82,7 +148,19 @@ class Views:
         :Params:
             view: `str`
                 string representation for a registered `al_contacts.view.View` instance.
+            data: `list`
+                per-call data to be displayed. Defaults to self.data
         """
+        if data is None:
+            data = self.data
+
+        # instantiate the declared views that are about to be notified
+        if isinstance(view, str) and view in self._declared:
+            self.get_view(view)
+        elif not view:
+            for name in list(self._declared):
+                self.get_view(name)
+
         if not self.views:
             raise ViewsException('There are no Views registered with "{0}" currently'.format(self))
 
@@ -93,10 +171,32 @@ class Views:
             if view not in [str(aView) for aView in self.views]:
                 raise ViewsException('There is no view named "{0}" registered with "{0}" currently'.format(view, self))
 
-            for aView in self.views:
-                if str(aView) == view:
-                    aView.notify(self, self.data)
-                    break
+            with stage('views.notify', view):
+                for aView in self.views:
+                    if str(aView) == view:
+                        aView.notify(self, data)
+                        break
         else:
-            for aView in self.views:
-                aView.notify(self, self.data)
+            with stage('views.notify'):
+                for aView in self.views:
+                    aView.notify(self, data)
+
+
+    async def anotify_views(self, view='', data=None, executor=None):
+        """
+        Asynchronous counterpart of notify_views(). The views are rendered in 'executor' so that
+        the display does not block the event loop.
+
+        :Params:
+            view: `str`
+                string representation for a registered `al_contacts.view.View` instance.
+            data: `list`
+                per-call data to be displayed. Defaults to self.data
+            executor: `concurrent.futures.Executor`
+                executor to render the views in. Defaults to the default executor of the running loop.
+        """
+        # imported here, asyncio is slow to import and the CLI never needs it
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, self.notify_views, view, data)
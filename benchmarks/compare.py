@@ -0,0 +1,23 @@
+#! /usr/bin/env python
+"""
+Performance regression gate: runs again the benchmarks of the committed baseline report and
+exits non-zero when an action got slower, or uses more memory, beyond the thresholds.
+
+> python benchmarks/compare.py
+> python benchmarks/compare.py --threshold 5 --memory-threshold 20 --repeat 9
+> python benchmarks/compare.py --update
+
+Absolute timings depend on the machine, regenerate the baseline with '--update' on the machine
+running the gate.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from al_contacts.regression import main
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#! /usr/bin/env python
+"""
+Benchmark of the contact json codec against the stdlib json path.
+
+Encodes and decodes synthetic contacts both ways, checks that the codec writes the same bytes
+as json.dump() and reads back the same records, and reports the best time of each.
+
+> python benchmarks/jsoncodec.py --rows 100K --repeat 5
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from al_contacts.benchmark import generate_contacts, parse_rows
+from al_contacts.jsoncodec import encode_contact_items, iter_encode_contacts
+from al_contacts.reader_writer import _iter_json_array
+
+BATCH_SIZE = 1000
+
+
+def best_time(function, repeat):
+    """
+    Return the result of the function and the best wall time of 'repeat' runs of it.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def cases(data, text):
+    """
+    Return the (name, stdlib function, codec function) cases to compare.
+    """
+    batches = [data[start:start + BATCH_SIZE] for start in range(0, len(data), BATCH_SIZE)]
+
+    def dump(fp):
+        json.dump(data, fp)
+        return fp.getvalue()
+
+    def write(fp):
+        fp.writelines(iter_encode_contacts(data))
+        return fp.getvalue()
+
+    def stream(bulk):
+        return [item for batch in _iter_json_array(io.StringIO(text), BATCH_SIZE, bulk=bulk) for item in batch]
+
+    return [
+        ('serialise', lambda: dump(io.StringIO()), lambda: write(io.StringIO())),
+        ('encode batches', lambda: [json.dumps(batch)[1:-1] for batch in batches],
+         lambda: [encode_contact_items(batch) for batch in batches]),
+        ('stream batches', lambda: stream(False), lambda: stream(True)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the contact json codec against the stdlib json path')
+    parser.add_argument('--rows', type=parse_rows, default=100000, help='Number of contacts, e.g. 100K. Defaults to 100K')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs of each case. Defaults to 5')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generated contacts. Defaults to 0')
+    args = parser.parse_args()
+
+    data = generate_contacts(args.rows, args.seed)
+    text = json.dumps(data)
+    print('{0} contacts, {1:.1f} MB of json'.format(args.rows, len(text) / 1048576.0))
+    print('{0:<16} {1:>10} {2:>10} {3:>8}'.format('case', 'json', 'codec', 'speedup'))
+    for name, stdlib, codec in cases(data, text):
+        expected, stdlibTime = best_time(stdlib, args.repeat)
+        result, codecTime = best_time(codec, args.repeat)
+        if result != expected:
+            sys.exit('The codec output differs from the json output for "{0}"'.format(name))
+        print('{0:<16} {1:>8.1f}ms {2:>8.1f}ms {3:>7.2f}x'.format(name, stdlibTime * 1000, codecTime * 1000, stdlibTime / codecTime))
+
+
+if __name__ == '__main__':
+    main()
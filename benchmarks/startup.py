@@ -0,0 +1,74 @@
+#! /usr/bin/env python
+"""
+Start up benchmark of the 'al_contacts' command line app.
+
+Runs 'al_contacts --help' (or the given arguments) a number of times in fresh interpreters and
+reports the wall time, the slowest imports and whether the json/pickle/csv machinery got imported.
+
+> python benchmarks/startup.py --runs 20
+> python benchmarks/startup.py --runs 5 -- json deserialise
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import statistics
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(PACKAGE_ROOT, 'scripts', 'al_contacts')
+WATCHED_MODULES = ['json', 'pickle', 'csv', 'asyncio', 'multiprocessing']
+
+
+def run_script(argv, extraOptions=()):
+    """
+    Run the app in a fresh interpreter and return (wall time in seconds, stderr).
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([PACKAGE_ROOT, env.get('PYTHONPATH', '')])
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable] + list(extraOptions) + [SCRIPT] + list(argv),
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env, universal_newlines=True)
+    return time.perf_counter() - start, process.stderr
+
+
+def import_times(argv):
+    """
+    Return {module: cumulative import time in microseconds} of a run of the app.
+    """
+    times = {}
+    for line in run_script(argv, ['-X', 'importtime'])[1].splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = [part.strip() for part in line[len('import time:'):].split('|')]
+        if parts[0].isdigit():
+            times[parts[2]] = int(parts[1])
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Start up benchmark of the "al_contacts" command line app')
+    parser.add_argument('--runs', type=int, default=10, help='Number of runs. Defaults to 10')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to list. Defaults to 10')
+    parser.add_argument('argv', nargs='*', default=['--help'], help='Arguments of the app. Defaults to --help')
+    args = parser.parse_args()
+
+    # one warm up run, so the timings do not include compiling the byte code
+    run_script(args.argv)
+    wallTimes = [run_script(args.argv)[0] for _ in range(args.runs)]
+    print('al_contacts {0}: {1} runs, min {2:.1f} ms, median {3:.1f} ms'.format(
+        ' '.join(args.argv), args.runs, min(wallTimes) * 1000, statistics.median(wallTimes) * 1000))
+
+    times = import_times(args.argv)
+    print('\nSlowest imports (cumulative):')
+    for module, micros in sorted(times.items(), key=lambda item: -item[1])[:args.top]:
+        print('  {0:<40} {1:>8.1f} ms'.format(module, micros / 1000.0))
+
+    print('\nWatched modules:')
+    for module in WATCHED_MODULES:
+        print('  {0:<40} {1}'.format(module, 'imported' if module in times else 'not imported'))
+
+
+if __name__ == '__main__':
+    main()
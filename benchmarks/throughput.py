@@ -0,0 +1,21 @@
+#! /usr/bin/env python
+"""
+Throughput benchmark of the registered formats and views, on synthetic contacts.
+
+Measures serialise/deserialise throughput, file size and peak RSS of each format and the render
+throughput of each view, each in a fresh interpreter, and writes a json report.
+
+> python benchmarks/throughput.py --rows 1K 100K 1M --output report.json
+> python benchmarks/throughput.py --rows 10M --formats pickle --views
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from al_contacts.benchmark import main
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,206 @@
 #!/usr/bin/env python
 
-# Integration tests can come here.
\ No newline at end of file
+# Integration tests can come here.
+
+import sys
+import os
+import unittest
+import shutil
+import tempfile
+import subprocess
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(PACKAGE_ROOT, 'scripts', 'al_contacts')
+
+
+# an installed distribution declaring a format and a view plugin, see make_plugin_dist()
+PLUGIN_MODULE = """
+import sys
+from al_contacts.format import Format
+from al_contacts.reader_writer import JsonRW
+from al_contacts.view import ListView
+
+class YamlFormat(Format):
+    def __str__(self):
+        return 'yaml'
+
+    def __repr__(self):
+        return 'yaml'
+
+def make_yaml_format(formats):
+    yamlFormat = YamlFormat(formats)
+    JsonRW(yamlFormat)
+    return yamlFormat
+
+class BulletView(ListView):
+    def __str__(self):
+        return 'bullet'
+
+    def __repr__(self):
+        return 'bullet'
+"""
+
+PLUGIN_ENTRY_POINTS = """
+[al_contacts.formats]
+yaml = fakeplugin:make_yaml_format
+
+[al_contacts.views]
+bullet = fakeplugin:BulletView
+"""
+
+
+def make_plugin_dist(directory):
+    """
+    Write a 'fakeplugin' module and its distribution metadata, with entry points, to 'directory'.
+    """
+    distInfo = os.path.join(directory, 'fakeplugin-1.0.dist-info')
+    os.makedirs(distInfo)
+    with open(os.path.join(distInfo, 'METADATA'), 'w') as fp:
+        fp.write('Metadata-Version: 2.1\nName: fakeplugin\nVersion: 1.0\n')
+    with open(os.path.join(distInfo, 'entry_points.txt'), 'w') as fp:
+        fp.write(PLUGIN_ENTRY_POINTS)
+    with open(os.path.join(directory, 'fakeplugin.py'), 'w') as fp:
+        fp.write(PLUGIN_MODULE)
+
+
+def run_python(code, paths=None, cacheFile=None):
+    """
+    Run 'code' in a fresh interpreter with the package and 'paths' on the path and return its stdout.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([PACKAGE_ROOT] + (paths or []) + [env.get('PYTHONPATH', '')])
+    if cacheFile:
+        env['AL_CONTACTS_PLUGINS_CACHE'] = cacheFile
+    return subprocess.check_output([sys.executable, '-c', code], env=env, universal_newlines=True)
+
+
+class TestStartup(unittest.TestCase):
+    """
+    Test Cases for the lazy start up of the 'al_contacts' app
+    """
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.cacheFile = os.path.join(self.tmpDir, 'plugins.cache')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+
+    def testHelpDoesNotImportSerialisationMachinery(self):
+        """
+        test 'al_contacts --help' does not import json, pickle or csv, once the plugins are cached.
+        """
+        code = '\n'.join([
+            'import sys, runpy',
+            'sys.argv = ["al_contacts", "--help"]',
+            'try:',
+            '    runpy.run_path({0!r}, run_name="__main__")'.format(SCRIPT),
+            'except SystemExit:',
+            '    pass',
+            'print("modules:" + ",".join(m for m in ("json", "pickle", "csv") if m in sys.modules))',
+        ])
+        run_python(code, cacheFile=self.cacheFile)
+        self.assertEqual(run_python(code, cacheFile=self.cacheFile).splitlines()[-1], 'modules:')
+
+
+    def testCommonRegistersNothingUntilUsed(self):
+        """
+        test importing al_contacts.common lists the formats and views without instantiating them.
+        """
+        code = '\n'.join([
+            'import sys',
+            'from al_contacts.common import dataFormats, dataViews, FORMATS_MAP, VIEWS_MAP',
+            'print(sorted(FORMATS_MAP.keys()), sorted(VIEWS_MAP.keys()), dataFormats.formats, dataViews.views)',
+            'print(str(FORMATS_MAP["pickle"].rw), dataFormats.formats)',
+        ])
+        output = run_python(code, cacheFile=self.cacheFile).splitlines()
+        self.assertEqual(output[0], "['binary', 'csv', 'json', 'pickle'] ['list', 'table'] [] []")
+        self.assertEqual(output[-1], 'Pickle reader/writer [pickle]')
+
+
+class TestPlugins(unittest.TestCase):
+    """
+    Test Cases for the formats and views of third-party packages declared through entry points
+    """
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.cacheFile = os.path.join(self.tmpDir, 'plugins.cache')
+        self.siteDir = os.path.join(self.tmpDir, 'site')
+        make_plugin_dist(self.siteDir)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+
+    def testPluginsListedWithoutImport(self):
+        """
+        test the plugins are listed in the help without importing them.
+        """
+        code = '\n'.join([
+            'import sys, runpy',
+            'sys.argv = ["al_contacts", "--help"]',
+            'try:',
+            '    runpy.run_path({0!r}, run_name="__main__")'.format(SCRIPT),
+            'except SystemExit:',
+            '    pass',
+            'print("fakeplugin" in sys.modules)',
+        ])
+        output = run_python(code, [self.siteDir], self.cacheFile)
+        self.assertIn("'yaml'", output)
+        self.assertIn("'bullet'", output)
+        self.assertEqual(output.splitlines()[-1], 'False')
+
+
+    def testOnlySelectedPluginImported(self):
+        """
+        test a plugin format is imported and registered only when it is used.
+        """
+        code = '\n'.join([
+            'import sys',
+            'from al_contacts.common import dataFormats, dataViews, FORMATS_MAP, VIEWS_MAP',
+            'print(sorted(FORMATS_MAP.keys()), sorted(VIEWS_MAP.keys()), "fakeplugin" in sys.modules)',
+            'print(FORMATS_MAP["yaml"], FORMATS_MAP["yaml"].rw, VIEWS_MAP["bullet"], dataFormats.formats)',
+        ])
+        output = run_python(code, [self.siteDir], self.cacheFile).splitlines()
+        self.assertEqual(output[0], "['binary', 'csv', 'json', 'pickle', 'yaml'] ['bullet', 'list', 'table'] False")
+        self.assertEqual(output[-1], 'yaml json reader/writer bullet [yaml]')
+
+
+
+class TestMetricsFile(unittest.TestCase):
+    """
+    Test Cases for the '--metrics-file' option of the 'al_contacts' app
+    """
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.cacheFile = os.path.join(self.tmpDir, 'plugins.cache')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+
+    def testCacheStatisticsExported(self):
+        """
+        test '--metrics-file' exports the statistics of the '--cache-dir' cache.
+        """
+        metricsFile = os.path.join(self.tmpDir, 'al_contacts.prom')
+        argv = ['al_contacts', 'json', 'deserialise', '--cache-dir', os.path.join(self.tmpDir, 'cache'),
+                '--metrics-file', metricsFile]
+        code = '\n'.join([
+            'import sys, runpy',
+            'sys.argv = {0!r}'.format(argv),
+            'runpy.run_path({0!r}, run_name="__main__")'.format(SCRIPT),
+        ])
+        run_python(code, cacheFile=self.cacheFile)
+        run_python(code, cacheFile=self.cacheFile)
+        with open(metricsFile) as fp:
+            text = fp.read()
+        self.assertIn('al_contacts_cache_hits_total{cache="deserialise"} 1', text)
+        self.assertIn('al_contacts_cache_misses_total{cache="deserialise"} 0', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
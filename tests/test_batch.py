@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import unittest
+import tempfile
+import json
+import shutil
+
+# import functions from al_contacts.batch
+from al_contacts.batch import BatchException
+from al_contacts.batch import collect_inputs
+from al_contacts.batch import plan_jobs
+from al_contacts.batch import run_batch
+from al_contacts.batch import format_summary
+from al_contacts.constants import CSV_INPUT_FILE
+
+
+class TestBatch(unittest.TestCase):
+    """
+    Test Cases for the batch job functions in al_contacts.batch
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.inputs = []
+        for index in range(3):
+            path = os.path.join(self.tmpDirPath, 'contacts{0}.csv'.format(index))
+            shutil.copy(CSV_INPUT_FILE, path)
+            self.inputs.append(path)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    ######################################################################
+    # tests for al_contacts.batch.collect_inputs()                       #
+    ######################################################################
+
+    def testCollectInputsFromGlobAndManifest(self):
+        """
+        test collect_inputs() with a glob pattern and a manifest, without duplicates.
+        """
+        manifest = os.path.join(self.tmpDirPath, 'manifest.txt')
+        with open(manifest, 'w') as fp:
+            fp.write('# inputs\n\ncontacts0.csv\n')
+
+        inputs = collect_inputs([os.path.join(self.tmpDirPath, '*.csv')], manifest)
+        self.assertEqual(inputs, self.inputs)
+
+
+    def testCollectInputsWithUnmatchedPatternOrMissingManifest(self):
+        """
+        test collect_inputs() with a pattern that matches nothing and a missing manifest.
+        """
+        self.assertRaises(BatchException, collect_inputs, [os.path.join(self.tmpDirPath, '*.xxx')])
+        self.assertRaises(BatchException, collect_inputs, [], os.path.join(self.tmpDirPath, 'missing'))
+
+
+    ######################################################################
+    # tests for al_contacts.batch.plan_jobs()                            #
+    ######################################################################
+
+    def testPlanJobsWithCollidingOutputs(self):
+        """
+        test plan_jobs() refuses to write two inputs to the same output.
+        """
+        other = os.path.join(self.tmpDirPath, 'other')
+        os.makedirs(other)
+        shutil.copy(self.inputs[0], other)
+        inputs = [self.inputs[0], os.path.join(other, 'contacts0.csv')]
+        self.assertRaises(BatchException, plan_jobs, inputs, ['json'], self.tmpDirPath)
+
+
+    def testPlanJobsWithNoInputsOrFormats(self):
+        """
+        test plan_jobs() with no inputs or no formats.
+        """
+        self.assertRaises(BatchException, plan_jobs, [], ['json'], self.tmpDirPath)
+        self.assertRaises(BatchException, plan_jobs, self.inputs, [], self.tmpDirPath)
+
+
+    ######################################################################
+    # tests for al_contacts.batch.run_batch()                            #
+    ######################################################################
+
+    def testRunBatchWithProcessPool(self):
+        """
+        test run_batch() serialises every input to every format through the process pool.
+        """
+        outputDir = os.path.join(self.tmpDirPath, 'out')
+        results = run_batch(self.inputs, ['json', 'pickle'], outputDir, workers=2)
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual([result['error'] for result in results], [''] * 6)
+        self.assertEqual(set(result['rows'] for result in results), set([10]))
+        with open(os.path.join(outputDir, 'contacts2.json'), 'r') as fp:
+            self.assertEqual(len(json.load(fp)), 10)
+
+
+    def testRunBatchReportsFailedJobs(self):
+        """
+        test run_batch() records a failing job instead of stopping the batch.
+        """
+        results = run_batch(self.inputs[:1], ['json', 'xxxx'], self.tmpDirPath, workers=1)
+        self.assertEqual(results[0]['error'], '')
+        self.assertTrue(results[1]['error'])
+        self.assertIn('1 failed', format_summary(results))
+
+
+if __name__ == '__main__':
+    unittest.main()
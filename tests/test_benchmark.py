@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# import functions from al_contacts.benchmark
+from al_contacts.benchmark import BenchmarkException
+from al_contacts.benchmark import generate_contacts
+from al_contacts.benchmark import iter_contacts
+from al_contacts.benchmark import parse_rows
+from al_contacts.benchmark import run_action
+from al_contacts.benchmark import run_benchmarks
+from al_contacts.benchmark import write_report
+from al_contacts.benchmark import read_report
+from al_contacts.benchmark import format_result
+from al_contacts.contacts import CONTACT_KEYS
+
+
+class TestGenerateContacts(unittest.TestCase):
+    """
+    Test Cases for the functions al_contacts.benchmark.generate_contacts() and iter_contacts()
+    """
+    def testGenerateContactsIsDeterministic(self):
+        """
+        test the same seed generates the same contacts, whatever the batch size.
+        """
+        data = generate_contacts(25000, seed=7)
+        self.assertEqual(len(data), 25000)
+        self.assertEqual(list(data[0].keys()), CONTACT_KEYS)
+        self.assertEqual(data, generate_contacts(25000, seed=7))
+        self.assertNotEqual(data, generate_contacts(25000, seed=8))
+        self.assertEqual([item for batch in iter_contacts(25000, 7, 999) for item in batch], data)
+
+
+    def testIterContactsBatches(self):
+        """
+        test iter_contacts() yields batches of at most the batch size.
+        """
+        self.assertEqual([len(batch) for batch in iter_contacts(25, batchSize=10)], [10, 10, 5])
+        self.assertEqual(list(iter_contacts(0)), [])
+        self.assertRaises(BenchmarkException, list, iter_contacts(10, batchSize=0))
+
+
+class TestParseRows(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.benchmark.parse_rows()
+    """
+    def testParseRows(self):
+        """
+        test parse_rows() with plain numbers and K/M suffixes.
+        """
+        self.assertEqual([parse_rows(text) for text in ['1000', '1K', '2.5k', '10M']], [1000, 1000, 2500, 10000000])
+        for text in ['', 'xK', '0', '-5']:
+            self.assertRaises(BenchmarkException, parse_rows, text)
+
+
+class TestRunBenchmarks(unittest.TestCase):
+    """
+    Test Cases for the functions al_contacts.benchmark.run_action() and run_benchmarks()
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def testRunAction(self):
+        """
+        test run_action() measures serialise, deserialise and render in the current process.
+        """
+        path = os.path.join(self.tmpDirPath, 'contacts.json')
+        serialise = run_action('format', 'json', 'serialise', 100, 0, path, 2)
+        self.assertEqual(len(serialise['samples']), 2)
+        self.assertEqual(serialise['seconds'], min(serialise['samples']))
+        self.assertEqual(serialise['bytes'], os.path.getsize(path))
+        deserialise = run_action('format', 'json', 'deserialise', 100, 0, path, 1)
+        self.assertEqual(deserialise['bytes'], serialise['bytes'])
+        render = run_action('view', 'list', 'render', 100, 0, '', 1)
+        self.assertGreater(render['bytes'], 0)
+        self.assertRaises(BenchmarkException, run_action, 'format', 'json', 'render', 100, 0, path, 1)
+
+
+    def testRunActionMemprofile(self):
+        """
+        test run_action() with 'memprofile' adds the memory of the action and of its stages.
+        """
+        path = os.path.join(self.tmpDirPath, 'contacts.json')
+        run_action('format', 'json', 'serialise', 100, 0, path, 1)
+        result = run_action('format', 'json', 'deserialise', 100, 0, path, 1, memprofile=True)
+        stats = dict((stats['stage'], stats) for stats in result['memory'])
+        self.assertEqual(stats['benchmark.deserialise']['records'], 100)
+        self.assertGreater(stats['benchmark.deserialise']['retained_bytes'], 0)
+        self.assertGreaterEqual(stats['benchmark.deserialise']['peak_bytes'], stats['rw.deserialise']['peak_bytes'])
+        self.assertIn('MB peak', format_result(result))
+        self.assertNotIn('memory', run_action('view', 'list', 'render', 100, 0, '', 1))
+
+
+    def testRunBenchmarksReport(self):
+        """
+        test run_benchmarks() measures every format and view and the report round trips.
+        """
+        report = run_benchmarks([50], ['pickle'], ['table'], repeat=1, workDir=self.tmpDirPath)
+        self.assertEqual([(result['name'], result['action']) for result in report['results']],
+                         [('pickle', 'serialise'), ('pickle', 'deserialise'), ('table', 'render')])
+        self.assertTrue(all(result['records_per_s'] > 0 for result in report['results']))
+
+        path = os.path.join(self.tmpDirPath, 'report.json')
+        write_report(report, path)
+        self.assertEqual(read_report(path), report)
+        self.assertRaises(BenchmarkException, run_benchmarks, [50], ['xxxx'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+
+import os
+import unittest
+import tempfile
+import shutil
+
+# import classes from al_contacts.bloom
+from al_contacts.bloom import BloomException
+from al_contacts.bloom import BloomFilter
+from al_contacts.bloom import BloomIndex
+from al_contacts.bloom import filter_path
+from al_contacts.bloom import may_contain
+from al_contacts.bloom import normalise_keys
+from al_contacts.bloom import read_filters
+from al_contacts.bloom import select_records
+from al_contacts.delta import DeltaStore
+from al_contacts.formats import Formats, FormatsException
+from al_contacts.format import JsonFormat, CsvFormat
+from al_contacts.reader_writer import JsonRW, CsvRW
+
+
+DATA = [
+    {'name': 'Rahul Singh', 'address': ' 28 Deanswood N112TQ', 'phone': '+91 98450 12345'},
+    {'name': 'James', 'address': ' Maidstone Road N221QQ', 'phone': '020 7946 0000'},
+    {'name': 'Albert', 'address': ' Queens Road CA-20001', 'phone': 'unknown'},
+]
+
+OTHER = [
+    {'name': 'Tom', 'address': ' London Bridge W1W3AD', 'phone': '0161 496 0000'},
+]
+
+
+class TestBloomFilter(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.bloom.BloomFilter
+    """
+    def testAddedKeysFound(self):
+        """
+        test BloomFilter finds every key added.
+        """
+        keys = ['key{0}'.format(index) for index in range(1000)]
+        aFilter = BloomFilter.for_capacity(len(keys), 0.01)
+        aFilter.add(keys + [None])
+        self.assertEqual(len(aFilter), 1000)
+        self.assertTrue(all(key in aFilter for key in keys))
+
+
+    def testFalsePositiveRate(self):
+        """
+        test BloomFilter.for_capacity() sizes the filter for the false positive rate.
+        """
+        aFilter = BloomFilter.for_capacity(5000, 0.01)
+        aFilter.add('key{0}'.format(index) for index in range(5000))
+        self.assertLessEqual(aFilter.false_positive_rate, 0.01)
+        falsePositives = sum('other{0}'.format(index) in aFilter for index in range(20000))
+        self.assertLess(falsePositives / 20000, 0.02)
+        self.assertLess(BloomFilter.for_capacity(5000, 0.1).blocks, aFilter.blocks)
+
+
+    def testBytes(self):
+        """
+        test BloomFilter.to_bytes() and from_bytes().
+        """
+        aFilter = BloomFilter.for_capacity(10)
+        aFilter.add(['a', 'b'])
+        payload = aFilter.to_bytes()
+        self.assertEqual(len(payload), aFilter.blocks * 8)
+        copy = BloomFilter.from_bytes(payload, 2)
+        self.assertEqual((copy.words, copy.count), (aFilter.words, 2))
+
+
+    def testInvalidArguments(self):
+        """
+        test BloomFilter with no blocks or an invalid false positive rate.
+        """
+        self.assertRaises(BloomException, BloomFilter, 0)
+        self.assertRaises(BloomException, BloomFilter.for_capacity, 10, 0)
+        self.assertRaises(BloomException, BloomFilter.for_capacity, 10, 1)
+
+
+class TestKeys(unittest.TestCase):
+    """
+    Test Cases for the key functions of al_contacts.bloom
+    """
+    def testNormaliseKeys(self):
+        """
+        test normalise_keys() normalises the phone numbers and the names.
+        """
+        self.assertEqual(normalise_keys('phone', ['020 7946 0000', '+44 (0)20-7946-0000', ' unknown ', None]),
+                         ['+442079460000', '+442079460000', 'unknown', None])
+        self.assertEqual(normalise_keys('phone', ['020 7946 0000'], '33'), ['+332079460000'])
+        self.assertEqual(normalise_keys('name', [' Rahul  SINGH', 42]), ['rahul singh', None])
+
+
+    def testSelectRecords(self):
+        """
+        test select_records() matches the normalised phone numbers and names.
+        """
+        self.assertEqual(select_records(DATA, {'phone': '+44 20 7946 0000'}), DATA[1:2])
+        self.assertEqual(select_records(DATA, {'name': 'rahul singh', 'phone': '+919845012345'}), DATA[:1])
+        self.assertEqual(select_records(DATA, {'address': ' Queens Road CA-20001'}), DATA[2:])
+        self.assertEqual(select_records(DATA, {'name': 'James', 'address': ''}), [])
+
+
+class TestBloomIndex(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.bloom.BloomIndex and the filter files
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.formats = Formats()
+        self.jsonRW = JsonRW(JsonFormat(self.formats))
+        self.csvRW = CsvRW(CsvFormat(self.formats))
+        self.filepath = self._path('contacts.json')
+        self.jsonRW.serialise(DATA, self.filepath)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def _path(self, name):
+        return os.path.join(self.tmpDirPath, name)
+
+
+    def testInvalidArguments(self):
+        """
+        test BloomIndex() with invalid fields or false positive rate.
+        """
+        self.assertRaises(BloomException, BloomIndex, ())
+        self.assertRaises(BloomException, BloomIndex, ('address',))
+        self.assertRaises(BloomException, BloomIndex, fpRate=1.5)
+
+
+    def testBuildAndRead(self):
+        """
+        test BloomIndex.build() writes the filters that read_filters() reads back.
+        """
+        path = BloomIndex(('phone', 'name')).build(DATA, self.filepath)
+        self.assertEqual(path, filter_path(self.filepath))
+        countryCode, filters = read_filters(self.filepath)
+        self.assertEqual(countryCode, '44')
+        self.assertEqual(sorted(filters), ['name', 'phone'])
+        self.assertIn('+442079460000', filters['phone'])
+        self.assertIn('albert', filters['name'])
+        self.assertEqual(len(filters['name']), 3)
+
+
+    def testMayContain(self):
+        """
+        test may_contain() rules out the values that are not in the filters.
+        """
+        BloomIndex(('phone',)).build(DATA, self.filepath)
+        self.assertTrue(may_contain(self.filepath, {'phone': '+44 20 7946 0000'}))
+        self.assertTrue(may_contain(self.filepath, {'phone': 'unknown'}))
+        self.assertFalse(may_contain(self.filepath, {'phone': '0161 496 0000'}))
+        self.assertFalse(may_contain(self.filepath, {'name': 'Tom', 'phone': '0161 496 0000'}))
+        # no filter over the names, or filters built with another country code
+        self.assertTrue(may_contain(self.filepath, {'name': 'Tom'}))
+        self.assertTrue(may_contain(self.filepath, {'phone': '0161 496 0000'}, '33'))
+
+
+    def testMissingOrStaleFilters(self):
+        """
+        test may_contain() and read_filters() without filters, or with the filters of a
+        previous version of the data file.
+        """
+        self.assertTrue(may_contain(self.filepath, {'phone': '0161 496 0000'}))
+        self.assertIsNone(read_filters(self.filepath))
+        BloomIndex().build(DATA, self.filepath)
+        self.jsonRW.serialise(DATA + OTHER, self.filepath)
+        self.assertIsNone(read_filters(self.filepath))
+        self.assertTrue(may_contain(self.filepath, {'phone': '0161 496 0000'}))
+
+
+    def testInvalidFilterFile(self):
+        """
+        test may_contain() raises BloomException for a file that is not a filter file.
+        """
+        with open(filter_path(self.filepath), 'wb') as fp:
+            fp.write(b'not a filter')
+        self.assertRaises(BloomException, may_contain, self.filepath, {'phone': '1'})
+        self.assertRaises(BloomException, read_filters, self.filepath)
+
+
+    def testNotifyBuildsFilters(self):
+        """
+        test ReaderWriter.notify() builds the filters of the files serialised when the
+        reader/writer has a Bloom index.
+        """
+        self.csvRW.bloom = BloomIndex()
+        filepath = self._path('contacts.csv')
+        self.formats.get_format('csv').notify_rw('serialise', OTHER, filepath)
+        self.assertTrue(os.path.exists(filter_path(filepath)))
+        self.assertTrue(may_contain(filepath, {'phone': '+441614960000'}))
+        self.assertFalse(may_contain(filepath, {'phone': '020 7946 0000'}))
+
+
+    def testLookup(self):
+        """
+        test Formats.lookup() only opens the files whose filters do not rule out the contact.
+        """
+        BloomIndex().build(DATA, self.filepath)
+        otherPath = self._path('other.csv')
+        self.csvRW.serialise(OTHER, otherPath)
+        BloomIndex().build(OTHER, otherPath)
+
+        opened = []
+        iter_batches = self.csvRW.iter_batches
+        self.csvRW.iter_batches = lambda filepath, batchSize: opened.append(filepath) or iter_batches(filepath, batchSize)
+        inputs = [self.filepath, ('csv', otherPath)]
+
+        self.assertEqual(self.formats.lookup(inputs, {'phone': '+44 20 7946 0000'}), DATA[1:2])
+        self.assertEqual(opened, [])
+        self.assertEqual(self.formats.lookup(inputs, {'phone': '01614960000'}), OTHER)
+        self.assertEqual(opened, [otherPath])
+        self.assertRaises(FormatsException, self.formats.lookup, inputs, {})
+        self.assertRaises(FormatsException, self.formats.lookup, [], {'phone': '1'})
+
+
+    def testLookupWithDeltas(self):
+        """
+        test Formats.lookup() reads the deltas of a file written by a delta store, and the filters
+        built before its latest delta are not used.
+        """
+        filepath = self._path('delta.json')
+        self.jsonRW.delta = DeltaStore()
+        self.jsonRW.bloom = BloomIndex()
+        jsonFormat = self.formats.get_format('json')
+        jsonFormat.notify_rw('serialise', DATA[:1], filepath)
+        jsonFormat.notify_rw('serialise', DATA, filepath)
+        self.assertFalse(may_contain(filepath, {'phone': '0161 496 0000'}))
+
+        # another process, whose reader/writer has no delta store
+        formats = Formats()
+        JsonRW(JsonFormat(formats))
+        self.assertEqual(formats.lookup([filepath], {'phone': '+44 20 7946 0000'}), DATA[1:2])
+
+        self.jsonRW.bloom = None
+        jsonFormat.notify_rw('serialise', DATA + OTHER, filepath)
+        self.assertIsNone(read_filters(filepath))
+        self.assertEqual(formats.lookup([filepath], {'phone': '0161 496 0000'}), OTHER)
+
+
+if __name__ == '__main__':
+    unittest.main()
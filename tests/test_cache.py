@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+
+import os
+import time
+import unittest
+import tempfile
+import shutil
+
+# import classes from al_contacts.cache
+from al_contacts.cache import CacheException
+from al_contacts.cache import DeserialisationCache
+from al_contacts.cache import SNAPSHOT_SUFFIX
+from al_contacts.cache import file_identity
+from al_contacts.formats import Formats
+from al_contacts.format import JsonFormat
+from al_contacts.reader_writer import JsonRW, ReaderWriterException
+
+
+DATA = [
+    {'name': 'Rahul Singh', 'address': ' 28 Deanswood N112TQ', 'phone': ' 0123456789'},
+    {'name': 'James', 'address': ' Maidstone Road N221QQ', 'phone': ' 01111222233'},
+    {'name': 'Albert', 'address': ' Queens Road CA-20001', 'phone': ' 99999999999'},
+]
+
+
+class TestDeserialisationCache(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.cache.DeserialisationCache
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.snapshotDir = os.path.join(self.tmpDirPath, 'snapshots')
+        self.loads = []
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def _file(self, name, content='x'):
+        path = os.path.join(self.tmpDirPath, name)
+        with open(path, 'w') as fp:
+            fp.write(content)
+        return path
+
+
+    def _loader(self, filepath):
+        self.loads.append(filepath)
+        return [dict(item) for item in DATA]
+
+
+    def _snapshots(self):
+        return sorted(name for name in os.listdir(self.snapshotDir) if name.endswith(SNAPSHOT_SUFFIX))
+
+
+    def testFileIdentity(self):
+        """
+        test file_identity() changes with the file and raises CacheException for a missing file.
+        """
+        path = self._file('a.json')
+        identity = file_identity(path)
+        self.assertEqual(identity[0], os.path.abspath(path))
+        self._file('a.json', 'a longer content')
+        self.assertNotEqual(file_identity(path), identity)
+        self.assertRaises(CacheException, file_identity, os.path.join(self.tmpDirPath, 'x'))
+
+
+    def testInvalidLimits(self):
+        """
+        test DeserialisationCache() with negative limits.
+        """
+        self.assertRaises(CacheException, DeserialisationCache, -1)
+        self.assertRaises(CacheException, DeserialisationCache, 1, None, -1)
+
+
+    def testGetHitsMemory(self):
+        """
+        test DeserialisationCache.get() loads a dataset once and then serves it from memory.
+        """
+        cache = DeserialisationCache(snapshotDir=self.snapshotDir)
+        path = self._file('a.json')
+        self.assertEqual(cache.get('json', path, self._loader), DATA)
+        self.assertIs(cache.get('json', path, self._loader), cache.get('json', path, self._loader))
+        self.assertEqual(self.loads, [path])
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['disk_hits'], stats['misses']), (2, 0, 1))
+
+
+    def testGetHitsSnapshotInNewCache(self):
+        """
+        test DeserialisationCache.get() loads the snapshot written by another cache.
+        """
+        path = self._file('a.json')
+        DeserialisationCache(snapshotDir=self.snapshotDir).get('json', path, self._loader)
+        self.assertEqual(len(self._snapshots()), 1)
+
+        cache = DeserialisationCache(snapshotDir=self.snapshotDir)
+        self.assertGreater(cache.stats()['disk_bytes'], 0)
+        self.assertEqual(cache.get('json', path, self._loader), DATA)
+        self.assertEqual(self.loads, [path])
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['disk_hits'], stats['misses']), (1, 1, 0))
+
+
+    def testSnapshotsOnlyWithoutMemoryTier(self):
+        """
+        test DeserialisationCache.get() with maxBytes 0 keeps nothing in memory but the snapshots.
+        """
+        cache = DeserialisationCache(0, self.snapshotDir)
+        path = self._file('a.json')
+        cache.get('json', path, self._loader)
+        cache.get('json', path, self._loader)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(self.loads, [path])
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+
+
+    def testChangedFileReplacesSnapshot(self):
+        """
+        test DeserialisationCache.get() loads a changed file again and replaces its snapshot.
+        """
+        cache = DeserialisationCache(snapshotDir=self.snapshotDir)
+        path = self._file('a.json')
+        cache.get('json', path, self._loader)
+        before = self._snapshots()
+        self._file('a.json', 'a longer content')
+        cache.get('json', path, self._loader)
+        after = self._snapshots()
+        self.assertEqual(len(self.loads), 2)
+        self.assertEqual(len(after), 1)
+        self.assertNotEqual(before, after)
+        # same file, other format
+        cache.get('csv', path, self._loader)
+        self.assertEqual(len(self._snapshots()), 2)
+
+
+    def testEvictsLeastRecentlyUsed(self):
+        """
+        test DeserialisationCache.get() evicts the least recently used datasets from memory.
+        """
+        paths = [self._file('{0}.json'.format(index)) for index in range(3)]
+        cache = DeserialisationCache(maxBytes=1)
+        for path in paths:
+            cache.get('json', path, self._loader)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+
+    def testEvictsLeastRecentlyUsedSnapshots(self):
+        """
+        test DeserialisationCache.get() deletes the oldest snapshots when over maxDiskBytes.
+        """
+        paths = [self._file('{0}.json'.format(index)) for index in range(3)]
+        cache = DeserialisationCache(0, self.snapshotDir, maxDiskBytes=1)
+        for path in paths:
+            cache.get('json', path, self._loader)
+            time.sleep(0.01)
+        self.assertEqual(len(self._snapshots()), 1)
+        stats = cache.stats()
+        self.assertEqual(stats['disk_evictions'], 2)
+        self.assertEqual(stats['disk_bytes'], os.path.getsize(os.path.join(self.snapshotDir, self._snapshots()[0])))
+        # the snapshot kept is the most recent one
+        cache.get('json', paths[-1], self._loader)
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+
+
+    def testNonContactDataNotSnapshotted(self):
+        """
+        test DeserialisationCache.get() keeps the datasets that are not contacts in memory only.
+        """
+        cache = DeserialisationCache(snapshotDir=self.snapshotDir)
+        path = self._file('a.json')
+        self.assertEqual(cache.get('json', path, lambda filepath: [{'id': 1}]), [{'id': 1}])
+        self.assertEqual(self._snapshots(), [])
+        self.assertEqual(cache.stats()['misses'], 1)
+
+
+    def testInvalidSnapshotDeleted(self):
+        """
+        test DeserialisationCache.get() deletes an invalid snapshot and loads the file again.
+        """
+        path = self._file('a.json')
+        DeserialisationCache(snapshotDir=self.snapshotDir).get('json', path, self._loader)
+        snapshot = os.path.join(self.snapshotDir, self._snapshots()[0])
+        with open(snapshot, 'wb') as fp:
+            fp.write(b'not a snapshot')
+
+        cache = DeserialisationCache(snapshotDir=self.snapshotDir)
+        self.assertEqual(cache.get('json', path, self._loader), DATA)
+        self.assertEqual(len(self.loads), 2)
+        self.assertEqual(cache.stats()['misses'], 1)
+        # written again
+        self.assertEqual(self._snapshots(), [os.path.basename(snapshot)])
+
+
+    def testClear(self):
+        """
+        test DeserialisationCache.clear() drops the datasets in memory and keeps the snapshots.
+        """
+        cache = DeserialisationCache(snapshotDir=self.snapshotDir)
+        path = self._file('a.json')
+        cache.get('json', path, self._loader)
+        cache.clear()
+        self.assertEqual((len(cache), cache.stats()['bytes']), (0, 0))
+        cache.get('json', path, self._loader)
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+
+
+    def testReaderWriterNotifyUsesCache(self):
+        """
+        test ReaderWriter.notify() deserialises through the cache of the reader/writer.
+        """
+        jsonFormat = JsonFormat(Formats())
+        rw = JsonRW(jsonFormat)
+        path = os.path.join(self.tmpDirPath, 'contacts.json')
+        jsonFormat.notify_rw('serialise', DATA, path)
+
+        rw.cache = DeserialisationCache(snapshotDir=self.snapshotDir)
+        self.assertEqual(jsonFormat.notify_rw('deserialise', path), DATA)
+        self.assertEqual(jsonFormat.notify_rw('deserialise', path), DATA)
+        stats = rw.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(len(self._snapshots()), 1)
+
+        rw.filepath = path
+        self.assertEqual(rw.cache.deserialise(rw, 'json'), DATA)
+        self.assertEqual(rw.data, DATA)
+        self.assertRaises(ReaderWriterException, rw.cache.deserialise, rw, 'json', os.path.join(self.tmpDirPath, 'x'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import shutil
+import pickle
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+# import classes and functions from al_contacts.columns
+from al_contacts.columns import ColumnsException
+from al_contacts.columns import ContactColumns
+from al_contacts.columns import BUFFER_ALIGNMENT
+from al_contacts.columns import buffers_path
+from al_contacts.columns import dump_columns
+from al_contacts.columns import load_columns
+
+
+def make_records(count, start=0):
+    return [
+        {'name': 'Zoë {0}'.format(index) if index % 3 == 0 else 'Contact {0}'.format(index),
+         'address': '{0} High Street'.format(index), 'phone': str(index)}
+        for index in range(start, start + count)
+    ]
+
+
+def dump_in_worker(filePath, start):
+    """
+    Write a columnar pickle file from a worker process
+    """
+    return dump_columns([make_records(5, start), make_records(3, start + 5)], filePath)
+
+
+class TestContactColumns(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.columns.ContactColumns
+    """
+    def setUp(self):
+        self.records = make_records(10)
+        self.columns = ContactColumns.from_records(self.records)
+
+
+    def testToRecords(self):
+        """
+        test the columns decode back to the records, in full or in part, ascii or not.
+        """
+        self.assertEqual(len(self.columns), 10)
+        self.assertEqual(self.columns.to_records(), self.records)
+        self.assertEqual(self.columns.to_records(4, 7), self.records[4:7])
+        self.assertEqual(self.columns.to_records(8, 20), self.records[8:])
+        self.assertEqual(self.columns.to_records(5, 5), [])
+        self.assertEqual(self.columns.column('phone', 1, 3), ['1', '2'])
+        self.assertEqual(self.columns.column('name', 2, 4), ['Contact 2', 'Zoë 3'])
+        self.assertEqual(list(self.columns), self.records)
+        self.assertEqual(ContactColumns.from_records([]).to_records(), [])
+
+
+    def testInvalidColumns(self):
+        """
+        test records without a key or with non string values and unknown columns raise ColumnsException.
+        """
+        self.assertRaises(ColumnsException, ContactColumns.from_records, [{'name': 'a', 'address': 'b'}])
+        self.assertRaises(ColumnsException, ContactColumns.from_records, [{'name': 'a', 'address': 'b', 'phone': None}])
+        self.assertRaises(ColumnsException, self.columns.column, 'email')
+        self.assertRaises(ColumnsException, ContactColumns, ['name'], 2, [b'ab', b'\0' * 8])
+
+
+    def testPickleProtocols(self):
+        """
+        test the columns pickle in-band with any protocol, and out-of-band with protocol 5.
+        """
+        for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+            self.assertEqual(pickle.loads(pickle.dumps(self.columns, protocol)).to_records(), self.records)
+
+        buffers = []
+        frame = pickle.dumps(self.columns, 5, buffer_callback=buffers.append)
+        self.assertEqual(len(buffers), 6)
+        self.assertLess(len(frame), 200)
+        self.assertEqual(sum(buf.raw().nbytes for buf in buffers), self.columns.nbytes)
+        self.assertEqual(pickle.loads(frame, buffers=buffers).to_records(), self.records)
+
+
+class TestColumnsFiles(unittest.TestCase):
+    """
+    Test Cases for the functions al_contacts.columns.dump_columns() and load_columns()
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.filePath = os.path.join(self.tmpDirPath, 'contacts.pickle')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def testDumpThenLoad(self):
+        """
+        test the batches are loaded back as views of the memory-mapped side file, and both files
+        get the permissions open() gives.
+        """
+        records = make_records(10)
+        self.assertEqual(dump_columns([records[:6], ContactColumns.from_records(records[6:])], self.filePath), 10)
+        self.assertTrue(os.path.exists(buffers_path(self.filePath)))
+        referencePath = os.path.join(self.tmpDirPath, 'reference')
+        open(referencePath, 'w').close()
+        for path in (self.filePath, buffers_path(self.filePath)):
+            self.assertEqual(os.stat(path).st_mode & 0o777, os.stat(referencePath).st_mode & 0o777)
+        os.remove(referencePath)
+
+        batches = load_columns(self.filePath)
+        self.assertEqual([len(batch) for batch in batches], [6, 4])
+        self.assertEqual([item for batch in batches for item in batch.to_records()], records)
+        for data, offsets in batches[0]._columns:
+            self.assertEqual(type(data.obj).__name__, 'mmap')
+            self.assertEqual(offsets.nbytes, 7 * 8)
+
+        self.assertEqual(dump_columns([], self.filePath), 0)
+        self.assertEqual(load_columns(self.filePath), [])
+
+
+    def testBuffersAreAligned(self):
+        """
+        test every buffer starts at a multiple of BUFFER_ALIGNMENT in the side file.
+        """
+        dump_columns([make_records(7)], self.filePath)
+        with open(buffers_path(self.filePath), 'rb') as fp:
+            side = fp.read()
+        for data, offsets in load_columns(self.filePath)[0]._columns:
+            for view in (data, offsets):
+                self.assertEqual(side.index(view.tobytes(), 16) % BUFFER_ALIGNMENT, 0)
+
+
+    def testMismatchedOrMissingSideFile(self):
+        """
+        test a side file from another write or a missing one raise ColumnsException.
+        """
+        dump_columns([make_records(3)], self.filePath)
+        otherPath = os.path.join(self.tmpDirPath, 'other.pickle')
+        dump_columns([make_records(3, 1)], otherPath)
+        os.replace(buffers_path(otherPath), buffers_path(self.filePath))
+        self.assertRaises(ColumnsException, load_columns, self.filePath)
+        os.remove(buffers_path(self.filePath))
+        self.assertRaises(ColumnsException, load_columns, self.filePath)
+
+        with open(otherPath, 'wb') as fp:
+            pickle.dump([], fp)
+        self.assertRaises(ColumnsException, load_columns, otherPath)
+
+
+    def testFileWrittenByAWorkerProcess(self):
+        """
+        test a worker process hands its batches over as a file path, and they load without a copy.
+        """
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            self.assertEqual(executor.submit(dump_in_worker, self.filePath, 10).result(), 8)
+        batches = load_columns(self.filePath)
+        self.assertEqual([item for batch in batches for item in batch.to_records()], make_records(8, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
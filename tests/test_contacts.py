@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import io
+import unittest
+
+# import functions from al_contacts.contacts
+from al_contacts.contacts import CONTACT_KEYS
+from al_contacts.contacts import load_csv_file
+from al_contacts.contacts import iter_csv_batches
+from al_contacts.contacts import iter_csv_contacts
+from al_contacts.contacts import header_columns
+from al_contacts.contacts import sniff_dialect
+from al_contacts.constants import CSV_INPUT_FILE
+
+
+class TestLoadCsvFile(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.contacts.load_csv_file()
+    """
+    def testLoadCsvFileWithDefaultInputFile(self):
+        """
+        test load_csv_file() returns a list of contact dictionaries.
+        """
+        data = load_csv_file(CSV_INPUT_FILE)
+        self.assertEqual(len(data), 10)
+        self.assertEqual(list(data[0].keys()), CONTACT_KEYS)
+        self.assertEqual(data[0]['name'], 'Rahul Singh')
+
+
+class TestIterCsvBatches(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.contacts.iter_csv_batches()
+    """
+    def testIterCsvBatches(self):
+        """
+        test iter_csv_batches() yields the same contacts as load_csv_file(), in batches.
+        """
+        batches = list(iter_csv_batches(CSV_INPUT_FILE, 4))
+        self.assertEqual([len(batch) for batch in batches], [4, 4, 2])
+        self.assertEqual([item for batch in batches for item in batch], load_csv_file(CSV_INPUT_FILE))
+        self.assertRaises(ValueError, list, iter_csv_batches(CSV_INPUT_FILE, 0))
+
+
+class TestIterCsvContacts(unittest.TestCase):
+    """
+    Test Cases for the functions al_contacts.contacts.iter_csv_contacts(), header_columns() and sniff_dialect()
+    """
+    def read(self, text, batchSize=1000):
+        return [item for batch in iter_csv_contacts(io.StringIO(text, newline=''), batchSize) for item in batch]
+
+
+    def testHeaderRowMapsTheColumns(self):
+        """
+        test a header row naming the columns in any order and case maps them on to the contact keys.
+        """
+        self.assertEqual(header_columns(['Phone', ' NAME ', 'email', 'address']), [1, 3, 0])
+        self.assertIsNone(header_columns(['Rahul Singh', 'address', '0123']))
+        self.assertEqual(self.read('phone,Name,address\r\n0123,Rahul Singh,28 Deanswood\r\n'),
+                         [{'name': 'Rahul Singh', 'address': '28 Deanswood', 'phone': '0123'}])
+
+
+    def testSniffedDelimiterKeepsTheValues(self):
+        """
+        test the delimiter is sniffed and the spaces and quoted delimiters in the values are kept.
+        """
+        text = 'Rahul Singh; 28 Deanswood; 0123\nJames;Maidstone Road;0111\n\nAlbert;Queens Road;0999\n'
+        self.assertEqual(sniff_dialect(text).delimiter, ';')
+        self.assertEqual(self.read(text, batchSize=2), [
+            {'name': 'Rahul Singh', 'address': ' 28 Deanswood', 'phone': ' 0123'},
+            {'name': 'James', 'address': 'Maidstone Road', 'phone': '0111'},
+            {'name': 'Albert', 'address': 'Queens Road', 'phone': '0999'},
+        ])
+        self.assertEqual(self.read('a|"b|c"|d\n'), [{'name': 'a', 'address': 'b|c', 'phone': 'd'}])
+
+
+    def testEmptyFileAndShortRows(self):
+        """
+        test an empty file yields nothing and a row with too few columns raises ValueError.
+        """
+        self.assertEqual(self.read(''), [])
+        self.assertEqual(self.read('name,address,phone\n'), [])
+        self.assertRaises(ValueError, self.read, 'a,b,c\nd,e\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+
+import os
+import json
+import unittest
+import tempfile
+import shutil
+
+# import classes from al_contacts.dataset
+from al_contacts.dataset import DatasetException
+from al_contacts.dataset import Dataset
+from al_contacts.dataset import MANIFEST_NAME
+from al_contacts.dataset import country_code
+from al_contacts.dataset import partition_areas
+from al_contacts.dataset import partition_countries
+from al_contacts.dataset import partition_initials
+from al_contacts.bloom import BloomIndex
+from al_contacts.formats import Formats
+from al_contacts.format import JsonFormat, BinaryFormat
+from al_contacts.reader_writer import JsonRW, BinaryRW
+
+
+DATA = [
+    {'name': 'Rahul Singh', 'address': ' 28 Deanswood N112TQ', 'phone': '+91 98450 12345'},
+    {'name': 'James', 'address': ' Maidstone Road N221QQ', 'phone': '020 7946 0000'},
+    {'name': 'Albert', 'address': ' Queens Road CA-20001', 'phone': '+1 202 555 0100'},
+    {'name': 'alasdair Bird', 'address': ' Great Portland Street W1W5DB', 'phone': '0161 496 0000'},
+    {'name': '42', 'address': ' Nowhere', 'phone': 'unknown'},
+]
+
+
+class TestPartitioners(unittest.TestCase):
+    """
+    Test Cases for the partitioners of al_contacts.dataset
+    """
+    def testPartitionInitials(self):
+        """
+        test partition_initials()
+        """
+        self.assertEqual(partition_initials(DATA + [{}]), ['R', 'J', 'A', 'A', '_', '_'])
+
+
+    def testCountryCode(self):
+        """
+        test country_code() with codes of one, two and three digits.
+        """
+        self.assertEqual([country_code(number) for number in ['+12025550100', '+442079460000', '+35312345678']],
+                         ['1', '44', '353'])
+
+
+    def testPartitionCountries(self):
+        """
+        test partition_countries()
+        """
+        self.assertEqual(partition_countries(DATA), ['91', '44', '1', '44', '_'])
+        self.assertEqual(partition_countries(DATA[1:2], '33'), ['33'])
+
+
+    def testPartitionAreas(self):
+        """
+        test partition_areas()
+        """
+        self.assertEqual(partition_areas(DATA), ['91-984', '44-207', '1-202', '44-161', '_'])
+
+
+class TestDataset(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.dataset.Dataset
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.root = os.path.join(self.tmpDirPath, 'dataset')
+        self.formats = Formats()
+        self.jsonRW = JsonRW(JsonFormat(self.formats))
+        BinaryRW(BinaryFormat(self.formats))
+        self.dataset = Dataset(self.formats, self.root)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def testWrite(self):
+        """
+        test Dataset.write() writes one file per partition and the manifest.
+        """
+        manifest = self.dataset.write([DATA[:2], DATA[2:]], 'json', 'initial', batchSize=1)
+        self.assertEqual(manifest['records'], 5)
+        self.assertEqual([entry['value'] for entry in manifest['partitions']], ['A', 'J', 'R', '_'])
+        self.assertEqual(sorted(os.listdir(self.root)),
+                         ['initial=A.json', 'initial=J.json', 'initial=R.json', 'initial=_.json', MANIFEST_NAME])
+
+        entry = manifest['partitions'][0]
+        self.assertEqual(entry['records'], 2)
+        self.assertEqual(entry['bytes'], os.path.getsize(os.path.join(self.root, 'initial=A.json')))
+        self.assertEqual((entry['min']['name'], entry['max']['name']), ('Albert', 'alasdair Bird'))
+        self.assertEqual(self.jsonRW.deserialise(os.path.join(self.root, 'initial=A.json')), [DATA[2], DATA[3]])
+
+        with open(os.path.join(self.root, MANIFEST_NAME)) as fp:
+            self.assertEqual(json.load(fp), manifest)
+
+
+    def testWriteInParallel(self):
+        """
+        test Dataset.write() with several workers.
+        """
+        manifest = self.dataset.write([DATA], 'binary', 'country', workers=2)
+        self.assertEqual([entry['value'] for entry in manifest['partitions']], ['1', '44', '91', '_'])
+        self.assertEqual(sorted(self.dataset.read(), key=lambda record: record['name']),
+                         sorted(DATA, key=lambda record: record['name']))
+
+
+    def testRewriteRemovesOldPartitions(self):
+        """
+        test Dataset.write() deletes the partition files of the previous content.
+        """
+        self.dataset.write([DATA], 'json', 'initial')
+        self.dataset.write([DATA[:1]], 'json', 'initial')
+        self.assertEqual(sorted(os.listdir(self.root)), ['initial=R.json', MANIFEST_NAME])
+        self.assertEqual(Dataset(self.formats, self.root).read(), DATA[:1])
+
+
+    def testInvalidWrite(self):
+        """
+        test Dataset.write() with an unknown partitioner or batch size.
+        """
+        self.assertRaises(DatasetException, self.dataset.write, [DATA], 'json', 'city')
+        self.assertRaises(DatasetException, self.dataset.write, [DATA], 'json', 'initial', 0)
+
+
+    def testPartitionsPrunedOnPartitionKey(self):
+        """
+        test Dataset.partitions() only keeps the partition of the queried key.
+        """
+        self.dataset.write([DATA], 'json', 'area')
+        partitions = self.dataset.partitions({'phone': '020 7946 0000'})
+        self.assertEqual([entry['value'] for entry in partitions], ['44-207'])
+        self.assertEqual(self.dataset.read({'phone': '020 7946 0000'}), [DATA[1]])
+        self.assertEqual(self.dataset.read({'phone': '+44 20 7946 0000'}), [])
+
+
+    def testPartitionsPrunedOnStatistics(self):
+        """
+        test Dataset.partitions() drops the partitions whose field ranges rule out a match,
+        before opening any file.
+        """
+        self.dataset.write([DATA], 'json', 'country')
+        os.remove(os.path.join(self.root, 'country=1.json'))
+        partitions = self.dataset.partitions({'name': 'James'})
+        self.assertEqual([entry['value'] for entry in partitions], ['44'])
+        self.assertEqual(self.dataset.read({'name': 'James'}), [DATA[1]])
+        self.assertEqual(self.dataset.partitions({'age': '42'}), [])
+        self.assertEqual(len(self.dataset.partitions()), 4)
+
+
+    def testPartitionsPrunedOnBloomFilters(self):
+        """
+        test Dataset.partitions() drops the partitions whose Bloom filters rule out a match.
+        """
+        self.dataset.write([DATA], 'json', 'initial', bloom=BloomIndex(('phone', 'name')))
+        self.assertIn('initial=A.json.bloom', os.listdir(self.root))
+        partitions = self.dataset.partitions({'name': 'Albert'})
+        self.assertEqual([entry['value'] for entry in partitions], ['A'])
+        self.assertEqual(self.dataset.read({'name': 'Albert'}), [DATA[2]])
+        # 'Ann' is within the name range of the partition A, only its filter rules it out
+        self.assertEqual(self.dataset.partitions({'name': 'Ann'}), [])
+        self.assertEqual(self.dataset.partitions({'phone': '0000'}), [])
+
+        self.dataset.write([DATA[:1]], 'json', 'initial')
+        self.assertEqual(sorted(os.listdir(self.root)), ['initial=R.json', MANIFEST_NAME])
+
+
+    def testMissingDataset(self):
+        """
+        test Dataset.manifest without a dataset in the directory.
+        """
+        self.assertRaises(DatasetException, self.dataset.read)
+        os.makedirs(self.root)
+        with open(os.path.join(self.root, MANIFEST_NAME), 'w') as fp:
+            fp.write('[]')
+        self.assertRaises(DatasetException, Dataset(self.formats, self.root).read)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+
+import os
+import json
+import unittest
+import tempfile
+import shutil
+
+# import classes from al_contacts.delta
+from al_contacts.delta import DeltaException
+from al_contacts.delta import DeltaStore
+from al_contacts.delta import apply_delta
+from al_contacts.delta import diff_records
+from al_contacts.delta import is_empty_delta
+from al_contacts.delta import list_deltas
+from al_contacts.delta import record_keys
+from al_contacts.formats import Formats
+from al_contacts.format import JsonFormat, BinaryFormat
+from al_contacts.reader_writer import JsonRW, BinaryRW, ReaderWriterException
+
+
+DATA = [
+    {'name': 'Rahul Singh', 'address': ' 28 Deanswood N112TQ', 'phone': ' 0123456789'},
+    {'name': 'James', 'address': ' Maidstone Road N221QQ', 'phone': ' 01111222233'},
+    {'name': 'Albert', 'address': ' Queens Road CA-20001', 'phone': ' 99999999999'},
+]
+
+
+def changed(data):
+    """
+    Return a copy of 'data' with the address of James changed, Albert removed and Tom added.
+    """
+    data = [dict(item) for item in data if item['name'] != 'Albert']
+    data[1]['address'] = ' Mill Road N221QQ'
+    data.append({'name': 'Tom', 'address': ' London Bridge W1W3AD', 'phone': ' 5353535353'})
+    return data
+
+
+class TestDiffRecords(unittest.TestCase):
+    """
+    Test Cases for the delta functions of al_contacts.delta
+    """
+    def testRecordKeysNumberDuplicates(self):
+        """
+        test record_keys() tells duplicate records apart.
+        """
+        keys = record_keys(DATA[:1] * 2 + DATA[1:2])
+        self.assertEqual(keys, [('Rahul Singh', ' 0123456789', 0), ('Rahul Singh', ' 0123456789', 1),
+                                ('James', ' 01111222233', 0)])
+
+
+    def testDiffAndApply(self):
+        """
+        test diff_records() only holds the changes, and apply_delta() rebuilds the new records.
+        """
+        new = changed(DATA)
+        delta = diff_records(DATA, new)
+        self.assertEqual(delta['removed'], [['Albert', ' 99999999999', 0]])
+        self.assertEqual([record for key, record in delta['upserts']], new[1:])
+        self.assertIsNone(delta['order'])
+        self.assertEqual(apply_delta(DATA, delta), new)
+
+
+    def testDiffKeepsOrder(self):
+        """
+        test diff_records() stores the order of the records only when it changed.
+        """
+        new = list(reversed(DATA))
+        delta = diff_records(DATA, new)
+        self.assertEqual(delta['upserts'], [])
+        self.assertEqual(len(delta['order']), 3)
+        self.assertEqual(apply_delta(DATA, delta), new)
+
+
+    def testEmptyDelta(self):
+        """
+        test is_empty_delta() with the same records.
+        """
+        self.assertTrue(is_empty_delta(diff_records(DATA, [dict(item) for item in DATA])))
+        self.assertFalse(is_empty_delta(diff_records(DATA, DATA[:2])))
+
+
+    def testNonStringValues(self):
+        """
+        test diff_records() with values that are not strings.
+        """
+        old = [{'name': 'a', 'phone': 1, 'age': 20}]
+        new = [{'name': 'a', 'phone': 1, 'age': 21}]
+        delta = diff_records(old, new)
+        self.assertEqual(len(delta['upserts']), 1)
+        self.assertEqual(apply_delta(old, delta), new)
+
+
+    def testApplyToOtherRecords(self):
+        """
+        test apply_delta() raises DeltaException on records the delta was not computed against.
+        """
+        delta = diff_records(DATA, DATA[:1])
+        self.assertRaises(DeltaException, apply_delta, DATA[:1], delta)
+
+
+class TestDeltaStore(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.delta.DeltaStore
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.filepath = os.path.join(self.tmpDirPath, 'contacts.json')
+        self.format = JsonFormat(Formats())
+        self.rw = JsonRW(self.format)
+        self.store = DeltaStore()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def testInvalidArguments(self):
+        """
+        test DeltaStore() with no key fields or an empty chain.
+        """
+        self.assertRaises(DeltaException, DeltaStore, ())
+        self.assertRaises(DeltaException, DeltaStore, maxChain=0)
+
+
+    def testFirstSerialiseWritesBase(self):
+        """
+        test DeltaStore.serialise() writes a base file when there is none.
+        """
+        self.store.serialise(self.rw, DATA, self.filepath)
+        self.assertEqual(self.rw.deserialise(self.filepath), DATA)
+        self.assertEqual(list_deltas(self.filepath), [])
+
+
+    def testSerialiseWritesDeltas(self):
+        """
+        test DeltaStore.serialise() chains deltas to the base and deserialise() applies them.
+        """
+        self.store.serialise(self.rw, DATA, self.filepath)
+        baseSize = os.path.getsize(self.filepath)
+        second = changed(DATA)
+        self.store.serialise(self.rw, second, self.filepath)
+        third = second + [{'name': 'Yo Han', 'address': ' Japan', 'phone': ' 888888889999'}]
+        self.store.serialise(self.rw, third, self.filepath)
+
+        deltas = list_deltas(self.filepath)
+        self.assertEqual([sequence for sequence, path in deltas], [1, 2])
+        self.assertEqual(os.path.getsize(self.filepath), baseSize)
+        with open(deltas[1][1]) as fp:
+            self.assertEqual(len(json.load(fp)['upserts']), 1)
+        self.assertEqual(self.store.deserialise(self.rw, self.filepath), third)
+        self.assertEqual(self.rw.deserialise(self.filepath), DATA)
+
+
+    def testUnchangedDataWritesNoDelta(self):
+        """
+        test DeltaStore.serialise() does not write a delta when nothing changed.
+        """
+        self.store.serialise(self.rw, DATA, self.filepath)
+        self.store.serialise(self.rw, [dict(item) for item in DATA], self.filepath)
+        self.assertEqual(list_deltas(self.filepath), [])
+
+
+    def testConsolidate(self):
+        """
+        test DeltaStore.consolidate() writes the data as a new base and deletes the deltas.
+        """
+        self.store.serialise(self.rw, DATA, self.filepath)
+        self.store.serialise(self.rw, changed(DATA), self.filepath)
+        self.assertEqual(self.store.consolidate(self.rw, self.filepath), 1)
+        self.assertEqual(list_deltas(self.filepath), [])
+        self.assertEqual(self.rw.deserialise(self.filepath), changed(DATA))
+        self.assertEqual(self.store.consolidate(self.rw, self.filepath), 0)
+
+
+    def testFullChainWritesBase(self):
+        """
+        test DeltaStore.serialise() writes a new base once the chain has 'maxChain' deltas.
+        """
+        store = DeltaStore(maxChain=2)
+        data = list(DATA)
+        store.serialise(self.rw, data, self.filepath)
+        for index in range(3):
+            data = data + [{'name': 'n{0}'.format(index), 'address': 'a', 'phone': 'p'}]
+            store.serialise(self.rw, data, self.filepath)
+        self.assertEqual(len(list_deltas(self.filepath)), 0)
+        self.assertEqual(self.rw.deserialise(self.filepath), data)
+
+
+    def testStaleDeltasIgnored(self):
+        """
+        test DeltaStore ignores, then replaces, deltas written against another base.
+        """
+        self.store.serialise(self.rw, DATA, self.filepath)
+        self.store.serialise(self.rw, changed(DATA), self.filepath)
+        self.rw.serialise(DATA[:1], self.filepath)
+        self.assertEqual(self.store.deserialise(self.rw, self.filepath), DATA[:1])
+        self.store.serialise(self.rw, DATA[:2], self.filepath)
+        self.assertEqual(len(list_deltas(self.filepath)), 1)
+        self.assertEqual(self.store.deserialise(self.rw, self.filepath), DATA[:2])
+
+
+    def testBrokenChain(self):
+        """
+        test DeltaStore.deserialise() raises DeltaException for a missing or foreign delta.
+        """
+        self.store.serialise(self.rw, DATA, self.filepath)
+        self.store.serialise(self.rw, DATA[:2], self.filepath)
+        self.store.serialise(self.rw, DATA[:1], self.filepath)
+        os.remove(list_deltas(self.filepath)[0][1])
+        self.assertRaises(DeltaException, self.store.deserialise, self.rw, self.filepath)
+
+
+    def testCorruptDelta(self):
+        """
+        test DeltaStore.deserialise() raises DeltaException for a delta file that is not json.
+        """
+        self.store.serialise(self.rw, DATA, self.filepath)
+        self.store.serialise(self.rw, DATA[:2], self.filepath)
+        with open(list_deltas(self.filepath)[0][1], 'w') as fp:
+            fp.write('{')
+        self.assertRaises(DeltaException, self.store.deserialise, self.rw, self.filepath)
+
+
+    def testMissingBase(self):
+        """
+        test DeltaStore.deserialise() with a base file that does not exist.
+        """
+        self.assertRaises(ReaderWriterException, self.store.deserialise, self.rw, self.filepath)
+
+
+    def testNotifyGoesThroughDelta(self):
+        """
+        test ReaderWriter.notify() serialises and deserialises through the delta store of the
+        reader/writer, here of the binary format.
+        """
+        binaryFormat = BinaryFormat(Formats())
+        rw = BinaryRW(binaryFormat)
+        rw.delta = self.store
+        filepath = os.path.join(self.tmpDirPath, 'contacts.binary')
+        binaryFormat.notify_rw('serialise', DATA, filepath)
+        binaryFormat.notify_rw('serialise', changed(DATA), filepath)
+        self.assertEqual(len(list_deltas(filepath)), 1)
+        self.assertEqual(binaryFormat.notify_rw('deserialise', filepath), changed(DATA))
+
+
+if __name__ == '__main__':
+    unittest.main()
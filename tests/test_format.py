@@ -4,12 +4,15 @@ import sys
 import os
 import unittest
 import tempfile
+import asyncio
 
 # import classes from al_contacts.reader_writer
 from al_contacts.format import Format
 from al_contacts.format import FormatException
 from al_contacts.format import JsonFormat
 from al_contacts.format import PickleFormat
+from al_contacts.format import BinaryFormat
+from al_contacts.format import CsvFormat
 
 
 class MockFormats:
@@ -39,6 +42,9 @@ class MockReaderWriter:
     def notify(self, *args, **kwargs):
         pass
 
+    async def anotify(self, *args, **kwargs):
+        pass
+
 
 class TestFormat(unittest.TestCase):
     """
@@ -131,6 +137,37 @@ class TestFormat(unittest.TestCase):
         self.assertRaises(FormatException, self.format.notify_rw)
 
 
+    def testNotifyRWForwardsArgumentsAndReturnsResult(self):
+        """
+        test al_contacts.format.Format.notify_rw() forwards per-call arguments to the rw.
+        """
+        class EchoReaderWriter(MockReaderWriter):
+            def notify(self, format, action, *args, **kwargs):
+                return (action, args, kwargs)
+
+        self.format.register_rw(EchoReaderWriter())
+        self.assertEqual(self.format.notify_rw('serialise', [1], filepath='x'), ('serialise', ([1],), {'filepath': 'x'}))
+
+
+    ######################################################################
+    # tests for al_contacts.format.Format.anotify_rw()                   #
+    ######################################################################
+
+    def testANotifyRWWithNoRegisteredRW(self):
+        """
+        test al_contacts.format.Format.anotify_rw() with no registered rw.
+        """
+        self.assertEqual(self.format.rw, None)
+        self.assertRaises(FormatException, asyncio.run, self.format.anotify_rw('serialise'))
+
+
+    def testANotifyRWWithRegisteredRW(self):
+        """
+        test al_contacts.format.Format.anotify_rw() with a registered rw.
+        """
+        self.format.register_rw(self.mockReaderWriter)
+        self.assertEqual(asyncio.run(self.format.anotify_rw('serialise')), None)
+
     ######################################################################
     # tests for al_contacts.format.Format.notify()                       #
     ######################################################################
@@ -177,6 +214,20 @@ class TestJsonFormat(unittest.TestCase):
         self.assertEqual(str(self.format), 'json')
 
 
+    ######################################################################
+    # tests for al_contacts.format.JsonFormat.probe()                    #
+    ######################################################################
+
+    def testProbe(self):
+        """
+        test probe() accepts json arrays and objects, after a byte order mark and whitespace.
+        """
+        for header in [b'[{"name": "a"', b'  \r\n[', b'\xef\xbb\xbf{"a": 1}', b'[]']:
+            self.assertTrue(self.format.probe(header), header)
+        for header in [b'', b'\x80\x04\x95', b'(lp0\n', b'name,address,phone']:
+            self.assertFalse(self.format.probe(header), header)
+
+
 class TestPickleFormat(unittest.TestCase):
     """
     Test Cases for the class al_contacts.format.PickleFormat
@@ -211,5 +262,69 @@ class TestPickleFormat(unittest.TestCase):
         self.assertEqual(str(self.format), 'pickle')
 
 
+    ######################################################################
+    # tests for al_contacts.format.PickleFormat.probe()                  #
+    ######################################################################
+
+    def testProbe(self):
+        """
+        test probe() accepts the pickle protocols 0 to 5 and nothing else.
+        """
+        import pickle
+        for protocol in range(6):
+            self.assertTrue(self.format.probe(pickle.dumps([{'name': 'a'}], protocol)[:16]), protocol)
+        for header in [b'', b'[{"name": "a"', b'\x80\x09', b'name,address,phone']:
+            self.assertFalse(self.format.probe(header), header)
+
+
+class TestBinaryFormat(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.format.BinaryFormat
+    """
+    def setUp(self):
+        self.format = BinaryFormat(MockFormats())
+
+
+    def testStringRepresentationForNewInstance(self):
+        """
+        test String Representation For the New Instance
+        """
+        self.assertEqual(str(self.format), 'binary')
+
+
+    def testProbe(self):
+        """
+        test probe() accepts the binary magic and nothing else.
+        """
+        self.assertTrue(self.format.probe(b'ALCB\x01\x00'))
+        for header in [b'', b'[{"name": "a"', b'\x80\x04', b'ALC']:
+            self.assertFalse(self.format.probe(header), header)
+
+
+class TestCsvFormat(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.format.CsvFormat
+    """
+    def setUp(self):
+        self.format = CsvFormat(MockFormats())
+
+
+    def testStringRepresentationForNewInstance(self):
+        """
+        test String Representation For the New Instance
+        """
+        self.assertEqual(str(self.format), 'csv')
+
+
+    def testProbe(self):
+        """
+        test probe() accepts csv text of three or more columns, even cut in the middle of a line.
+        """
+        for header in [b'name,address,phone\r\nRahul,28 Deanswood,0123\r\nJam', b'a;b;c\n', 'a,b,c\nZo\u00eb,y,z'.encode('utf-8')[:9]]:
+            self.assertTrue(self.format.probe(header), header)
+        for header in [b'', b'[{"name": "a", "address": "b"}]', b'\x80\x04\x95', b'ALCB\x01\x00\x00', b'just text\n', b'a,b\nc,d\n']:
+            self.assertFalse(self.format.probe(header), header)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -77,8 +77,10 @@ class TestFormats(unittest.TestCase):
         test al_contacts.formats.Formats.register_format() with an unregistered format.
         """
         self.assertNotIn(self.mockFormat, self.formats.formats)
-        self.formats.register_format(self.mockFormat)
+        with self.assertLogs('al_contacts.formats', 'INFO') as logs:
+            self.formats.register_format(self.mockFormat)
         self.assertIn(self.mockFormat, self.formats.formats)
+        self.assertEqual(logs.output, ['INFO:al_contacts.formats:Registering "MockFormat" format with "Formats"'])
 
 
     ######################################################################
@@ -115,5 +117,149 @@ class TestFormats(unittest.TestCase):
         self.assertRaises(FormatsException, self.formats.notify_formats)
 
 
+    ######################################################################
+    # tests for al_contacts.formats.Formats.get_format()                 #
+    ######################################################################
+
+    def testGetFormat(self):
+        """
+        test al_contacts.formats.Formats.get_format() by name and by object.
+        """
+        self.formats.register_format(self.mockFormat)
+        self.assertIs(self.formats.get_format('MockFormat'), self.mockFormat)
+        self.assertIs(self.formats.get_format(self.mockFormat), self.mockFormat)
+        self.assertRaises(FormatsException, self.formats.get_format, 'xxxx')
+
+
+    ######################################################################
+    # tests for al_contacts.formats.Formats.declare_format()             #
+    ######################################################################
+
+    def testDeclareFormatInstantiatesOnFirstUse(self):
+        """
+        test a declared format is listed by names() and only instantiated by get_format().
+        """
+        self.formats.declare_format('json', 'al_contacts.format:JsonFormat', 'al_contacts.reader_writer:JsonRW')
+        self.assertEqual(self.formats.names(), ['json'])
+        self.assertEqual(self.formats.formats, [])
+
+        jsonFormat = self.formats.get_format('json')
+        self.assertEqual(str(jsonFormat.rw), 'json reader/writer')
+        self.assertEqual(self.formats.formats, [jsonFormat])
+        self.assertIs(self.formats.get_format('json'), jsonFormat)
+        self.assertEqual(self.formats.names(), ['json'])
+
+
+    def testDeclareFormatWithDuplicateOrMismatchingName(self):
+        """
+        test declare_format() with a name already in use and a class registering another name.
+        """
+        self.formats.declare_format('json', 'al_contacts.format:JsonFormat')
+        self.assertRaises(FormatsException, self.formats.declare_format, 'json', 'al_contacts.format:JsonFormat')
+        self.formats.declare_format('xml', 'al_contacts.format:PickleFormat')
+        self.assertRaises(FormatsException, self.formats.get_format, 'xml')
+        self.assertEqual(self.formats.formats, [])
+
+
+class TestFormatsTranscode(unittest.TestCase):
+    """
+    Test Cases for al_contacts.formats.Formats.transcode() with the json and pickle formats
+    """
+    def setUp(self):
+        from al_contacts.format import JsonFormat, PickleFormat
+        from al_contacts.reader_writer import JsonRW, PickleRW
+        self.formats = Formats()
+        JsonRW(JsonFormat(self.formats))
+        PickleRW(PickleFormat(self.formats))
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.data = [{'name': str(index), 'address': 'a', 'phone': '0'} for index in range(25)]
+        self.jsonPath = os.path.join(self.tmpDirPath, 'contacts.json')
+        self.formats.get_format('json').notify_rw('serialise', self.data, self.jsonPath)
+
+
+    def testTranscodeJsonToPickleAndBack(self):
+        """
+        test transcode() round trips the records between json and pickle.
+        """
+        picklePath = os.path.join(self.tmpDirPath, 'contacts.pickle')
+        self.assertEqual(self.formats.transcode('json', self.jsonPath, 'pickle', picklePath, batchSize=4), 25)
+        self.assertEqual(self.formats.get_format('pickle').notify_rw('deserialise', picklePath), self.data)
+
+        jsonPath = os.path.join(self.tmpDirPath, 'copy.json')
+        self.assertEqual(self.formats.transcode('pickle', picklePath, 'json', jsonPath, batchSize=4, workers=2), 25)
+        with open(self.jsonPath) as fp1, open(jsonPath) as fp2:
+            self.assertEqual(fp1.read(), fp2.read())
+
+
+    def testTranscodeAutoDetectsSourceFormat(self):
+        """
+        test transcode() with the 'auto' source format.
+        """
+        picklePath = os.path.join(self.tmpDirPath, 'contacts.pickle')
+        self.assertEqual(self.formats.transcode('auto', self.jsonPath, 'pickle', picklePath), 25)
+        self.assertEqual(self.formats.transcode('auto', picklePath, 'json', os.path.join(self.tmpDirPath, 'copy')), 25)
+
+
+    ######################################################################
+    # tests for al_contacts.formats.Formats.detect()                     #
+    ######################################################################
+
+    def testDetect(self):
+        """
+        test detect() picks the format from the start of the file, whatever its name.
+        """
+        picklePath = os.path.join(self.tmpDirPath, 'contacts.json.bak')
+        self.formats.get_format('pickle').notify_rw('serialise', self.data, picklePath)
+        self.assertIs(self.formats.detect(self.jsonPath), self.formats.get_format('json'))
+        self.assertIs(self.formats.detect(picklePath), self.formats.get_format('pickle'))
+
+
+    def testDetectWithUnknownOrMissingFile(self):
+        """
+        test detect() with a file no format matches and a file that does not exist.
+        """
+        csvPath = os.path.join(self.tmpDirPath, 'contacts.csv')
+        with open(csvPath, 'w') as fp:
+            fp.write('name,address,phone\n')
+        self.assertRaises(FormatsException, self.formats.detect, csvPath)
+        self.assertRaises(FormatsException, self.formats.detect, os.path.join(self.tmpDirPath, 'xxxx'))
+
+
+    def testDetectInstantiatesDeclaredFormatsUntilMatch(self):
+        """
+        test detect() stops instantiating the declared formats at the first match.
+        """
+        formats = Formats()
+        formats.declare_format('json', 'al_contacts.format:JsonFormat', 'al_contacts.reader_writer:JsonRW')
+        formats.declare_format('csv', 'al_contacts.format:CsvFormat', 'al_contacts.reader_writer:CsvRW')
+        self.assertEqual(str(formats.detect(self.jsonPath)), 'json')
+        self.assertEqual([str(aFormat) for aFormat in formats.formats], ['json'])
+
+
+    def testDetectProbesInFixedOrder(self):
+        """
+        test detect() probes the magic formats before the heuristic and plugin ones, whatever
+        formats were used before.
+        """
+        formats = Formats()
+        formats.declare_format('csv', 'al_contacts.format:CsvFormat', 'al_contacts.reader_writer:CsvRW')
+        formats.declare_format('yaml', 'al_contacts.no_such_plugin:YamlFormat')
+        formats.declare_format('json', 'al_contacts.format:JsonFormat', 'al_contacts.reader_writer:JsonRW')
+        formats.declare_format('pickle', 'al_contacts.format:PickleFormat', 'al_contacts.reader_writer:PickleRW')
+        formats.get_format('csv')
+        self.assertEqual(formats.detect_order(), ['pickle', 'json', 'yaml', 'csv'])
+        # the plugin, which cannot even be imported, is never reached
+        self.assertEqual(str(formats.detect(self.jsonPath)), 'json')
+        self.assertEqual(sorted(str(aFormat) for aFormat in formats.formats), ['csv', 'json', 'pickle'])
+
+
+    def testTranscodeOntoItselfOrUnknownFormat(self):
+        """
+        test transcode() refuses to overwrite its source and unknown formats.
+        """
+        self.assertRaises(FormatsException, self.formats.transcode, 'json', self.jsonPath, 'pickle', self.jsonPath)
+        self.assertRaises(FormatsException, self.formats.transcode, 'json', self.jsonPath, 'xxxx', 'out')
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
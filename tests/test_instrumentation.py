@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import gc
+import io
+import time
+import shutil
+import tempfile
+import unittest
+
+# import classes and functions from al_contacts.instrumentation
+from al_contacts.instrumentation import InstrumentationException
+from al_contacts.instrumentation import Hook
+from al_contacts.instrumentation import StageTimer
+from al_contacts.instrumentation import MemoryHook
+from al_contacts.instrumentation import add_hook
+from al_contacts.instrumentation import remove_hook
+from al_contacts.instrumentation import hooked
+from al_contacts.instrumentation import profiling
+from al_contacts.instrumentation import memory_profiling
+from al_contacts.instrumentation import stage
+from al_contacts.formats import Formats
+from al_contacts.format import JsonFormat
+from al_contacts.reader_writer import JsonRW
+from al_contacts.contacts import load_csv_file
+from al_contacts.constants import CSV_INPUT_FILE
+
+
+class RecordingHook(Hook):
+    """
+    Hook recording the stages it is notified about
+    """
+    def __init__(self):
+        self.calls = []
+
+    def before(self, stage):
+        self.calls.append(('before', str(stage)))
+        return len(self.calls)
+
+    def after(self, stage, token, error):
+        self.calls.append(('after', str(stage), token, type(error).__name__ if error else None))
+
+
+class TestStage(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.instrumentation.stage() and the hooks
+    """
+    def testStageWithoutHooks(self):
+        """
+        test stage() returns an inactive stage ignoring its attributes when no hook is installed.
+        """
+        with stage('rw.serialise', 'json') as aStage:
+            aStage.records = 10
+        self.assertFalse(aStage.active)
+        self.assertFalse(hasattr(aStage, 'records'))
+
+
+    def testStageNotifiesHooks(self):
+        """
+        test the hooks are called before and after a stage, with the token and the error.
+        """
+        hook = RecordingHook()
+        with hooked(hook):
+            with stage('rw.serialise', 'json') as aStage:
+                self.assertTrue(aStage.active)
+            with self.assertRaises(ValueError):
+                with stage('view.display'):
+                    raise ValueError('bad')
+        with stage('rw.deserialise'):
+            pass
+
+        self.assertEqual(hook.calls, [
+            ('before', 'rw.serialise[json]'), ('after', 'rw.serialise[json]', 1, None),
+            ('before', 'view.display'), ('after', 'view.display', 3, 'ValueError'),
+        ])
+
+
+    def testAddAndRemoveHook(self):
+        """
+        test a hook can not be installed twice or removed when it is not installed.
+        """
+        hook = Hook()
+        add_hook(hook)
+        self.assertRaises(InstrumentationException, add_hook, hook)
+        remove_hook(hook)
+        self.assertRaises(InstrumentationException, remove_hook, hook)
+
+
+class TestStageTimer(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.instrumentation.StageTimer
+    """
+    def testStageTimerNesting(self):
+        """
+        test the self time of a stage excludes the stages nested in it.
+        """
+        timer = StageTimer()
+        with hooked(timer):
+            for _ in range(2):
+                with stage('format.notify_rw', 'json'):
+                    with stage('rw.serialise', 'json') as aStage:
+                        aStage.records, aStage.bytes = 5, 100
+                        time.sleep(0.01)
+
+        outer, inner = sorted(timer.report(), key=lambda stats: stats['stage'])
+        self.assertEqual((inner['stage'], inner['calls'], inner['records'], inner['bytes']), ('rw.serialise', 2, 10, 200))
+        self.assertEqual(outer['calls'], 2)
+        self.assertGreaterEqual(outer['seconds'], inner['seconds'])
+        self.assertLess(outer['self_seconds'], inner['seconds'])
+        self.assertIn('rw.serialise[json]', timer.format_breakdown())
+
+
+    def testStageTimerOnNotifications(self):
+        """
+        test the csv loading and the reader/writer actions report their records and bytes.
+        """
+        tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        filepath = os.path.join(tmpDirPath, 'contacts.json')
+        jsonFormat = JsonFormat(Formats())
+        JsonRW(jsonFormat)
+        timer = StageTimer()
+        try:
+            with hooked(timer):
+                data = load_csv_file(CSV_INPUT_FILE)
+                jsonFormat.notify_rw('serialise', data, filepath)
+                jsonFormat.notify_rw('deserialise', filepath=filepath)
+        finally:
+            shutil.rmtree(tmpDirPath)
+
+        stats = dict((stats['stage'], stats) for stats in timer.report())
+        self.assertEqual(list(stats), ['csv.load', 'rw.serialise', 'format.notify_rw', 'rw.deserialise'])
+        self.assertEqual(stats['csv.load']['records'], 10)
+        self.assertEqual(stats['csv.load']['bytes'], os.path.getsize(CSV_INPUT_FILE))
+        self.assertEqual(stats['rw.serialise']['records'], 10)
+        self.assertGreater(stats['rw.serialise']['bytes'], 0)
+        self.assertEqual(stats['rw.deserialise']['bytes'], stats['rw.serialise']['bytes'])
+        self.assertEqual(stats['format.notify_rw']['calls'], 2)
+
+
+class TestMemoryHook(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.instrumentation.MemoryHook
+    """
+    def testMemoryHookNesting(self):
+        """
+        test the peak of a stage includes the peak of the stages nested in it.
+        """
+        hook = MemoryHook()
+        hook.start()
+        try:
+            with hooked(hook):
+                with stage('outer') as outer:
+                    kept = [bytearray(1000) for _ in range(100)]
+                    with stage('inner') as inner:
+                        dropped = bytearray(1000000)
+                        inner.records = 10
+                        del dropped
+                    outer.records = 100
+        finally:
+            hook.stop()
+
+        stats = dict((stats['stage'], stats) for stats in hook.report())
+        self.assertEqual(list(stats), ['inner', 'outer'])
+        self.assertGreaterEqual(stats['inner']['peak_bytes'], 990000)
+        self.assertLess(stats['inner']['retained_bytes'], 10000)
+        self.assertGreaterEqual(stats['outer']['peak_bytes'], stats['inner']['peak_bytes'] + 90000)
+        self.assertGreaterEqual(stats['outer']['retained_bytes'], 100000)
+        self.assertEqual(stats['inner']['peak_per_record'], stats['inner']['peak_bytes'] / 10.0)
+        self.assertEqual(stats['outer']['retained_per_record'], stats['outer']['retained_bytes'] / 100.0)
+        self.assertEqual(len(kept), 100)
+
+
+    def testMemoryHookWithoutTracing(self):
+        """
+        test the hook records nothing when tracemalloc is not tracing.
+        """
+        hook = MemoryHook()
+        with hooked(hook):
+            load_csv_file(CSV_INPUT_FILE)
+        self.assertEqual(hook.report(), [])
+
+
+    def testMemoryProfiling(self):
+        """
+        test memory_profiling() prints the memory of the csv loading and of the deserialisation.
+        """
+        tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        filepath = os.path.join(tmpDirPath, 'contacts.json')
+        jsonFormat = JsonFormat(Formats())
+        JsonRW(jsonFormat)
+        stream = io.StringIO()
+        try:
+            jsonFormat.notify_rw('serialise', load_csv_file(CSV_INPUT_FILE), filepath)
+            # garbage of the previous tests freed in the block would be counted against it
+            gc.collect()
+            with memory_profiling(stream, topLines=2) as hook:
+                load_csv_file(CSV_INPUT_FILE)
+                data = jsonFormat.notify_rw('deserialise', filepath=filepath)
+        finally:
+            shutil.rmtree(tmpDirPath)
+
+        stats = dict((stats['stage'], stats) for stats in hook.report())
+        self.assertEqual(stats['csv.load']['records'], 10)
+        self.assertGreater(stats['csv.load']['peak_bytes'], 0)
+        self.assertEqual(stats['rw.deserialise']['records'], len(data))
+        self.assertGreater(stats['rw.deserialise']['retained_bytes'], 0)
+        self.assertTrue(stats['csv.load']['top'])
+        self.assertIn('rw.deserialise[json]', stream.getvalue())
+        import tracemalloc
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+class TestProfiling(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.instrumentation.profiling()
+    """
+    def testProfiling(self):
+        """
+        test profiling() prints the breakdown and writes the cProfile statistics.
+        """
+        tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        pstatsPath = os.path.join(tmpDirPath, 'run.pstats')
+        stream = io.StringIO()
+        try:
+            with profiling(pstatsPath, stream):
+                load_csv_file(CSV_INPUT_FILE)
+            import pstats
+            self.assertTrue(pstats.Stats(pstatsPath).total_calls > 0)
+        finally:
+            shutil.rmtree(tmpDirPath)
+        self.assertIn('csv.load', stream.getvalue())
+        self.assertIn('run.pstats', stream.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
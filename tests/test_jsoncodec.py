@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import json
+import unittest
+from collections import OrderedDict
+
+# import functions from al_contacts.jsoncodec
+from al_contacts.jsoncodec import encode_contact_items
+from al_contacts.jsoncodec import encode_contacts
+from al_contacts.jsoncodec import iter_encode_contacts
+from al_contacts.jsoncodec import decode_contact_items
+from al_contacts.jsoncodec import RECORD_BOUNDARY
+
+
+def make_records(count):
+    return [
+        {'name': 'Zoë "{0}"'.format(index), 'address': '{0} High St\\\\\n\t '.format(index),
+         'phone': '😀 %s {0}'.format(index)}
+        for index in range(count)
+    ]
+
+
+class TestEncodeContacts(unittest.TestCase):
+    """
+    Test Cases for the functions al_contacts.jsoncodec.encode_contacts() and encode_contact_items()
+    """
+    def testSameTextAsJsonDumps(self):
+        """
+        test contacts encode to the same text as json.dumps(), escapes included.
+        """
+        records = make_records(10)
+        self.assertEqual(encode_contacts(records), json.dumps(records))
+        self.assertEqual(encode_contacts(records, blockSize=3), json.dumps(records))
+        self.assertEqual(encode_contact_items(records), json.dumps(records)[1:-1])
+        self.assertEqual(list(iter_encode_contacts(records[:4], blockSize=2)),
+                         ['[', json.dumps(records[:2])[1:-1], ', ' + json.dumps(records[2:4])[1:-1], ']'])
+
+
+    def testOtherRecordsGoThroughJsonDumps(self):
+        """
+        test lists with other keys, key orders, values or types encode the same as json.dumps().
+        """
+        contact = {'name': 'a', 'address': 'b', 'phone': 'c'}
+        for records in [
+            [], [{}], [contact, {'phone': 'c', 'name': 'a', 'address': 'b'}], [contact, dict(contact, email='d')],
+            [contact, {'name': 'a', 'address': None, 'phone': 1.5}], [contact, OrderedDict(contact)],
+            [contact, ['a', 'b', 'c']], [contact, 'a'], {'a': [contact]}, (contact,),
+        ]:
+            self.assertEqual(encode_contacts(records), json.dumps(records), records)
+            if isinstance(records, list):
+                self.assertEqual(encode_contact_items(records), json.dumps(records)[1:-1], records)
+
+
+class TestDecodeContactItems(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.jsoncodec.decode_contact_items()
+    """
+    def testDecodeUpToLastBoundary(self):
+        """
+        test the complete contacts before the last boundary are decoded at once.
+        """
+        records = make_records(5)
+        text = json.dumps(records)
+        self.assertEqual(decode_contact_items(text, 1), (records[:4], text.rindex(RECORD_BOUNDARY) + 1))
+        self.assertEqual(decode_contact_items(text[:-20], 1)[0], records[:4])
+        self.assertEqual(decode_contact_items(json.dumps(records[:1]), 1), ([], 1))
+
+
+    def testItemsNotLaidOutAsContacts(self):
+        """
+        test items nested in other objects are not decoded at once.
+        """
+        text = json.dumps([{'contacts': make_records(3)}])
+        self.assertIsNone(decode_contact_items(text, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
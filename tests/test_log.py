@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import io
+import logging
+import argparse
+import unittest
+
+# import functions from al_contacts.log
+from al_contacts.log import LogException
+from al_contacts.log import add_logging_arguments
+from al_contacts.log import configure_logging
+
+
+class TestConfigureLogging(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.log.configure_logging()
+    """
+    def setUp(self):
+        self.logger = logging.getLogger('al_contacts')
+        self.handlers = list(self.logger.handlers)
+        self.level = self.logger.level
+        self.propagate = self.logger.propagate
+
+
+    def tearDown(self):
+        self.logger.handlers = self.handlers
+        self.logger.setLevel(self.level)
+        self.logger.propagate = self.propagate
+
+
+    def testConfigureLogging(self):
+        """
+        test the package messages at the configured level and above are written to the stream.
+        """
+        stream = io.StringIO()
+        configure_logging('warning', stream=stream)
+        logging.getLogger('al_contacts.formats').info('Registering "%s"', 'json')
+        logging.getLogger('al_contacts.formats').warning('Unregistering "%s"', 'json')
+        self.assertEqual(stream.getvalue(), 'WARNING al_contacts.formats: Unregistering "json"\n')
+
+
+    def testConfigureLoggingQuiet(self):
+        """
+        test 'quiet' only lets the errors through, whatever the level.
+        """
+        stream = io.StringIO()
+        configure_logging('debug', quiet=True, stream=stream)
+        logging.getLogger('al_contacts.reader_writer').warning('Serialised')
+        self.assertEqual(stream.getvalue(), '')
+        self.assertFalse(logging.getLogger('al_contacts.reader_writer').isEnabledFor(logging.INFO))
+
+
+    def testConfigureLoggingTwice(self):
+        """
+        test configuring the logging again replaces the previous handler.
+        """
+        first, second = io.StringIO(), io.StringIO()
+        configure_logging('info', stream=first)
+        configure_logging('info', stream=second)
+        logging.getLogger('al_contacts.views').info('Registering')
+        self.assertEqual(first.getvalue(), '')
+        self.assertEqual(second.getvalue(), 'INFO al_contacts.views: Registering\n')
+
+
+    def testConfigureLoggingWithInvalidLevel(self):
+        """
+        test configure_logging() with an unknown level.
+        """
+        self.assertRaises(LogException, configure_logging, 'xxxx')
+
+
+class TestAddLoggingArguments(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.log.add_logging_arguments()
+    """
+    def testAddLoggingArguments(self):
+        """
+        test the '--log-level' and '--quiet' options and their defaults.
+        """
+        parser = argparse.ArgumentParser()
+        add_logging_arguments(parser)
+        args = parser.parse_args([])
+        self.assertEqual((args.log_level, args.quiet), ('info', False))
+        args = parser.parse_args(['--log-level', 'debug', '-q'])
+        self.assertEqual((args.log_level, args.quiet), ('debug', True))
+
+
+if __name__ == '__main__':
+    unittest.main()
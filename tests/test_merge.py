@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+
+import os
+import unittest
+import tempfile
+import shutil
+
+# import classes from al_contacts.merge
+from al_contacts.merge import MergeException
+from al_contacts.merge import iter_checked
+from al_contacts.merge import iter_record_batches
+from al_contacts.merge import merge_records
+from al_contacts.merge import reduce_runs
+from al_contacts.merge import spill_runs
+from al_contacts.formats import Formats, FormatsException
+from al_contacts.format import JsonFormat, PickleFormat, CsvFormat
+from al_contacts.reader_writer import JsonRW, PickleRW, CsvRW
+
+
+NORTH = [
+    {'name': 'Albert', 'address': ' Queens Road CA-20001', 'phone': ' 99999999999'},
+    {'name': 'James', 'address': ' Maidstone Road N221QQ', 'phone': ' 01111222233'},
+    {'name': 'Tom', 'address': ' London Bridge W1W3AD', 'phone': ' 5353535353'},
+]
+
+SOUTH = [
+    {'name': 'Alasdair Bird', 'address': ' Great Portland Street W1W5DB', 'phone': ' 777777777777'},
+    {'name': 'James', 'address': ' Mill Road N221QQ', 'phone': ' 01111222233'},
+    {'name': 'Yo Han', 'address': ' Japan', 'phone': ' 888888889999'},
+]
+
+
+def names(records):
+    return [record['name'] for record in records]
+
+
+class TestMergeRecords(unittest.TestCase):
+    """
+    Test Cases for the merge functions of al_contacts.merge
+    """
+    def testMergeRecords(self):
+        """
+        test merge_records() merges sorted iterables, the first iterable first on equal keys.
+        """
+        merged = list(merge_records([NORTH, SOUTH]))
+        self.assertEqual(names(merged), ['Alasdair Bird', 'Albert', 'James', 'James', 'Tom', 'Yo Han'])
+        self.assertEqual(merged[2], NORTH[1])
+
+
+    def testMergeRecordsDedupe(self):
+        """
+        test merge_records() keeps the first record of each key with dedupe.
+        """
+        merged = list(merge_records([SOUTH, NORTH], dedupe=True))
+        self.assertEqual(names(merged), ['Alasdair Bird', 'Albert', 'James', 'Tom', 'Yo Han'])
+        self.assertEqual(merged[2], SOUTH[1])
+
+
+    def testMergeRecordsOnSeveralFields(self):
+        """
+        test merge_records() on several key fields.
+        """
+        merged = list(merge_records([SOUTH, NORTH], ('name', 'address'), dedupe=True))
+        self.assertEqual(len(merged), 6)
+        self.assertEqual(merged[2:4], [NORTH[1], SOUTH[1]])
+
+
+    def testMergeRecordsIsLazy(self):
+        """
+        test merge_records() only holds one record of each iterable.
+        """
+        consumed = []
+
+        def iterate(records):
+            for record in records:
+                consumed.append(record)
+                yield record
+
+        merged = merge_records([iterate(NORTH), iterate(SOUTH)])
+        self.assertEqual(next(merged), SOUTH[0])
+        self.assertEqual(len(consumed), 2)
+
+
+    def testIterChecked(self):
+        """
+        test iter_checked() yields sorted records and raises MergeException for unsorted ones.
+        """
+        self.assertEqual(list(iter_checked([NORTH[:2], NORTH[2:]])), NORTH)
+        self.assertRaises(MergeException, list, iter_checked([NORTH[1:], NORTH[:1]]))
+        self.assertRaises(MergeException, list, iter_checked([[NORTH[1], NORTH[0]]]))
+        self.assertRaises(MergeException, list, iter_checked([NORTH], ('age',)))
+        self.assertRaises(MergeException, list, iter_checked([NORTH], ()))
+
+
+    def testSpillRuns(self):
+        """
+        test spill_runs() sorts the records in runs of at most 'runRecords' records.
+        """
+        records = list(reversed(NORTH + SOUTH))
+        runs = [list(run) for run in spill_runs([records[:4], records[4:]], runRecords=4)]
+        self.assertEqual([len(run) for run in runs], [4, 2])
+        for run in runs:
+            self.assertEqual(names(run), sorted(names(run)))
+        self.assertEqual(names(merge_records(runs)), sorted(names(records)))
+        self.assertRaises(MergeException, spill_runs, [records], runRecords=0)
+        self.assertRaises(MergeException, spill_runs, [records], ('age',))
+
+
+    def testSpillRunsBoundsOpenRuns(self):
+        """
+        test spill_runs() merges every 'maxFanIn' runs of the same level into one, across inputs.
+        """
+        records = [{'name': 'name{0:02d}'.format(index)} for index in reversed(range(20))]
+        runs = spill_runs([records[:8]], runRecords=1, maxFanIn=3)
+        self.assertEqual([run.records for run in runs], [3, 3, 1, 1])
+        spill_runs([records[8:]], runRecords=1, runs=runs, maxFanIn=3)
+        # 20 runs of one record are 2 runs of 9, 2 runs of 1
+        self.assertEqual([run.records for run in runs], [9, 9, 1, 1])
+        self.assertEqual(names(merge_records(runs)), sorted(names(records)))
+        self.assertRaises(MergeException, spill_runs, [records], maxFanIn=1)
+
+
+    def testReduceRuns(self):
+        """
+        test reduce_runs() merges the last iterables until 'maxFanIn' are left, keeping the order
+        of the records with the same key.
+        """
+        iterables = [[{'name': 'James', 'input': index}] for index in range(5)]
+        reduced = reduce_runs(iterables, maxFanIn=2)
+        self.assertEqual(len(reduced), 2)
+        self.assertEqual([record['input'] for record in merge_records(reduced)], list(range(5)))
+        self.assertEqual(reduce_runs(iterables[:2], maxFanIn=2), iterables[:2])
+        self.assertRaises(MergeException, reduce_runs, iterables, maxFanIn=1)
+
+
+    def testKeysThatCannotBeCompared(self):
+        """
+        test the merge functions raise MergeException for keys that cannot be compared, e.g. None.
+        """
+        records = [{'name': 'James'}, {'name': None}]
+        self.assertRaises(MergeException, list, iter_checked([records]))
+        self.assertRaises(MergeException, spill_runs, [records])
+        self.assertRaises(MergeException, list, merge_records([records[:1], records[1:]]))
+
+
+    def testIterRecordBatches(self):
+        """
+        test iter_record_batches() groups the records.
+        """
+        self.assertEqual([len(batch) for batch in iter_record_batches(iter(NORTH + SOUTH), 4)], [4, 2])
+        self.assertRaises(MergeException, list, iter_record_batches(NORTH, 0))
+
+
+class TestFormatsMerge(unittest.TestCase):
+    """
+    Test Cases for the method al_contacts.formats.Formats.merge()
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.formats = Formats()
+        JsonRW(JsonFormat(self.formats))
+        PickleRW(PickleFormat(self.formats))
+        CsvRW(CsvFormat(self.formats))
+        self.jsonPath = self._path('north.json')
+        self.picklePath = self._path('south.pickle')
+        self.formats.get_format('json').notify_rw('serialise', list(reversed(NORTH)), self.jsonPath)
+        self.formats.get_format('pickle').notify_rw('serialise', SOUTH, self.picklePath)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def _path(self, name):
+        return os.path.join(self.tmpDirPath, name)
+
+
+    def testMergeDetectsFormats(self):
+        """
+        test Formats.merge() merges files of several formats, sorting the unsorted ones.
+        """
+        output = self._path('merged.csv')
+        count = self.formats.merge([self.jsonPath, self.picklePath], 'csv', output, runRecords=2)
+        self.assertEqual(count, 6)
+        merged = self.formats.get_format('csv').notify_rw('deserialise', output)
+        self.assertEqual(names(merged), sorted(names(NORTH + SOUTH)))
+
+
+    def testMergeDedupe(self):
+        """
+        test Formats.merge() with dedupe, the first input taking precedence.
+        """
+        output = self._path('merged.json')
+        count = self.formats.merge([('pickle', self.picklePath), ('json', self.jsonPath)], 'json', output,
+                                   dedupe=True)
+        self.assertEqual(count, 5)
+        merged = self.formats.get_format('json').notify_rw('deserialise', output)
+        self.assertIn(SOUTH[1], merged)
+        self.assertNotIn(NORTH[1], merged)
+
+
+    def testMergePresorted(self):
+        """
+        test Formats.merge() checks that presorted inputs are sorted.
+        """
+        output = self._path('merged.json')
+        self.assertEqual(self.formats.merge([self.picklePath], 'json', output, presorted=True), 3)
+        self.assertRaises(MergeException, self.formats.merge, [self.jsonPath, self.picklePath], 'json', output,
+                          presorted=True)
+
+
+    def testMergeInPasses(self):
+        """
+        test Formats.merge() with more runs or presorted inputs than 'maxFanIn'.
+        """
+        output = self._path('merged.json')
+        count = self.formats.merge([('pickle', self.picklePath), ('json', self.jsonPath)], 'json', output,
+                                   dedupe=True, runRecords=1, maxFanIn=2)
+        self.assertEqual(count, 5)
+        merged = self.formats.get_format('json').notify_rw('deserialise', output)
+        self.assertEqual(names(merged), sorted(set(names(NORTH + SOUTH))))
+        self.assertIn(SOUTH[1], merged)
+
+        self.assertEqual(self.formats.merge([self.picklePath] * 3, 'json', output, presorted=True, maxFanIn=2), 9)
+
+
+    def testMergeInvalidInputs(self):
+        """
+        test Formats.merge() with no inputs or the output among the inputs.
+        """
+        self.assertRaises(FormatsException, self.formats.merge, [], 'json', self._path('merged.json'))
+        self.assertRaises(FormatsException, self.formats.merge, [self.jsonPath], 'json', self.jsonPath)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# import classes and functions from al_contacts.metrics
+from al_contacts.metrics import MetricsException
+from al_contacts.metrics import MetricsRegistry
+from al_contacts.metrics import MetricsHook
+from al_contacts.metrics import cache_collector
+from al_contacts.metrics import metrics_textfile
+from al_contacts.instrumentation import hooked
+from al_contacts.instrumentation import stage
+from al_contacts.formats import Formats
+from al_contacts.format import JsonFormat
+from al_contacts.reader_writer import JsonRW
+from al_contacts.contacts import load_csv_file
+from al_contacts.constants import CSV_INPUT_FILE
+
+
+class FakeCache:
+    """
+    Cache returning fixed statistics
+    """
+    def stats(self):
+        return {'hits': 3, 'misses': 1, 'evictions': 0, 'datasets': 1, 'bytes': 2048}
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.metrics.MetricsRegistry
+    """
+    def testCounterAndGauge(self):
+        """
+        test counters only go up and are exported with their labels.
+        """
+        registry = MetricsRegistry()
+        counter = registry.counter('test_total', 'Test counter', ('kind',))
+        counter.inc(('a',))
+        counter.inc(('a',), 2)
+        counter.inc(('b "quoted"',))
+        registry.gauge('test_bytes', 'Test gauge').set(1.5)
+        self.assertIs(registry.counter('test_total', 'Test counter', ('kind',)), counter)
+        self.assertEqual(counter.value(('a',)), 3)
+        self.assertRaises(MetricsException, counter.inc, ('a',), -1)
+        self.assertRaises(MetricsException, counter.inc, ())
+        self.assertRaises(MetricsException, registry.gauge, 'test_total', 'Test gauge')
+
+        self.assertEqual(registry.to_prometheus().splitlines(), [
+            '# HELP test_bytes Test gauge',
+            '# TYPE test_bytes gauge',
+            'test_bytes 1.5',
+            '# HELP test_total Test counter',
+            '# TYPE test_total counter',
+            'test_total{kind="a"} 3',
+            'test_total{kind="b \\"quoted\\""} 1',
+        ])
+
+
+    def testHistogram(self):
+        """
+        test a histogram exports cumulative buckets, its sum and its count.
+        """
+        registry = MetricsRegistry()
+        histogram = registry.histogram('test_seconds', 'Test histogram', buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.count(), 4)
+        lines = registry.to_prometheus().splitlines()
+        self.assertEqual(lines[2:], [
+            'test_seconds_bucket{le="0.1"} 2',
+            'test_seconds_bucket{le="1"} 3',
+            'test_seconds_bucket{le="+Inf"} 4',
+            'test_seconds_sum 2.65',
+            'test_seconds_count 4',
+        ])
+        self.assertRaises(MetricsException, registry.histogram, 'bad_seconds', 'Bad', buckets=(1.0, 0.1))
+
+
+    def testCacheCollector(self):
+        """
+        test the cache statistics are read on every export.
+        """
+        registry = MetricsRegistry()
+        registry.add_collector(cache_collector(FakeCache()))
+        text = registry.to_prometheus()
+        self.assertIn('# TYPE al_contacts_cache_hits_total counter', text)
+        self.assertIn('al_contacts_cache_hits_total{cache="datasets"} 3', text)
+        self.assertIn('al_contacts_cache_hit_ratio{cache="datasets"} 0.75', text)
+        self.assertIn('al_contacts_cache_bytes{cache="datasets"} 2048', text)
+
+
+class TestMetricsHook(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.metrics.MetricsHook and metrics_textfile()
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def testMetricsHook(self):
+        """
+        test the reader/writer actions update the records, bytes and latency metrics.
+        """
+        filepath = os.path.join(self.tmpDirPath, 'contacts.json')
+        jsonFormat = JsonFormat(Formats())
+        JsonRW(jsonFormat)
+        registry = MetricsRegistry()
+        hook = MetricsHook(registry)
+        with hooked(hook):
+            jsonFormat.notify_rw('serialise', load_csv_file(CSV_INPUT_FILE), filepath)
+            jsonFormat.notify_rw('deserialise', filepath=filepath)
+            try:
+                with stage('rw.deserialise', 'json'):
+                    raise ValueError('broken')
+            except ValueError:
+                pass
+
+        labels = ('rw.deserialise', 'json')
+        self.assertEqual(hook.records.value(('rw.serialise', 'json')), 10)
+        self.assertEqual(hook.bytes.value(labels), os.path.getsize(filepath))
+        self.assertEqual(hook.calls.value(labels), 2)
+        self.assertEqual(hook.errors.value(labels), 1)
+        self.assertEqual(hook.latency.count(labels), 2)
+        self.assertEqual(hook.records.value(('csv.load', '')), 10)
+
+
+    def testMetricsTextfile(self):
+        """
+        test metrics_textfile() writes the metrics of the block even when it raised, in a file
+        with the permissions open() gives.
+        """
+        path = os.path.join(self.tmpDirPath, 'al_contacts.prom')
+        with self.assertRaises(ValueError):
+            with metrics_textfile(path):
+                load_csv_file(CSV_INPUT_FILE)
+                raise ValueError('broken')
+        with open(path) as fp:
+            text = fp.read()
+        self.assertIn('al_contacts_records_total{stage="csv.load",label=""} 10', text)
+        self.assertEqual(os.listdir(self.tmpDirPath), ['al_contacts.prom'])
+        referencePath = os.path.join(self.tmpDirPath, 'reference')
+        open(referencePath, 'w').close()
+        self.assertEqual(os.stat(path).st_mode & 0o777, os.stat(referencePath).st_mode & 0o777)
+
+
+if __name__ == '__main__':
+    unittest.main()
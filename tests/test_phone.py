@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import unittest
+
+# import classes from al_contacts.phone
+from al_contacts.phone import PhoneException
+from al_contacts.phone import PhoneNormaliser
+from al_contacts.phone import normalise_phone
+from al_contacts.phone import normalise_phones
+from al_contacts.phone import is_valid_phone
+
+
+class TestNormalisePhones(unittest.TestCase):
+    """
+    Test Cases for the functions al_contacts.phone.normalise_phones() and normalise_phone()
+    """
+
+    ######################################################################
+    # tests for al_contacts.phone.normalise_phones()                     #
+    ######################################################################
+
+    def testNormalisePhonesWithTrunkPrefix(self):
+        """
+        test normalise_phones() replaces the national trunk prefix with the country code.
+        """
+        self.assertEqual(normalise_phones([' 0123456789']), ['+44123456789'])
+        self.assertEqual(normalise_phones(['0123456789'], country_code='1'), ['+1123456789'])
+
+
+    def testNormalisePhonesWithInternationalPrefixAndSeparators(self):
+        """
+        test normalise_phones() with '00'/'+' prefixes and separators.
+        """
+        numbers = ['0044 20 7946-0000', '+44 (0)20 7946 0000', '+1 (212) 555.0100']
+        self.assertEqual(normalise_phones(numbers), ['+442079460000', '+442079460000', '+12125550100'])
+        numbers = ['0044(0)2079460000', '(0)123456789', '(0)20 7946 0000']
+        self.assertEqual(normalise_phones(numbers), ['+442079460000', '+44123456789', '+442079460000'])
+
+
+    def testNormalisePhonesWithInvalidNumbers(self):
+        """
+        test normalise_phones() returns None for invalid numbers and keeps the order.
+        """
+        numbers = [' W1W3AD', '0123456789', '', None, '01', '1234567890123456']
+        self.assertEqual(normalise_phones(numbers), [None, '+44123456789', None, None, None, None])
+
+
+    def testNormalisePhonesWithEmbeddedNewline(self):
+        """
+        test normalise_phones() does not let an embedded newline shift the batch.
+        """
+        numbers = ['0123456789\n+442079460000', '0123456789']
+        self.assertEqual(normalise_phones(numbers), [None, '+44123456789'])
+
+
+    def testNormalisePhonesWithEmptyBatch(self):
+        """
+        test normalise_phones() with an empty batch.
+        """
+        self.assertEqual(normalise_phones([]), [])
+
+
+    def testNormalisePhonesWithInvalidCountryCode(self):
+        """
+        test normalise_phones() with an invalid country code.
+        """
+        self.assertRaises(PhoneException, normalise_phones, ['0123456789'], 'x')
+        self.assertRaises(PhoneException, normalise_phones, ['0123456789'], '0')
+
+
+    def testNormalisePhoneAndIsValidPhone(self):
+        """
+        test normalise_phone() and is_valid_phone() for single numbers.
+        """
+        self.assertEqual(normalise_phone('0123456789'), '+44123456789')
+        self.assertEqual(normalise_phone(None), None)
+        self.assertTrue(is_valid_phone('+44123456789'))
+        self.assertFalse(is_valid_phone('0123456789'))
+
+
+class TestPhoneNormaliser(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.phone.PhoneNormaliser
+    """
+    def setUp(self):
+        self.normaliser = PhoneNormaliser()
+        self.data = [
+            {'name': 'Rahul Singh', 'address': ' 28 Deanswood N112TQ', 'phone': ' 0123456789'},
+            {'name': 'Tom', 'address': ' London Bridge', 'phone': ' W1W3AD'},
+        ]
+
+
+    def testStringRepresentation(self):
+        """
+        test String Representation
+        """
+        self.assertEqual(str(self.normaliser), 'phone normaliser')
+
+
+    def testCallNormalisesCopiesOfTheData(self):
+        """
+        test PhoneNormaliser() as a processing stage keeps invalid numbers and the input data.
+        """
+        result = self.normaliser(self.data)
+        self.assertEqual([item['phone'] for item in result], ['+44123456789', ' W1W3AD'])
+        self.assertEqual(self.data[0]['phone'], ' 0123456789')
+
+
+    def testCallWithDropInvalid(self):
+        """
+        test PhoneNormaliser() drops contacts with invalid numbers when asked to.
+        """
+        result = PhoneNormaliser(drop_invalid=True)(self.data)
+        self.assertEqual([item['name'] for item in result], ['Rahul Singh'])
+
+
+    def testKey(self):
+        """
+        test PhoneNormaliser.key() for valid and invalid numbers.
+        """
+        self.assertEqual(self.normaliser.key({'phone': '0044 123 456 789'}), self.normaliser.key(self.data[0]))
+        self.assertEqual(self.normaliser.key(self.data[1]), 'W1W3AD')
+        self.assertEqual(self.normaliser.key({}), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# import classes from al_contacts.pipeline
+from al_contacts.pipeline import Pipeline
+from al_contacts.pipeline import PipelineException
+from al_contacts.pipeline import Dedupe
+from al_contacts.pipeline import FieldFilter
+from al_contacts.pipeline import format_report
+from al_contacts.formats import Formats
+from al_contacts.format import JsonFormat, PickleFormat
+from al_contacts.reader_writer import JsonRW, PickleRW
+from al_contacts.view import ListView
+from al_contacts.constants import CSV_INPUT_FILE
+
+
+class MockViews:
+    """
+    This is a mock class for al_contacts.views.Views
+    """
+    def register_view(self, *args, **kwargs):
+        pass
+
+
+def fail(batch):
+    """
+    Transform failing on the second batch.
+    """
+    if batch[0]['name'] == '10':
+        raise ValueError('bad batch')
+    return batch
+
+
+class TestDedupe(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.pipeline.Dedupe
+    """
+    def testDedupeAcrossBatches(self):
+        """
+        test Dedupe drops the contacts seen in the same or an earlier batch.
+        """
+        dedupe = Dedupe(['name'])
+        self.assertEqual(dedupe([{'name': 'a'}, {'name': 'b'}, {'name': 'a'}]), [{'name': 'a'}, {'name': 'b'}])
+        self.assertEqual(dedupe([{'name': 'b'}, {'name': 'c'}]), [{'name': 'c'}])
+
+
+class TestFieldFilter(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.pipeline.FieldFilter
+    """
+    def testFieldFilter(self):
+        """
+        test FieldFilter keeps the contacts whose field matches, and survives pickling.
+        """
+        import pickle
+        aFilter = pickle.loads(pickle.dumps(FieldFilter('name', '^A')))
+        self.assertEqual(aFilter([{'name': 'Ann'}, {'name': 'Bob'}, {}]), [{'name': 'Ann'}])
+
+
+class TestPipeline(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.pipeline.Pipeline
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.formats = Formats()
+        self.jsonFormat = JsonFormat(self.formats)
+        self.pickleFormat = PickleFormat(self.formats)
+        JsonRW(self.jsonFormat)
+        PickleRW(self.pickleFormat)
+        self.data = [{'name': str(index % 40), 'address': 'a', 'phone': '0'} for index in range(100)]
+        self.batches = [self.data[start:start + 10] for start in range(0, 100, 10)]
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def testRunToFormatsAndViews(self):
+        """
+        test run() passes the batches through the transforms to every sink.
+        """
+        jsonPath = os.path.join(self.tmpDirPath, 'out.json')
+        picklePath = os.path.join(self.tmpDirPath, 'out.pickle')
+        pipeline = Pipeline(queueDepth=2)
+        pipeline.add_transform(Dedupe(['name'])).add_transform(FieldFilter('name', '^1'))
+        pipeline.add_rw_sink(self.jsonFormat, jsonPath).add_rw_sink(self.pickleFormat, picklePath)
+        pipeline.add_view_sink(ListView(MockViews()))
+        report = pipeline.run(iter(self.batches), display=False)
+
+        expected = [item for item in self.data[:40] if item['name'].startswith('1')]
+        self.assertEqual(self.jsonFormat.notify_rw('deserialise', jsonPath), expected)
+        self.assertEqual(self.pickleFormat.notify_rw('deserialise', picklePath), expected)
+        self.assertIn('Contact Details in List View', report['views']['list'])
+        self.assertEqual(report['records'], 100)
+        self.assertEqual([stage['name'] for stage in report['stages']], ['source', 'dedupe', 'filter', 'json', 'pickle', 'list'])
+        self.assertEqual([stage['records'] for stage in report['stages']], [100, 40, 11, 11, 11, 11])
+        self.assertEqual(len(report['queues']), 5)
+        self.assertIn(report['bottleneck'], [stage['name'] for stage in report['stages']])
+        self.assertIn('bottleneck', format_report(report))
+
+
+    def testRunWithCsvSourceAndProcessStage(self):
+        """
+        test run() reads a csv file in batches and runs a transform in its own process.
+        """
+        jsonPath = os.path.join(self.tmpDirPath, 'out.json')
+        pipeline = Pipeline(batchSize=3)
+        pipeline.add_transform(Dedupe(), process=True)
+        pipeline.add_rw_sink(self.jsonFormat, jsonPath)
+        report = pipeline.run(CSV_INPUT_FILE)
+        self.assertEqual(report['stages'][0]['batches'], 4)
+        self.assertEqual(len(self.jsonFormat.notify_rw('deserialise', jsonPath)), 10)
+
+
+    def testRunForksProcessStagesBeforeThreads(self):
+        """
+        test run() starts the process stages before any of its threads.
+        """
+        import threading
+        import multiprocessing
+        threads = []
+        start = multiprocessing.Process.start
+        def record_start(process):
+            threads.append(threading.active_count())
+            start(process)
+
+        multiprocessing.Process.start = record_start
+        try:
+            before = threading.active_count()
+            pipeline = Pipeline(batchSize=3).add_transform(Dedupe(), process=True)
+            pipeline.add_transform(Dedupe(), 'dedupe2', process=True)
+            pipeline.add_rw_sink(self.jsonFormat, os.path.join(self.tmpDirPath, 'out.json'))
+            pipeline.run(CSV_INPUT_FILE)
+        finally:
+            multiprocessing.Process.start = start
+        self.assertEqual(threads, [before, before])
+
+
+    def testRunWithFailingStage(self):
+        """
+        test run() stops every stage, raises PipelineException and leaves no output behind when
+        a stage fails.
+        """
+        jsonPath = os.path.join(self.tmpDirPath, 'out.json')
+        pipeline = Pipeline(queueDepth=1)
+        pipeline.add_transform(fail, 'fail').add_rw_sink(self.jsonFormat, jsonPath)
+        self.assertRaises(PipelineException, pipeline.run, iter(self.batches))
+        self.assertEqual(os.listdir(self.tmpDirPath), [])
+
+
+    def testInvalidPipelines(self):
+        """
+        test Pipeline with invalid sizes, duplicate stage names and no sinks.
+        """
+        self.assertRaises(PipelineException, Pipeline, 0)
+        self.assertRaises(PipelineException, Pipeline, 10, 0)
+        pipeline = Pipeline().add_transform(Dedupe())
+        self.assertRaises(PipelineException, pipeline.add_transform, Dedupe())
+        self.assertRaises(PipelineException, pipeline.run, iter(self.batches))
+
+
+if __name__ == '__main__':
+    unittest.main()
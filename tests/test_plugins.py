@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# import functions from al_contacts.plugins
+from al_contacts.plugins import PluginsException
+from al_contacts.plugins import load_object
+from al_contacts.plugins import discover_plugins
+from al_contacts.plugins import save_plugins_cache
+from al_contacts.plugins import FORMATS_GROUP, VIEWS_GROUP
+import al_contacts.plugins as plugins
+
+
+class TestLoadObject(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.plugins.load_object()
+    """
+    def testLoadObjectByPath(self):
+        """
+        test load_object() imports and returns the named object.
+        """
+        from al_contacts.format import JsonFormat
+        self.assertIs(load_object('al_contacts.format:JsonFormat'), JsonFormat)
+        self.assertEqual(load_object('os.path:join.__name__'), 'join')
+
+
+    def testLoadObjectWithObject(self):
+        """
+        test load_object() returns objects that are not strings as they are.
+        """
+        self.assertIs(load_object(TestLoadObject), TestLoadObject)
+
+
+    def testLoadObjectWithInvalidPaths(self):
+        """
+        test load_object() with invalid paths, modules and attributes.
+        """
+        for path in ['al_contacts.format', ':JsonFormat', 'al_contacts.xxxx:Format', 'al_contacts.format:Xxxx']:
+            self.assertRaises(PluginsException, load_object, path)
+
+
+class TestDiscoverPlugins(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.plugins.discover_plugins()
+    """
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.cacheFile = os.path.join(self.tmpDir, 'plugins.cache')
+        self.siteDir = os.path.join(self.tmpDir, 'site')
+        distInfo = os.path.join(self.siteDir, 'fakeplugin-1.0.dist-info')
+        os.makedirs(distInfo)
+        with open(os.path.join(distInfo, 'METADATA'), 'w') as fp:
+            fp.write('Metadata-Version: 2.1\nName: fakeplugin\nVersion: 1.0\n')
+        with open(os.path.join(distInfo, 'entry_points.txt'), 'w') as fp:
+            fp.write('[al_contacts.formats]\nyaml = fakeplugin:make_yaml_format\n'
+                     '[al_contacts.views]\nbullet = fakeplugin:BulletView\n')
+        sys.path.insert(0, self.siteDir)
+        plugins._discovered.clear()
+
+
+    def tearDown(self):
+        sys.path.remove(self.siteDir)
+        plugins._discovered.clear()
+        shutil.rmtree(self.tmpDir)
+
+
+    def testDiscoverPlugins(self):
+        """
+        test discover_plugins() returns the entry points of each group without importing them.
+        """
+        self.assertIn(('yaml', 'fakeplugin:make_yaml_format'), discover_plugins(FORMATS_GROUP, self.cacheFile))
+        self.assertIn(('bullet', 'fakeplugin:BulletView'), discover_plugins(VIEWS_GROUP, self.cacheFile))
+        self.assertNotIn('fakeplugin', sys.modules)
+        self.assertRaises(PluginsException, discover_plugins, 'xxxx', self.cacheFile)
+
+
+    def testDiscoverPluginsFromCache(self):
+        """
+        test discover_plugins() reads a fresh cache instead of the distributions' metadata.
+        """
+        plugins_ = discover_plugins(FORMATS_GROUP, self.cacheFile)
+        self.assertFalse(os.path.exists(self.cacheFile))
+        save_plugins_cache()
+        self.assertTrue(os.path.exists(self.cacheFile))
+
+        plugins._discovered.clear()
+        scan = plugins._scan_entry_points
+        plugins._scan_entry_points = None
+        try:
+            self.assertEqual(discover_plugins(FORMATS_GROUP, self.cacheFile), plugins_)
+        finally:
+            plugins._scan_entry_points = scan
+
+
+    def testDiscoverPluginsWithStaleCache(self):
+        """
+        test discover_plugins() reads the metadata again once a distribution is removed.
+        """
+        discover_plugins(FORMATS_GROUP, self.cacheFile)
+        save_plugins_cache()
+        shutil.rmtree(os.path.join(self.siteDir, 'fakeplugin-1.0.dist-info'))
+        # make sure the directory modification time changes on file systems with coarse times
+        os.utime(self.siteDir, ns=(0, 0))
+
+        plugins._discovered.clear()
+        self.assertNotIn(('yaml', 'fakeplugin:make_yaml_format'), discover_plugins(FORMATS_GROUP, self.cacheFile))
+
+
+    def testCacheIgnoresCurrentDirectory(self):
+        """
+        test a change of the current directory does not make the cache stale.
+        """
+        cwd = os.getcwd()
+        for name in ('first', 'second'):
+            os.mkdir(os.path.join(self.tmpDir, name))
+        sys.path.insert(0, '')
+        try:
+            os.chdir(os.path.join(self.tmpDir, 'first'))
+            discover_plugins(FORMATS_GROUP, self.cacheFile)
+            save_plugins_cache()
+            os.chdir(os.path.join(self.tmpDir, 'second'))
+            self.assertEqual(plugins._read_cache(self.cacheFile, plugins._fingerprint()), dict(plugins._discovered))
+        finally:
+            os.chdir(cwd)
+            sys.path.remove('')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,12 +6,17 @@ import unittest
 import tempfile
 import json
 import pickle
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 # import classes from al_contacts.reader_writer
 from al_contacts.reader_writer import ReaderWriterException
 from al_contacts.reader_writer import ReaderWriter
 from al_contacts.reader_writer import JsonRW
 from al_contacts.reader_writer import PickleRW
+from al_contacts.reader_writer import BinaryRW
+from al_contacts.reader_writer import CsvRW
+from al_contacts.reader_writer import BINARY_HEADER
 
 
 class MockFormat:
@@ -68,6 +73,14 @@ class TestReaderWriter(unittest.TestCase):
         self.assertEqual(self.rw.filepath, '')
 
 
+    def testDefaultDataIsNotSharedBetweenInstances(self):
+        """
+        test the default 'data' list is not shared between instances
+        """
+        self.rw.data.append({'a':'aa'})
+        self.assertEqual(ReaderWriter(self.mockFormat).data, [])
+
+
     def testInitialisationForActionsInstanceVariable(self):
         """
         test Initialisation For 'actions' Instance Variable
@@ -103,6 +116,24 @@ class TestReaderWriter(unittest.TestCase):
         self.assertEqual(self.rw.notify(self.mockFormat, validAction), None)
 
 
+    ######################################################################
+    # tests for al_contacts.reader_writer.ReaderWriter.anotify()         #
+    ######################################################################
+
+    def testANotifyWithInvalidActionName(self):
+        """
+        test al_contacts.reader_writer.ReaderWriter.anotify() when action arg is invalid action name.
+        """
+        self.assertRaises(ReaderWriterException, asyncio.run, self.rw.anotify(self.mockFormat, 'xxxxxxxxx'))
+
+
+    def testANotifyWithValidAction(self):
+        """
+        test al_contacts.reader_writer.ReaderWriter.anotify() with valid action arg.
+        """
+        self.assertEqual(asyncio.run(self.rw.anotify(self.mockFormat, 'deserialise')), None)
+
+
 class TestJsonRW(unittest.TestCase):
     """
     Test Cases for the class al_contacts.reader_writer.JsonRW
@@ -221,6 +252,216 @@ class TestJsonRW(unittest.TestCase):
             self.assertTrue(False, msg=message)
 
 
+    ######################################################################
+    # tests for al_contacts.reader_writer.JsonRW.aserialise()/adeserialise()
+    ######################################################################
+
+    def testASerialiseThenADeserialiseRoundTrip(self):
+        """
+        test aserialise and adeserialise round trip the data without blocking the event loop.
+        """
+        filePath = os.path.join(tempfile.mkdtemp(prefix='al_contacts_test'), 'serialised.json')
+        data = [{'a':'aa'}, {'b': 'bb'}]
+        self.jrw.data = data
+        self.jrw.filepath = filePath
+        asyncio.run(self.jrw.aserialise())
+
+        self.jrw.data = []
+        asyncio.run(self.jrw.adeserialise())
+        self.assertEqual(self.jrw.data, data)
+
+
+    def testANotifyGoesThroughNotify(self):
+        """
+        test anotify(), aserialise() and adeserialise() go through notify(): the instrumentation
+        hooks see the actions, and the delta store and the cache of the reader/writer are used.
+        """
+        from al_contacts.instrumentation import StageTimer, hooked
+        from al_contacts.delta import DeltaStore, list_deltas
+        from al_contacts.cache import DeserialisationCache
+
+        filePath = os.path.join(tempfile.mkdtemp(prefix='al_contacts_test'), 'serialised.json')
+        data = [{'name': 'a', 'address': 'aa', 'phone': '1'}, {'name': 'b', 'address': 'bb', 'phone': '2'}]
+        self.jrw.delta = DeltaStore()
+        timer = StageTimer()
+        with hooked(timer):
+            asyncio.run(self.jrw.aserialise(data, filePath))
+            asyncio.run(self.jrw.anotify(self.mockFormat, 'serialise', data[:1], filePath))
+            self.assertEqual(len(list_deltas(filePath)), 1)
+            self.assertEqual(asyncio.run(self.jrw.adeserialise(filePath)), data[:1])
+        stats = dict((stats['stage'], stats) for stats in timer.report())
+        self.assertEqual(stats['rw.serialise']['calls'], 2)
+        self.assertEqual(stats['rw.deserialise']['calls'], 1)
+
+        self.jrw.delta = None
+        self.jrw.cache = DeserialisationCache()
+        asyncio.run(self.jrw.adeserialise(filePath))
+        asyncio.run(self.jrw.adeserialise(filePath))
+        self.assertEqual(self.jrw.cache.stats()['hits'], 1)
+
+
+    def testNotifyWithPerCallStoreAndCache(self):
+        """
+        test notify() with a delta store and a cache passed for the call only, which leaves the
+        shared reader/writer as it is.
+        """
+        from al_contacts.delta import DeltaStore, list_deltas
+        from al_contacts.cache import DeserialisationCache
+
+        filePath = os.path.join(tempfile.mkdtemp(prefix='al_contacts_test'), 'serialised.json')
+        data = [{'name': 'a', 'address': 'aa', 'phone': '1'}, {'name': 'b', 'address': 'bb', 'phone': '2'}]
+        delta = DeltaStore()
+        self.jrw.notify(self.mockFormat, 'serialise', data, filePath, delta=delta)
+        self.jrw.notify(self.mockFormat, 'serialise', data[:1], filePath, delta=delta)
+        self.assertEqual(len(list_deltas(filePath)), 1)
+        self.assertEqual(self.jrw.notify(self.mockFormat, 'deserialise', filePath, delta=delta), data[:1])
+        self.assertEqual(self.jrw.notify(self.mockFormat, 'deserialise', filePath), data)
+
+        cache = DeserialisationCache()
+        self.jrw.notify(self.mockFormat, 'deserialise', filePath, cache=cache)
+        self.jrw.notify(self.mockFormat, 'deserialise', filePath, cache=cache)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual((self.jrw.delta, self.jrw.cache, self.jrw.bloom), (None, None, None))
+
+
+    ######################################################################
+    # tests for the per-call JsonRW.serialise(data, filepath) and        #
+    # JsonRW.deserialise(filepath)                                       #
+    ######################################################################
+
+    def testPerCallSerialiseAndDeserialiseDoNotTouchInstanceState(self):
+        """
+        test per-call serialise/deserialise return the data and leave 'data' and 'filepath' alone
+        """
+        filePath = os.path.join(tempfile.mkdtemp(prefix='al_contacts_test'), 'serialised.json')
+        data = [{'a':'aa'}, {'b': 'bb'}]
+        self.assertEqual(self.jrw.serialise(data, filePath), data)
+        self.assertEqual(self.jrw.deserialise(filePath), data)
+        self.assertEqual(self.jrw.data, [])
+        self.assertEqual(self.jrw.filepath, '')
+
+
+    def testNotifyForwardsPerCallArguments(self):
+        """
+        test al_contacts.reader_writer.JsonRW.notify() forwards the per-call arguments
+        """
+        filePath = os.path.join(tempfile.mkdtemp(prefix='al_contacts_test'), 'serialised.json')
+        data = [{'a':'aa'}]
+        self.jrw.notify(self.mockFormat, 'serialise', data, filePath)
+        self.assertEqual(self.jrw.notify(self.mockFormat, 'deserialise', filepath=filePath), data)
+
+
+    def testPerCallSerialiseFromSeveralThreads(self):
+        """
+        test a single instance serving several threads at once with per-call arguments
+        """
+        tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+
+        def roundTrip(index):
+            filePath = os.path.join(tmpDirPath, '{0}.json'.format(index))
+            data = [{'name': str(index)}] * (index + 1)
+            self.jrw.serialise(data, filePath)
+            return self.jrw.deserialise(filePath) == data
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertTrue(all(executor.map(roundTrip, range(32))))
+
+
+    def testWriteBatchesToSamePathFromSeveralThreads(self):
+        """
+        test write_batches from several threads to the same path leaves one complete file, with
+        the permissions open() gives, and no temporary file behind
+        """
+        tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        filePath = os.path.join(tmpDirPath, 'shared.json')
+        referencePath = os.path.join(tmpDirPath, 'reference.json')
+        open(referencePath, 'w').close()
+        fileMode = os.stat(referencePath).st_mode & 0o777
+        os.remove(referencePath)
+        versions = [[{'name': str(index), 'address': 'a' * 1000, 'phone': '1'}] * 200 for index in range(16)]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            counts = list(executor.map(lambda data: self.jrw.write_batches([data[:100], data[100:]], filePath), versions))
+        self.assertEqual(counts, [200] * 16)
+        self.assertIn(self.jrw.deserialise(filePath), versions)
+        self.assertEqual(os.listdir(tmpDirPath), ['shared.json'])
+        self.assertEqual(os.stat(filePath).st_mode & 0o777, fileMode)
+
+
+    def testWriteBatchesKeepsPermissionsOfReplacedFile(self):
+        """
+        test write_batches keeps the permissions of the file it replaces
+        """
+        tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        filePath = os.path.join(tmpDirPath, 'private.json')
+        self.jrw.serialise([{'name': 'a'}], filePath)
+        os.chmod(filePath, 0o600)
+        self.jrw.write_batches([[{'name': 'b'}]], filePath)
+        self.assertEqual(os.stat(filePath).st_mode & 0o777, 0o600)
+        self.assertEqual(self.jrw.deserialise(filePath), [{'name': 'b'}])
+        self.assertEqual(os.listdir(tmpDirPath), ['private.json'])
+
+
+    ######################################################################
+    # tests for al_contacts.reader_writer.JsonRW.iter_batches() and      #
+    # JsonRW.write_batches()                                             #
+    ######################################################################
+
+    def testWriteBatchesWritesSameFileAsSerialise(self):
+        """
+        test write_batches writes the same json as serialise and iter_batches streams it back
+        """
+        tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        data = [{'name': 'n{0}'.format(index), 'address': 'a "{0}"'.format(index), 'phone': '\u00e9'} for index in range(25)]
+        self.jrw.serialise(data, os.path.join(tmpDirPath, 'serialised.json'))
+        batches = [data[start:start + 7] for start in range(0, 25, 7)] + [[]]
+        self.assertEqual(self.jrw.write_batches(batches, os.path.join(tmpDirPath, 'batches.json')), 25)
+
+        with open(os.path.join(tmpDirPath, 'serialised.json')) as fp1, open(os.path.join(tmpDirPath, 'batches.json')) as fp2:
+            self.assertEqual(fp1.read(), fp2.read())
+
+        batches = list(self.jrw.iter_batches(os.path.join(tmpDirPath, 'batches.json'), batchSize=10))
+        self.assertEqual([len(batch) for batch in batches], [10, 10, 5])
+        self.assertEqual([item for batch in batches for item in batch], data)
+
+
+    def testIterBatchesAcrossChunkBoundaries(self):
+        """
+        test iter_batches parses records split across the read chunks, and rejects bad json
+        """
+        from al_contacts.reader_writer import _iter_json_array
+        filePath = tempfile.mkstemp(prefix='al_contacts_test_')[1]
+        data = [{'a': 'x' * index, 'b': index * 1000} for index in range(50)]
+        with open(filePath, 'w') as fp:
+            fp.write(' \n' + json.dumps(data, indent=2) + '\n')
+        with open(filePath, 'r') as fp:
+            self.assertEqual([item for batch in _iter_json_array(fp, 3, chunkSize=7) for item in batch], data)
+
+        for content in ['{"a": 1}', '[{"a": 1} {"a": 2}]', '[{"a": 1},']:
+            with open(filePath, 'w') as fp:
+                fp.write(content)
+            self.assertRaises(ReaderWriterException, list, self.jrw.iter_batches(filePath))
+
+
+    def testIterBatchesDecodesContactsInBulk(self):
+        """
+        test the contacts laid out as json.dumps() writes them, or not, stream back the same,
+        in batches of the requested size.
+        """
+        from al_contacts.reader_writer import _iter_json_array
+        filePath = tempfile.mkstemp(prefix='al_contacts_test_')[1]
+        data = [{'name': 'n}}, {{"name": {0}'.format(index), 'address': 'a\\', 'phone': '\u00e9'} for index in range(300)]
+        nested = [{'name': 'x', 'contacts': data[:20]}, {'name': 'y'}]
+        for content in [json.dumps(data), json.dumps(nested), json.dumps(data, indent=1)]:
+            with open(filePath, 'w') as fp:
+                fp.write(content)
+            for chunkSize in (50, 1000, 1 << 16):
+                with open(filePath, 'r') as fp:
+                    batches = list(_iter_json_array(fp, 64, chunkSize=chunkSize))
+                self.assertEqual([item for batch in batches for item in batch], json.loads(content))
+                self.assertTrue(all(len(batch) == 64 for batch in batches[:-1]))
+
+
 class TestPickleRW(unittest.TestCase):
     """
     Test Cases for the class al_contacts.reader_writer.PickleRW
@@ -323,12 +564,13 @@ class TestPickleRW(unittest.TestCase):
         filePath = tempfile.mkstemp(prefix='al_contacts_test_')[1]
         if  os.path.exists(filePath):
             data = [{'a':'aa'}, {'b': 'bb'}]
-            with open(filePath, 'w') as fp:
+            with open(filePath, 'wb') as fp:
                 pickle.dump(data, fp)
 
             self.prw.filepath = filePath
             self.prw.deserialise()
             self.assertEqual(self.prw.data, data)
+            self.assertEqual(self.prw.deserialise(filePath), data)
 
         else:
             # this is to cover the case where the dir got deleted for some reason
@@ -336,5 +578,257 @@ class TestPickleRW(unittest.TestCase):
             self.assertTrue(False, msg=message)
 
 
+class TestPickleRWBatches(unittest.TestCase):
+    """
+    Test Cases for the streaming methods of the class al_contacts.reader_writer.PickleRW
+    """
+    def setUp(self):
+        self.prw = PickleRW(MockFormat())
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+
+
+    def testWriteBatchesThenDeserialiseAndIterBatches(self):
+        """
+        test write_batches writes one frame per batch that deserialise and iter_batches read back
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        filePath = os.path.join(self.tmpDirPath, 'batches.pickle')
+        data = [{'name': str(index)} for index in range(10)]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(self.prw.write_batches([data[:4], data[4:]], filePath, executor), 10)
+        self.assertEqual(self.prw.deserialise(filePath), data)
+        self.assertEqual([len(batch) for batch in self.prw.iter_batches(filePath, batchSize=3)], [3, 1, 3, 3])
+
+
+    def testWriteBatchesWithNoRecords(self):
+        """
+        test write_batches with no records writes an empty list
+        """
+        filePath = os.path.join(self.tmpDirPath, 'empty.pickle')
+        self.assertEqual(self.prw.write_batches([], filePath), 0)
+        self.assertEqual(self.prw.deserialise(filePath), [])
+
+
+class TestPickleRWColumnar(unittest.TestCase):
+    """
+    Test Cases for the columnar mode of the class al_contacts.reader_writer.PickleRW
+    """
+    def setUp(self):
+        self.prw = PickleRW(MockFormat(), columnar=True)
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.filePath = os.path.join(self.tmpDirPath, 'contacts.pickle')
+        self.data = [
+            {'name': 'Contact {0}'.format(index), 'address': '{0} High Street'.format(index), 'phone': str(index)}
+            for index in range(10)
+        ]
+
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def testSerialiseThenDeserialise(self):
+        """
+        test serialise() writes a pickle file and its side file that any PickleRW reads back.
+        """
+        from al_contacts.columns import buffers_path
+        self.assertEqual(self.prw.serialise(self.data, self.filePath), self.data)
+        self.assertTrue(os.path.exists(buffers_path(self.filePath)))
+        self.assertEqual(PickleRW(MockFormat()).deserialise(self.filePath), self.data)
+        self.assertEqual([len(batch) for batch in self.prw.iter_batches(self.filePath, batchSize=4)], [4, 4, 2])
+        self.assertRaises(ReaderWriterException, self.prw.serialise, [{'name': 'a'}], self.filePath)
+
+
+    def testContactColumnsAreWrittenColumnar(self):
+        """
+        test ContactColumns data is written columnar even when the mode is off.
+        """
+        from al_contacts.columns import ContactColumns, load_columns
+        PickleRW(MockFormat()).serialise(ContactColumns.from_records(self.data), self.filePath)
+        self.assertEqual(load_columns(self.filePath)[0].to_records(), self.data)
+
+
+    def testWriteBatches(self):
+        """
+        test write_batches() writes a columnar batch per non empty batch.
+        """
+        from al_contacts.columns import buffers_path
+        self.assertEqual(self.prw.write_batches([self.data[:3], [], self.data[3:]], self.filePath), 10)
+        self.assertEqual([len(batch) for batch in self.prw.iter_batches(self.filePath, batchSize=5)], [3, 5, 2])
+        self.assertEqual(self.prw.deserialise(self.filePath), self.data)
+        os.remove(buffers_path(self.filePath))
+        self.assertRaises(ReaderWriterException, self.prw.deserialise, self.filePath)
+
+
+class TestBinaryRW(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.reader_writer.BinaryRW
+    """
+    def setUp(self):
+        self.brw = BinaryRW(MockFormat(), blockRecords=4)
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.filePath = os.path.join(self.tmpDirPath, 'contacts.bin')
+        self.data = [
+            {'name': 'Contact {0}'.format(index), 'address': '{0} High Street'.format(index), 'phone': str(index)}
+            for index in range(10)
+        ]
+
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def testSerialiseThenDeserialise(self):
+        """
+        test serialise() and deserialise() round trip and beat pickle on size.
+        """
+        self.assertEqual(self.brw.serialise(self.data, self.filePath), self.data)
+        self.assertEqual(self.brw.deserialise(self.filePath), self.data)
+        with open(self.filePath, 'rb') as fp:
+            self.assertEqual(BINARY_HEADER.unpack(fp.read(BINARY_HEADER.size))[:4], (b'ALCB', 1, 0, 10))
+        self.assertLess(os.path.getsize(self.filePath), len(pickle.dumps(self.data)))
+        self.assertRaises(ReaderWriterException, self.brw.serialise, [], self.filePath)
+
+
+    def testFieldsWithSeparatorsLongAndNonAsciiText(self):
+        """
+        test the fields holding the separator, long fields and non ascii text round trip.
+        """
+        data = [
+            {'name': 'A\x1fB', 'address': 'x' * 300, 'phone': ''},
+            {'name': 'Zoë Ünal', 'address': '東京', 'phone': '+44 1'},
+            {'name': '', 'address': '', 'phone': ''},
+        ]
+        self.brw.serialise(data, self.filePath)
+        self.assertEqual(self.brw.deserialise(self.filePath), data)
+
+
+    def testSerialiseWithRecordsNotMatchingTheSchema(self):
+        """
+        test records with missing, extra or non text fields are refused.
+        """
+        for data in [[{'name': 'a', 'address': 'b'}], [dict(self.data[0], email='e')], [dict(self.data[0], phone=1)]]:
+            self.assertRaises(ReaderWriterException, self.brw.serialise, data, self.filePath)
+
+
+    def testWriteBatchesThenIterBatches(self):
+        """
+        test write_batches() cuts the batches into blocks that iter_batches() streams back.
+        """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(self.brw.write_batches([self.data[:3], [], self.data[3:]], self.filePath, executor), 10)
+        self.assertEqual([len(batch) for batch in self.brw.iter_batches(self.filePath, batchSize=3)], [3, 3, 1, 3])
+        self.assertEqual(self.brw.deserialise(self.filePath), self.data)
+        self.assertEqual(self.brw.write_batches([], self.filePath), 0)
+        self.assertEqual(self.brw.deserialise(self.filePath), [])
+
+
+    def testSplitRangesReadEveryRecordOnce(self):
+        """
+        test the ranges of split_ranges() yield every record exactly once, in order.
+        """
+        self.brw.serialise(self.data * 5, self.filePath)
+        for parts in (1, 2, 3, 7, 50):
+            records = []
+            for start, end in self.brw.split_ranges(self.filePath, parts):
+                for batch in self.brw.iter_range(start, end, self.filePath):
+                    records.extend(batch)
+            self.assertEqual(records, self.data * 5, parts)
+
+
+    def testDeserialiseCorruptedFiles(self):
+        """
+        test truncated, tampered and foreign files raise ReaderWriterException.
+        """
+        self.brw.serialise(self.data, self.filePath)
+        with open(self.filePath, 'rb') as fp:
+            content = fp.read()
+        headerSize = content.index(content[BINARY_HEADER.size - 16:BINARY_HEADER.size], BINARY_HEADER.size)
+        corrupted = [
+            content[:-5],
+            content[:BINARY_HEADER.size - 3],
+            b'XXXX' + content[4:],
+            content[:4] + b'\x09' + content[5:],
+            # a huge payload length
+            content[:headerSize + 18] + b'\xff\xff\xff\xff\x0f' + content[headerSize + 19:],
+            # invalid utf-8 in the first record
+            content[:headerSize + 19] + b'\xff' + content[headerSize + 20:],
+            # a record count that does not match the blocks
+            content[:6] + (11).to_bytes(8, 'little') + content[14:],
+            pickle.dumps(self.data),
+        ]
+        for index, content in enumerate(corrupted):
+            with open(self.filePath, 'wb') as fp:
+                fp.write(content)
+            self.assertRaises(ReaderWriterException, self.brw.deserialise, self.filePath)
+
+
+class TestCsvRW(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.reader_writer.CsvRW
+    """
+    def setUp(self):
+        self.crw = CsvRW(MockFormat())
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.filePath = os.path.join(self.tmpDirPath, 'contacts.csv')
+        self.data = [
+            {'name': 'Rahul Singh', 'address': ' 28 Deanswood, N112TQ', 'phone': ' 0123456789'},
+            {'name': 'James "Jim"', 'address': 'Maidstone Road\nN221QQ', 'phone': ''},
+            {'name': 'Albert', 'address': 'Queens Road', 'phone': '99999999999'},
+        ]
+
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def testSerialiseThenDeserialise(self):
+        """
+        test serialise() writes a header row and deserialise() reads back quoted delimiters,
+        quotes and newlines.
+        """
+        self.assertEqual(self.crw.serialise(self.data, self.filePath), self.data)
+        with open(self.filePath, newline='') as fp:
+            self.assertEqual(fp.readline(), 'name,address,phone\r\n')
+        self.assertEqual(self.crw.deserialise(self.filePath), self.data)
+        self.assertRaises(ReaderWriterException, self.crw.serialise, [{'name': 'a'}], self.filePath)
+
+
+    def testSerialiseWithoutHeaderOrWithAnotherDialect(self):
+        """
+        test the header row can be left out and the rows written with another dialect.
+        """
+        CsvRW(MockFormat(), header=False, dialect='excel-tab').serialise(self.data, self.filePath)
+        with open(self.filePath, newline='') as fp:
+            self.assertEqual(fp.readline(), 'Rahul Singh\t 28 Deanswood, N112TQ\t 0123456789\r\n')
+        self.assertEqual(self.crw.deserialise(self.filePath), self.data)
+
+
+    def testWriteBatchesWritesSameFileAsSerialise(self):
+        """
+        test write_batches() writes the same file as serialise() and iter_batches() streams it.
+        """
+        self.crw.serialise(self.data, self.filePath)
+        with open(self.filePath, 'rb') as fp:
+            expected = fp.read()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(self.crw.write_batches([self.data[:1], [], self.data[1:]], self.filePath, executor), 3)
+        with open(self.filePath, 'rb') as fp:
+            self.assertEqual(fp.read(), expected)
+        self.assertEqual([len(batch) for batch in self.crw.iter_batches(self.filePath, batchSize=2)], [2, 1])
+
+
+    def testDeserialiseInvalidCsv(self):
+        """
+        test rows with too few columns raise ReaderWriterException.
+        """
+        with open(self.filePath, 'w') as fp:
+            fp.write('a,b,c\nd,e\n')
+        self.assertRaises(ReaderWriterException, self.crw.deserialise, self.filePath)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
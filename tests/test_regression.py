@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout, redirect_stderr
+
+# import classes and functions from al_contacts.regression
+from al_contacts.regression import RegressionException
+from al_contacts.regression import compare_reports
+from al_contacts.regression import failed
+from al_contacts.regression import median_mad
+from al_contacts.regression import merge_reports
+from al_contacts.regression import main
+from al_contacts.regression import EXIT_OK, EXIT_REGRESSION, EXIT_ERROR
+from al_contacts.regression import OK, REGRESSION, IMPROVEMENT, MISSING, NEW
+from al_contacts.benchmark import REPORT_SCHEMA, write_report
+
+
+def make_result(name, samples, rss=1000000, peak=None, kind='format', action='deserialise', rows=1000):
+    """
+    Make a benchmark result with the given timed runs
+    """
+    result = {
+        'kind': kind, 'name': name, 'action': action, 'rows': rows, 'seconds': min(samples),
+        'samples': samples, 'records_per_s': rows / min(samples), 'bytes': 100, 'bytes_per_s': 100 / min(samples),
+        'base_rss_bytes': rss, 'peak_rss_bytes': rss,
+    }
+    if peak is not None:
+        result['memory'] = [{'stage': 'benchmark.' + action, 'label': name, 'peak_bytes': peak}]
+    return result
+
+
+def make_report(*results):
+    return {'schema': REPORT_SCHEMA, 'meta': {'seed': 0, 'repeat': 5}, 'results': list(results)}
+
+
+class TestMedianMad(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.regression.median_mad()
+    """
+    def testMedianMad(self):
+        """
+        test the median and the median absolute deviation ignore an outlier.
+        """
+        median, mad = median_mad([1.0, 1.1, 0.9, 1.0, 9.0])
+        self.assertEqual(median, 1.0)
+        self.assertAlmostEqual(mad, 0.1)
+        self.assertRaises(RegressionException, median_mad, [])
+
+
+class TestCompareReports(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.regression.compare_reports()
+    """
+    def testCompareTime(self):
+        """
+        test a slowdown beyond the threshold and the noise is a regression, a noisy one is not.
+        """
+        baseline = make_report(
+            make_result('json', [1.0, 1.01, 0.99, 1.0, 1.0]),
+            make_result('pickle', [1.0, 1.01, 0.99, 1.0, 1.0]),
+            make_result('noisy', [1.0, 1.5, 0.6, 1.2, 0.8]),
+            make_result('fast', [1.0, 1.01, 0.99, 1.0, 1.0]),
+        )
+        current = make_report(
+            make_result('json', [1.2, 1.21, 1.19, 1.2, 1.2]),
+            make_result('pickle', [1.05, 1.06, 1.04, 1.05, 1.05]),
+            make_result('noisy', [1.2, 1.7, 0.8, 1.4, 1.0]),
+            make_result('fast', [0.5, 0.51, 0.49, 0.5, 0.5]),
+        )
+        comparisons = compare_reports(baseline, current, threshold=10)
+        status = dict((comparison['name'], comparison['status']) for comparison in comparisons
+                      if comparison['metric'] == 'seconds')
+        self.assertEqual(status, {'json': REGRESSION, 'pickle': OK, 'noisy': OK, 'fast': IMPROVEMENT})
+        self.assertEqual([comparison['name'] for comparison in failed(comparisons)], ['json'])
+        self.assertAlmostEqual(comparisons[0]['change_pct'], 20.0)
+        self.assertEqual(compare_reports(baseline, current, threshold=25)[0]['status'], OK)
+
+
+    def testCompareMemory(self):
+        """
+        test the peak RSS and the traced peak memory are compared with the memory threshold.
+        """
+        baseline = make_report(make_result('json', [1.0], rss=1000000, peak=500000))
+        current = make_report(make_result('json', [1.0], rss=1050000, peak=600000))
+        comparisons = dict((comparison['metric'], comparison) for comparison in compare_reports(baseline, current))
+        self.assertEqual(comparisons['seconds']['status'], OK)
+        self.assertEqual(comparisons['peak_rss_bytes']['status'], OK)
+        self.assertEqual(comparisons['traced_peak_bytes']['status'], REGRESSION)
+        self.assertEqual(compare_reports(baseline, current, memoryThreshold=50)[-1]['status'], OK)
+        self.assertRaises(RegressionException, compare_reports, baseline, current, -1)
+
+
+    def testMissingAndNewResults(self):
+        """
+        test a result missing from the current report fails the gate, a new one does not.
+        """
+        baseline = make_report(make_result('json', [1.0]))
+        current = make_report(make_result('pickle', [1.0]))
+        comparisons = compare_reports(baseline, current)
+        self.assertEqual([(comparison['name'], comparison['status']) for comparison in comparisons],
+                         [('json', MISSING), ('pickle', NEW)])
+        self.assertEqual(len(failed(comparisons)), 1)
+
+
+class TestMergeReports(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.regression.merge_reports()
+    """
+    def testMergeReports(self):
+        """
+        test the samples of the runs are pooled and the median base and peak RSS are kept.
+        """
+        reports = [
+            make_report(make_result('json', [1.0, 1.2], rss=100)),
+            make_report(make_result('json', [0.9, 1.1], rss=300)),
+            make_report(make_result('json', [1.3], rss=200)),
+        ]
+        for report, base in zip(reports, [90, 250, 150]):
+            report['results'][0]['base_rss_bytes'] = base
+        merged = merge_reports(reports)
+        result, = merged['results']
+        self.assertEqual(result['samples'], [1.0, 1.2, 0.9, 1.1, 1.3])
+        self.assertEqual(result['seconds'], 0.9)
+        self.assertEqual((result['base_rss_bytes'], result['peak_rss_bytes']), (150, 200))
+        self.assertEqual(merged['meta']['runs'], 3)
+        self.assertRaises(RegressionException, merge_reports, [])
+
+
+class TestMain(unittest.TestCase):
+    """
+    Test Cases for the function al_contacts.regression.main()
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.baseline = os.path.join(self.tmpDirPath, 'baseline.json')
+        self.current = os.path.join(self.tmpDirPath, 'current.json')
+        write_report(make_report(make_result('json', [1.0, 1.0, 1.0])), self.baseline)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def run_main(self, argv):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            code = main(argv)
+        return code, stdout.getvalue()
+
+
+    def testExitCodes(self):
+        """
+        test main() exits non-zero on a regression and on an unreadable report.
+        """
+        write_report(make_report(make_result('json', [1.05, 1.05, 1.05])), self.current)
+        self.assertEqual(self.run_main([self.baseline, '--current', self.current])[0], EXIT_OK)
+
+        write_report(make_report(make_result('json', [1.5, 1.5, 1.5])), self.current)
+        code, output = self.run_main([self.baseline, '--current', self.current])
+        self.assertEqual(code, EXIT_REGRESSION)
+        self.assertIn('REGRESSION', output)
+        self.assertEqual(self.run_main([self.baseline, '--current', self.current, '--threshold', '60'])[0], EXIT_OK)
+
+        self.assertEqual(self.run_main([os.path.join(self.tmpDirPath, 'none.json')])[0], EXIT_ERROR)
+
+
+    def testUpdateBaseline(self):
+        """
+        test '--update' runs the benchmarks of the baseline and replaces it.
+        """
+        code, _ = self.run_main([self.baseline, '--update', '--repeat', '1', '--runs', '2'])
+        self.assertEqual(code, EXIT_OK)
+        with open(self.baseline) as fp:
+            report = json.load(fp)
+        results = dict((result['action'], result) for result in report['results'])
+        self.assertEqual(sorted(results), ['deserialise', 'serialise'])
+        result = results['deserialise']
+        self.assertEqual((result['name'], result['rows'], len(result['samples'])), ('json', 1000, 2))
+        self.assertEqual(report['meta']['runs'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
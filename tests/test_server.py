@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import unittest
+import tempfile
+import json
+import shutil
+import threading
+from urllib.request import urlopen
+from urllib.error import HTTPError
+
+# import classes from al_contacts.server
+from al_contacts.server import ServerException
+from al_contacts.server import DatasetCache
+from al_contacts.server import ContactsService
+from al_contacts.server import make_server
+from al_contacts.formats import Formats
+from al_contacts.format import JsonFormat, BinaryFormat
+from al_contacts.reader_writer import JsonRW, BinaryRW
+from al_contacts.views import Views
+from al_contacts.view import TableView
+from al_contacts.metrics import MetricsHook
+from al_contacts.instrumentation import hooked
+
+
+DATA = [
+    {'name': 'Rahul Singh', 'address': ' 28 Deanswood N112TQ', 'phone': ' 0123456789'},
+    {'name': 'James', 'address': ' Maidstone Road N221QQ', 'phone': ' 01111222233'},
+    {'name': 'Albert', 'address': ' Queens Road CA-20001', 'phone': ' 99999999999'},
+]
+
+
+class TestDatasetCache(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.server.DatasetCache
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        self.loads = []
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def _file(self, name, content='x'):
+        path = os.path.join(self.tmpDirPath, name)
+        with open(path, 'w') as fp:
+            fp.write(content)
+        return path
+
+
+    def _loader(self, filepath):
+        self.loads.append(filepath)
+        return list(DATA)
+
+
+    def testGetCachesDatasets(self):
+        """
+        test DatasetCache.get() loads a dataset once and then hits the cache.
+        """
+        cache = DatasetCache()
+        path = self._file('a.json')
+        self.assertEqual(cache.get('json', path, self._loader), DATA)
+        self.assertEqual(cache.get('json', path, self._loader), DATA)
+        self.assertEqual(self.loads, [path])
+        self.assertEqual((cache.stats()['hits'], cache.stats()['misses']), (1, 1))
+
+
+    def testGetReloadsChangedFiles(self):
+        """
+        test DatasetCache.get() loads a file again once it changed on disk.
+        """
+        cache = DatasetCache()
+        path = self._file('a.json')
+        cache.get('json', path, self._loader)
+        self._file('a.json', 'a longer content')
+        cache.get('json', path, self._loader)
+        self.assertEqual(len(self.loads), 2)
+
+
+    def testGetEvictsLeastRecentlyUsed(self):
+        """
+        test DatasetCache.get() evicts the least recently used dataset when over the limit.
+        """
+        paths = [self._file('{0}.json'.format(index)) for index in range(3)]
+        cache = DatasetCache(maxBytes=1)
+        for path in paths:
+            cache.get('json', path, self._loader)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.stats()['evictions'], 2)
+        cache.get('json', paths[-1], self._loader)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+
+    def testGetWithMissingFile(self):
+        """
+        test DatasetCache.get() with a file that does not exist.
+        """
+        cache = DatasetCache()
+        self.assertRaises(ServerException, cache.get, 'json', os.path.join(self.tmpDirPath, 'x'), self._loader)
+
+
+class TestContactsService(unittest.TestCase):
+    """
+    Test Cases for the class al_contacts.server.ContactsService and the http server
+    """
+    def setUp(self):
+        self.tmpDirPath = tempfile.mkdtemp(prefix='al_contacts_test')
+        formats = Formats()
+        jsonFormat = JsonFormat(formats)
+        JsonRW(jsonFormat)
+        views = Views()
+        tableView = TableView(views)
+        jsonFormat.notify_rw('serialise', DATA, os.path.join(self.tmpDirPath, 'contacts.json'))
+        self.service = ContactsService({'json': jsonFormat}, {'table': tableView}, self.tmpDirPath)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDirPath)
+
+
+    def testPageAndLookup(self):
+        """
+        test ContactsService.page() and lookup()
+        """
+        page = self.service.page('json', 'contacts.json', page=2, size=2)
+        self.assertEqual(page['total'], 3)
+        self.assertEqual(page['records'], DATA[2:])
+        self.assertEqual(self.service.lookup('json', 'contacts.json', 'name', 'James'), DATA[1:2])
+
+
+    def testRender(self):
+        """
+        test ContactsService.render() renders a page in a registered view.
+        """
+        text = self.service.render('json', 'contacts.json', 'table', size=1)
+        self.assertIn('Rahul Singh', text)
+        self.assertNotIn('James', text)
+        self.assertRaises(ServerException, self.service.render, 'json', 'contacts.json', 'xxxx')
+
+
+    def testDatasetOutsideRootOrWithInvalidFormat(self):
+        """
+        test ContactsService.dataset() refuses files outside the root and unknown formats.
+        """
+        self.assertRaises(ServerException, self.service.dataset, 'json', '../contacts.json')
+        self.assertRaises(ServerException, self.service.dataset, 'xxxx', 'contacts.json')
+
+
+    def testDatasetInAnotherFormat(self):
+        """
+        test the http server answers 400 for a file that is not in the format requested.
+        """
+        formats = Formats()
+        binaryFormat = BinaryFormat(formats)
+        BinaryRW(binaryFormat)
+        service = ContactsService({'binary': binaryFormat}, {}, self.tmpDirPath)
+        self.assertRaises(ServerException, service.dataset, 'binary', 'contacts.json')
+
+        server = make_server(service, port=0, quiet=True)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            baseUrl = 'http://{0}:{1}'.format(*server.server_address[:2])
+            with self.assertRaises(HTTPError) as context:
+                urlopen(baseUrl + '/page?format=binary&path=contacts.json')
+            self.assertEqual(context.exception.code, 400)
+            context.exception.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+
+    def testHttpServer(self):
+        """
+        test the http server answers from the service.
+        """
+        server = make_server(self.service, port=0, quiet=True)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            baseUrl = 'http://{0}:{1}'.format(*server.server_address[:2])
+            with urlopen(baseUrl + '/lookup?format=json&path=contacts.json&field=name&value=Albert') as response:
+                self.assertEqual(json.loads(response.read().decode('utf-8')), DATA[2:])
+            with urlopen(baseUrl + '/formats') as response:
+                self.assertEqual(json.loads(response.read().decode('utf-8')), ['json'])
+            self.assertRaises(HTTPError, urlopen, baseUrl + '/page?format=json&path=missing.json')
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+
+    def testMetricsEndpoint(self):
+        """
+        test '/metrics' serves the stage metrics and the cache hit rate in the Prometheus format.
+        """
+        server = make_server(self.service, port=0, quiet=True)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            baseUrl = 'http://{0}:{1}'.format(*server.server_address[:2])
+            with hooked(MetricsHook(self.service.metrics)):
+                for _ in range(3):
+                    with urlopen(baseUrl + '/render?format=json&path=contacts.json&view=table') as response:
+                        response.read()
+            with urlopen(baseUrl + '/metrics') as response:
+                self.assertTrue(response.headers['Content-Type'].startswith('text/plain; version=0.0.4'))
+                text = response.read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.assertIn('al_contacts_cache_hits_total{cache="datasets"} 2', text)
+        self.assertIn('al_contacts_cache_misses_total{cache="datasets"} 1', text)
+        self.assertIn('al_contacts_records_total{stage="rw.deserialise",label="json"} 3', text)
+        self.assertIn('al_contacts_stage_seconds_count{stage="view.render",label="table"} 3', text)
+        self.assertIn('al_contacts_cache_hit_ratio{cache="datasets"} 0.6666666666666666', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
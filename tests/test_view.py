@@ -77,6 +77,17 @@ class TestView(unittest.TestCase):
         self.assertEqual(self.view.notify(self.mockViews, []), None)
 
 
+    ######################################################################
+    # tests for al_contacts.view.View.render()                           #
+    ######################################################################
+
+    def testRenderIsNotSupported(self):
+        """
+        test al_contacts.view.View.render() raises for the base view.
+        """
+        self.assertRaises(ViewException, self.view.render, [])
+
+
 class TestTableView(unittest.TestCase):
     """
     Test Cases for the class al_contacts.view.JsonRW
@@ -119,6 +130,14 @@ class TestTableView(unittest.TestCase):
         self.assertEqual(self.tv._display([]), None)
 
 
+    def testRenderReturnsTableText(self):
+        """
+        test al_contacts.view.TableView.render() returns the table as a string.
+        """
+        text = self.tv.render([{'name': 'Tom', 'address': 'London Bridge', 'phone': '0123'}])
+        self.assertIn('| 1     | Tom             |', text)
+
+
 class TestListView(unittest.TestCase):
     """
     Test Cases for the class al_contacts.view.JsonRW
@@ -161,6 +180,14 @@ class TestListView(unittest.TestCase):
         self.assertEqual(self.lv._display([]), None)
 
 
+    def testRenderReturnsListText(self):
+        """
+        test al_contacts.view.ListView.render() returns the list as a string.
+        """
+        text = self.lv.render([{'name': 'Tom', 'address': 'London Bridge', 'phone': '0123'}])
+        self.assertIn('Name: Tom', text)
+
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
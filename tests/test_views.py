@@ -4,6 +4,7 @@ import sys
 import os
 import unittest
 import tempfile
+import asyncio
 
 # import classes from al_contacts.reader_writer
 from al_contacts.views import Views
@@ -24,6 +25,17 @@ class MockView:
         pass
 
 
+class RecordingView(MockView):
+    """
+    This is a mock class for al_contacts.view.View that records the data it is notified with
+    """
+    def __init__(self):
+        self.received = []
+
+    def notify(self, views, data, *args, **kwargs):
+        self.received.append(data)
+
+
 class TestViews(unittest.TestCase):
     """
     Test Cases for the class al_contacts.views.Views
@@ -141,6 +153,50 @@ class TestViews(unittest.TestCase):
         self.assertRaises(ViewsException, self.views.notify_views, 'xxxxxxxx')
 
 
+    ######################################################################
+    # tests for al_contacts.views.Views.anotify_views()                  #
+    ######################################################################
+
+    def testANotifyViewsWithNoRegisteredViews(self):
+        """
+        test al_contacts.views.Views.anotify_views() with no registered views.
+        """
+        self.assertEqual(self.views.views, [])
+        self.assertRaises(ViewsException, asyncio.run, self.views.anotify_views())
+
+
+    def testANotifyViewsWithRegisteredView(self):
+        """
+        test al_contacts.views.Views.anotify_views() with a registered view name.
+        """
+        self.views.register_view(self.mockView)
+        self.assertEqual(asyncio.run(self.views.anotify_views('MockView')), None)
+
+
+    def testDeclareViewInstantiatesOnFirstUse(self):
+        """
+        test a declared view is listed by names() and instantiated when it is notified.
+        """
+        self.views.declare_view('MockView', lambda views: views.register_view(self.mockView) or self.mockView)
+        self.assertEqual(self.views.names(), ['MockView'])
+        self.assertEqual(self.views.views, [])
+        self.views.notify_views('MockView')
+        self.assertEqual(self.views.views, [self.mockView])
+        self.assertIs(self.views.get_view('MockView'), self.mockView)
+        self.assertRaises(ViewsException, self.views.get_view, 'xxxx')
+
+
+    def testNotifyViewsWithPerCallData(self):
+        """
+        test al_contacts.views.Views.notify_views() forwards per-call data instead of self.data
+        """
+        view = RecordingView()
+        self.views.register_view(view)
+        data = [{'name': 'a', 'address': 'b', 'phone': 'c'}]
+        self.views.notify_views(data=data)
+        self.views.notify_views()
+        self.assertEqual(view.received, [data, []])
+
 
 
 if __name__ == '__main__':